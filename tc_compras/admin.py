@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ConciliacaoPedido, ExcecaoConciliacao, ExecucaoConciliacao
+
+
+class ExcecaoConciliacaoInline(admin.TabularInline):
+    model = ExcecaoConciliacao
+    extra = 0
+    can_delete = False
+    readonly_fields = ('tipo', 'mensagem', 'valor_esperado', 'valor_encontrado', 'despesa_sugerida')
+
+
+@admin.register(ConciliacaoPedido)
+class ConciliacaoPedidoAdmin(admin.ModelAdmin):
+    list_display = ('pedido', 'fornecedor', 'status', 'valor_pedido', 'valor_recebido', 'valor_despesa', 'diferenca', 'processado_em')
+    list_filter = ('status', 'excecoes__tipo')
+    search_fields = ('fornecedor__razao_social',)
+    readonly_fields = [f.name for f in ConciliacaoPedido._meta.fields]
+    inlines = [ExcecaoConciliacaoInline]
+
+
+@admin.register(ExecucaoConciliacao)
+class ExecucaoConciliacaoAdmin(admin.ModelAdmin):
+    list_display = ('iniciada_em', 'modo', 'data_inicio', 'data_fim', 'pedidos_processados', 'pedidos_divergentes', 'concluida_em')
+    list_filter = ('modo',)
+    readonly_fields = [f.name for f in ExecucaoConciliacao._meta.fields]
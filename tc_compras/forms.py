@@ -1,19 +1,9 @@
 from django import forms
 from .models import CentroCusto, RequisicaoCompra, ItemRequisicao, PedidoCompra, RecebimentoItem
-from django.apps import apps
 from decimal import Decimal # Importar Decimal para valores monetários
-
-# Acesso aos modelos de outros Apps
-# É necessário garantir que estes imports funcionem (via app_label.Model)
-try:
-    ProdutoModel = apps.get_model('tc_produtos', 'Produto')
-    ServicoModel = apps.get_model('tc_servicos', 'Servico')
-    FornecedorModel = apps.get_model('tc_produtos', 'Fornecedor')
-except LookupError:
-    # Fallback para evitar erro na definição do Form se a App ainda não estiver pronta.
-    ProdutoModel = None 
-    ServicoModel = None
-    FornecedorModel = None
+from tc_core.autocomplete import AutocompleteSelect
+from tc_produtos.autocompletes import FornecedorAutocomplete, ProdutoAutocomplete
+from tc_servicos.autocompletes import ServicoAutocomplete
 
 # ############################################################################
 # CENTRO DE CUSTO
@@ -59,21 +49,14 @@ class ItemRequisicaoForm(forms.ModelForm):
         fields = ['produto', 'servico', 'nome_customizado', 'especificacao', 
                   'quantidade', 'preco_unitario_estimado']
         widgets = {
-            # Classes Select2 para a interatividade HTMX/JS
-            'produto': forms.Select(attrs={'class': 'form-control custom-select select2-produto'}),
-            'servico': forms.Select(attrs={'class': 'form-control custom-select select2-servico'}),
+            # Select2 com busca remota: só o item escolhido vai no HTML
+            'produto': AutocompleteSelect(ProdutoAutocomplete, attrs={'class': 'form-control select2 select2-produto'}),
+            'servico': AutocompleteSelect(ServicoAutocomplete, attrs={'class': 'form-control select2 select2-servico'}),
             'nome_customizado': forms.TextInput(attrs={'class': 'form-control'}),
             'especificacao': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
             'quantidade': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'preco_unitario_estimado': forms.TextInput(attrs={'class': 'form-control currency-mask', 'value': '0.00'}),
         }
-        
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if ProdutoModel:
-            self.fields['produto'].queryset = ProdutoModel.objects.all().order_by('nome')
-        if ServicoModel:
-            self.fields['servico'].queryset = ServicoModel.objects.all().order_by('nome')
 
 
 # ############################################################################
@@ -85,7 +68,7 @@ class PedidoCompraForm(forms.ModelForm):
         model = PedidoCompra
         fields = ['fornecedor', 'custo_frete']
         widgets = {
-            'fornecedor': forms.Select(attrs={'class': 'form-control custom-select select2-fornecedor'}),
+            'fornecedor': AutocompleteSelect(FornecedorAutocomplete, attrs={'class': 'form-control select2 select2-fornecedor'}),
             'custo_frete': forms.TextInput(attrs={'class': 'form-control currency-mask', 'value': '0.00'}),
         }
 
@@ -0,0 +1,27 @@
+# tc_compras/management/commands/conciliar_compras.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from tc_compras.services import ConciliacaoComprasService
+
+class Command(BaseCommand):
+    help = 'Concilia pedidos de compra, recebimentos e despesas (three-way match) por período ou de forma incremental'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=date.fromisoformat, help='Data inicial de emissão do PO (AAAA-MM-DD).')
+        parser.add_argument('--fim', type=date.fromisoformat, help='Data final de emissão do PO (AAAA-MM-DD).')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Processa só os POs com documentos alterados desde a última execução incremental.'
+        )
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            execucao = ConciliacaoComprasService.conciliar_incremental()
+        else:
+            execucao = ConciliacaoComprasService.conciliar_periodo(options['inicio'], options['fim'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{execucao.pedidos_processados} pedido(s) conciliado(s), {execucao.pedidos_divergentes} com divergência.'
+        ))
@@ -0,0 +1,79 @@
+# Generated by Django 6.0 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_compras', '0002_initial'),
+        ('tc_financeiro', '0003_alter_despesa_numero_documento_and_more'),
+        ('tc_produtos', '0003_cotacaomoeda_melhorprecoproduto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoConciliacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modo', models.CharField(choices=[('periodo', 'Por Período'), ('incremental', 'Incremental')], max_length=15, verbose_name='Modo')),
+                ('data_inicio', models.DateField(blank=True, null=True, verbose_name='Emissão a partir de')),
+                ('data_fim', models.DateField(blank=True, null=True, verbose_name='Emissão até')),
+                ('iniciada_em', models.DateTimeField(auto_now_add=True, verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('pedidos_processados', models.PositiveIntegerField(default=0, verbose_name='Pedidos Processados')),
+                ('pedidos_divergentes', models.PositiveIntegerField(default=0, verbose_name='Pedidos Divergentes')),
+            ],
+            options={
+                'verbose_name': 'Execução de Conciliação',
+                'verbose_name_plural': 'Execuções de Conciliação',
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ConciliacaoPedido',
+            fields=[
+                ('pedido', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='conciliacao', serialize=False, to='tc_compras.pedidocompra', verbose_name='Pedido de Compra')),
+                ('status', models.CharField(choices=[('conciliado', 'Conciliado'), ('parcial', 'Recebido Parcialmente'), ('pendente', 'Aguardando Recebimento'), ('divergente', 'Divergente')], max_length=15, verbose_name='Status')),
+                ('quantidade_pedida', models.PositiveIntegerField(default=0, verbose_name='Qtd. Pedida')),
+                ('quantidade_recebida', models.PositiveIntegerField(default=0, verbose_name='Qtd. Recebida')),
+                ('valor_pedido', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Valor do PO')),
+                ('valor_recebido', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Valor Recebido (+ Frete)')),
+                ('valor_despesa', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Valor da Despesa')),
+                ('diferenca', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Despesa - Recebido')),
+                ('processado_em', models.DateTimeField(auto_now=True, verbose_name='Processado em')),
+                ('despesa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conciliacoes', to='tc_financeiro.despesa', verbose_name='Despesa Conciliada')),
+                ('fornecedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tc_produtos.fornecedor', verbose_name='Fornecedor')),
+                ('execucao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tc_compras.execucaoconciliacao', verbose_name='Execução')),
+            ],
+            options={
+                'verbose_name': 'Conciliação de Pedido',
+                'verbose_name_plural': 'Conciliações de Pedidos',
+                'ordering': ['-pedido_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExcecaoConciliacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('recebido_sem_despesa', 'Recebido sem Despesa'), ('despesa_sem_recebimento', 'Despesa sem Recebimento'), ('excesso_recebido', 'Recebido Acima do Pedido'), ('fornecedor_divergente', 'Fornecedor Divergente'), ('valor_divergente', 'Valor Divergente'), ('pedido_cancelado', 'Movimento em PO Cancelado')], max_length=30, verbose_name='Tipo')),
+                ('mensagem', models.CharField(max_length=255, verbose_name='Mensagem')),
+                ('valor_esperado', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Esperado')),
+                ('valor_encontrado', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Encontrado')),
+                ('conciliacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excecoes', to='tc_compras.conciliacaopedido', verbose_name='Conciliação')),
+                ('despesa_sugerida', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tc_financeiro.despesa', verbose_name='Despesa Sugerida')),
+            ],
+            options={
+                'verbose_name': 'Exceção de Conciliação',
+                'verbose_name_plural': 'Exceções de Conciliação',
+                'ordering': ['conciliacao_id', 'tipo'],
+                'indexes': [models.Index(fields=['tipo'], name='idx_excecao_conciliacao_tipo')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='conciliacaopedido',
+            index=models.Index(fields=['status', 'fornecedor'], name='idx_conciliacao_status'),
+        ),
+    ]
@@ -356,7 +356,9 @@ class RecebimentoItem(models.Model):
         is_new = self.pk is None
         
         if is_new:
-            item_pedido = self.item_pedido
+            # Trava o item: recebimentos simultâneos não podem ultrapassar o saldo
+            item_pedido = ItemPedidoCompra.objects.select_for_update().get(pk=self.item_pedido_id)
+            self.item_pedido = item_pedido
             pedido = item_pedido.pedido_compra
             
             # 1. Validação de Saldo
@@ -364,9 +366,9 @@ class RecebimentoItem(models.Model):
                 raise ValidationError(_(f"Quantidade a receber ({self.quantidade_recebida}) excede o saldo restante no pedido ({item_pedido.saldo_a_receber})."))
 
             # 2. Atualiza o saldo do ItemPedidoCompra
-            item_pedido.quantidade_recebida = F('quantidade_recebida') + self.quantidade_recebida
+            # (valor calculado, não F(): o histórico do item grava o valor da instância)
+            item_pedido.quantidade_recebida += self.quantidade_recebida
             item_pedido.save(update_fields=['quantidade_recebida'])
-            item_pedido.refresh_from_db()
 
             # 3. Integração com ESTOQUE (Se for um PRODUTO estocável)
             if item_pedido.requisicao_item and item_pedido.requisicao_item.produto:
@@ -409,19 +411,10 @@ class RecebimentoItem(models.Model):
             pedido.save(update_fields=['status'])
 
             # 5. Geração da Despesa no Financeiro (Regra 8)
-            # A Despesa (Contas a Pagar) deve ser gerada/atualizada AQUI, 
-            # após o recebimento, garantindo que o valor é devido.
-            # O código para isso será implementado no App FINANCEIRO, mas a chamada viria aqui.
-            # Ex:
-            # if not pedido.fatura_vinculada:
-            #    FinanceiroModel = apps.get_model('financeiro', 'Despesa')
-            #    valor_recebido = self.quantidade_recebida * item_pedido.preco_unitario
-            #    FinanceiroModel.objects.create(
-            #       ... campos da despesa ...
-            #       valor=valor_recebido,
-            #       po_vinculado=pedido
-            #    )
-
+            # O valor recebido é acumulado por PO e a Despesa é criada/atualizada
+            # uma única vez no commit da transação, não a cada linha recebida.
+            from .services import ContasPagarRecebimentoService
+            ContasPagarRecebimentoService.agendar(pedido.pk)
 
         super().save(*args, **kwargs)
 
@@ -431,4 +424,125 @@ class RecebimentoItem(models.Model):
         ordering = ['-data_recebimento']
 
     def __str__(self):
-        return f"Recebimento de {self.quantidade_recebida} para PO-{self.item_pedido.pedido_compra.pk}"
\ No newline at end of file
+        return f"Recebimento de {self.quantidade_recebida} para PO-{self.item_pedido.pedido_compra.pk}"
+
+# ############################################################################
+# 6. CONCILIAÇÃO (PO x Recebimento x Despesa)
+# ############################################################################
+
+class ExecucaoConciliacao(models.Model):
+    """ Registro de cada rodada do motor de conciliação (base do modo incremental). """
+    class Modo(models.TextChoices):
+        PERIODO = 'periodo', _('Por Período')
+        INCREMENTAL = 'incremental', _('Incremental')
+
+    modo = models.CharField(max_length=15, choices=Modo.choices, verbose_name="Modo")
+    data_inicio = models.DateField(null=True, blank=True, verbose_name="Emissão a partir de")
+    data_fim = models.DateField(null=True, blank=True, verbose_name="Emissão até")
+    iniciada_em = models.DateTimeField(auto_now_add=True, verbose_name="Iniciada em")
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluída em")
+    pedidos_processados = models.PositiveIntegerField(default=0, verbose_name="Pedidos Processados")
+    pedidos_divergentes = models.PositiveIntegerField(default=0, verbose_name="Pedidos Divergentes")
+
+    class Meta:
+        verbose_name = "Execução de Conciliação"
+        verbose_name_plural = "Execuções de Conciliação"
+        ordering = ['-iniciada_em']
+
+    def __str__(self):
+        return f"{self.get_modo_display()} em {self.iniciada_em:%d/%m/%Y %H:%M}"
+
+
+class ConciliacaoPedido(models.Model):
+    """
+    Resultado do three-way match de um PO: valores pedidos, recebidos e
+    lançados em Contas a Pagar. Regravado a cada execução que inclui o PO.
+    """
+    class Status(models.TextChoices):
+        CONCILIADO = 'conciliado', _('Conciliado')
+        PARCIAL = 'parcial', _('Recebido Parcialmente')
+        PENDENTE = 'pendente', _('Aguardando Recebimento')
+        DIVERGENTE = 'divergente', _('Divergente')
+
+    pedido = models.OneToOneField(
+        PedidoCompra,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='conciliacao',
+        verbose_name="Pedido de Compra"
+    )
+    fornecedor = models.ForeignKey('tc_produtos.Fornecedor', on_delete=models.CASCADE, verbose_name="Fornecedor")
+    despesa = models.ForeignKey(
+        'tc_financeiro.Despesa',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='conciliacoes',
+        verbose_name="Despesa Conciliada"
+    )
+    status = models.CharField(max_length=15, choices=Status.choices, verbose_name="Status")
+
+    quantidade_pedida = models.PositiveIntegerField(default=0, verbose_name="Qtd. Pedida")
+    quantidade_recebida = models.PositiveIntegerField(default=0, verbose_name="Qtd. Recebida")
+    valor_pedido = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Valor do PO")
+    valor_recebido = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Valor Recebido (+ Frete)")
+    valor_despesa = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="Valor da Despesa")
+    diferenca = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Despesa - Recebido")
+
+    execucao = models.ForeignKey(
+        ExecucaoConciliacao,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        verbose_name="Execução"
+    )
+    processado_em = models.DateTimeField(auto_now=True, verbose_name="Processado em")
+
+    class Meta:
+        verbose_name = "Conciliação de Pedido"
+        verbose_name_plural = "Conciliações de Pedidos"
+        ordering = ['-pedido_id']
+        indexes = [
+            models.Index(fields=['status', 'fornecedor'], name='idx_conciliacao_status'),
+        ]
+
+    def __str__(self):
+        return f"PO-{self.pedido_id}: {self.get_status_display()}"
+
+
+class ExcecaoConciliacao(models.Model):
+    """ Divergência encontrada na conciliação de um PO. """
+    class Tipo(models.TextChoices):
+        RECEBIDO_SEM_DESPESA = 'recebido_sem_despesa', _('Recebido sem Despesa')
+        DESPESA_SEM_RECEBIMENTO = 'despesa_sem_recebimento', _('Despesa sem Recebimento')
+        EXCESSO_RECEBIDO = 'excesso_recebido', _('Recebido Acima do Pedido')
+        FORNECEDOR_DIVERGENTE = 'fornecedor_divergente', _('Fornecedor Divergente')
+        VALOR_DIVERGENTE = 'valor_divergente', _('Valor Divergente')
+        PEDIDO_CANCELADO = 'pedido_cancelado', _('Movimento em PO Cancelado')
+
+    conciliacao = models.ForeignKey(
+        ConciliacaoPedido,
+        on_delete=models.CASCADE,
+        related_name='excecoes',
+        verbose_name="Conciliação"
+    )
+    tipo = models.CharField(max_length=30, choices=Tipo.choices, verbose_name="Tipo")
+    mensagem = models.CharField(max_length=255, verbose_name="Mensagem")
+    valor_esperado = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="Esperado")
+    valor_encontrado = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="Encontrado")
+    despesa_sugerida = models.ForeignKey(
+        'tc_financeiro.Despesa',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+        verbose_name="Despesa Sugerida"
+    )
+
+    class Meta:
+        verbose_name = "Exceção de Conciliação"
+        verbose_name_plural = "Exceções de Conciliação"
+        ordering = ['conciliacao_id', 'tipo']
+        indexes = [
+            models.Index(fields=['tipo'], name='idx_excecao_conciliacao_tipo'),
+        ]
+
+    def __str__(self):
+        return f"PO-{self.conciliacao_id}: {self.get_tipo_display()}"
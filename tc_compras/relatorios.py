@@ -0,0 +1,146 @@
+# tc_compras/relatorios.py
+from decimal import Decimal
+
+from django import forms
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from tc_produtos.models import Fornecedor
+from tc_relatorios.registro import RelatorioBase, registrar
+
+from .models import ConciliacaoPedido, ExcecaoConciliacao, ItemPedidoCompra
+
+# ############################################################################
+# AUDITORIA DE COMPRAS (Estimado na Requisição x Negociado no PO)
+# ############################################################################
+
+VALOR_ESTIMADO = ExpressionWrapper(
+    F('quantidade_pedida') * F('requisicao_item__preco_unitario_estimado'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+VALOR_REAL = ExpressionWrapper(
+    F('quantidade_pedida') * F('preco_unitario'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+@registrar
+class AuditoriaComprasRelatorio(RelatorioBase):
+    codigo = 'auditoria-compras'
+    titulo = 'Auditoria de Compras'
+    descricao = 'Compara o valor estimado nas requisições com o valor negociado nos pedidos de compra.'
+    categoria = 'Compras'
+    permissao = 'tc_compras.view_pedidocompra'
+    parametros = {
+        'data_inicio': forms.DateField(label='Emissão a partir de', required=False, widget=forms.DateInput(attrs={'type': 'date'})),
+        'data_fim': forms.DateField(label='Emissão até', required=False, widget=forms.DateInput(attrs={'type': 'date'})),
+        'fornecedor': forms.ModelChoiceField(label='Fornecedor', queryset=Fornecedor.objects.all(), required=False),
+    }
+    colunas = [
+        ('pedido', 'PO'),
+        ('data_emissao', 'Emissão'),
+        ('fornecedor', 'Fornecedor'),
+        ('descricao_item', 'Item'),
+        ('quantidade', 'Qtd.'),
+        ('valor_estimado', 'Valor Estimado (R$)'),
+        ('valor_real', 'Valor Negociado (R$)'),
+        ('diferenca', 'Economia (R$)'),
+        ('percentual', 'Economia (%)'),
+    ]
+
+    def get_queryset(self, params):
+        qs = ItemPedidoCompra.objects.filter(requisicao_item__isnull=False).exclude(pedido_compra__status='cancelado')
+        if params.get('data_inicio'):
+            qs = qs.filter(pedido_compra__data_emissao__gte=params['data_inicio'])
+        if params.get('data_fim'):
+            qs = qs.filter(pedido_compra__data_emissao__lte=params['data_fim'])
+        if params.get('fornecedor'):
+            qs = qs.filter(pedido_compra__fornecedor=params['fornecedor'])
+        return qs.annotate(valor_estimado=VALOR_ESTIMADO, valor_real=VALOR_REAL)
+
+    def gerar(self, params):
+        linhas = self.get_queryset(params).values_list(
+            'pedido_compra_id', 'pedido_compra__data_emissao', 'pedido_compra__fornecedor__razao_social',
+            'descricao_item', 'quantidade_pedida', 'valor_estimado', 'valor_real',
+        ).order_by('-pedido_compra__data_emissao', 'pedido_compra_id', 'pk')
+
+        for po, emissao, fornecedor, descricao, qtd, estimado, real in linhas.iterator(chunk_size=2000):
+            estimado = estimado or Decimal('0.00')
+            real = real or Decimal('0.00')
+            diferenca = estimado - real
+            yield {
+                'pedido': f"PO-{po}",
+                'data_emissao': emissao.isoformat() if emissao else None,
+                'fornecedor': fornecedor,
+                'descricao_item': descricao,
+                'quantidade': qtd,
+                'valor_estimado': float(estimado),
+                'valor_real': float(real),
+                'diferenca': float(diferenca),
+                'percentual': round(float(diferenca / estimado * 100), 2) if estimado else None,
+            }
+
+    def resumir(self, params):
+        totais = self.get_queryset(params).aggregate(estimado=Sum('valor_estimado'), real=Sum('valor_real'))
+        estimado = totais['estimado'] or Decimal('0.00')
+        real = totais['real'] or Decimal('0.00')
+        return {'total estimado': estimado, 'total negociado': real, 'economia': estimado - real}
+
+
+# ############################################################################
+# EXCEÇÕES DA CONCILIAÇÃO (PO x Recebimento x Despesa)
+# ############################################################################
+
+@registrar
+class ExcecoesConciliacaoRelatorio(RelatorioBase):
+    codigo = 'conciliacao-compras'
+    titulo = 'Exceções da Conciliação de Compras'
+    descricao = 'Divergências entre pedidos de compra, recebimentos e despesas apontadas pela última conciliação.'
+    categoria = 'Compras'
+    permissao = 'tc_compras.view_pedidocompra'
+    parametros = {
+        'tipo': forms.ChoiceField(label='Tipo', choices=[('', 'Todos')] + list(ExcecaoConciliacao.Tipo.choices), required=False),
+        'fornecedor': forms.ModelChoiceField(label='Fornecedor', queryset=Fornecedor.objects.all(), required=False),
+    }
+    colunas = [
+        ('pedido', 'PO'),
+        ('fornecedor', 'Fornecedor'),
+        ('tipo', 'Exceção'),
+        ('mensagem', 'Detalhe'),
+        ('valor_esperado', 'Esperado (R$)'),
+        ('valor_encontrado', 'Encontrado (R$)'),
+        ('despesa_sugerida', 'Despesa Sugerida'),
+        ('processado_em', 'Processado em'),
+    ]
+
+    def get_queryset(self, params):
+        qs = ExcecaoConciliacao.objects.all()
+        if params.get('tipo'):
+            qs = qs.filter(tipo=params['tipo'])
+        if params.get('fornecedor'):
+            qs = qs.filter(conciliacao__fornecedor=params['fornecedor'])
+        return qs
+
+    def gerar(self, params):
+        tipos = dict(ExcecaoConciliacao.Tipo.choices)
+        linhas = self.get_queryset(params).values_list(
+            'conciliacao_id', 'conciliacao__fornecedor__razao_social', 'tipo', 'mensagem',
+            'valor_esperado', 'valor_encontrado', 'despesa_sugerida_id', 'conciliacao__processado_em',
+        ).order_by('conciliacao_id', 'tipo')
+
+        for po, fornecedor, tipo, mensagem, esperado, encontrado, sugerida, processado in linhas.iterator(chunk_size=2000):
+            yield {
+                'pedido': f"PO-{po}",
+                'fornecedor': fornecedor,
+                'tipo': str(tipos.get(tipo, tipo)),
+                'mensagem': mensagem,
+                'valor_esperado': float(esperado) if esperado is not None else None,
+                'valor_encontrado': float(encontrado) if encontrado is not None else None,
+                'despesa_sugerida': f"#{sugerida}" if sugerida else None,
+                'processado_em': processado.isoformat() if processado else None,
+            }
+
+    def resumir(self, params):
+        resumo = dict(
+            ConciliacaoPedido.objects.values('status').annotate(total=Count('pk')).values_list('status', 'total')
+        )
+        return {str(rotulo): resumo.get(valor, 0) for valor, rotulo in ConciliacaoPedido.Status.choices}
@@ -0,0 +1,412 @@
+# tc_compras/services.py
+import threading
+import weakref
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, Sum
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from .models import (
+    ConciliacaoPedido, ExcecaoConciliacao, ExecucaoConciliacao,
+    ItemPedidoCompra, PedidoCompra, RecebimentoItem,
+)
+
+# ############################################################################
+# CONCILIAÇÃO PO x RECEBIMENTO x DESPESA (three-way match)
+# ############################################################################
+
+class ConciliacaoComprasService:
+    """
+    Confronta, por PO, o que foi pedido (ItemPedidoCompra), o que foi
+    recebido (RecebimentoItem) e o que foi lançado em Contas a Pagar
+    (Despesa). Cada lote de POs é lido com um número fixo de queries
+    (pedidos, itens, recebimentos agrupados por item e despesas avulsas),
+    sem percorrer os documentos um a um, e o resultado é regravado em
+    ConciliacaoPedido/ExcecaoConciliacao.
+
+    O valor esperado da despesa é o valor recebido mais o frete; uma despesa
+    vinculada a vários POs é comparada com a soma deles. POs recebidos sem
+    despesa recebem como sugestão uma despesa avulsa do mesmo fornecedor com
+    valor dentro da tolerância (a vinculação fica a cargo do financeiro).
+    """
+
+    TAMANHO_LOTE = 500
+    CENTAVO = Decimal('0.01')
+
+    @staticmethod
+    def tolerancia(valor_esperado):
+        percentual = Decimal(str(getattr(settings, 'COMPRAS_CONCILIACAO_TOLERANCIA_PERCENTUAL', 1)))
+        minimo = Decimal(str(getattr(settings, 'COMPRAS_CONCILIACAO_TOLERANCIA_VALOR', 1)))
+        return max(minimo, abs(valor_esperado) * percentual / 100)
+
+    # ------------------------------------------------------------------
+    # Seleção dos POs
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def pedidos_alterados_desde(momento):
+        """ POs cujo pedido, itens, recebimentos ou despesa mudaram após `momento`. """
+        from tc_financeiro.models import Despesa
+
+        pedidos = set(
+            PedidoCompra.history.filter(history_date__gte=momento).values_list('id', flat=True)
+        )
+        pedidos.update(
+            ItemPedidoCompra.history.filter(history_date__gte=momento).values_list('pedido_compra_id', flat=True)
+        )
+        itens = RecebimentoItem.history.filter(history_date__gte=momento).values('item_pedido_id')
+        pedidos.update(
+            ItemPedidoCompra.objects.filter(pk__in=itens).values_list('pedido_compra_id', flat=True)
+        )
+
+        despesas = Despesa.history.filter(history_date__gte=momento)
+        pedidos.update(
+            PedidoCompra.objects.filter(fatura_vinculada_id__in=despesas.values('id')).values_list('pk', flat=True)
+        )
+        # Despesa avulsa nova/alterada pode ser a candidata de um PO recebido sem despesa
+        pedidos.update(
+            ConciliacaoPedido.objects.filter(
+                fornecedor_id__in=despesas.filter(fornecedor_id__isnull=False).values('fornecedor_id'),
+                excecoes__tipo=ExcecaoConciliacao.Tipo.RECEBIDO_SEM_DESPESA,
+            ).values_list('pedido_id', flat=True)
+        )
+        return pedidos
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def conciliar_periodo(data_inicio=None, data_fim=None):
+        """ Concilia os POs emitidos no intervalo (datas opcionais). """
+        qs = PedidoCompra.objects.all()
+        if data_inicio:
+            qs = qs.filter(data_emissao__gte=data_inicio)
+        if data_fim:
+            qs = qs.filter(data_emissao__lte=data_fim)
+        execucao = ExecucaoConciliacao.objects.create(
+            modo=ExecucaoConciliacao.Modo.PERIODO, data_inicio=data_inicio, data_fim=data_fim,
+        )
+        return ConciliacaoComprasService._executar(execucao, qs.values_list('pk', flat=True))
+
+    @staticmethod
+    def conciliar_incremental():
+        """
+        Concilia só os POs com documentos alterados desde o início da última
+        execução incremental concluída (a primeira processa todos).
+        """
+        ultima = ExecucaoConciliacao.objects.filter(
+            modo=ExecucaoConciliacao.Modo.INCREMENTAL, concluida_em__isnull=False,
+        ).order_by('-iniciada_em').first()
+        execucao = ExecucaoConciliacao.objects.create(modo=ExecucaoConciliacao.Modo.INCREMENTAL)
+        if ultima is None:
+            pedido_ids = PedidoCompra.objects.values_list('pk', flat=True)
+        else:
+            pedido_ids = ConciliacaoComprasService.pedidos_alterados_desde(ultima.iniciada_em)
+        return ConciliacaoComprasService._executar(execucao, pedido_ids)
+
+    @staticmethod
+    def _executar(execucao, pedido_ids):
+        pedido_ids = sorted(set(pedido_ids))
+        divergentes = 0
+        for inicio in range(0, len(pedido_ids), ConciliacaoComprasService.TAMANHO_LOTE):
+            lote = pedido_ids[inicio:inicio + ConciliacaoComprasService.TAMANHO_LOTE]
+            divergentes += ConciliacaoComprasService.conciliar(lote, execucao)
+
+        execucao.pedidos_processados = len(pedido_ids)
+        execucao.pedidos_divergentes = divergentes
+        execucao.concluida_em = timezone.now()
+        execucao.save(update_fields=['pedidos_processados', 'pedidos_divergentes', 'concluida_em'])
+        return execucao
+
+    # ------------------------------------------------------------------
+    # Match de um lote
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def conciliar(pedido_ids, execucao=None):
+        """ Recalcula e regrava a conciliação dos POs informados. Devolve o nº de divergentes. """
+        from tc_financeiro.models import Despesa
+
+        Tipo = ExcecaoConciliacao.Tipo
+        Status = ConciliacaoPedido.Status
+        tolerancia = ConciliacaoComprasService.tolerancia
+        centavo = ConciliacaoComprasService.CENTAVO
+        pedido_ids = set(pedido_ids)
+
+        # Uma despesa vinculada a vários POs só fecha olhando todos eles
+        despesas_lote = PedidoCompra.objects.filter(
+            pk__in=pedido_ids, fatura_vinculada__isnull=False,
+        ).values('fatura_vinculada_id')
+        pedido_ids.update(
+            PedidoCompra.objects.filter(fatura_vinculada_id__in=despesas_lote).values_list('pk', flat=True)
+        )
+
+        pedidos = list(
+            PedidoCompra.objects.filter(pk__in=pedido_ids).values(
+                'pk', 'fornecedor_id', 'status', 'custo_frete', 'data_emissao', 'fatura_vinculada_id',
+                'fatura_vinculada__fornecedor_id', 'fatura_vinculada__valor_original', 'fatura_vinculada__status',
+            )
+        )
+        itens = {
+            item['pk']: item
+            for item in ItemPedidoCompra.objects.filter(pedido_compra_id__in=pedido_ids).values(
+                'pk', 'pedido_compra_id', 'quantidade_pedida', 'preco_unitario',
+            )
+        }
+        recebido_por_item = dict(
+            RecebimentoItem.objects.filter(item_pedido__pedido_compra_id__in=pedido_ids)
+            .values('item_pedido_id').annotate(total=Sum('quantidade_recebida'))
+            .values_list('item_pedido_id', 'total')
+        )
+
+        # Totais por PO
+        totais = {p['pk']: {'qtd_pedida': 0, 'qtd_recebida': 0, 'valor_pedido': Decimal('0'),
+                            'valor_recebido': Decimal('0'), 'itens_excedidos': 0} for p in pedidos}
+        for item_id, item in itens.items():
+            total = totais.get(item['pedido_compra_id'])
+            if total is None:
+                continue
+            recebido = recebido_por_item.get(item_id) or 0
+            total['qtd_pedida'] += item['quantidade_pedida']
+            total['qtd_recebida'] += recebido
+            total['valor_pedido'] += item['quantidade_pedida'] * item['preco_unitario']
+            total['valor_recebido'] += recebido * item['preco_unitario']
+            if recebido > item['quantidade_pedida']:
+                total['itens_excedidos'] += 1
+
+        for pedido in pedidos:
+            total = totais[pedido['pk']]
+            total['valor_pedido'] = (total['valor_pedido'] + pedido['custo_frete']).quantize(centavo)
+            if total['qtd_recebida']:
+                total['valor_recebido'] = (total['valor_recebido'] + pedido['custo_frete']).quantize(centavo)
+
+        # Valor esperado de cada despesa = soma do recebido dos POs vinculados
+        esperado_por_despesa = {}
+        for pedido in pedidos:
+            if pedido['fatura_vinculada_id'] and pedido['status'] != PedidoCompra.StatusPedido.CANCELADO:
+                esperado_por_despesa[pedido['fatura_vinculada_id']] = (
+                    esperado_por_despesa.get(pedido['fatura_vinculada_id'], Decimal('0'))
+                    + totais[pedido['pk']]['valor_recebido']
+                )
+
+        # Candidatas para POs recebidos sem despesa: despesas avulsas do fornecedor
+        sem_despesa = [
+            p for p in pedidos
+            if not p['fatura_vinculada_id'] and totais[p['pk']]['qtd_recebida']
+            and p['status'] != PedidoCompra.StatusPedido.CANCELADO
+        ]
+        candidatas = {}
+        if sem_despesa:
+            avulsas = Despesa.objects.filter(
+                fornecedor_id__in={p['fornecedor_id'] for p in sem_despesa},
+                pedidocompra__isnull=True,
+            ).exclude(status=Despesa.StatusDespesa.CANCELADO).values('pk', 'fornecedor_id', 'valor_original', 'data_emissao')
+            for despesa in avulsas.order_by('data_emissao', 'pk'):
+                candidatas.setdefault(despesa['fornecedor_id'], []).append(despesa)
+
+        conciliacoes = []
+        excecoes = []
+        divergentes = 0
+        for pedido in sorted(pedidos, key=lambda p: p['pk']):
+            total = totais[pedido['pk']]
+            despesa_id = pedido['fatura_vinculada_id']
+            valor_despesa = pedido['fatura_vinculada__valor_original'] if despesa_id else None
+            cancelado = pedido['status'] == PedidoCompra.StatusPedido.CANCELADO
+            if cancelado and not total['qtd_recebida'] and not despesa_id:
+                continue  # PO cancelado sem movimento: nada a conciliar
+
+            problemas = []
+            if cancelado:
+                problemas.append((Tipo.PEDIDO_CANCELADO, "PO cancelado com recebimento ou despesa vinculada.", None, None, None))
+            if total['itens_excedidos']:
+                problemas.append((
+                    Tipo.EXCESSO_RECEBIDO, f"{total['itens_excedidos']} item(ns) recebido(s) acima do pedido.",
+                    total['qtd_pedida'], total['qtd_recebida'], None,
+                ))
+
+            diferenca = Decimal('0.00')
+            if despesa_id:
+                esperado = esperado_por_despesa.get(despesa_id, Decimal('0'))
+                diferenca = valor_despesa - esperado
+                if pedido['fatura_vinculada__fornecedor_id'] and pedido['fatura_vinculada__fornecedor_id'] != pedido['fornecedor_id']:
+                    problemas.append((Tipo.FORNECEDOR_DIVERGENTE, "Despesa lançada para outro fornecedor.", None, None, None))
+                if pedido['fatura_vinculada__status'] == Despesa.StatusDespesa.CANCELADO:
+                    problemas.append((Tipo.VALOR_DIVERGENTE, "Despesa vinculada está cancelada.", esperado, None, None))
+                elif not total['qtd_recebida']:
+                    problemas.append((Tipo.DESPESA_SEM_RECEBIMENTO, "Despesa lançada sem nenhum recebimento.", Decimal('0'), valor_despesa, None))
+                elif abs(diferenca) > tolerancia(esperado):
+                    problemas.append((Tipo.VALOR_DIVERGENTE, "Valor da despesa fora da tolerância do recebido.", esperado, valor_despesa, None))
+            elif total['qtd_recebida'] and not cancelado:
+                sugerida = None
+                lista = candidatas.get(pedido['fornecedor_id'], [])
+                proximas = [
+                    d for d in lista
+                    if d['data_emissao'] >= pedido['data_emissao']
+                    and abs(d['valor_original'] - total['valor_recebido']) <= tolerancia(total['valor_recebido'])
+                ]
+                if proximas:
+                    sugerida = min(proximas, key=lambda d: abs(d['valor_original'] - total['valor_recebido']))
+                    lista.remove(sugerida)  # cada despesa avulsa é sugerida a um único PO
+                problemas.append((
+                    Tipo.RECEBIDO_SEM_DESPESA,
+                    "Recebimento sem despesa vinculada." + (f" Sugestão: despesa #{sugerida['pk']}." if sugerida else ""),
+                    total['valor_recebido'], sugerida['valor_original'] if sugerida else None,
+                    sugerida['pk'] if sugerida else None,
+                ))
+
+            if problemas:
+                status = Status.DIVERGENTE
+                divergentes += 1
+            elif not total['qtd_recebida']:
+                status = Status.PENDENTE
+            elif total['qtd_recebida'] < total['qtd_pedida']:
+                status = Status.PARCIAL
+            else:
+                status = Status.CONCILIADO
+
+            conciliacoes.append(ConciliacaoPedido(
+                pedido_id=pedido['pk'],
+                fornecedor_id=pedido['fornecedor_id'],
+                despesa_id=despesa_id,
+                status=status,
+                quantidade_pedida=total['qtd_pedida'],
+                quantidade_recebida=total['qtd_recebida'],
+                valor_pedido=total['valor_pedido'],
+                valor_recebido=total['valor_recebido'],
+                valor_despesa=valor_despesa,
+                diferenca=diferenca,
+                execucao=execucao,
+            ))
+            for tipo, mensagem, esperado, encontrado, sugerida_id in problemas:
+                excecoes.append(ExcecaoConciliacao(
+                    conciliacao_id=pedido['pk'], tipo=tipo, mensagem=mensagem,
+                    valor_esperado=esperado, valor_encontrado=encontrado, despesa_sugerida_id=sugerida_id,
+                ))
+
+        with transaction.atomic():
+            ConciliacaoPedido.objects.filter(pedido_id__in=pedido_ids).delete()
+            ConciliacaoPedido.objects.bulk_create(conciliacoes)
+            ExcecaoConciliacao.objects.bulk_create(excecoes)
+        return divergentes
+
+
+# ############################################################################
+# RECEBIMENTO -> CONTAS A PAGAR (uma Despesa por PO)
+# ############################################################################
+
+class ContasPagarRecebimentoService:
+    """
+    Cada linha recebida só marca o PO como pendente no lote da transação; no
+    commit o valor recebido de cada PO é somado numa única query e a Despesa
+    vinculada (fatura_vinculada) é criada ou atualizada uma vez por PO.
+    Receber um lote de itens dentro de uma transação gera, portanto, um
+    único lançamento no financeiro por pedido.
+
+    A competência da despesa acompanha o último recebimento (regime de
+    competência). Despesas já pagas ou canceladas não são alteradas: a
+    diferença aparece na conciliação de compras.
+    """
+
+    _lote = threading.local()
+
+    @staticmethod
+    def agendar(pedido_id):
+        """ Marca o PO para gerar/atualizar a despesa após o commit. """
+        if not getattr(settings, 'COMPRAS_GERAR_DESPESA_RECEBIMENTO', True):
+            return
+        local = ContasPagarRecebimentoService._lote
+        atual = getattr(local, 'atual', None)
+        # O lote é o próprio callback on_commit da transação corrente, e a fila
+        # do on_commit guarda a única referência forte a ele: depois do commit
+        # ou de um rollback (inclusive de savepoint), que descarta o callback,
+        # a referência fraca morre e começa um lote novo. Um PO marcado num
+        # savepoint desfeito é inofensivo: a despesa é calculada só com os
+        # recebimentos gravados.
+        if atual is not None and atual[0]() is not None:
+            atual[1].add(pedido_id)
+            return
+
+        pedidos = {pedido_id}
+
+        def processar():
+            if getattr(local, 'atual', None) is not None and local.atual[1] is pedidos:
+                local.atual = None
+            ContasPagarRecebimentoService.gerar_despesas(pedidos)
+
+        local.atual = (weakref.ref(processar), pedidos)
+        transaction.on_commit(processar)
+
+    @staticmethod
+    @transaction.atomic
+    def receber_lote(recebimentos):
+        """ Grava vários RecebimentoItem numa transação (uma despesa por PO). """
+        for recebimento in recebimentos:
+            recebimento.save()
+        return recebimentos
+
+    @staticmethod
+    def gerar_despesas(pedido_ids):
+        """ Cria/atualiza a Despesa de cada PO com o total recebido. Devolve (criadas, atualizadas). """
+        from tc_financeiro.models import Despesa
+
+        recebido = {
+            linha['item_pedido__pedido_compra_id']: linha
+            for linha in RecebimentoItem.objects.filter(item_pedido__pedido_compra_id__in=pedido_ids)
+            .values('item_pedido__pedido_compra_id')
+            .annotate(
+                valor=Sum(F('quantidade_recebida') * F('item_pedido__preco_unitario'),
+                          output_field=DecimalField(max_digits=14, decimal_places=2)),
+                ultimo=Max('data_recebimento'),
+            )
+        }
+        if not recebido:
+            return 0, 0
+
+        hoje = timezone.localdate()
+        prazo = timedelta(days=getattr(settings, 'COMPRAS_DESPESA_PRAZO_DIAS', 30))
+        bloqueados = (Despesa.StatusDespesa.PAGO, Despesa.StatusDespesa.CANCELADO)
+        pedidos = (
+            PedidoCompra.objects.select_for_update(of=('self',))
+            .select_related('fornecedor', 'fatura_vinculada')
+            .filter(pk__in=recebido.keys())
+            .exclude(status=PedidoCompra.StatusPedido.CANCELADO)
+        )
+
+        criadas, atualizadas, vincular = 0, 0, []
+        with transaction.atomic():
+            for pedido in pedidos:
+                linha = recebido[pedido.pk]
+                valor = (linha['valor'] + pedido.custo_frete).quantize(ConciliacaoComprasService.CENTAVO)
+                competencia = timezone.localdate(linha['ultimo']) if linha['ultimo'] else hoje
+                despesa = pedido.fatura_vinculada
+
+                if despesa is None:
+                    despesa = Despesa(
+                        fornecedor_id=pedido.fornecedor_id,
+                        numero_documento=f"PO-{pedido.pk}",
+                        descricao=f"PO-{pedido.pk} - {pedido.fornecedor.razao_social}"[:255],
+                        origem=Despesa.OrigemTitulo.COMPRA,
+                        tipo_titulo=Despesa.TipoTitulo.OUTROS,
+                        data_emissao=hoje,
+                        data_vencimento=hoje + prazo,
+                        data_competencia=competencia,
+                        valor_original=valor,
+                    )
+                    despesa.save()
+                    pedido.fatura_vinculada = despesa
+                    vincular.append(pedido)
+                    criadas += 1
+                elif despesa.status not in bloqueados and despesa.valor_original != valor:
+                    despesa.valor_original = valor
+                    despesa.data_competencia = competencia
+                    despesa.save()
+                    atualizadas += 1
+
+            if vincular:
+                bulk_update_with_history(vincular, PedidoCompra, ['fatura_vinculada'], batch_size=500)
+        return criadas, atualizadas
@@ -7,9 +7,11 @@ from django.apps import apps
 from django.db.models import Count, Sum, F, DecimalField
 from django.core.exceptions import ValidationError
 from django.db import transaction
-from tc_core.mixins import PermissionRequiredMixin
+from simple_history.utils import bulk_create_with_history
+from tc_core.mixins import PermissionRequiredMixin, KeysetPaginationMixin
 
-from .models import CentroCusto, RequisicaoCompra, ItemRequisicao, PedidoCompra, AprovacaoRequisicao, RecebimentoItem
+from .models import CentroCusto, RequisicaoCompra, ItemRequisicao, PedidoCompra, ItemPedidoCompra, AprovacaoRequisicao, RecebimentoItem
+from tc_produtos.services import PrecoFornecedorService
 from .forms import RequisicaoCompraForm, ItemRequisicaoForm, PedidoCompraForm, RecebimentoItemForm
 
 # Importando modelos externos necessários para a lógica de recebimento e itens
@@ -138,12 +140,20 @@ class AprovacaoRequisicaoCreateView(LoginRequiredMixin, CreateView):
 # PEDIDO DE COMPRA (PO)
 # ############################################################################
 
-class PedidoCompraListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class PedidoCompraListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     permission_required = 'compras.view_pedidocompra'
     model = PedidoCompra
     template_name = 'compras/pedidocompra_list.html'
     context_object_name = 'pedidos'
-    ordering = ['-data_emissao']
+    keyset_template_parcial = 'compras/partials/pedidocompra_rows.html'
+    keyset_ordenacao_padrao = '-data_emissao'
+    keyset_ordenacoes = {
+        '-data_emissao': ('-data_emissao',),
+        'data_emissao': ('data_emissao',),
+    }
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('fornecedor')
 
 class PedidoCompraCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     # Permissão de Alto Nível
@@ -156,9 +166,15 @@ class PedidoCompraCreateView(LoginRequiredMixin, PermissionRequiredMixin, Create
         initial = super().get_initial()
         requisicao = get_object_or_404(RequisicaoCompra, pk=self.kwargs['requisicao_pk'])
         initial['requisicao_origem'] = requisicao.pk
-        
-        # Lógica para pré-preencher fornecedor (se relevante)
-        # ... (similar ao que foi comentado no form.py) ...
+
+        # Pré-preenche o fornecedor que é o mais barato para o maior número de itens
+        produto_ids = requisicao.itens_requisicao.filter(produto__isnull=False).values_list('produto_id', flat=True)
+        melhores = PrecoFornecedorService.melhores_precos(produto_ids)
+        if melhores:
+            contagem = {}
+            for melhor in melhores.values():
+                contagem[melhor.fornecedor_id] = contagem.get(melhor.fornecedor_id, 0) + 1
+            initial['fornecedor'] = max(contagem, key=contagem.get)
         return initial
         
     def form_valid(self, form):
@@ -172,17 +188,31 @@ class PedidoCompraCreateView(LoginRequiredMixin, PermissionRequiredMixin, Create
         
         with transaction.atomic():
             response = super().form_valid(form)
-            
+
+            itens_req = list(requisicao.itens_requisicao.select_related('produto', 'servico'))
+            produto_ids = [i.produto_id for i in itens_req if i.produto_id]
+
+            # Preço: tabela do fornecedor escolhido > melhor preço de mercado > estimativa da requisição
+            precos_fornecedor = PrecoFornecedorService.precos_do_fornecedor(self.object.fornecedor_id, produto_ids)
+            melhores = PrecoFornecedorService.melhores_precos(produto_ids)
+
             # Copia itens da Requisição para o Pedido de Compra (ItemPedidoCompra)
-            ItemPedidoCompraModel = apps.get_model('compras', 'ItemPedidoCompra')
-            for item_req in requisicao.itens_requisicao.all():
-                ItemPedidoCompraModel.objects.create(
+            itens_pedido = []
+            for item_req in itens_req:
+                preco = item_req.preco_unitario_estimado
+                if item_req.produto_id in precos_fornecedor:
+                    preco = precos_fornecedor[item_req.produto_id]
+                elif item_req.produto_id in melhores:
+                    preco = melhores[item_req.produto_id].preco_brl
+
+                itens_pedido.append(ItemPedidoCompra(
                     pedido_compra=self.object,
                     requisicao_item=item_req,
-                    descricao_item=item_req.nome_customizado or item_req.produto.nome if item_req.produto else item_req.servico.nome,
+                    descricao_item=item_req.nome_customizado or (item_req.produto.nome if item_req.produto else item_req.servico.nome),
                     quantidade_pedida=item_req.quantidade,
-                    preco_unitario=item_req.preco_unitario_estimado
-                )
+                    preco_unitario=preco,
+                ))
+            bulk_create_with_history(itens_pedido, ItemPedidoCompra, default_user=self.request.user)
             
             # Atualiza o status da Requisição para CONVERTIDA
             requisicao.status = RequisicaoCompra.StatusRequisicao.CONVERTIDA
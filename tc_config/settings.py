@@ -153,4 +153,102 @@ DEFAULT_FROM_EMAIL = 'TCMAIS ERP <seu-email@gmail.com>'
 # URLs de Autenticação
 LOGIN_URL = '/login/' 
 LOGIN_REDIRECT_URL = '/'
-LOGOUT_REDIRECT_URL = '/login/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/login/'
+# ############################################################################
+# 7. CÂMBIO (Normalização de preços de fornecedores em BRL)
+# ############################################################################
+
+# Provedor das cotações usadas por tc_produtos (pode ser trocado por outra classe)
+CAMBIO_PROVEDOR = 'tc_produtos.cambio.ProvedorCambioArquivo'
+# Arquivo CSV "moeda;taxa" lido pelo provedor padrão (ex.: USD;5.4321)
+CAMBIO_ARQUIVO = os.path.join(BASE_DIR, 'cambio.csv')
+# Tempo (segundos) que a tabela de cotações fica em cache
+CAMBIO_CACHE_TIMEOUT = 60 * 60
+
+# ############################################################################
+# 8. RELATÓRIOS (tc_relatorios: execução em segundo plano)
+# ############################################################################
+
+RELATORIOS_DIR = os.path.join(MEDIA_ROOT, 'relatorios')
+RELATORIOS_WORKERS = 2
+# Resultados com os mesmos parâmetros são reaproveitados dentro deste prazo (segundos)
+RELATORIOS_CACHE_TTL = 6 * 60 * 60
+# Execuções na fila/executando há mais tempo que isso são consideradas perdidas
+RELATORIOS_TIMEOUT = 30 * 60
+
+# ############################################################################
+# 9. MARKETING (Indicadores de aquisição)
+# ############################################################################
+
+# Meses de receita recorrente projetados no LTV dos clientes com contrato ativo
+MARKETING_LTV_HORIZONTE_MESES = 12
+
+# ############################################################################
+# 10. OPERAÇÕES (Fila de chamados)
+# ############################################################################
+
+# Novos chamados sem atendente vão para o atendente operacional com menor carga
+OPERACOES_AUTO_ATRIBUIR = True
+# Validade (segundos) da carga por atendente mantida em cache
+OPERACOES_CARGA_CACHE_TIMEOUT = 10 * 60
+# Antecedência (dias) dos alertas de garantia/licença dos ativos do CMDB
+OPERACOES_GARANTIA_ANTECEDENCIA_DIAS = 60
+# Destinatários do resumo de vencimentos por cliente
+OPERACOES_GARANTIA_EMAILS = ['comercial@suaempresa.com.br']
+
+# ############################################################################
+# 11. COMPRAS (Contas a pagar do recebimento e conciliação)
+# ############################################################################
+
+# Diferença aceita entre a despesa e o valor recebido: o maior entre o
+# percentual sobre o esperado e o valor absoluto (R$)
+COMPRAS_CONCILIACAO_TOLERANCIA_PERCENTUAL = 1
+COMPRAS_CONCILIACAO_TOLERANCIA_VALOR = 1
+
+# Recebimentos geram/atualizam a Despesa do PO (uma por pedido, no commit)
+COMPRAS_GERAR_DESPESA_RECEBIMENTO = True
+# Vencimento (dias após o lançamento) das despesas geradas no recebimento
+COMPRAS_DESPESA_PRAZO_DIAS = 30
+
+# ############################################################################
+# 12. CRM (Catálogo do editor de propostas, previsão de vendas, metas, duplicidades e Kanban)
+# ############################################################################
+
+# Validade (segundos) do cache compartilhado das buscas mais frequentes
+CRM_CATALOGO_CACHE_TIMEOUT = 60
+
+# Negócios encerrados nos últimos N dias entram no cálculo das probabilidades
+CRM_PREVISAO_JANELA_DIAS = 365
+# Validade (segundos) do cache da previsão por escopo (vendedor/empresa) e mês
+CRM_PREVISAO_CACHE_TIMEOUT = 300
+# Validade (segundos) do painel de metas x realizado da equipe, por mês
+CRM_METAS_CACHE_TIMEOUT = 300
+
+# Pares de cadastros com pontuação (0-100) a partir deste valor entram na fila de revisão
+CRM_DUPLICIDADE_PONTUACAO_MINIMA = 75
+# Chaves compartilhadas por mais registros que isso (nomes comuns) não geram comparações
+CRM_DUPLICIDADE_BLOCO_MAXIMO = 50
+
+# Intervalo (segundos) entre as consultas de cada quadro Kanban aberto às alterações dos demais
+CRM_KANBAN_INTERVALO_SEGUNDOS = 5
+# Alterações do Kanban mais antigas que isso são descartadas (quadros abertos há mais tempo recarregam)
+CRM_KANBAN_RETENCAO_HORAS = 24
+
+# ############################################################################
+# 13. FINANCEIRO (Comissões)
+# ############################################################################
+
+# Base padrão do cálculo de comissões: 'oportunidade' (valor das oportunidades
+# ganhas no mês) ou 'fatura' (valor pago das faturas liquidadas no mês)
+FINANCEIRO_COMISSAO_BASE = 'oportunidade'
+
+# ############################################################################
+# 14. AUTOCOMPLETE (Selects com busca remota do tc_core)
+# ############################################################################
+
+# Resultados por página em cada busca dos selects remotos
+CORE_AUTOCOMPLETE_POR_PAGINA = 20
+# Última página atendida (limita o OFFSET das buscas roladas até o fim)
+CORE_AUTOCOMPLETE_MAX_PAGINAS = 50
+# Validade (segundos) do cache de cada termo/página buscado
+CORE_AUTOCOMPLETE_CACHE_TIMEOUT = 60
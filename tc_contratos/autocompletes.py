@@ -0,0 +1,25 @@
+# tc_contratos/autocompletes.py
+from tc_core.autocomplete import AutocompleteBase, registrar_autocomplete
+
+from .models import Contrato
+
+# ############################################################################
+# BUSCAS REMOTAS DOS SELECTS
+# ############################################################################
+
+@registrar_autocomplete
+class ContratoAutocomplete(AutocompleteBase):
+    codigo = 'contratos'
+    modelo = Contrato
+    campos_busca = ('numero_contrato__icontains', 'cliente__razao_social__icontains', 'fornecedor__razao_social__icontains')
+    ordenacao = ('-data_inicio', '-pk')
+    permissao = 'tc_contratos.view_contrato'
+    placeholder = 'Busque o contrato por número ou cliente...'
+
+    def get_queryset(self):
+        return Contrato.objects.select_related('cliente', 'fornecedor')
+
+    def rotulo(self, obj):
+        # Contrato.__str__ não mostra a parte; aqui ela identifica o contrato na lista
+        parte = obj.cliente or obj.fornecedor
+        return f"{obj.numero_contrato} - {parte}" if parte else obj.numero_contrato
@@ -0,0 +1,87 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _cnpj(valor):
+    return re.sub(r'\D', '', valor or '') or (valor or '')
+
+
+def consolidar_fornecedores(apps, schema_editor):
+    # Incorpora tc_crm.Fornecedor ao cadastro de tc_produtos: mesmo CNPJ (só
+    # dígitos) é o mesmo fornecedor, os demais são criados em lote. Depois os
+    # contratos e o histórico passam a apontar para o cadastro único.
+    Legado = apps.get_model('tc_crm', 'Fornecedor')
+    Fornecedor = apps.get_model('tc_produtos', 'Fornecedor')
+
+    legados = list(Legado.objects.values_list('pk', 'cnpj', 'razao_social'))
+    existentes = {_cnpj(cnpj) for cnpj in Fornecedor.objects.values_list('cnpj', flat=True)}
+    novos = {}
+    for _pk, cnpj, razao_social in legados:
+        if _cnpj(cnpj) not in existentes and _cnpj(cnpj) not in novos:
+            novos[_cnpj(cnpj)] = Fornecedor(cnpj=cnpj, razao_social=razao_social)
+    Fornecedor.objects.bulk_create(novos.values(), batch_size=1000)
+
+    canonicos = {_cnpj(cnpj): pk for pk, cnpj in Fornecedor.objects.values_list('pk', 'cnpj')}
+    mapa = {pk: canonicos[_cnpj(cnpj)] for pk, cnpj, _razao_social in legados}
+
+    for nome in ('Contrato', 'HistoricalContrato'):
+        Modelo = apps.get_model('tc_contratos', nome)
+        alterados = []
+        for registro in Modelo.objects.filter(fornecedor__isnull=False).only('pk', 'fornecedor_id').iterator(chunk_size=2000):
+            registro.fornecedor_catalogo_id = mapa.get(registro.fornecedor_id)
+            alterados.append(registro)
+        Modelo.objects.bulk_update(alterados, ['fornecedor_catalogo'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    # Cada operação no seu próprio commit: no PostgreSQL o ALTER TABLE não pode
+    # rodar com as verificações de FK da cópia ainda pendentes na transação
+    atomic = False
+
+    dependencies = [
+        ('tc_contratos', '0002_initial'),
+        ('tc_crm', '0014_candidatoduplicata'),
+        ('tc_produtos', '0004_busca_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contrato',
+            name='fornecedor_catalogo',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='tc_produtos.fornecedor'),
+        ),
+        migrations.AddField(
+            model_name='historicalcontrato',
+            name='fornecedor_catalogo',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tc_produtos.fornecedor'),
+        ),
+        migrations.RunPython(consolidar_fornecedores, migrations.RunPython.noop, atomic=True),
+        migrations.RemoveField(
+            model_name='contrato',
+            name='fornecedor',
+        ),
+        migrations.RemoveField(
+            model_name='historicalcontrato',
+            name='fornecedor',
+        ),
+        migrations.RenameField(
+            model_name='contrato',
+            old_name='fornecedor_catalogo',
+            new_name='fornecedor',
+        ),
+        migrations.RenameField(
+            model_name='historicalcontrato',
+            old_name='fornecedor_catalogo',
+            new_name='fornecedor',
+        ),
+        migrations.AlterField(
+            model_name='contrato',
+            name='fornecedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='contratos_despesa', to='tc_produtos.fornecedor'),
+        ),
+    ]
@@ -29,7 +29,7 @@ class Contrato(models.Model):
     # Vínculos
     oportunidade = models.OneToOneField('tc_crm.Oportunidade', on_delete=models.SET_NULL, null=True, blank=True, related_name='contrato_vinculado')
     cliente = models.ForeignKey('tc_crm.Cliente', on_delete=models.PROTECT, null=True, blank=True, related_name='contratos_receita')
-    fornecedor = models.ForeignKey('tc_crm.Fornecedor', on_delete=models.PROTECT, null=True, blank=True, related_name='contratos_despesa')
+    fornecedor = models.ForeignKey('tc_produtos.Fornecedor', on_delete=models.PROTECT, null=True, blank=True, related_name='contratos_despesa')
 
     # Especificações e Vigência
     objeto_contrato = models.TextField(verbose_name="Objeto e Especificações")
@@ -3,7 +3,7 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from tc_core.mixins import PermissionRequiredMixin
+from tc_core.mixins import PermissionRequiredMixin, KeysetPaginationMixin
 from django.urls import reverse_lazy
 from django.http import HttpResponse, JsonResponse
 from django.db.models import Q, Sum
@@ -17,14 +17,20 @@ from tc_crm.models import Oportunidade
 from .models import Contrato
 from .forms import ContratoForm 
 
-class ContratoListView(LoginRequiredMixin, ListView):
+class ContratoListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Contrato
     template_name = 'contratos/contrato_list.html'
     context_object_name = 'contratos'
-    ordering = ['-criado_em']
+    keyset_template_parcial = 'contratos/partials/contrato_rows.html'
+    keyset_ordenacao_padrao = '-criado_em'
+    keyset_ordenacoes = {
+        '-criado_em': ('-criado_em',),
+        'data_fim': ('data_fim',),
+        '-valor_mensal': ('-valor_mensal',),
+    }
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('cliente', 'fornecedor')
         
         # Filtros de URL
         q = self.request.GET.get('q')
@@ -57,6 +63,8 @@ class ContratoListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        if self.e_pagina_seguinte:
+            return context
         hoje = timezone.now().date()
         proximos_30_dias = hoje + timedelta(days=30)
 
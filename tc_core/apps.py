@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class TcCoreConfig(AppConfig):
     name = 'tc_core'
+
+    def ready(self):
+        # Carrega o módulo "autocompletes.py" de cada app, onde as buscas dos selects se registram
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('autocompletes')
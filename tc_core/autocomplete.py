@@ -0,0 +1,151 @@
+# tc_core/autocomplete.py
+import hashlib
+import json
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
+
+# ############################################################################
+# REGISTRO DE AUTOCOMPLETES (selects com busca remota)
+# ############################################################################
+
+_autocompletes = {}
+
+
+class AutocompleteBase:
+    """
+    Busca remota de um model para os selects grandes (select2 com ajax).
+
+    - codigo: identificador único usado na URL e no cache.
+    - modelo: classe do model pesquisado.
+    - campos_busca: lookups combinados com OR para o termo digitado.
+    - ordenacao: ordem dos resultados (deve ser estável para a paginação).
+    - permissao: exigida para consultar (None = qualquer usuário logado).
+    - rotulo(obj): texto de cada opção.
+    - filtrar(queryset, usuario): restrição por usuário; quem a usar deve
+      sobrescrever também escopo(usuario), que separa as entradas do cache.
+    """
+    codigo = None
+    modelo = None
+    campos_busca = ()
+    ordenacao = ('pk',)
+    permissao = None
+    placeholder = 'Digite para buscar...'
+
+    def get_queryset(self):
+        return self.modelo._default_manager.all()
+
+    def filtrar(self, queryset, usuario):
+        return queryset
+
+    def escopo(self, usuario):
+        return ''
+
+    def tem_permissao(self, user):
+        return not self.permissao or user.has_perm(self.permissao)
+
+    def rotulo(self, obj):
+        return str(obj)
+
+    def get_url(self):
+        return reverse('tc_core:autocomplete', args=[self.codigo])
+
+    def chave_cache(self, termo, usuario, pagina):
+        bruto = json.dumps([self.codigo, self.escopo(usuario), termo.lower(), pagina])
+        return 'tc_core:autocomplete:' + hashlib.sha256(bruto.encode()).hexdigest()
+
+    def buscar(self, termo, usuario, pagina=1):
+        """ Uma página de resultados no formato do select2: {'results': [...], 'pagination': {'more': bool}}. """
+        chave = self.chave_cache(termo, usuario, pagina)
+        resultado = cache.get(chave)
+        if resultado is None:
+            queryset = self.filtrar(self.get_queryset(), usuario)
+            if termo:
+                filtro = Q()
+                for campo in self.campos_busca:
+                    filtro |= Q(**{campo: termo})
+                queryset = queryset.filter(filtro)
+
+            # Um registro a mais indica se há próxima página, sem COUNT; a
+            # última página atendida (CORE_AUTOCOMPLETE_MAX_PAGINAS) encerra a rolagem
+            por_pagina = settings.CORE_AUTOCOMPLETE_POR_PAGINA
+            inicio = (pagina - 1) * por_pagina
+            objetos = list(queryset.order_by(*self.ordenacao)[inicio:inicio + por_pagina + 1])
+            resultado = {
+                'results': [{'id': obj.pk, 'text': self.rotulo(obj)} for obj in objetos[:por_pagina]],
+                'pagination': {'more': len(objetos) > por_pagina and pagina < settings.CORE_AUTOCOMPLETE_MAX_PAGINAS},
+            }
+            cache.set(chave, resultado, settings.CORE_AUTOCOMPLETE_CACHE_TIMEOUT)
+        return resultado
+
+
+def registrar_autocomplete(classe):
+    """ Decorator: @registrar_autocomplete em uma subclasse de AutocompleteBase. """
+    if not classe.codigo:
+        raise ValueError(f"{classe.__name__} precisa definir 'codigo'.")
+    if classe.codigo in _autocompletes and _autocompletes[classe.codigo] is not classe:
+        raise ValueError(f"Autocomplete '{classe.codigo}' já registrado.")
+    _autocompletes[classe.codigo] = classe
+    return classe
+
+
+def obter_autocomplete(codigo):
+    classe = _autocompletes.get(codigo)
+    return classe() if classe else None
+
+
+# ############################################################################
+# WIDGET E FIELD
+# ############################################################################
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select que renderiza apenas a opção escolhida; as demais chegam pela
+    busca remota do autocomplete (initSelect2 em base.html). Serve de widget
+    para qualquer ModelChoiceField, inclusive os gerados por ModelForm.
+    """
+
+    def __init__(self, autocomplete, attrs=None):
+        self.autocomplete = autocomplete() if isinstance(autocomplete, type) else autocomplete
+        attrs = {'class': 'select2', **(attrs or {})}
+        super().__init__(attrs)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs'].update({
+            'data-autocomplete-url': self.autocomplete.get_url(),
+            'data-placeholder': self.autocomplete.placeholder,
+        })
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Opção vazia (placeholder do select2) + a(s) selecionada(s), com uma consulta
+        opcoes = [self.create_option(name, '', '', False, 0)]
+        selecionados = {str(v) for v in value if v not in (None, '')}
+        if selecionados:
+            try:
+                objetos = list(self.choices.queryset.filter(pk__in=selecionados))
+            except (ValueError, ValidationError):
+                objetos = []
+            for indice, obj in enumerate(objetos, start=1):
+                opcoes.append(self.create_option(name, obj.pk, self.autocomplete.rotulo(obj), True, indice))
+        return [(None, opcoes, 0)]
+
+
+class AutocompleteModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField ligado a um autocomplete: o queryset padrão vem dele, o
+    formulário não carrega a tabela e a validação consulta só a PK enviada.
+    """
+
+    def __init__(self, autocomplete, queryset=None, **kwargs):
+        self.autocomplete = autocomplete() if isinstance(autocomplete, type) else autocomplete
+        kwargs.setdefault('widget', AutocompleteSelect(self.autocomplete))
+        super().__init__(queryset if queryset is not None else self.autocomplete.get_queryset(), **kwargs)
+
+    def label_from_instance(self, obj):
+        return self.autocomplete.rotulo(obj)
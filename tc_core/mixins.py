@@ -1,7 +1,12 @@
 # tc_core/mixins.py
 
+import base64
+import json
+
 from django.contrib.auth.mixins import AccessMixin
-from django.core.exceptions import PermissionDenied
+from django.db.models import F, Q
+from django.http import Http404
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.contrib import messages
@@ -37,4 +42,152 @@ class PermissionRequiredMixin(AccessMixin):
         return super().dispatch(request, *args, **kwargs)
 
     def get_permission_denied_message(self):
-        return f"Você não tem permissão ('{self.permission_required}') para acessar esta página."
\ No newline at end of file
+        return f"Você não tem permissão ('{self.permission_required}') para acessar esta página."
+
+# ############################################################################
+# PAGINAÇÃO POR CURSOR (KEYSET)
+# ############################################################################
+
+class KeysetPage:
+    """
+    Página de resultados da paginação por cursor. Expõe a mesma interface
+    mínima usada pelos templates (object_list, has_next) e a URL da próxima
+    página, consumida pelo fragmento HTMX de rolagem infinita.
+    """
+
+    def __init__(self, object_list, has_next, next_url=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.next_url = next_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next
+
+
+class KeysetPaginationMixin:
+    """
+    Substitui a paginação por OFFSET do ListView por paginação por cursor
+    (keyset): a próxima página é buscada com um filtro "depois da última
+    linha", o que mantém o custo constante mesmo nas páginas mais profundas.
+
+    - keyset_ordenacoes: dicionário com as ordenações permitidas via
+      ?order_by=; qualquer outro valor cai na ordenação padrão.
+      Campos anuláveis são aceitos: os nulos vêm sempre por último, nas
+      duas direções.
+    - keyset_template_parcial: template renderizado nas requisições HTMX
+      de "próxima página" (apenas as linhas da tabela).
+    """
+    paginate_by = 25
+    keyset_ordenacoes = {}
+    keyset_ordenacao_padrao = None
+    keyset_template_parcial = None
+    keyset_param_cursor = 'cursor'
+    keyset_param_ordem = 'order_by'
+
+    @property
+    def e_pagina_seguinte(self):
+        """ True quando a requisição é o carregamento HTMX da próxima página. """
+        return bool(
+            getattr(self.request, 'htmx', False)
+            and self.request.GET.get(self.keyset_param_cursor)
+        )
+
+    def get_campos_ordenacao(self):
+        chave = self.request.GET.get(self.keyset_param_ordem)
+        if chave not in self.keyset_ordenacoes:
+            chave = self.keyset_ordenacao_padrao
+        campos = list(self.keyset_ordenacoes[chave])
+
+        # Desempate pela PK para que o cursor seja sempre único
+        if not any(c.lstrip('-') in ('pk', 'id') for c in campos):
+            campos.append('-pk' if campos[0].startswith('-') else 'pk')
+        return campos
+
+    def get_ordering(self):
+        # Nulos por último em qualquer direção, como _filtro_keyset pressupõe
+        return [
+            F(c[1:]).desc(nulls_last=True) if c.startswith('-') else F(c).asc(nulls_last=True)
+            for c in self.get_campos_ordenacao()
+        ]
+
+    def get_template_names(self):
+        if self.e_pagina_seguinte and self.keyset_template_parcial:
+            return [self.keyset_template_parcial]
+        return super().get_template_names()
+
+    def paginate_queryset(self, queryset, page_size):
+        campos = self.get_campos_ordenacao()
+        # Reaplica a ordenação: views que sobrescrevem get_queryset não passam por get_ordering
+        queryset = queryset.order_by(*self.get_ordering())
+        cursor = self.request.GET.get(self.keyset_param_cursor)
+        if cursor:
+            valores = self._decodificar_cursor(cursor, len(campos))
+            try:
+                queryset = queryset.filter(self._filtro_keyset(campos, valores))
+            except (ValidationError, ValueError, TypeError):
+                # Cursor adulterado: decodifica, mas os valores não servem para os campos
+                raise Http404("Cursor de paginação inválido.")
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        linhas = list(queryset[:page_size + 1])
+        has_next = len(linhas) > page_size
+        linhas = linhas[:page_size]
+
+        next_url = None
+        if has_next:
+            params = self.request.GET.copy()
+            params[self.keyset_param_cursor] = self._codificar_cursor(linhas[-1], campos)
+            next_url = f"{self.request.path}?{params.urlencode()}"
+
+        pagina = KeysetPage(linhas, has_next, next_url)
+        return (None, pagina, linhas, has_next)
+
+    # --- Cursor -------------------------------------------------------------
+
+    @staticmethod
+    def _valor_campo(obj, campo):
+        valor = obj
+        for parte in campo.lstrip('-').split('__'):
+            valor = getattr(valor, parte)
+        return valor
+
+    def _codificar_cursor(self, obj, campos):
+        valores = [self._valor_campo(obj, c) for c in campos]
+        bruto = json.dumps(valores, default=lambda v: v.isoformat() if hasattr(v, 'isoformat') else str(v))
+        return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+    @staticmethod
+    def _decodificar_cursor(cursor, quantidade):
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, UnicodeError):
+            raise Http404("Cursor de paginação inválido.")
+        if not isinstance(valores, list) or len(valores) != quantidade:
+            raise Http404("Cursor de paginação inválido.")
+        return valores
+
+    @staticmethod
+    def _filtro_keyset(campos, valores):
+        """
+        Monta (a > x) OR (a = x AND b > y) OR ... respeitando a direção
+        de cada campo da ordenação. Como os nulos vêm por último, "depois
+        de x" inclui os nulos, e depois de um nulo só há outros nulos.
+        """
+        filtro = Q()
+        for i, campo in enumerate(campos):
+            nome = campo.lstrip('-')
+            if valores[i] is None:
+                continue
+            lookup = 'lt' if campo.startswith('-') else 'gt'
+            condicao = Q(**{f"{nome}__{lookup}": valores[i]}) | Q(**{f"{nome}__isnull": True})
+            for anterior, valor in zip(campos[:i], valores[:i]):
+                anterior = anterior.lstrip('-')
+                condicao &= Q(**{f"{anterior}__isnull": True}) if valor is None else Q(**{anterior: valor})
+            filtro |= condicao
+        return filtro
@@ -1,3 +1,106 @@
-from django.test import TestCase
+import base64
+import json
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.views.generic import ListView
+
+from tc_crm.autocompletes import ClienteAutocomplete
+from tc_crm.models import Cliente
+from .autocomplete import AutocompleteModelChoiceField
+from .mixins import KeysetPaginationMixin
+
+User = get_user_model()
+
+
+class UsuarioKeysetView(KeysetPaginationMixin, ListView):
+    model = User
+    paginate_by = 2
+    template_name = 'unused.html'
+    keyset_ordenacao_padrao = 'date_joined'
+    keyset_ordenacoes = {'date_joined': ('date_joined',)}
+
+
+class KeysetPaginationTest(TestCase):
+    """ Paginação por cursor: páginas encadeadas sem repetição e cursor adulterado vira 404. """
+    @classmethod
+    def setUpTestData(cls):
+        for numero in range(5):
+            User.objects.create_user(username=f'usuario{numero}', password='senha')
+
+    def pagina(self, cursor=None):
+        request = RequestFactory().get('/', {'cursor': cursor} if cursor else {})
+        view = UsuarioKeysetView()
+        view.setup(request)
+        view.object_list = view.get_queryset()
+        return view.get_context_data()
+
+    @staticmethod
+    def cursor(valores):
+        return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+    def test_cursor_percorre_todas_as_linhas(self):
+        vistos, cursor = [], None
+        while True:
+            contexto = self.pagina(cursor)
+            vistos += [usuario.username for usuario in contexto['object_list']]
+            if not contexto['is_paginated']:
+                break
+            cursor = parse_qs(urlsplit(contexto['page_obj'].next_url).query)['cursor'][0]
+        self.assertEqual(vistos, [f'usuario{numero}' for numero in range(5)])
+
+    def test_cursor_com_tipos_errados_responde_404(self):
+        for valores in (['não é data', 1], ['2026-01-01T00:00:00+00:00', 'abc'], [{'a': 1}, [2]]):
+            with self.subTest(valores=valores), self.assertRaises(Http404):
+                self.pagina(self.cursor(valores))
+
+    def test_cursor_ilegivel_responde_404(self):
+        with self.assertRaises(Http404):
+            self.pagina('%%%')
+
+
+@override_settings(CORE_AUTOCOMPLETE_POR_PAGINA=2, CORE_AUTOCOMPLETE_MAX_PAGINAS=2)
+class AutocompleteTest(TestCase):
+    """ Busca remota dos selects: permissão, limite de páginas e validação só da PK enviada. """
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_superuser(username='gestor', password='senha')
+        cls.sem_permissao = User.objects.create_user(username='estagiario', password='senha')
+        cls.clientes = [Cliente.objects.create(razao_social=f'Cliente {letra}') for letra in 'ABCDE']
+        cls.url = reverse('tc_core:autocomplete', args=['clientes'])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sem_permissao_responde_403(self):
+        self.client.force_login(self.sem_permissao)
+
+        response = self.client.get(self.url, {'term': 'Cliente'})
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_pagina_fora_dos_limites_e_ajustada(self):
+        self.client.force_login(self.gestor)
+
+        for pagina, esperado in (('0', ['Cliente A', 'Cliente B']), ('abc', ['Cliente A', 'Cliente B']),
+                                 ('999', ['Cliente C', 'Cliente D'])):
+            with self.subTest(pagina=pagina):
+                dados = self.client.get(self.url, {'term': 'Cliente', 'page': pagina}).json()
+                self.assertEqual([linha['text'] for linha in dados['results']], esperado)
+        # A última página atendida encerra a rolagem, mesmo com mais registros
+        self.assertFalse(dados['pagination']['more'])
+
+    def test_field_recusa_pk_fora_do_queryset(self):
+        permitido, *_, fora = self.clientes
+        field = AutocompleteModelChoiceField(ClienteAutocomplete, queryset=Cliente.objects.exclude(pk=fora.pk))
+
+        self.assertEqual(field.clean(permitido.pk), permitido)
+        for valor in (fora.pk, 'abc'):
+            with self.subTest(valor=valor), self.assertRaises(ValidationError):
+                field.clean(valor)
@@ -15,6 +15,7 @@ urlpatterns = [
         
     # Rotas Globais/Utilidade
     path('search/results/', views.search_results_view, name='search_results'),
+    path('autocomplete/<slug:codigo>/', views.AutocompleteView.as_view(), name='autocomplete'),
     path('profile/', views.UserProfileView.as_view(), name='profile'),
     
     # AJUSTE 2: Novas rotas para Gestão de Usuários e Vendedores
@@ -1,12 +1,13 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.views.generic import TemplateView
-from django.http import HttpResponse
+from django.views.generic import TemplateView, View
+from django.http import HttpResponse, Http404, JsonResponse
 from django.db.models import Q
 from django.contrib.auth.views import LoginView as DjangoLoginView, LogoutView as DjangoLogoutView
 from django.urls import reverse_lazy, reverse
 from django.utils.decorators import method_decorator
 from django.apps import apps
+from django.conf import settings
 import logging
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import models
@@ -14,6 +15,7 @@ from django.db.models import Sum
 from django.db.models.functions import ExtractMonth
 from django.utils import timezone
 from tc_crm.models import Oportunidade, Proposta, Atividade, Cliente
+from tc_crm.services import PrevisaoVendasService
 from tc_contratos.models import Contrato
 from datetime import timedelta
 
@@ -24,6 +26,7 @@ from django import forms
 
 # IMPORTAÇÃO CORRIGIDA PARA O NOVO NOME DO APP:
 from tc_core.mixins import PermissionRequiredMixin 
+from .autocomplete import obter_autocomplete
 from .models import Usuario, Regra
 from tc_crm.models import Oportunidade, MetaMensal, EtapaVenda
 
@@ -58,8 +61,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         hoje = now.date()
 
         # 1. KPIs FINANCEIROS
-        pipeline_query = Oportunidade.objects.exclude(etapa__nome__icontains='Ganho').exclude(etapa__nome__icontains='Perdido')
-        context['total_pipeline'] = pipeline_query.aggregate(Sum('valor_estimado'))['valor_estimado__sum'] or 0
+        # Pipeline bruto e ponderado pela taxa histórica de ganho (previsão em cache por mês)
+        previsao = PrevisaoVendasService.obter()
+        context['total_pipeline'] = previsao['bruto']
+        context['pipeline_ponderado'] = previsao['ponderado']
+        context['previsao_meses'] = previsao['meses']
         
         contratos_ativos = Contrato.objects.filter(situacao='ATIVO')
         context['total_mrr'] = sum(c.valor_mensal for c in contratos_ativos)
@@ -204,6 +210,26 @@ def search_results_view(request):
 
     return render(request, 'partials/search_dropdown.html', {'resultados': resultados, 'query': query})
 
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    Busca remota dos selects (select2 com ajax): ?term=...&page=N devolve uma
+    página de {id, text} do autocomplete registrado com o código da URL.
+    """
+
+    def get(self, request, codigo):
+        autocomplete = obter_autocomplete(codigo)
+        if autocomplete is None:
+            raise Http404
+        if not autocomplete.tem_permissao(request.user):
+            return JsonResponse({'results': [], 'pagination': {'more': False}}, status=403)
+        try:
+            pagina = int(request.GET.get('page', 1))
+        except ValueError:
+            pagina = 1
+        pagina = min(max(pagina, 1), settings.CORE_AUTOCOMPLETE_MAX_PAGINAS)
+        termo = request.GET.get('term', '').strip()[:100]
+        return JsonResponse(autocomplete.buscar(termo, request.user, pagina))
+
 # ############################################################################
 # GESTÃO DE USUÁRIOS E VENDEDORES (ADMINISTRAÇÃO GLOBAL)
 # ############################################################################
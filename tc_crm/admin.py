@@ -2,15 +2,15 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Cliente, Contato, EtapaVenda, Oportunidade, Atividade, Proposta, ItemProposta, Etiqueta
+from .models import Cliente, Contato, EtapaVenda, Oportunidade, Atividade, Proposta, ItemProposta, Etiqueta, ResumoCliente, TransicaoEtapa, CoeficientePrevisao, MetaConsolidada, CandidatoDuplicata
 
 @admin.register(EtapaVenda)
 class EtapaVendaAdmin(admin.ModelAdmin):
     # O primeiro campo (nome) será o link para entrar no registro
-    list_display = ('nome', 'ordem', 'permite_proposta', 'e_etapa_ganha')
+    list_display = ('nome', 'ordem', 'permite_proposta', 'e_etapa_ganha', 'e_etapa_perdida')
     
     # Agora podemos tornar a ordem e as outras opções editáveis na lista
-    list_editable = ('ordem', 'permite_proposta', 'e_etapa_ganha')
+    list_editable = ('ordem', 'permite_proposta', 'e_etapa_ganha', 'e_etapa_perdida')
     
     ordering = ['ordem']
 
@@ -24,10 +24,41 @@ class ClienteAdmin(admin.ModelAdmin):
     search_fields = ('razao_social', 'nome_fantasia', 'cnpj_cpf')
     list_filter = ('estado', 'regime_tributario')
 
+@admin.register(ResumoCliente)
+class ResumoClienteAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'vendas_total', 'pipeline_aberto', 'saldo_receber', 'chamados_abertos', 'ultima_atividade', 'calculado_em')
+    search_fields = ('cliente__razao_social',)
+    readonly_fields = [f.name for f in ResumoCliente._meta.fields]
+
+@admin.register(TransicaoEtapa)
+class TransicaoEtapaAdmin(admin.ModelAdmin):
+    list_display = ('oportunidade', 'etapa_origem', 'etapa_destino', 'responsavel', 'data', 'segundos_na_etapa')
+    list_filter = ('etapa_destino', 'responsavel')
+    search_fields = ('oportunidade__nome',)
+    readonly_fields = [f.name for f in TransicaoEtapa._meta.fields]
+
+@admin.register(CoeficientePrevisao)
+class CoeficientePrevisaoAdmin(admin.ModelAdmin):
+    list_display = ('etapa', 'responsavel', 'tipo_oportunidade', 'amostras', 'ganhas', 'probabilidade', 'atraso_medio', 'calculado_em')
+    list_filter = ('etapa', 'tipo_oportunidade')
+    readonly_fields = [f.name for f in CoeficientePrevisao._meta.fields]
+
+@admin.register(MetaConsolidada)
+class MetaConsolidadaAdmin(admin.ModelAdmin):
+    list_display = ('vendedor', 'ano', 'mes', 'valor_objetivo', 'fonte', 'atualizado_em')
+    list_filter = ('ano', 'mes', 'fonte')
+    readonly_fields = [f.name for f in MetaConsolidada._meta.fields]
+
+@admin.register(CandidatoDuplicata)
+class CandidatoDuplicataAdmin(admin.ModelAdmin):
+    list_display = ('entidade', 'registro_a_id', 'registro_b_id', 'pontuacao', 'status', 'mantido_id', 'revisado_por', 'revisado_em')
+    list_filter = ('entidade', 'status')
+    readonly_fields = ('entidade', 'registro_a_id', 'registro_b_id', 'pontuacao', 'criterios', 'mantido_id', 'revisado_por', 'revisado_em', 'criado_em')
+
 @admin.register(Oportunidade)
 class OportunidadeAdmin(admin.ModelAdmin):
     list_display = ('nome', 'cliente', 'etapa', 'valor_estimado', 'data_fechamento_prevista')
-    list_filter = ('etapa', 'tipo_oportunidade', 'status_operacional')
+    list_filter = ('etapa', 'tipo_oportunidade', 'canal_origem', 'status_operacional')
     search_fields = ('nome', 'cliente__razao_social')
 
 # Registros simples para os demais modelos
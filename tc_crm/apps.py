@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TcCrmConfig(AppConfig):
     name = 'tc_crm'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,17 @@
+# tc_crm/autocompletes.py
+from tc_core.autocomplete import AutocompleteBase, registrar_autocomplete
+
+from .models import Cliente
+
+# ############################################################################
+# BUSCAS REMOTAS DOS SELECTS
+# ############################################################################
+
+@registrar_autocomplete
+class ClienteAutocomplete(AutocompleteBase):
+    codigo = 'clientes'
+    modelo = Cliente
+    campos_busca = ('razao_social__icontains', 'nome_fantasia__icontains', 'cnpj_cpf__icontains')
+    ordenacao = ('razao_social', 'pk')
+    permissao = 'tc_crm.view_cliente'
+    placeholder = 'Busque o cliente por nome ou CNPJ/CPF...'
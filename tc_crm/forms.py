@@ -59,7 +59,7 @@ class OportunidadeForm(forms.ModelForm):
         model = Oportunidade
         fields = [
             'nome', 'cliente', 'responsavel', 'etapa', 
-            'valor_estimado', 'data_fechamento_prevista', 'tipo_oportunidade'
+            'valor_estimado', 'data_fechamento_prevista', 'tipo_oportunidade', 'canal_origem'
         ]
         widgets = {
             'nome': forms.TextInput(attrs={'class': 'form-control'}),
@@ -68,6 +68,7 @@ class OportunidadeForm(forms.ModelForm):
             'etapa': forms.Select(attrs={'class': 'form-control'}),
             'valor_estimado': forms.NumberInput(attrs={'class': 'form-control'}),
             'tipo_oportunidade': forms.Select(attrs={'class': 'form-control'}),
+            'canal_origem': forms.Select(attrs={'class': 'form-control'}),
             'data_fechamento_prevista': forms.DateInput(
                 attrs={'type': 'date', 'class': 'form-control'},
                 format='%Y-%m-%d'
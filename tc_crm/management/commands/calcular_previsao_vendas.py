@@ -0,0 +1,14 @@
+# tc_crm/management/commands/calcular_previsao_vendas.py
+
+from django.core.management.base import BaseCommand
+from tc_crm.services import PrevisaoVendasService
+
+class Command(BaseCommand):
+    help = 'Recalcula as probabilidades de ganho e o atraso médio usados na previsão de vendas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--janela', type=int, default=None, help='Dias de negócios encerrados considerados (padrão: CRM_PREVISAO_JANELA_DIAS).')
+
+    def handle(self, *args, **options):
+        gravados = PrevisaoVendasService.recalcular(janela_dias=options['janela'])
+        self.stdout.write(self.style.SUCCESS(f'{gravados} coeficiente(s) de previsão gravado(s).'))
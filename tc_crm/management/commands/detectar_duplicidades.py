@@ -0,0 +1,22 @@
+# tc_crm/management/commands/detectar_duplicidades.py
+
+from django.core.management.base import BaseCommand
+from tc_crm.models import CandidatoDuplicata
+from tc_crm.services import DeduplicacaoService
+
+class Command(BaseCommand):
+    help = 'Procura cadastros duplicados (clientes, contatos e fornecedores) e atualiza a fila de revisão'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entidade', choices=CandidatoDuplicata.Entidade.values, action='append',
+            help='Entidade a analisar (pode repetir; padrão: todas)'
+        )
+
+    def handle(self, *args, **options):
+        for entidade in options['entidade'] or CandidatoDuplicata.Entidade.values:
+            resultado = DeduplicacaoService.detectar(entidade)
+            self.stdout.write(self.style.SUCCESS(
+                f"{entidade}: {resultado['registros']} registro(s), {resultado['comparacoes']} comparação(ões), "
+                f"{resultado['novos']} novo(s), {resultado['atualizados']} atualizado(s), {resultado['removidos']} removido(s)."
+            ))
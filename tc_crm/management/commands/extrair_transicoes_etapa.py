@@ -0,0 +1,18 @@
+# tc_crm/management/commands/extrair_transicoes_etapa.py
+
+from django.core.management.base import BaseCommand
+from tc_crm.services import FunilVendasService
+
+class Command(BaseCommand):
+    help = "Extrai as mudanças de etapa do histórico das oportunidades para o funil (incremental)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=FunilVendasService.LOTE, help='Registros de histórico por lote.')
+        parser.add_argument('--reprocessar', action='store_true', help="Apaga as transições e refaz a extração desde o início.")
+
+    def handle(self, *args, **options):
+        if options['reprocessar']:
+            gravadas = FunilVendasService.reprocessar()
+        else:
+            gravadas = FunilVendasService.extrair(lote=max(options['lote'], 1))
+        self.stdout.write(self.style.SUCCESS(f'{gravadas} transição(ões) de etapa gravada(s).'))
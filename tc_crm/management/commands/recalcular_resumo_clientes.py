@@ -0,0 +1,19 @@
+# tc_crm/management/commands/recalcular_resumo_clientes.py
+
+from django.core.management.base import BaseCommand
+from tc_crm.models import Cliente
+from tc_crm.services import ResumoClienteService
+
+class Command(BaseCommand):
+    help = 'Recalcula a visão 360 (ResumoCliente) de todos os clientes, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Clientes por lote (padrão: 500).')
+
+    def handle(self, *args, **options):
+        ids = list(Cliente.objects.order_by('pk').values_list('pk', flat=True))
+        lote = max(options['lote'], 1)
+        gravados = 0
+        for inicio in range(0, len(ids), lote):
+            gravados += ResumoClienteService.atualizar(ids[inicio:inicio + lote])
+        self.stdout.write(self.style.SUCCESS(f'{gravados} resumo(s) de cliente gravado(s).'))
@@ -0,0 +1,11 @@
+# tc_crm/management/commands/sincronizar_metas.py
+
+from django.core.management.base import BaseCommand
+from tc_crm.services import MetasService
+
+class Command(BaseCommand):
+    help = 'Reconstrói as metas consolidadas a partir de MetaMensal, MetaGlobal e MetaVenda'
+
+    def handle(self, *args, **options):
+        gravadas = MetasService.sincronizar()
+        self.stdout.write(self.style.SUCCESS(f'{gravadas} meta(s) consolidada(s) gravada(s).'))
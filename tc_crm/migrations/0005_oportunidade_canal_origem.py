@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0004_historicalproposta_valor_desconto_and_more'),
+        ('tc_marketing', '0002_indicadoraquisicaomensal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaloportunidade',
+            name='canal_origem',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Canal de marketing que gerou o negócio (base do CAC por canal).', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tc_marketing.canalmarketing', verbose_name='Canal de Origem'),
+        ),
+        migrations.AddField(
+            model_name='oportunidade',
+            name='canal_origem',
+            field=models.ForeignKey(blank=True, help_text='Canal de marketing que gerou o negócio (base do CAC por canal).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='oportunidades', to='tc_marketing.canalmarketing', verbose_name='Canal de Origem'),
+        ),
+    ]
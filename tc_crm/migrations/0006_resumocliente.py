@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 13:20
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0005_oportunidade_canal_origem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='tc_crm.cliente', verbose_name='Cliente')),
+                ('vendas_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Vendas (Geral)')),
+                ('vendas_ano', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Vendas no Ano')),
+                ('vendas_90_dias', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Vendas (90 dias)')),
+                ('vendas_30_dias', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Vendas (30 dias)')),
+                ('qtd_vendas', models.PositiveIntegerField(default=0, verbose_name='Negócios Ganhos')),
+                ('pipeline_aberto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Pipeline em Aberto')),
+                ('oportunidades_abertas', models.PositiveIntegerField(default=0, verbose_name='Oportunidades em Aberto')),
+                ('saldo_receber', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Saldo a Receber')),
+                ('saldo_vencido', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Saldo Vencido')),
+                ('faturas_em_aberto', models.PositiveIntegerField(default=0, verbose_name='Faturas em Aberto')),
+                ('chamados_abertos', models.PositiveIntegerField(default=0, verbose_name='Chamados em Aberto')),
+                ('ativos_instalados', models.PositiveIntegerField(default=0, verbose_name='Ativos Instalados')),
+                ('ultima_atividade', models.DateTimeField(blank=True, null=True, verbose_name='Última Atividade')),
+                ('calculado_em', models.DateTimeField(auto_now=True, verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Resumo do Cliente',
+                'verbose_name_plural': 'Resumos de Clientes',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0006_resumocliente'),
+        ('tc_produtos', '0004_busca_catalogo'),
+        ('tc_servicos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemproposta',
+            index=models.Index(fields=['produto', 'id'], name='idx_itemproposta_produto_uso'),
+        ),
+        migrations.AddIndex(
+            model_name='itemproposta',
+            index=models.Index(fields=['servico', 'id'], name='idx_itemproposta_servico_uso'),
+        ),
+    ]
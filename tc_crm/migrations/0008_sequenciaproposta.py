@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0007_itemproposta_uso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaProposta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.CharField(max_length=8, unique=True, verbose_name='Dia (AAAAMMDD)')),
+                ('ultimo', models.PositiveIntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Propostas',
+                'verbose_name_plural': 'Sequências de Propostas',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0008_sequenciaproposta'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='itemproposta',
+            options={'ordering': ['ordem', 'pk'], 'verbose_name': 'Item da Proposta', 'verbose_name_plural': 'Itens da Proposta'},
+        ),
+        migrations.AddField(
+            model_name='itemproposta',
+            name='ordem',
+            field=models.PositiveIntegerField(default=0, verbose_name='Ordem'),
+        ),
+    ]
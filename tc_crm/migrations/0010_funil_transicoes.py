@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0009_itemproposta_ordem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessamentoFunil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_history_id', models.PositiveIntegerField(default=0, verbose_name='Último Registro Processado')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+            ],
+            options={
+                'verbose_name': 'Processamento do Funil',
+                'verbose_name_plural': 'Processamentos do Funil',
+            },
+        ),
+        migrations.CreateModel(
+            name='TransicaoEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateTimeField(verbose_name='Data da Transição')),
+                ('segundos_na_etapa', models.PositiveIntegerField(blank=True, null=True, verbose_name='Tempo na Etapa de Origem (s)')),
+                ('history_id', models.PositiveIntegerField(unique=True, verbose_name='Registro do Histórico')),
+                ('etapa_destino', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transicoes_entrada', to='tc_crm.etapavenda', verbose_name='Etapa de Destino')),
+                ('etapa_origem', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transicoes_saida', to='tc_crm.etapavenda', verbose_name='Etapa de Origem')),
+                ('oportunidade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transicoes_etapa', to='tc_crm.oportunidade', verbose_name='Oportunidade')),
+                ('responsavel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transicoes_etapa', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor Responsável')),
+            ],
+            options={
+                'verbose_name': 'Transição de Etapa',
+                'verbose_name_plural': 'Transições de Etapa',
+                'ordering': ['oportunidade', 'data'],
+                'indexes': [models.Index(fields=['etapa_origem', 'etapa_destino'], name='idx_transicao_etapas'), models.Index(fields=['responsavel', 'data'], name='idx_transicao_vendedor'), models.Index(fields=['data'], name='idx_transicao_data')],
+            },
+        ),
+    ]
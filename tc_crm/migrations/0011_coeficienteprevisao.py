@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 11:03
+
+import datetime
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0010_funil_transicoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoeficientePrevisao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo_oportunidade', models.CharField(blank=True, choices=[('projeto', 'Projeto (Venda Única)'), ('contrato', 'Contrato (Recorrente)')], max_length=10, verbose_name='Tipo de Oportunidade')),
+                ('amostras', models.PositiveIntegerField(default=0, verbose_name='Negócios Encerrados')),
+                ('ganhas', models.PositiveIntegerField(default=0, verbose_name='Negócios Ganhos')),
+                ('probabilidade', models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=5, verbose_name='Probabilidade de Ganho')),
+                ('atraso_medio', models.DurationField(default=datetime.timedelta, verbose_name='Atraso Médio no Fechamento')),
+                ('calculado_em', models.DateTimeField(auto_now=True, verbose_name='Calculado em')),
+                ('etapa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coeficientes_previsao', to='tc_crm.etapavenda', verbose_name='Etapa')),
+                ('responsavel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coeficientes_previsao', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Coeficiente de Previsão',
+                'verbose_name_plural': 'Coeficientes de Previsão',
+                'indexes': [models.Index(fields=['etapa', 'responsavel', 'tipo_oportunidade'], name='idx_coeficiente_previsao')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+def marcar_etapas_perdidas(apps, schema_editor):
+    # Até aqui as etapas perdidas eram reconhecidas pelo nome ("Perdida"/"Perdido")
+    EtapaVenda = apps.get_model('tc_crm', 'EtapaVenda')
+    EtapaVenda.objects.filter(nome__icontains='Perdid', e_etapa_ganha=False).update(e_etapa_perdida=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0011_coeficienteprevisao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='etapavenda',
+            name='e_etapa_perdida',
+            field=models.BooleanField(default=False, help_text='Marque a(s) etapa(s) que representam um negócio perdido/encerrado sem venda.', verbose_name="É Etapa 'Perdida'?"),
+        ),
+        migrations.RunPython(marcar_etapas_perdidas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 11:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0012_etapavenda_e_etapa_perdida'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetaConsolidada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveIntegerField(verbose_name='Ano')),
+                ('mes', models.PositiveIntegerField(choices=[(1, 'Janeiro'), (2, 'Fevereiro'), (3, 'Março'), (4, 'Abril'), (5, 'Maio'), (6, 'Junho'), (7, 'Julho'), (8, 'Agosto'), (9, 'Setembro'), (10, 'Outubro'), (11, 'Novembro'), (12, 'Dezembro')], verbose_name='Mês')),
+                ('valor_objetivo', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor Objetivo')),
+                ('fonte', models.CharField(choices=[('meta_mensal', 'Meta Mensal (CRM)'), ('meta_global', 'Meta Global (Vendedor)'), ('meta_venda', 'Meta de Venda (Financeiro)')], max_length=15, verbose_name='Fonte')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('vendedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metas_consolidadas', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Meta Consolidada',
+                'verbose_name_plural': 'Metas Consolidadas',
+                'indexes': [models.Index(fields=['ano', 'mes'], name='idx_meta_consolidada_mes')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('vendedor__isnull', False)), fields=('vendedor', 'ano', 'mes'), name='uniq_meta_consolidada_vendedor'), models.UniqueConstraint(condition=models.Q(('vendedor__isnull', True)), fields=('ano', 'mes'), name='uniq_meta_consolidada_empresa')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0013_metaconsolidada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CandidatoDuplicata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entidade', models.CharField(choices=[('cliente', 'Cliente'), ('contato', 'Contato'), ('fornecedor', 'Fornecedor')], max_length=20, verbose_name='Entidade')),
+                ('registro_a_id', models.PositiveIntegerField(verbose_name='Registro A')),
+                ('registro_b_id', models.PositiveIntegerField(verbose_name='Registro B')),
+                ('pontuacao', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Pontuação (0-100)')),
+                ('criterios', models.JSONField(blank=True, default=dict, verbose_name='Critérios')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('mesclado', 'Mesclado'), ('descartado', 'Não é Duplicata')], default='pendente', max_length=15, verbose_name='Status')),
+                ('mantido_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='Registro Mantido')),
+                ('revisado_em', models.DateTimeField(blank=True, null=True, verbose_name='Revisado em')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Encontrado em')),
+                ('revisado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Revisado por')),
+            ],
+            options={
+                'verbose_name': 'Candidato a Duplicata',
+                'verbose_name_plural': 'Candidatos a Duplicata',
+                'indexes': [models.Index(fields=['entidade', 'status', '-pontuacao'], name='idx_duplicata_fila')],
+                'constraints': [models.UniqueConstraint(fields=('entidade', 'registro_a_id', 'registro_b_id'), name='uniq_candidato_duplicata_par')],
+            },
+        ),
+    ]
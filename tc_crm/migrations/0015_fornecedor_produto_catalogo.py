@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # As tabelas legadas só saem depois que contratos e estoque foram migrados
+    dependencies = [
+        ('tc_contratos', '0003_fornecedor_catalogo'),
+        ('tc_crm', '0014_candidatoduplicata'),
+        ('tc_estoque', '0002_produto_catalogo'),
+        ('tc_produtos', '0004_busca_catalogo'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Fornecedor',
+        ),
+        migrations.DeleteModel(
+            name='Produto',
+        ),
+        migrations.CreateModel(
+            name='Fornecedor',
+            fields=[],
+            options={
+                'verbose_name': 'Fornecedor (legado)',
+                'verbose_name_plural': 'Fornecedores (legado)',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('tc_produtos.fornecedor',),
+        ),
+        migrations.CreateModel(
+            name='Produto',
+            fields=[],
+            options={
+                'verbose_name': 'Produto (legado)',
+                'verbose_name_plural': 'Produtos (legado)',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('tc_produtos.produto',),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0015_fornecedor_produto_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlteracaoKanban',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('oportunidade_id', models.PositiveIntegerField(verbose_name='Oportunidade')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Registrado em')),
+            ],
+            options={
+                'verbose_name': 'Alteração do Kanban',
+                'verbose_name_plural': 'Alterações do Kanban',
+            },
+        ),
+        migrations.AddField(
+            model_name='historicaloportunidade',
+            name='posicao_kanban',
+            field=models.PositiveIntegerField(default=0, verbose_name='Posição no Kanban'),
+        ),
+        migrations.AddField(
+            model_name='historicaloportunidade',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão'),
+        ),
+        migrations.AddField(
+            model_name='oportunidade',
+            name='posicao_kanban',
+            field=models.PositiveIntegerField(default=0, verbose_name='Posição no Kanban'),
+        ),
+        migrations.AddField(
+            model_name='oportunidade',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão'),
+        ),
+        migrations.AddIndex(
+            model_name='oportunidade',
+            index=models.Index(fields=['etapa', 'posicao_kanban'], name='idx_oportunidade_kanban'),
+        ),
+    ]
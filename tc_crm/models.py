@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
@@ -6,10 +6,12 @@ from django.db import models
 from django.db.models import Sum, F, DecimalField
 from django.utils.translation import gettext_lazy as _
 from django.utils.http import urlencode
+from datetime import timedelta
 from decimal import Decimal
-from django.apps import apps
 import math
 
+from tc_produtos.models import Fornecedor as CatalogoFornecedor, Produto as CatalogoProduto
+
 # Modelo de Etiqueta (Tag) para classificação de Clientes
 class Etiqueta(models.Model):
     """
@@ -79,6 +81,50 @@ class Cliente(models.Model):
     def __str__(self):
         return self.razao_social
 
+class ResumoCliente(models.Model):
+    """
+    Visão 360 do cliente (vendas, pipeline, recebíveis, chamados e ativos)
+    pré-calculada para a página do cliente. Mantido por ResumoClienteService;
+    não editar manualmente.
+    """
+    cliente = models.OneToOneField(
+        Cliente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumo',
+        verbose_name="Cliente"
+    )
+
+    # Vendas (oportunidades ganhas)
+    vendas_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Vendas (Geral)")
+    vendas_ano = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Vendas no Ano")
+    vendas_90_dias = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Vendas (90 dias)")
+    vendas_30_dias = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Vendas (30 dias)")
+    qtd_vendas = models.PositiveIntegerField(default=0, verbose_name="Negócios Ganhos")
+
+    # Pipeline em aberto
+    pipeline_aberto = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Pipeline em Aberto")
+    oportunidades_abertas = models.PositiveIntegerField(default=0, verbose_name="Oportunidades em Aberto")
+
+    # Contas a receber
+    saldo_receber = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Saldo a Receber")
+    saldo_vencido = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Saldo Vencido")
+    faturas_em_aberto = models.PositiveIntegerField(default=0, verbose_name="Faturas em Aberto")
+
+    # Operações
+    chamados_abertos = models.PositiveIntegerField(default=0, verbose_name="Chamados em Aberto")
+    ativos_instalados = models.PositiveIntegerField(default=0, verbose_name="Ativos Instalados")
+
+    ultima_atividade = models.DateTimeField(null=True, blank=True, verbose_name="Última Atividade")
+    calculado_em = models.DateTimeField(auto_now=True, verbose_name="Calculado em")
+
+    class Meta:
+        verbose_name = "Resumo do Cliente"
+        verbose_name_plural = "Resumos de Clientes"
+
+    def __str__(self):
+        return f"Resumo - {self.cliente}"
+
 # Modelo para os Contatos (Pessoas específicas) associados a um Cliente
 class Contato(models.Model):
     class PapelDecisao(models.TextChoices):
@@ -124,6 +170,11 @@ class EtapaVenda(models.Model):
         verbose_name="É Etapa 'Ganha'?",
         help_text="Marque APENAS a(s) etapa(s) que representam uma venda concluída/ganha."
     )
+    e_etapa_perdida = models.BooleanField(
+        default=False,
+        verbose_name="É Etapa 'Perdida'?",
+        help_text="Marque a(s) etapa(s) que representam um negócio perdido/encerrado sem venda."
+    )
 
     class Meta:
         verbose_name = "Etapa de Venda"
@@ -163,6 +214,11 @@ class Oportunidade(models.Model):
     tipo_oportunidade = models.CharField(
         max_length=10, choices=TiposOportunidade.choices, default=TiposOportunidade.PROJETO, verbose_name="Tipo de Oportunidade"
     )
+    canal_origem = models.ForeignKey(
+        'tc_marketing.CanalMarketing', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='oportunidades', verbose_name="Canal de Origem",
+        help_text="Canal de marketing que gerou o negócio (base do CAC por canal)."
+    )
 
     # Acompanhamento Pós-Venda (CAMPOS DUPLICADOS AQUI PARA REDUÇÃO DE ACOPLAMENTO)
     data_fechamento_real = models.DateTimeField(blank=True, null=True, verbose_name="Data de Fechamento (Real)") 
@@ -173,6 +229,10 @@ class Oportunidade(models.Model):
     status_financeiro = models.CharField(
         max_length=25, choices=StatusFinanceiro.choices, default=StatusFinanceiro.AGUARDANDO, verbose_name="Status Financeiro"
     ) 
+
+    # Quadro Kanban: ordem dentro da coluna e versão para detectar movimentações concorrentes
+    posicao_kanban = models.PositiveIntegerField(default=0, verbose_name="Posição no Kanban")
+    versao = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versão")
     
     @property
     def contato_principal(self):
@@ -205,16 +265,126 @@ class Oportunidade(models.Model):
         verbose_name = "Oportunidade"
         verbose_name_plural = "Oportunidades"
         ordering = ['-data_fechamento_prevista']
+        indexes = [
+            models.Index(fields=['etapa', 'posicao_kanban'], name='idx_oportunidade_kanban'),
+        ]
 
     def save(self, *args, **kwargs):
         # Se a etapa for marcada como 'Ganha' e ainda não tiver data real, preenchemos agora
         if self.etapa.e_etapa_ganha and not self.data_fechamento_real:
             self.data_fechamento_real = timezone.now()
+        # Toda gravação invalida a versão que os quadros abertos conhecem
+        if not self._state.adding:
+            self.versao += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'versao'}
         super().save(*args, **kwargs)
         
     def __str__(self):
         return self.nome
 
+class AlteracaoKanban(models.Model):
+    """
+    Feed de alterações do quadro Kanban: cada linha registra que um cartão
+    mudou (movido, reordenado, editado ou excluído). O id funciona como
+    revisão do quadro; os quadros abertos pedem as alterações posteriores à
+    última revisão que receberam e redesenham apenas esses cartões.
+    """
+    oportunidade_id = models.PositiveIntegerField(verbose_name="Oportunidade")
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Registrado em")
+
+    class Meta:
+        verbose_name = "Alteração do Kanban"
+        verbose_name_plural = "Alterações do Kanban"
+
+    def __str__(self):
+        return f"Revisão {self.pk}: oportunidade #{self.oportunidade_id}"
+
+class TransicaoEtapa(models.Model):
+    """
+    Fato do funil de vendas: uma linha por mudança de etapa de uma oportunidade,
+    extraída do histórico (HistoricalOportunidade) por FunilVendasService.
+    A primeira linha de cada oportunidade tem etapa_origem vazia (entrada no funil).
+    Não editar manualmente.
+    """
+    oportunidade = models.ForeignKey(
+        Oportunidade, on_delete=models.CASCADE, related_name='transicoes_etapa', verbose_name="Oportunidade"
+    )
+    etapa_origem = models.ForeignKey(
+        EtapaVenda, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='transicoes_saida', verbose_name="Etapa de Origem"
+    )
+    etapa_destino = models.ForeignKey(
+        EtapaVenda, on_delete=models.CASCADE, related_name='transicoes_entrada', verbose_name="Etapa de Destino"
+    )
+    responsavel = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='transicoes_etapa', verbose_name="Vendedor Responsável"
+    )
+    data = models.DateTimeField(verbose_name="Data da Transição")
+    segundos_na_etapa = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name="Tempo na Etapa de Origem (s)"
+    )
+    history_id = models.PositiveIntegerField(unique=True, verbose_name="Registro do Histórico")
+
+    class Meta:
+        verbose_name = "Transição de Etapa"
+        verbose_name_plural = "Transições de Etapa"
+        ordering = ['oportunidade', 'data']
+        indexes = [
+            models.Index(fields=['etapa_origem', 'etapa_destino'], name='idx_transicao_etapas'),
+            models.Index(fields=['responsavel', 'data'], name='idx_transicao_vendedor'),
+            models.Index(fields=['data'], name='idx_transicao_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.oportunidade_id}: {self.etapa_origem_id or '-'} -> {self.etapa_destino_id}"
+
+class ProcessamentoFunil(models.Model):
+    """ Marca d'água (linha única) da extração incremental de TransicaoEtapa. """
+    ultimo_history_id = models.PositiveIntegerField(default=0, verbose_name="Último Registro Processado")
+    processado_em = models.DateTimeField(null=True, blank=True, verbose_name="Processado em")
+
+    class Meta:
+        verbose_name = "Processamento do Funil"
+        verbose_name_plural = "Processamentos do Funil"
+
+    def __str__(self):
+        return f"Funil até #{self.ultimo_history_id}"
+
+class CoeficientePrevisao(models.Model):
+    """
+    Probabilidade de ganho e atraso médio no fechamento, calculados dos negócios
+    encerrados por PrevisaoVendasService.recalcular. Três níveis: geral (sem
+    etapa), por etapa (sem vendedor) e por etapa + vendedor + tipo.
+    """
+    etapa = models.ForeignKey(
+        EtapaVenda, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='coeficientes_previsao', verbose_name="Etapa"
+    )
+    responsavel = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='coeficientes_previsao', verbose_name="Vendedor"
+    )
+    tipo_oportunidade = models.CharField(
+        max_length=10, choices=Oportunidade.TiposOportunidade.choices, blank=True, verbose_name="Tipo de Oportunidade"
+    )
+    amostras = models.PositiveIntegerField(default=0, verbose_name="Negócios Encerrados")
+    ganhas = models.PositiveIntegerField(default=0, verbose_name="Negócios Ganhos")
+    probabilidade = models.DecimalField(max_digits=5, decimal_places=4, default=Decimal('0'), verbose_name="Probabilidade de Ganho")
+    atraso_medio = models.DurationField(default=timedelta, verbose_name="Atraso Médio no Fechamento")
+    calculado_em = models.DateTimeField(auto_now=True, verbose_name="Calculado em")
+
+    class Meta:
+        verbose_name = "Coeficiente de Previsão"
+        verbose_name_plural = "Coeficientes de Previsão"
+        indexes = [
+            models.Index(fields=['etapa', 'responsavel', 'tipo_oportunidade'], name='idx_coeficiente_previsao'),
+        ]
+
+    def __str__(self):
+        return f"{self.etapa or 'Geral'} / {self.responsavel_id or '-'} / {self.tipo_oportunidade or '-'}: {self.probabilidade}"
+
 # Modelo para as Atividades (ligações, reuniões, tarefas)
 class Atividade(models.Model):
     class TiposAtividade(models.TextChoices):
@@ -331,34 +501,60 @@ class Proposta(models.Model):
             # Pega a inicial do username ou 'X' se estiver vazio
             initial_part = salesperson.username[0].upper() if salesperson.username else 'X'
             
-            # Busca a última proposta criada HOJE para definir a sequência global
-            PropostaModel = apps.get_model('tc_crm', 'Proposta')
-            # Filtramos por id_proposta que começa com a data de hoje (AAAAMMDD)
-            last_proposal_today = PropostaModel.objects.filter(
-                id_proposta__startswith=date_part
-            ).order_by('-id_proposta').first()
-
-            next_sequence = 1
-            if last_proposal_today:
-                try:
-                    # Captura os últimos 3 dígitos do código atual
-                    last_sequence_str = last_proposal_today.id_proposta[-3:]
-                    next_sequence = int(last_sequence_str) + 1
-                except (ValueError, IndexError):
-                    next_sequence = 1
-            
-            # Formata a sequência com 3 dígitos (ex: 001)
-            sequence_part = str(next_sequence).zfill(3)
+            # Sequência global do dia, reservada no contador (sem varrer as propostas)
+            next_sequence = SequenciaProposta.reservar(date_part, 1)[0]
             
             # Monta o código final: 20251225D001
-            self.id_proposta = f"{date_part}{initial_part}{sequence_part}"
+            self.id_proposta = Proposta.montar_id(date_part, initial_part, next_sequence)
         
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def montar_id(date_part, initial_part, sequence):
+        # Formata a sequência com 3 dígitos (ex: 001)
+        return f"{date_part}{initial_part}{str(sequence).zfill(3)}"
+
     def __str__(self):
         return self.id_proposta or f"Proposta (ID: {self.pk})"
 
 
+class SequenciaProposta(models.Model):
+    """
+    Último número de proposta usado em cada dia (id_proposta = AAAAMMDD +
+    inicial + sequência). Reservar um bloco trava só a linha do dia, então
+    N propostas (ex.: variantes clonadas) recebem números com uma query.
+    """
+    data = models.CharField(max_length=8, unique=True, verbose_name="Dia (AAAAMMDD)")
+    ultimo = models.PositiveIntegerField(default=0, verbose_name="Último Número")
+
+    class Meta:
+        verbose_name = "Sequência de Propostas"
+        verbose_name_plural = "Sequências de Propostas"
+
+    def __str__(self):
+        return f"{self.data}: {self.ultimo}"
+
+    @classmethod
+    def reservar(cls, data, quantidade):
+        """ Reserva `quantidade` números consecutivos do dia; devolve o range. """
+        with transaction.atomic():
+            sequencia = cls.objects.select_for_update().filter(data=data).first()
+            if sequencia is None:
+                # Primeiro uso do dia: parte do maior número já gravado (a inicial
+                # do vendedor vem antes da sequência, então a ordem do texto não serve)
+                ultimo = 0
+                for id_proposta in Proposta.objects.filter(id_proposta__startswith=data).values_list('id_proposta', flat=True):
+                    sufixo = id_proposta[len(data) + 1:]
+                    if sufixo.isdigit():
+                        ultimo = max(ultimo, int(sufixo))
+                cls.objects.get_or_create(data=data, defaults={'ultimo': ultimo})
+                sequencia = cls.objects.select_for_update().get(data=data)
+            inicio = sequencia.ultimo + 1
+            sequencia.ultimo += quantidade
+            sequencia.save(update_fields=['ultimo'])
+        return range(inicio, inicio + quantidade)
+
+
 # Modelo para os Itens da Proposta
 class ItemProposta(models.Model):
    # proposta = models.ForeignKey(Proposta, on_delete=models.CASCADE, related_name='itens_proposta', verbose_name="Proposta")
@@ -401,6 +597,7 @@ class ItemProposta(models.Model):
         verbose_name="Preço Unitário (R$)",
         help_text="Pode ser editado para o item."
     )
+    ordem = models.PositiveIntegerField(default=0, verbose_name="Ordem")
     
     @property
     def total(self):
@@ -412,33 +609,45 @@ class ItemProposta(models.Model):
     class Meta:
         verbose_name = "Item da Proposta"
         verbose_name_plural = "Itens da Proposta"
+        ordering = ['ordem', 'pk']
+        indexes = [
+            # Uso mais recente de cada produto/serviço (ranking da busca no catálogo)
+            models.Index(fields=['produto', 'id'], name='idx_itemproposta_produto_uso'),
+            models.Index(fields=['servico', 'id'], name='idx_itemproposta_servico_uso'),
+        ]
 
     def __str__(self):
         return self.resumo_item or "Item sem Resumo"
 
-class Fornecedor(models.Model):
-    razao_social = models.CharField(max_length=255, verbose_name="Razão Social")
-    cnpj = models.CharField(max_length=18, unique=True, verbose_name="CNPJ")
-    # ... outros campos legados que você já tenha
-    
+# ############################################################################
+# COMPATIBILIDADE (Cadastros legados de fornecedor e produto)
+# ############################################################################
+# Os antigos tc_crm.Fornecedor e tc_crm.Produto foram incorporados a
+# tc_produtos (migração tc_crm 0014). Os proxies abaixo leem e gravam na tabela
+# única e mantêm os nomes antigos funcionando durante a transição; código novo
+# deve importar de tc_produtos.models. Remover quando não houver mais usos.
+
+class Fornecedor(CatalogoFornecedor):
     class Meta:
-        verbose_name = "Fornecedor"
-        verbose_name_plural = "Fornecedores"
+        proxy = True
+        verbose_name = "Fornecedor (legado)"
+        verbose_name_plural = "Fornecedores (legado)"
 
-    def __str__(self):
-        return self.razao_social
 
-class Produto(models.Model):
-    nome = models.CharField(max_length=255, verbose_name="Nome do Produto")
-    codigo = models.CharField(max_length=50, unique=True, verbose_name="Código")
-    preco_venda = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    
+class Produto(CatalogoProduto):
     class Meta:
-        verbose_name = "Produto"
-        verbose_name_plural = "Produtos"
+        proxy = True
+        verbose_name = "Produto (legado)"
+        verbose_name_plural = "Produtos (legado)"
 
-    def __str__(self):
-        return self.nome
+    # Nomes dos campos do cadastro legado, somente leitura
+    @property
+    def codigo(self):
+        return self.codigo_interno
+
+    @property
+    def preco_venda(self):
+        return self.preco_venda_padrao
 
 class MetaMensal(models.Model):
     MESES_CHOICES = [
@@ -467,4 +676,89 @@ class MetaMensal(models.Model):
 
     def __str__(self):
         tipo = self.vendedor.get_full_name() if self.vendedor else "GLOBAL"
-        return f"{tipo} - {self.get_mes_display()}/{self.ano}: R$ {self.valor_objetivo}"
\ No newline at end of file
+        return f"{tipo} - {self.get_mes_display()}/{self.ano}: R$ {self.valor_objetivo}"
+class MetaConsolidada(models.Model):
+    """
+    Meta de venda normalizada por (vendedor, ano, mês), a partir de MetaMensal,
+    tc_core.MetaGlobal e tc_financeiro.MetaVenda. Mantida pelos signals via
+    MetasService; vendedor vazio = meta global da empresa. Não editar manualmente.
+    """
+    class Fonte(models.TextChoices):
+        META_MENSAL = 'meta_mensal', 'Meta Mensal (CRM)'
+        META_GLOBAL = 'meta_global', 'Meta Global (Vendedor)'
+        META_VENDA = 'meta_venda', 'Meta de Venda (Financeiro)'
+
+    vendedor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='metas_consolidadas', verbose_name="Vendedor"
+    )
+    ano = models.PositiveIntegerField(verbose_name="Ano")
+    mes = models.PositiveIntegerField(choices=MetaMensal.MESES_CHOICES, verbose_name="Mês")
+    valor_objetivo = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Valor Objetivo")
+    fonte = models.CharField(max_length=15, choices=Fonte.choices, verbose_name="Fonte")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Meta Consolidada"
+        verbose_name_plural = "Metas Consolidadas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vendedor', 'ano', 'mes'], condition=models.Q(vendedor__isnull=False),
+                name='uniq_meta_consolidada_vendedor',
+            ),
+            models.UniqueConstraint(
+                fields=['ano', 'mes'], condition=models.Q(vendedor__isnull=True),
+                name='uniq_meta_consolidada_empresa',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['ano', 'mes'], name='idx_meta_consolidada_mes'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendedor or 'GLOBAL'} - {self.mes:02d}/{self.ano}: R$ {self.valor_objetivo}"
+
+class CandidatoDuplicata(models.Model):
+    """
+    Par de cadastros que provavelmente representam a mesma empresa/pessoa,
+    encontrado por DeduplicacaoService e aguardando revisão. registro_a_id é
+    sempre o menor id do par; a decisão (mesclar ou descartar) é mantida para
+    que o par não volte à fila nas próximas buscas.
+    """
+    class Entidade(models.TextChoices):
+        CLIENTE = 'cliente', 'Cliente'
+        CONTATO = 'contato', 'Contato'
+        FORNECEDOR = 'fornecedor', 'Fornecedor'
+
+    class Status(models.TextChoices):
+        PENDENTE = 'pendente', 'Pendente'
+        MESCLADO = 'mesclado', 'Mesclado'
+        DESCARTADO = 'descartado', 'Não é Duplicata'
+
+    entidade = models.CharField(max_length=20, choices=Entidade.choices, verbose_name="Entidade")
+    registro_a_id = models.PositiveIntegerField(verbose_name="Registro A")
+    registro_b_id = models.PositiveIntegerField(verbose_name="Registro B")
+    pontuacao = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Pontuação (0-100)")
+    # Critérios que contribuíram para a pontuação, ex.: {"nome": 0.93, "documento": 1.0}
+    criterios = models.JSONField(default=dict, blank=True, verbose_name="Critérios")
+    status = models.CharField(max_length=15, choices=Status.choices, default=Status.PENDENTE, verbose_name="Status")
+    mantido_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="Registro Mantido")
+    revisado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name="Revisado por"
+    )
+    revisado_em = models.DateTimeField(null=True, blank=True, verbose_name="Revisado em")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Encontrado em")
+
+    class Meta:
+        verbose_name = "Candidato a Duplicata"
+        verbose_name_plural = "Candidatos a Duplicata"
+        constraints = [
+            models.UniqueConstraint(fields=['entidade', 'registro_a_id', 'registro_b_id'], name='uniq_candidato_duplicata_par'),
+        ]
+        indexes = [
+            models.Index(fields=['entidade', 'status', '-pontuacao'], name='idx_duplicata_fila'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entidade_display()} #{self.registro_a_id} x #{self.registro_b_id} ({self.pontuacao})"
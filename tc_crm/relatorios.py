@@ -0,0 +1,56 @@
+# tc_crm/relatorios.py
+from django import forms
+from django.contrib.auth import get_user_model
+
+from tc_relatorios.registro import RelatorioBase, registrar
+
+from .services import PrevisaoVendasService
+
+# ############################################################################
+# PREVISÃO DE VENDAS (pipeline ponderado por mês)
+# ############################################################################
+
+@registrar
+class PrevisaoVendasRelatorio(RelatorioBase):
+    codigo = 'previsao-vendas'
+    titulo = 'Previsão de Vendas'
+    descricao = 'Pipeline em aberto por mês de fechamento, ponderado pela taxa histórica de ganho da etapa e do vendedor.'
+    categoria = 'Vendas'
+    permissao = 'tc_crm.view_oportunidade'
+    parametros = {
+        'vendedor': forms.ModelChoiceField(
+            label='Vendedor', queryset=get_user_model().objects.filter(is_active=True), required=False
+        ),
+        'meses': forms.IntegerField(label='Meses', min_value=1, max_value=24, required=False),
+    }
+    colunas = [
+        ('mes', 'Mês'),
+        ('quantidade', 'Oportunidades'),
+        ('bruto', 'Pipeline (R$)'),
+        ('ponderado', 'Previsto (R$)'),
+        ('probabilidade', 'Probabilidade Média (%)'),
+    ]
+
+    def get_previsao(self, params):
+        vendedor = params.get('vendedor')
+        return PrevisaoVendasService.previsao_mensal(
+            responsavel_id=vendedor.pk if vendedor else None, meses=params.get('meses'),
+        )
+
+    def gerar(self, params):
+        for linha in self.get_previsao(params)['meses']:
+            yield {
+                'mes': linha['mes'].strftime('%m/%Y'),
+                'quantidade': linha['quantidade'],
+                'bruto': float(linha['bruto']),
+                'ponderado': float(linha['ponderado']),
+                'probabilidade': round(float(linha['ponderado'] / linha['bruto'] * 100), 1) if linha['bruto'] else None,
+            }
+
+    def resumir(self, params):
+        previsao = self.get_previsao(params)
+        return {
+            'oportunidades em aberto': previsao['quantidade'],
+            'pipeline total': previsao['bruto'],
+            'previsto total': previsao['ponderado'],
+        }
@@ -0,0 +1,1649 @@
+# tc_crm/services.py
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from difflib import SequenceMatcher
+from itertools import combinations
+from statistics import median
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import NotSupportedError, close_old_connections, connection, transaction
+from django.db.models import (
+    Aggregate, Avg, Count, DateField, DecimalField, ExpressionWrapper, F, FloatField, Max, Min, OuterRef, Q,
+    Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, TruncMonth
+from django.dispatch import Signal
+from django.utils import timezone
+from simple_history.models import HistoricalChanges
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from .models import (
+    AlteracaoKanban, Atividade, CandidatoDuplicata, Cliente, CoeficientePrevisao, EtapaVenda, ItemProposta, MetaConsolidada, MetaMensal, Oportunidade,
+    ProcessamentoFunil, Proposta, ResumoCliente, SequenciaProposta, TransicaoEtapa,
+)
+
+# ############################################################################
+# VISÃO 360 DO CLIENTE (materializada em ResumoCliente)
+# ############################################################################
+
+class ResumoClienteService:
+    """
+    Cada fonte (oportunidades, faturas, chamados, ativos e atividades) é lida
+    com uma única query agrupada por cliente e agregação condicional, então
+    recalcular um ou mil clientes custa o mesmo número de queries.
+
+    As janelas de vendas (ano, 90 e 30 dias) dependem da data: um resumo
+    calculado em outro dia é servido como está pela leitura (obter), que
+    agenda o recálculo em segundo plano.
+    """
+
+    CACHE_AGENDADO = 'tc_crm:resumo_cliente:agendado:{}'
+    _pool = None
+
+    CAMPOS = [
+        'vendas_total', 'vendas_ano', 'vendas_90_dias', 'vendas_30_dias', 'qtd_vendas',
+        'pipeline_aberto', 'oportunidades_abertas',
+        'saldo_receber', 'saldo_vencido', 'faturas_em_aberto',
+        'chamados_abertos', 'ativos_instalados', 'ultima_atividade',
+    ]
+
+    @staticmethod
+    def _por_cliente(queryset, cliente_ids, **agregacoes):
+        return {
+            linha.pop('cliente_id'): linha
+            for linha in queryset.filter(cliente_id__in=cliente_ids).values('cliente_id').annotate(**agregacoes)
+        }
+
+    @staticmethod
+    def atualizar(cliente_ids):
+        """ Recalcula e regrava os resumos dos clientes informados. """
+        from tc_financeiro.models import Fatura
+        from tc_financeiro.services import AgingService
+        from tc_operacoes.models import Ativo, Chamado
+        from tc_operacoes.services import FilaChamadosService
+
+        # Ignora clientes já excluídos (exclusão em cascata dispara os signals)
+        cliente_ids = set(Cliente.objects.filter(pk__in=[pk for pk in cliente_ids if pk]).values_list('pk', flat=True))
+        if not cliente_ids:
+            return 0
+
+        agora = timezone.now()
+        hoje = timezone.localdate()
+        ganha = Q(etapa__e_etapa_ganha=True)
+        aberta = Q(etapa__e_etapa_ganha=False, data_fechamento_real__isnull=True)
+        em_aberto = AgingService.em_aberto(Fatura)
+        por_cliente = ResumoClienteService._por_cliente
+
+        oportunidades = por_cliente(
+            Oportunidade.objects, cliente_ids,
+            vendas_total=Sum('valor_estimado', filter=ganha),
+            vendas_ano=Sum('valor_estimado', filter=ganha & Q(data_fechamento_real__year=agora.year)),
+            vendas_90_dias=Sum('valor_estimado', filter=ganha & Q(data_fechamento_real__gte=agora - timedelta(days=90))),
+            vendas_30_dias=Sum('valor_estimado', filter=ganha & Q(data_fechamento_real__gte=agora - timedelta(days=30))),
+            qtd_vendas=Count('pk', filter=ganha),
+            pipeline_aberto=Sum('valor_estimado', filter=aberta),
+            oportunidades_abertas=Count('pk', filter=aberta),
+            ultimo_fechamento=Max('data_fechamento_real'),
+        )
+        faturas = por_cliente(
+            Fatura.objects, cliente_ids,
+            saldo_receber=Sum('valor_saldo', filter=em_aberto),
+            saldo_vencido=Sum('valor_saldo', filter=em_aberto & Q(data_vencimento__lt=hoje)),
+            faturas_em_aberto=Count('pk', filter=em_aberto),
+        )
+        chamados = por_cliente(
+            Chamado.objects, cliente_ids,
+            chamados_abertos=Count('pk', filter=Q(status__in=FilaChamadosService.STATUS_ABERTOS)),
+            ultima_interacao=Max('data_ultima_interacao'),
+        )
+        ativos = por_cliente(Ativo.objects, cliente_ids, ativos_instalados=Count('pk'))
+        atividades = por_cliente(
+            Atividade.objects, cliente_ids,
+            ultima_atividade=Max('data_hora', filter=Q(data_hora__lte=agora)),
+        )
+
+        resumos = []
+        for cliente_id in cliente_ids:
+            dados = {}
+            for fonte in (oportunidades, faturas, chamados, ativos, atividades):
+                dados.update(fonte.get(cliente_id, {}))
+            # Última atividade: follow-up, interação em chamado ou negócio fechado
+            datas = [d for d in (dados.pop('ultimo_fechamento', None), dados.pop('ultima_interacao', None), dados.get('ultima_atividade')) if d]
+            dados['ultima_atividade'] = max(datas) if datas else None
+
+            resumo = ResumoCliente(cliente_id=cliente_id)
+            for campo in ResumoClienteService.CAMPOS:
+                if dados.get(campo) is not None:
+                    setattr(resumo, campo, dados[campo])
+            resumos.append(resumo)
+
+        # Upsert: recálculos concorrentes (on_commit, segundo plano, comando) não colidem na PK
+        ResumoCliente.objects.bulk_create(
+            resumos, update_conflicts=True, unique_fields=['cliente'],
+            update_fields=ResumoClienteService.CAMPOS + ['calculado_em'],
+        )
+        return len(resumos)
+
+    @staticmethod
+    def agendar(cliente_ids):
+        """ Recalcula após o commit da transação corrente. """
+        cliente_ids = {pk for pk in cliente_ids if pk}
+        if cliente_ids:
+            transaction.on_commit(lambda: ResumoClienteService.atualizar(cliente_ids))
+
+    @staticmethod
+    def agendar_em_segundo_plano(cliente_id):
+        """ Recalcula fora da requisição; um único agendamento por cliente enquanto estiver na fila. """
+        chave = ResumoClienteService.CACHE_AGENDADO.format(cliente_id)
+        if not cache.add(chave, True, 10 * 60):
+            return
+
+        def recalcular():
+            close_old_connections()
+            try:
+                ResumoClienteService.atualizar([cliente_id])
+            finally:
+                cache.delete(chave)
+                close_old_connections()
+
+        if ResumoClienteService._pool is None:
+            ResumoClienteService._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='resumo_cliente')
+        transaction.on_commit(lambda: ResumoClienteService._pool.submit(recalcular))
+
+    @staticmethod
+    def obter(cliente):
+        """
+        Resumo do cliente. Só calcula na hora quando ainda não existe; um
+        resumo de outro dia é devolvido como está e recalculado em segundo plano.
+        """
+        resumo = ResumoCliente.objects.filter(cliente=cliente).first()
+        if resumo is None:
+            ResumoClienteService.atualizar([cliente.pk])
+            resumo = ResumoCliente.objects.get(cliente=cliente)
+        elif timezone.localdate(resumo.calculado_em) != timezone.localdate():
+            ResumoClienteService.agendar_em_segundo_plano(cliente.pk)
+        return resumo
+
+
+# ############################################################################
+# BUSCA NO CATÁLOGO (seletor de itens da proposta)
+# ############################################################################
+
+class CatalogoService:
+    """
+    Busca produtos e serviços para o editor de itens da proposta sem carregar
+    o catálogo inteiro: primeiro por prefixo (nome, código e EAN, indexados),
+    completando com "contém" só quando faltam resultados. As linhas trazem
+    apenas os campos exibidos (only) e são ordenadas por relevância e pelo
+    uso mais recente em propostas. Termos repetidos saem de um cache curto.
+    """
+
+    CACHE_BUSCA = 'tc_crm:catalogo:{}'
+    TAMANHO_MINIMO = 2
+    LIMITE = 20
+
+    # Relevância: código idêntico > prefixo > contém
+    EXATO, PREFIXO, CONTEM = 0, 1, 2
+
+    @staticmethod
+    def _fontes():
+        Produto = apps.get_model('tc_produtos', 'Produto')
+        Servico = apps.get_model('tc_servicos', 'Servico')
+        return (
+            ('P', Produto.objects.filter(ativo=True), 'produto', 'codigo_interno',
+             ('nome', 'codigo_interno', 'ean_gtin'), 'preco_venda_padrao'),
+            ('S', Servico.objects.all(), 'servico', 'codigo_servico',
+             ('nome', 'codigo_servico'), 'preco_unitario_padrao'),
+        )
+
+    @staticmethod
+    def _consultar(queryset, campo_item, campo_codigo, campos, campo_preco, termo, prefixo, excluir, limite):
+        lookup = 'istartswith' if prefixo else 'icontains'
+        filtro = Q()
+        for campo in campos:
+            filtro |= Q(**{f'{campo}__{lookup}': termo})
+        # pk do item mais recente com este produto/serviço = ordem de uso em propostas
+        ultimo_uso = ItemProposta.objects.filter(**{campo_item: OuterRef('pk')}).order_by('-pk').values('pk')[:1]
+        return list(
+            queryset.filter(filtro).exclude(pk__in=excluir)
+            .only('pk', 'nome', campo_codigo, campo_preco)
+            .annotate(ultimo_uso=Subquery(ultimo_uso))
+            .order_by(F('ultimo_uso').desc(nulls_last=True), 'nome')[:limite]
+        )
+
+    @staticmethod
+    def buscar(termo, limite=None):
+        """ [{'id': 'P-12', 'tipo', 'nome', 'codigo', 'preco'}] mais relevantes para o termo. """
+        termo = ' '.join((termo or '').split())[:100]
+        if len(termo) < CatalogoService.TAMANHO_MINIMO:
+            return []
+        limite = limite or CatalogoService.LIMITE
+        chave = CatalogoService.CACHE_BUSCA.format(
+            hashlib.md5(f'{termo.upper()}|{limite}'.encode()).hexdigest()
+        )
+        resultados = cache.get(chave)
+        if resultados is not None:
+            return resultados
+
+        candidatos = []
+        for tipo, queryset, campo_item, campo_codigo, campos, campo_preco in CatalogoService._fontes():
+            encontrados = CatalogoService._consultar(
+                queryset, campo_item, campo_codigo, campos, campo_preco, termo, True, [], limite,
+            )
+            relevancia = {obj.pk: CatalogoService.PREFIXO for obj in encontrados}
+            if len(encontrados) < limite:
+                extras = CatalogoService._consultar(
+                    queryset, campo_item, campo_codigo, campos, campo_preco, termo, False,
+                    list(relevancia), limite - len(encontrados),
+                )
+                relevancia.update((obj.pk, CatalogoService.CONTEM) for obj in extras)
+                encontrados += extras
+
+            for obj in encontrados:
+                codigo = getattr(obj, campo_codigo) or ''
+                candidatos.append({
+                    'id': f'{tipo}-{obj.pk}',
+                    'tipo': tipo,
+                    'nome': obj.nome,
+                    'codigo': codigo,
+                    'preco': getattr(obj, campo_preco),
+                    'relevancia': CatalogoService.EXATO if codigo.upper() == termo.upper() else relevancia[obj.pk],
+                    'ultimo_uso': obj.ultimo_uso or 0,
+                })
+
+        candidatos.sort(key=lambda c: (c['relevancia'], -c['ultimo_uso'], c['nome']))
+        resultados = candidatos[:limite]
+        cache.set(chave, resultados, getattr(settings, 'CRM_CATALOGO_CACHE_TIMEOUT', 60))
+        return resultados
+
+
+# ############################################################################
+# CLONAGEM DE PROPOSTAS E OPORTUNIDADES (cópia profunda em lote)
+# ############################################################################
+
+class ClonagemService:
+    """
+    Copia propostas (com itens) e oportunidades (com as propostas e
+    atividades escolhidas) com um número fixo de queries, independente de
+    quantos itens ou variantes existam: os filhos vão em bulk_create, os
+    códigos das propostas são reservados em bloco (SequenciaProposta) e o
+    histórico é gravado em lote (bulk_create_with_history). Só a própria
+    oportunidade usa save(), para disparar os signals do resumo do cliente.
+    """
+
+    LIMITE_VARIANTES = 20
+
+    @staticmethod
+    def _copiar(objeto, **alteracoes):
+        """ Nova instância (sem pk) com os valores das colunas de `objeto`. """
+        modelo = type(objeto)
+        valores = {
+            campo.attname: getattr(objeto, campo.attname)
+            for campo in modelo._meta.concrete_fields if not campo.primary_key
+        }
+        valores.update(alteracoes)
+        return modelo(**valores)
+
+    @staticmethod
+    def _criar_propostas(origens, oportunidade_id, usuario):
+        """ [(proposta_original, itens)] -> novas propostas, itens inclusos. """
+        if not origens:
+            return []
+        data = timezone.now().strftime('%Y%m%d')
+        numeros = SequenciaProposta.reservar(data, len(origens))
+
+        novas = []
+        for (original, _), numero in zip(origens, numeros):
+            criador = usuario or original.criado_por
+            inicial = criador.username[0].upper() if criador.username else 'X'
+            novas.append(ClonagemService._copiar(
+                original,
+                oportunidade_id=oportunidade_id or original.oportunidade_id,
+                criado_por_id=criador.pk,
+                id_proposta=Proposta.montar_id(data, inicial, numero),
+                status='elaboracao',
+                contrato_id=None,
+            ))
+        novas = bulk_create_with_history(novas, Proposta, default_user=usuario)
+
+        # bulk_create_with_history pode devolver objetos sem pk (bancos sem RETURNING)
+        if any(nova.pk is None for nova in novas):
+            por_codigo = Proposta.objects.in_bulk([n.id_proposta for n in novas], field_name='id_proposta')
+            novas = [por_codigo[n.id_proposta] for n in novas]
+
+        itens = [
+            ClonagemService._copiar(item, proposta_id=nova.pk)
+            for nova, (_, itens_originais) in zip(novas, origens)
+            for item in itens_originais
+        ]
+        ItemProposta.objects.bulk_create(itens, batch_size=500)
+        return novas
+
+    @staticmethod
+    @transaction.atomic
+    def clonar_proposta(proposta, variantes=1, usuario=None, oportunidade=None):
+        """
+        Gera `variantes` cópias da proposta (com itens) para comparar
+        cenários, na mesma oportunidade ou na informada.
+        """
+        variantes = max(1, min(int(variantes), ClonagemService.LIMITE_VARIANTES))
+        itens = list(proposta.itens.all())
+        destino = oportunidade.pk if oportunidade else None
+        return ClonagemService._criar_propostas([(proposta, itens)] * variantes, destino, usuario)
+
+    @staticmethod
+    @transaction.atomic
+    def clonar_oportunidade(oportunidade, propostas=None, atividades=None, usuario=None, nome=None):
+        """
+        Copia a oportunidade como um novo negócio em aberto. `propostas` e
+        `atividades` são querysets/listas de ids a copiar junto (None: todas
+        as propostas e nenhuma atividade). Negócio ganho ou perdido volta para
+        a primeira etapa em aberto.
+        """
+        etapa_id = oportunidade.etapa_id
+        if oportunidade.etapa.e_etapa_ganha or oportunidade.etapa.e_etapa_perdida:
+            etapa_id = EtapaVenda.objects.filter(
+                e_etapa_ganha=False, e_etapa_perdida=False,
+            ).order_by('ordem', 'pk').values_list('pk', flat=True).first()
+            if etapa_id is None:
+                raise ValueError("Nenhuma etapa em aberto cadastrada para o novo negócio.")
+        nova = ClonagemService._copiar(
+            oportunidade,
+            nome=nome or f"{oportunidade.nome} (CÓPIA)"[:255],
+            etapa_id=etapa_id,
+            data_fechamento_real=None,
+        )
+        # Registro único: save() normal (histórico e signals do resumo/marketing)
+        nova.save()
+
+        origem = Proposta.objects.filter(oportunidade=oportunidade).select_related('criado_por')
+        if propostas is not None:
+            origem = origem.filter(pk__in=propostas)
+        origem = list(origem.order_by('pk'))
+        itens_por_proposta = {}
+        for item in ItemProposta.objects.filter(proposta__in=origem).order_by('pk'):
+            itens_por_proposta.setdefault(item.proposta_id, []).append(item)
+        ClonagemService._criar_propostas(
+            [(p, itens_por_proposta.get(p.pk, [])) for p in origem], nova.pk, usuario,
+        )
+
+        if atividades:
+            copias = [
+                ClonagemService._copiar(atividade, oportunidade_id=nova.pk)
+                for atividade in Atividade.objects.filter(oportunidade=oportunidade, pk__in=atividades)
+            ]
+            bulk_create_with_history(copias, Atividade, default_user=usuario)
+        return nova
+
+
+# ############################################################################
+# EDITOR DE ITENS DA PROPOSTA (mutações em lote + totais no banco)
+# ############################################################################
+
+class EdicaoItensPropostaService:
+    """
+    Aplica um lote de mutações nos itens de uma proposta numa transação:
+    {"op": "add", "catalogo_id": "P-12"}, {"op": "update", "id": 5,
+    "quantidade": 3, "preco": "10,50"}, {"op": "delete", "id": 7} e
+    {"op": "reorder", "ids": [7, 5, 9]}. Alterações e reordenação vão num
+    único bulk_update; os totais saem de uma agregação no banco em vez do
+    laço de valor_total sobre os itens.
+    """
+
+    OPERACOES = ('add', 'update', 'delete', 'reorder')
+
+    @staticmethod
+    def totais(proposta):
+        subtotal = ItemProposta.objects.filter(proposta=proposta).aggregate(
+            total=Sum(F('quantidade') * F('preco_unitario'), output_field=DecimalField(max_digits=14, decimal_places=2))
+        )['total'] or Decimal('0.00')
+        subtotal = subtotal.quantize(Decimal('0.01'))
+        return {
+            'subtotal': subtotal,
+            'frete': proposta.valor_frete,
+            'desconto': proposta.valor_desconto,
+            'total': (subtotal + proposta.valor_frete - proposta.valor_desconto).quantize(Decimal('0.01')),
+        }
+
+    @staticmethod
+    def _limites(numero, nome_campo, campo):
+        """ Faixa do inteiro no banco / max_digits do decimal, pelos validadores do campo de ItemProposta. """
+        try:
+            ItemProposta._meta.get_field(nome_campo).run_validators(numero)
+        except ValidationError:
+            raise ValueError(f"{campo} fora do limite permitido: {numero}")
+        return numero
+
+    @staticmethod
+    def _inteiro(valor, campo):
+        try:
+            numero = int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"{campo} inválido: {valor!r}")
+        if numero < 0:
+            raise ValueError(f"{campo} não pode ser negativo.")
+        return EdicaoItensPropostaService._limites(numero, 'quantidade', campo)
+
+    @staticmethod
+    def _decimal(valor, campo):
+        try:
+            numero = Decimal(str(valor).strip().replace(',', '.'))
+            if not numero.is_finite() or numero < 0:
+                raise ValueError
+            numero = numero.quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"{campo} inválido: {valor!r}")
+        return EdicaoItensPropostaService._limites(numero, 'preco_unitario', campo)
+
+    @staticmethod
+    def _itens_do_catalogo(catalogo_ids):
+        """ {'P-12': (vínculo, nome, preço)} com uma consulta por tipo. """
+        por_tipo = {'P': set(), 'S': set()}
+        for catalogo_id in catalogo_ids:
+            tipo, _, pk = str(catalogo_id).partition('-')
+            if tipo not in por_tipo or not pk.isdigit():
+                raise ValueError(f"Item de catálogo inválido: {catalogo_id!r}")
+            por_tipo[tipo].add(int(pk))
+
+        encontrados = {}
+        produtos = apps.get_model('tc_produtos', 'Produto').objects.only('nome', 'preco_venda_padrao').in_bulk(por_tipo['P'])
+        for pk, produto in produtos.items():
+            encontrados[f'P-{pk}'] = ({'produto': produto}, produto.nome, produto.preco_venda_padrao)
+        servicos = apps.get_model('tc_servicos', 'Servico').objects.only('nome', 'preco_unitario_padrao').in_bulk(por_tipo['S'])
+        for pk, servico in servicos.items():
+            encontrados[f'S-{pk}'] = ({'servico': servico}, servico.nome, servico.preco_unitario_padrao)
+
+        faltando = set(map(str, catalogo_ids)) - set(encontrados)
+        if faltando:
+            raise ValueError(f"Item de catálogo não encontrado: {', '.join(sorted(faltando))}")
+        return encontrados
+
+    @staticmethod
+    @transaction.atomic
+    def aplicar(proposta, operacoes):
+        """
+        Devolve {'alterados': [itens], 'adicionados': [itens], 'removidos': [ids],
+        'reordenado': bool}. Qualquer operação inválida desfaz o lote (ValueError).
+        """
+        if not isinstance(operacoes, list):
+            raise ValueError("As operações devem ser uma lista.")
+        for operacao in operacoes:
+            if not isinstance(operacao, dict) or operacao.get('op') not in EdicaoItensPropostaService.OPERACOES:
+                raise ValueError(f"Operação inválida: {operacao!r}")
+
+        itens = {item.pk: item for item in ItemProposta.objects.filter(proposta=proposta).select_for_update()}
+
+        def item_da_proposta(item_id):
+            try:
+                return itens[int(item_id)]
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Item {item_id!r} não pertence à proposta.")
+
+        alterados, removidos, campos, reordenado = {}, set(), set(), False
+        novos = []
+        for operacao in operacoes:
+            tipo = operacao['op']
+            if tipo == 'add':
+                novos.append(operacao.get('catalogo_id'))
+            elif tipo == 'update':
+                item = item_da_proposta(operacao.get('id'))
+                if 'quantidade' in operacao:
+                    item.quantidade = EdicaoItensPropostaService._inteiro(operacao['quantidade'], 'Quantidade')
+                    campos.add('quantidade')
+                if 'preco' in operacao:
+                    item.preco_unitario = EdicaoItensPropostaService._decimal(operacao['preco'], 'Preço')
+                    campos.add('preco_unitario')
+                alterados[item.pk] = item
+            elif tipo == 'delete':
+                removidos.add(item_da_proposta(operacao.get('id')).pk)
+            elif tipo == 'reorder':
+                ids = operacao.get('ids') or []
+                if not isinstance(ids, list) or not all(type(item_id) is int for item_id in ids):
+                    raise ValueError(f"Lista de ids inválida: {ids!r}")
+                for posicao, item_id in enumerate(ids):
+                    item = item_da_proposta(item_id)
+                    item.ordem = posicao
+                    alterados[item.pk] = item
+                campos.add('ordem')
+                reordenado = True
+
+        for item_id in removidos:
+            alterados.pop(item_id, None)
+        if removidos:
+            ItemProposta.objects.filter(pk__in=removidos).delete()
+        if alterados and campos:
+            ItemProposta.objects.bulk_update(alterados.values(), sorted(campos), batch_size=500)
+
+        adicionados = []
+        if novos:
+            catalogo = EdicaoItensPropostaService._itens_do_catalogo(novos)
+            proxima = max((item.ordem for item in itens.values() if item.pk not in removidos), default=-1) + 1
+            for posicao, catalogo_id in enumerate(novos):
+                vinculo, nome, preco = catalogo[str(catalogo_id)]
+                adicionados.append(ItemProposta(
+                    proposta=proposta, quantidade=1, preco_unitario=preco,
+                    resumo_item=nome[:100], ordem=proxima + posicao, **vinculo
+                ))
+            adicionados = ItemProposta.objects.bulk_create(adicionados)
+
+        return {
+            'alterados': sorted(alterados.values(), key=lambda i: (i.ordem, i.pk)),
+            'adicionados': adicionados,
+            'removidos': sorted(removidos),
+            'reordenado': reordenado,
+        }
+
+
+# ############################################################################
+# FUNIL DE VENDAS (transições de etapa extraídas do histórico)
+# ############################################################################
+
+class Mediana(Aggregate):
+    """ Mediana contínua calculada no banco (percentile_cont do PostgreSQL). """
+    function = 'PERCENTILE_CONT'
+    name = 'Mediana'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        if connection.vendor != 'postgresql':
+            raise NotSupportedError("Mediana exige PostgreSQL.")
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+class FunilVendasService:
+    """
+    Extrai as mudanças de etapa de HistoricalOportunidade para a tabela fato
+    TransicaoEtapa e responde às análises do funil a partir dela.
+
+    A extração é incremental: cada execução lê só os registros de histórico
+    com history_id acima da marca d'água (ProcessamentoFunil), em lotes, e o
+    estado anterior de cada oportunidade vem da última transição gravada.
+    A leitura para no primeiro registro (em ordem de history_id) mais novo
+    que MARGEM_SEGUNDOS: ele e os seguintes ficam para a próxima execução,
+    para não pular linhas de transações que ainda não fizeram commit. A marca
+    avança só por history_id, nunca além de um registro ainda não lido.
+    """
+
+    LOTE = 2000
+    MARGEM_SEGUNDOS = 60
+
+    @staticmethod
+    def extrair(lote=None):
+        """ Processa o histórico novo e devolve quantas transições foram gravadas. """
+        lote = lote or FunilVendasService.LOTE
+        historico = Oportunidade.history.model
+        limite = timezone.now() - timedelta(seconds=FunilVendasService.MARGEM_SEGUNDOS)
+        gravadas = 0
+        while True:
+            with transaction.atomic():
+                # O lock na marca d'água serializa execuções concorrentes
+                marca, _ = ProcessamentoFunil.objects.select_for_update().get_or_create(pk=1)
+                registros = list(
+                    historico.objects.filter(history_id__gt=marca.ultimo_history_id)
+                    .order_by('history_id')
+                    .values_list('history_id', 'id', 'etapa_id', 'responsavel_id', 'history_date', 'history_type')[:lote]
+                )
+                lidos = len(registros)
+                recentes = next((i for i, registro in enumerate(registros) if registro[4] > limite), None)
+                if recentes is not None:
+                    registros = registros[:recentes]
+                if registros:
+                    gravadas += FunilVendasService._gravar_transicoes(registros)
+                    marca.ultimo_history_id = registros[-1][0]
+                marca.processado_em = timezone.now()
+                marca.save(update_fields=['ultimo_history_id', 'processado_em'])
+            if recentes is not None or lidos < lote:
+                return gravadas
+
+    @staticmethod
+    def _gravar_transicoes(registros):
+        oportunidade_ids = {registro[1] for registro in registros}
+        existentes = set(Oportunidade.objects.filter(pk__in=oportunidade_ids).values_list('pk', flat=True))
+        etapas = set(EtapaVenda.objects.values_list('pk', flat=True))
+        usuarios = set(
+            get_user_model().objects.filter(pk__in={registro[3] for registro in registros})
+            .values_list('pk', flat=True)
+        )
+
+        ultimas = (
+            TransicaoEtapa.objects.filter(oportunidade_id__in=existentes)
+            .values('oportunidade_id').annotate(ultima=Max('history_id')).values('ultima')
+        )
+        estado = {
+            oportunidade_id: (etapa_id, data)
+            for oportunidade_id, etapa_id, data in TransicaoEtapa.objects.filter(history_id__in=Subquery(ultimas))
+            .values_list('oportunidade_id', 'etapa_destino_id', 'data')
+        }
+
+        novas = []
+        for history_id, oportunidade_id, etapa_id, responsavel_id, data, tipo in registros:
+            # Exclusões e oportunidades/etapas que não existem mais ficam fora do fato
+            if tipo == '-' or oportunidade_id not in existentes or etapa_id not in etapas:
+                continue
+            anterior = estado.get(oportunidade_id)
+            if anterior and anterior[0] == etapa_id:
+                continue
+            novas.append(TransicaoEtapa(
+                oportunidade_id=oportunidade_id,
+                etapa_origem_id=anterior[0] if anterior else None,
+                etapa_destino_id=etapa_id,
+                responsavel_id=responsavel_id if responsavel_id in usuarios else None,
+                data=data,
+                segundos_na_etapa=max(int((data - anterior[1]).total_seconds()), 0) if anterior else None,
+                history_id=history_id,
+            ))
+            estado[oportunidade_id] = (etapa_id, data)
+
+        TransicaoEtapa.objects.bulk_create(novas)
+        return len(novas)
+
+    @staticmethod
+    def reprocessar():
+        """ Apaga o fato e a marca d'água e extrai tudo de novo. """
+        with transaction.atomic():
+            TransicaoEtapa.objects.all().delete()
+            ProcessamentoFunil.objects.filter(pk=1).update(ultimo_history_id=0)
+        return FunilVendasService.extrair()
+
+    @staticmethod
+    def ultimo_processamento():
+        return ProcessamentoFunil.objects.filter(pk=1).values_list('processado_em', flat=True).first()
+
+    # ------------------------------------------------------------------------
+    # Análises (só leem TransicaoEtapa)
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def transicoes(inicio=None, fim=None, responsavel=None):
+        """ Transições do período [inicio, fim] (datas), opcionalmente de um vendedor. """
+        qs = TransicaoEtapa.objects.all()
+        if inicio:
+            qs = qs.filter(data__gte=timezone.make_aware(datetime.combine(inicio, time.min)))
+        if fim:
+            qs = qs.filter(data__lt=timezone.make_aware(datetime.combine(fim + timedelta(days=1), time.min)))
+        if responsavel is not None:
+            qs = qs.filter(responsavel=responsavel)
+        return qs
+
+    @staticmethod
+    def conversao(inicio=None, fim=None, responsavel=None):
+        """
+        Uma linha por etapa, na ordem do pipeline: oportunidades que entraram
+        na etapa no período, quantas avançaram dela para uma etapa posterior
+        e quantas foram ganhas (em qualquer data), com as taxas em %.
+        """
+        qs = FunilVendasService.transicoes(inicio, fim, responsavel)
+        ganhas = TransicaoEtapa.objects.filter(etapa_destino__e_etapa_ganha=True).values('oportunidade_id')
+
+        entradas = {
+            linha['etapa_destino']: linha
+            for linha in qs.values('etapa_destino').annotate(
+                entradas=Count('oportunidade', distinct=True),
+                ganhas=Count('oportunidade', distinct=True, filter=Q(oportunidade__in=ganhas)),
+            ).order_by()
+        }
+        avancos = dict(
+            qs.filter(etapa_destino__ordem__gt=F('etapa_origem__ordem'))
+            .values('etapa_origem').annotate(avancos=Count('oportunidade', distinct=True))
+            .order_by().values_list('etapa_origem', 'avancos')
+        )
+
+        def taxa(parte, total):
+            return round(100 * parte / total, 1) if total else None
+
+        resultado = []
+        for etapa in EtapaVenda.objects.order_by('ordem', 'pk'):
+            linha = entradas.get(etapa.pk, {})
+            total = linha.get('entradas', 0)
+            resultado.append({
+                'etapa': etapa,
+                'entradas': total,
+                'avancos': avancos.get(etapa.pk, 0),
+                'ganhas': linha.get('ganhas', 0),
+                'taxa_avanco': taxa(avancos.get(etapa.pk, 0), total),
+                'taxa_ganho': taxa(linha.get('ganhas', 0), total),
+            })
+        return resultado
+
+    @staticmethod
+    def tempo_mediano_por_etapa(inicio=None, fim=None, responsavel=None):
+        """
+        {etapa_id: mediana em segundos} do tempo até sair da etapa. No
+        PostgreSQL a mediana sai de uma única agregação por etapa; nos demais
+        bancos (desenvolvimento) as durações do período são lidas e a mediana
+        é calculada em Python.
+        """
+        qs = (
+            FunilVendasService.transicoes(inicio, fim, responsavel)
+            .filter(etapa_origem__isnull=False, segundos_na_etapa__isnull=False)
+            .order_by()
+        )
+        if connection.vendor == 'postgresql':
+            return dict(
+                qs.values('etapa_origem').annotate(mediana=Mediana('segundos_na_etapa'))
+                .values_list('etapa_origem', 'mediana')
+            )
+        tempos = {}
+        for etapa_id, segundos in qs.values_list('etapa_origem', 'segundos_na_etapa'):
+            tempos.setdefault(etapa_id, []).append(segundos)
+        return {etapa_id: median(lista) for etapa_id, lista in tempos.items()}
+
+    @staticmethod
+    def velocidade_por_vendedor(inicio=None, fim=None):
+        """ Por vendedor: transições, avanços, negócios ganhos e tempo médio por etapa. """
+        return (
+            FunilVendasService.transicoes(inicio, fim)
+            .values('responsavel', 'responsavel__username', 'responsavel__first_name', 'responsavel__last_name')
+            .annotate(
+                transicoes=Count('pk'),
+                avancos=Count('pk', filter=Q(etapa_destino__ordem__gt=F('etapa_origem__ordem'))),
+                ganhos=Count('oportunidade', distinct=True, filter=Q(etapa_destino__e_etapa_ganha=True)),
+                media_segundos=Avg('segundos_na_etapa'),
+            )
+            .order_by('-ganhos', '-avancos')
+        )
+
+
+# ############################################################################
+# PREVISÃO DE VENDAS (pipeline ponderado pela taxa histórica de ganho)
+# ############################################################################
+
+class PrevisaoVendasService:
+    """
+    recalcular() mede, nos negócios encerrados da janela, a taxa de ganho de
+    quem passou por cada etapa (pelas transições do funil) e o atraso médio
+    entre a data prevista e a real, gravando CoeficientePrevisao. As taxas
+    por vendedor e tipo são suavizadas em direção à taxa da etapa, para que
+    poucos negócios não gerem 0% ou 100%.
+
+    previsao_mensal() aplica o coeficiente mais específico a cada oportunidade
+    aberta e agrupa por mês de fechamento ajustado numa única query; obter()
+    guarda o resultado em cache por escopo (vendedor ou empresa) e mês.
+    """
+
+    CACHE_PREVISAO = 'tc_crm:previsao:{}:{}:{}'
+    CACHE_VERSAO = 'tc_crm:previsao:versao'
+    # Negócios "emprestados" da taxa da etapa ao suavizar vendedor/tipo
+    PESO_SUAVIZACAO = 5
+    MESES = 6
+
+    PERDIDA = Q(etapa__e_etapa_perdida=True)
+
+    @staticmethod
+    def abertas():
+        return Oportunidade.objects.exclude(etapa__e_etapa_ganha=True).exclude(PrevisaoVendasService.PERDIDA)
+
+    @staticmethod
+    def escopo(usuario):
+        """ None (empresa inteira) para gestores; senão o id do próprio vendedor. """
+        if usuario.is_superuser or getattr(usuario, 'departamento', None) in ('diretoria', 'financeiro'):
+            return None
+        return usuario.pk
+
+    # ------------------------------------------------------------------------
+    # Coeficientes
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def recalcular(janela_dias=None):
+        """ Refaz os coeficientes a partir dos negócios encerrados na janela. """
+        janela_dias = janela_dias or getattr(settings, 'CRM_PREVISAO_JANELA_DIAS', 365)
+        FunilVendasService.extrair()
+
+        fechadas = (
+            Oportunidade.objects.filter(Q(etapa__e_etapa_ganha=True) | PrevisaoVendasService.PERDIDA)
+            .annotate(fechada_em=Coalesce(Max('transicoes_etapa__data'), 'data_fechamento_real'))
+            .filter(fechada_em__gte=timezone.now() - timedelta(days=janela_dias))
+        )
+        negocios = {}
+        for pk, responsavel_id, tipo, ganha, real, prevista in fechadas.values_list(
+            'pk', 'responsavel_id', 'tipo_oportunidade', 'etapa__e_etapa_ganha',
+            'data_fechamento_real', 'data_fechamento_prevista',
+        ):
+            atraso = timezone.localdate(real) - prevista if ganha and real and prevista else None
+            negocios[pk] = (responsavel_id, tipo, ganha, atraso)
+        passagens = (
+            TransicaoEtapa.objects.filter(oportunidade__in=fechadas.values('pk'))
+            .exclude(etapa_destino__e_etapa_ganha=True).exclude(etapa_destino__e_etapa_perdida=True)
+            .values_list('oportunidade_id', 'etapa_destino_id').distinct()
+        )
+
+        # chave (etapa, vendedor, tipo) -> [encerrados, ganhos, soma dos atrasos, qtd com atraso]
+        contagem = {}
+
+        def somar(chave, ganha, atraso):
+            linha = contagem.setdefault(chave, [0, 0, timedelta(0), 0])
+            linha[0] += 1
+            linha[1] += int(ganha)
+            if atraso is not None:
+                linha[2] += atraso
+                linha[3] += 1
+
+        for _, _, ganha, atraso in negocios.values():
+            somar((None, None, ''), ganha, atraso)
+        for oportunidade_id, etapa_id in passagens:
+            responsavel_id, tipo, ganha, atraso = negocios[oportunidade_id]
+            somar((etapa_id, None, ''), ganha, atraso)
+            if responsavel_id:
+                somar((etapa_id, responsavel_id, tipo), ganha, atraso)
+
+        peso = PrevisaoVendasService.PESO_SUAVIZACAO
+        coeficientes = {}
+
+        def coeficiente(chave, base):
+            amostras, ganhas, soma_atraso, com_atraso = contagem[chave]
+            if base is None:
+                probabilidade = ganhas / amostras
+                atraso = soma_atraso / com_atraso if com_atraso else timedelta(0)
+            else:
+                probabilidade = (ganhas + peso * base[0]) / (amostras + peso)
+                atraso = (soma_atraso + peso * base[1]) / (com_atraso + peso)
+            coeficientes[chave] = (probabilidade, atraso)
+            return CoeficientePrevisao(
+                etapa_id=chave[0], responsavel_id=chave[1], tipo_oportunidade=chave[2],
+                amostras=amostras, ganhas=ganhas,
+                probabilidade=Decimal(str(round(probabilidade, 4))),
+                atraso_medio=timedelta(days=round(atraso / timedelta(days=1))),
+            )
+
+        # Cada nível é suavizado em direção ao anterior: geral -> etapa -> vendedor/tipo
+        novos = []
+        for nivel in range(3):
+            for chave in contagem:
+                if (chave[0] is not None) + (chave[1] is not None) != nivel:
+                    continue
+                base = None if nivel == 0 else coeficientes[(None, None, '') if nivel == 1 else (chave[0], None, '')]
+                novos.append(coeficiente(chave, base))
+
+        with transaction.atomic():
+            CoeficientePrevisao.objects.all().delete()
+            CoeficientePrevisao.objects.bulk_create(novos)
+        cache.set(PrevisaoVendasService.CACHE_VERSAO, timezone.now().timestamp(), None)
+        return len(novos)
+
+    # ------------------------------------------------------------------------
+    # Previsão
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _coeficiente(campo):
+        """ Valor do coeficiente mais específico disponível para a oportunidade. """
+        def consulta(**filtros):
+            return Subquery(CoeficientePrevisao.objects.filter(**filtros).values(campo)[:1])
+        return Coalesce(
+            consulta(etapa=OuterRef('etapa'), responsavel=OuterRef('responsavel'),
+                     tipo_oportunidade=OuterRef('tipo_oportunidade')),
+            consulta(etapa=OuterRef('etapa'), responsavel__isnull=True),
+            consulta(etapa__isnull=True),
+        )
+
+    @staticmethod
+    def previsao_mensal(responsavel_id=None, referencia=None, meses=None):
+        """
+        {'meses': [{'mes', 'quantidade', 'bruto', 'ponderado'}], 'quantidade',
+        'bruto', 'ponderado'} para os próximos meses a partir de referencia.
+        Atrasadas entram no mês de referência; os totais incluem também as sem
+        data prevista e as que caem depois do horizonte.
+        """
+        referencia = (referencia or timezone.localdate()).replace(day=1)
+        meses = meses or PrevisaoVendasService.MESES
+        qs = PrevisaoVendasService.abertas()
+        if responsavel_id is not None:
+            qs = qs.filter(responsavel_id=responsavel_id)
+
+        linhas = (
+            qs.annotate(
+                probabilidade=Coalesce(PrevisaoVendasService._coeficiente('probabilidade'), Value(Decimal('0'))),
+                atraso=Coalesce(PrevisaoVendasService._coeficiente('atraso_medio'), Value(timedelta(0))),
+            )
+            .annotate(mes=TruncMonth(ExpressionWrapper(
+                F('data_fechamento_prevista') + F('atraso'), output_field=DateField()
+            )))
+            .values('mes')
+            .annotate(
+                quantidade=Count('pk'),
+                bruto=Sum('valor_estimado'),
+                ponderado=Sum(ExpressionWrapper(
+                    F('valor_estimado') * F('probabilidade'), output_field=DecimalField(max_digits=16, decimal_places=6)
+                )),
+            )
+            .order_by()
+        )
+
+        inicio_meses = []
+        mes = referencia
+        for _ in range(meses):
+            inicio_meses.append(mes)
+            mes = (mes + timedelta(days=32)).replace(day=1)
+        por_mes = {mes: {'mes': mes, 'quantidade': 0, 'bruto': Decimal('0.00'), 'ponderado': Decimal('0.00')} for mes in inicio_meses}
+        total = {'quantidade': 0, 'bruto': Decimal('0.00'), 'ponderado': Decimal('0.00')}
+        centavos = Decimal('0.01')
+
+        for linha in linhas:
+            bruto = Decimal(linha['bruto'] or 0)
+            ponderado = Decimal(linha['ponderado'] or 0).quantize(centavos)
+            for destino in filter(None, [total, por_mes.get(max(linha['mes'], referencia)) if linha['mes'] else None]):
+                destino['quantidade'] += linha['quantidade']
+                destino['bruto'] += bruto
+                destino['ponderado'] += ponderado
+
+        return {'meses': list(por_mes.values()), **total}
+
+    @staticmethod
+    def obter(responsavel_id=None, referencia=None):
+        """ previsao_mensal em cache por (escopo, mês de referência). """
+        referencia = (referencia or timezone.localdate()).replace(day=1)
+        chave = PrevisaoVendasService.CACHE_PREVISAO.format(
+            cache.get(PrevisaoVendasService.CACHE_VERSAO, 0), responsavel_id or 'todos', referencia.strftime('%Y-%m'),
+        )
+        previsao = cache.get(chave)
+        if previsao is None:
+            previsao = PrevisaoVendasService.previsao_mensal(responsavel_id, referencia)
+            cache.set(chave, previsao, getattr(settings, 'CRM_PREVISAO_CACHE_TIMEOUT', 300))
+        return previsao
+
+
+# ############################################################################
+# METAS DE VENDA (três cadastros normalizados em MetaConsolidada)
+# ############################################################################
+
+class MetasService:
+    """
+    As metas vêm de MetaMensal (inclui a meta global da empresa),
+    tc_core.MetaGlobal (por Vendedor) e tc_financeiro.MetaVenda (JSON com as
+    metas do ano). sincronizar() normaliza as chaves (vendedor, ano, mês)
+    alteradas em MetaConsolidada; quando mais de uma fonte define o mesmo mês
+    vale a de maior precedência (MetaMensal > MetaGlobal > MetaVenda).
+
+    painel() junta metas e realizado de toda a equipe comercial numa query e
+    fica em cache por mês; mudanças de meta ou de negócio ganho invalidam o mês.
+    """
+
+    CACHE_PAINEL = 'tc_crm:metas:{}-{:02d}'
+
+    MESES_NOMES = {
+        nome: numero for numero, nome_mes in MetaMensal.MESES_CHOICES
+        for nome in (nome_mes.lower(), nome_mes[:3].lower())
+    }
+
+    @staticmethod
+    def _mes_meta_venda(chave):
+        """ Chave do JSON de MetaVenda -> mês (aceita '3', '03', 'mar' e 'março'). """
+        chave = str(chave).strip().lower()
+        mes = int(chave) if chave.isdigit() else MetasService.MESES_NOMES.get(chave)
+        return mes if mes and 1 <= mes <= 12 else None
+
+    @staticmethod
+    def _valor_meta_venda(valor):
+        texto = str(valor).replace('R$', '').strip()
+        if ',' in texto:
+            texto = texto.replace('.', '').replace(',', '.')
+        try:
+            return Decimal(texto).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            return None
+
+    @staticmethod
+    def _fontes(vendedor_ids, anos):
+        """ {(vendedor_id, ano, mes): (valor, fonte)} das três fontes, já com a precedência. """
+        MetaGlobal = apps.get_model('tc_core', 'MetaGlobal')
+        MetaVenda = apps.get_model('tc_financeiro', 'MetaVenda')
+        Fonte = MetaConsolidada.Fonte
+        metas = {}
+
+        vendas = MetaVenda.objects.all()
+        globais = MetaGlobal.objects.all()
+        mensais = MetaMensal.objects.all()
+        if vendedor_ids is not None:
+            vendas = vendas.filter(usuario_id__in=vendedor_ids)
+            globais = globais.filter(vendedor__usuario_id__in=vendedor_ids)
+            mensais = mensais.filter(Q(vendedor_id__in=vendedor_ids) | Q(vendedor__isnull=True))
+        if anos is not None:
+            vendas = vendas.filter(ano__in=anos)
+            globais = globais.filter(mes_referencia__year__in=anos)
+            mensais = mensais.filter(ano__in=anos)
+
+        # Da menor para a maior precedência: a última fonte sobrescreve
+        for usuario_id, ano, metas_mensais in vendas.values_list('usuario_id', 'ano', 'metas_mensais'):
+            for chave, valor in (metas_mensais or {}).items():
+                mes, valor = MetasService._mes_meta_venda(chave), MetasService._valor_meta_venda(valor)
+                if mes and valor is not None:
+                    metas[(usuario_id, ano, mes)] = (valor, Fonte.META_VENDA)
+        for usuario_id, referencia, valor in globais.values_list('vendedor__usuario_id', 'mes_referencia', 'valor_meta'):
+            metas[(usuario_id, referencia.year, referencia.month)] = (valor, Fonte.META_GLOBAL)
+        for vendedor_id, ano, mes, valor in mensais.values_list('vendedor_id', 'ano', 'mes', 'valor_objetivo'):
+            metas[(vendedor_id, ano, mes)] = (valor, Fonte.META_MENSAL)
+        return metas
+
+    @staticmethod
+    def sincronizar(chaves=None):
+        """ Refaz as chaves (vendedor_id, ano, mes) informadas; None refaz tudo. """
+        if chaves is None:
+            metas = MetasService._fontes(None, None)
+        else:
+            chaves = set(chaves)
+            if not chaves:
+                return 0
+            metas = MetasService._fontes({c[0] for c in chaves if c[0]}, {c[1] for c in chaves})
+            metas = {chave: meta for chave, meta in metas.items() if chave in chaves}
+
+        with transaction.atomic():
+            existentes = MetaConsolidada.objects.all()
+            if chaves is not None:
+                filtro = Q(pk__in=[])
+                for vendedor_id, ano, mes in chaves:
+                    filtro |= Q(vendedor_id=vendedor_id, ano=ano, mes=mes) if vendedor_id else Q(vendedor__isnull=True, ano=ano, mes=mes)
+                existentes = existentes.filter(filtro)
+            existentes.delete()
+            MetaConsolidada.objects.bulk_create([
+                MetaConsolidada(vendedor_id=vendedor_id, ano=ano, mes=mes, valor_objetivo=valor, fonte=fonte)
+                for (vendedor_id, ano, mes), (valor, fonte) in metas.items()
+            ])
+
+        meses = {(ano, mes) for _, ano, mes in (chaves if chaves is not None else metas)}
+        cache.delete_many([MetasService.CACHE_PAINEL.format(ano, mes) for ano, mes in meses])
+        return len(metas)
+
+    @staticmethod
+    def chaves(meta):
+        """ Chaves (vendedor_id, ano, mes) que um registro de qualquer fonte define. """
+        rotulo = meta._meta.label
+        if rotulo == 'tc_crm.MetaMensal':
+            return {(meta.vendedor_id, meta.ano, meta.mes)}
+        if rotulo == 'tc_financeiro.MetaVenda':
+            return {(meta.usuario_id, meta.ano, mes) for mes in range(1, 13)}
+        # tc_core.MetaGlobal aponta para Vendedor; a meta é do usuário dele
+        usuario_id = apps.get_model('tc_core', 'Vendedor').objects.filter(
+            pk=meta.vendedor_id
+        ).values_list('usuario_id', flat=True).first()
+        if not usuario_id or not meta.mes_referencia:
+            return set()
+        return {(usuario_id, meta.mes_referencia.year, meta.mes_referencia.month)}
+
+    @staticmethod
+    def agendar(chaves):
+        """ Sincroniza após o commit da transação corrente. """
+        chaves = {chave for chave in chaves if chave[1] and chave[2]}
+        if chaves:
+            transaction.on_commit(lambda: MetasService.sincronizar(chaves))
+
+    @staticmethod
+    def invalidar(*datas):
+        """ Descarta o painel dos meses das datas informadas (realizado mudou). """
+        meses = set()
+        for data in filter(None, datas):
+            if isinstance(data, datetime):
+                data = timezone.localtime(data)
+            meses.add((data.year, data.month))
+        cache.delete_many([MetasService.CACHE_PAINEL.format(ano, mes) for ano, mes in meses])
+
+    @staticmethod
+    def painel(ano, mes):
+        """
+        {'vendedores': [{'id', 'nome', 'meta', 'realizado', 'porcentagem'}],
+        'meta_global', 'meta_equipe', 'realizado_equipe', 'realizado_empresa'}
+        """
+        chave = MetasService.CACHE_PAINEL.format(ano, mes)
+        painel = cache.get(chave)
+        if painel is not None:
+            return painel
+
+        inicio = timezone.make_aware(datetime(ano, mes, 1))
+        fim = timezone.make_aware(datetime(ano + mes // 12, mes % 12 + 1, 1))
+        ganhas_no_mes = Q(
+            etapa__e_etapa_ganha=True, data_fechamento_real__gte=inicio, data_fechamento_real__lt=fim,
+        )
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=14, decimal_places=2))
+        meta_vendedor = MetaConsolidada.objects.filter(vendedor=OuterRef('pk'), ano=ano, mes=mes).values('valor_objetivo')[:1]
+
+        linhas = (
+            get_user_model().objects.filter(departamento='comercial', is_active=True)
+            .annotate(
+                realizado=Coalesce(Sum('oportunidade__valor_estimado', filter=Q(
+                    oportunidade__etapa__e_etapa_ganha=True,
+                    oportunidade__data_fechamento_real__gte=inicio,
+                    oportunidade__data_fechamento_real__lt=fim,
+                )), zero),
+                meta=Coalesce(Subquery(meta_vendedor), zero),
+            )
+            .values('pk', 'username', 'first_name', 'last_name', 'realizado', 'meta')
+            .order_by('username')
+        )
+        vendedores = []
+        for linha in linhas:
+            meta, realizado = linha['meta'], linha['realizado']
+            vendedores.append({
+                'id': linha['pk'],
+                'nome': f"{linha['first_name']} {linha['last_name']}".strip() or linha['username'],
+                'meta': meta,
+                'realizado': realizado,
+                'porcentagem': float(round(realizado / meta * 100, 1)) if meta > 0 else 0,
+            })
+
+        painel = {
+            'vendedores': vendedores,
+            'meta_global': MetaConsolidada.objects.filter(vendedor__isnull=True, ano=ano, mes=mes)
+                .values_list('valor_objetivo', flat=True).first() or Decimal('0.00'),
+            'meta_equipe': sum((v['meta'] for v in vendedores), Decimal('0.00')),
+            'realizado_equipe': sum((v['realizado'] for v in vendedores), Decimal('0.00')),
+            'realizado_empresa': Oportunidade.objects.filter(ganhas_no_mes)
+                .aggregate(total=Sum('valor_estimado'))['total'] or Decimal('0.00'),
+        }
+        cache.set(chave, painel, getattr(settings, 'CRM_METAS_CACHE_TIMEOUT', 300))
+        return painel
+
+    @staticmethod
+    def do_vendedor(painel, usuario_id):
+        return next((linha for linha in painel['vendedores'] if linha['id'] == usuario_id), None)
+
+
+# ############################################################################
+# DUPLICIDADES DE CADASTRO (Clientes, contatos e fornecedores)
+# ############################################################################
+
+class DeduplicacaoService:
+    """
+    Busca de duplicidades por blocagem: cada registro gera chaves normalizadas
+    (CNPJ/CPF só com dígitos, tokens do nome sem acentos nem termos societários,
+    domínio do e-mail, telefone) e a comparação aproximada só acontece entre
+    registros que compartilham alguma chave. Blocos grandes demais (tokens
+    comuns) são ignorados, então o custo cresce com o número de registros e não
+    com o número de pares possíveis.
+
+    A mesclagem transfere para o registro mantido tudo o que aponta para o
+    duplicado com um UPDATE por relação (oportunidades, faturas, chamados,
+    contratos...), completa os campos vazios do mantido e exclui o duplicado.
+    """
+    ENTIDADES = {
+        CandidatoDuplicata.Entidade.CLIENTE: ('tc_crm', 'Cliente'),
+        CandidatoDuplicata.Entidade.CONTATO: ('tc_crm', 'Contato'),
+        CandidatoDuplicata.Entidade.FORNECEDOR: ('tc_produtos', 'Fornecedor'),
+    }
+
+    # Campos exibidos lado a lado na fila de revisão
+    CAMPOS_REVISAO = {
+        CandidatoDuplicata.Entidade.CLIENTE: [
+            'razao_social', 'nome_fantasia', 'cnpj_cpf', 'email_corporativo', 'telefone_principal', 'cidade',
+        ],
+        CandidatoDuplicata.Entidade.CONTATO: ['primeiro_nome', 'sobrenome', 'cliente', 'email', 'telefone', 'celular'],
+        CandidatoDuplicata.Entidade.FORNECEDOR: ['razao_social', 'nome_fantasia', 'cnpj', 'email', 'telefone', 'cidade'],
+    }
+
+    # Termos societários e preposições não distinguem empresas
+    TERMOS_IGNORADOS = {'ltda', 'me', 'mei', 'epp', 'eireli', 'sa', 'cia', 'de', 'da', 'do', 'das', 'dos'}
+    # Domínios de e-mail pessoais não servem como chave de empresa
+    PROVEDORES_EMAIL = {
+        'gmail.com', 'hotmail.com', 'outlook.com', 'live.com', 'icloud.com', 'yahoo.com', 'yahoo.com.br',
+        'uol.com.br', 'bol.com.br', 'terra.com.br', 'ig.com.br',
+    }
+
+    # Pesos dos critérios; só entram na média os critérios presentes nos dois registros
+    PESOS = {
+        'empresa': {'nome': 0.55, 'documento': 0.25, 'dominio': 0.1, 'telefone': 0.1},
+        'contato': {'nome': 0.5, 'email': 0.3, 'telefone': 0.1, 'cliente': 0.1},
+    }
+
+    @staticmethod
+    def modelo(entidade):
+        return apps.get_model(*DeduplicacaoService.ENTIDADES[entidade])
+
+    @staticmethod
+    def digitos(valor):
+        return re.sub(r'\D', '', valor or '')
+
+    @staticmethod
+    def normalizar_nome(valor):
+        """ 'Acme Comércio Ltda.' -> 'acme comercio' """
+        texto = unicodedata.normalize('NFKD', valor or '').encode('ascii', 'ignore').decode().lower()
+        return ' '.join(
+            token for token in re.findall(r'[a-z0-9]+', texto)
+            if len(token) > 1 and token not in DeduplicacaoService.TERMOS_IGNORADOS
+        )
+
+    @staticmethod
+    def dominio(email):
+        dominio = (email or '').strip().lower().rpartition('@')[2]
+        return '' if dominio in DeduplicacaoService.PROVEDORES_EMAIL else dominio
+
+    @staticmethod
+    def _registros(entidade):
+        """ Registros normalizados da entidade (uma query), cada um com suas chaves de bloco. """
+        servico = DeduplicacaoService
+        modelo = servico.modelo(entidade)
+
+        if entidade == CandidatoDuplicata.Entidade.CONTATO:
+            linhas = modelo.objects.values('pk', 'cliente_id', 'primeiro_nome', 'sobrenome', 'email', 'telefone', 'celular')
+            for linha in linhas.iterator(chunk_size=2000):
+                nome = servico.normalizar_nome(f"{linha['primeiro_nome']} {linha['sobrenome']}")
+                email = (linha['email'] or '').strip().lower()
+                telefone = servico.digitos(linha['celular'] or linha['telefone'])[-8:]
+                telefone = telefone if len(telefone) == 8 else ''
+                chaves = {f'{prefixo}:{valor}' for prefixo, valor in (('nome', nome), ('email', email), ('tel', telefone)) if valor}
+                yield {
+                    'pk': linha['pk'], 'nomes': [nome] if nome else [], 'email': email,
+                    'telefone': telefone, 'cliente': linha['cliente_id'], 'chaves': chaves,
+                }
+            return
+
+        documento, email, telefone = {
+            CandidatoDuplicata.Entidade.CLIENTE: ('cnpj_cpf', 'email_corporativo', 'telefone_principal'),
+            CandidatoDuplicata.Entidade.FORNECEDOR: ('cnpj', 'email', 'telefone'),
+        }[entidade]
+        linhas = modelo.objects.values('pk', 'razao_social', 'nome_fantasia', documento, email, telefone)
+        for linha in linhas.iterator(chunk_size=2000):
+            nomes = {servico.normalizar_nome(linha['razao_social']), servico.normalizar_nome(linha['nome_fantasia'])} - {''}
+            registro = {
+                'pk': linha['pk'],
+                'nomes': list(nomes),
+                'documento': servico.digitos(linha[documento]),
+                'dominio': servico.dominio(linha[email]),
+                'telefone': servico.digitos(linha[telefone])[-8:],
+            }
+            chaves = {f'nome:{token}' for nome in nomes for token in nome.split() if len(token) >= 3}
+            if len(registro['documento']) >= 11:
+                chaves.add(f"doc:{registro['documento']}")
+            if len(registro['documento']) == 14:
+                # Raiz do CNPJ (matriz e filiais)
+                chaves.add(f"raiz:{registro['documento'][:8]}")
+            if registro['dominio']:
+                chaves.add(f"dominio:{registro['dominio']}")
+            if len(registro['telefone']) < 8:
+                registro['telefone'] = ''
+            registro['chaves'] = chaves
+            yield registro
+
+    @staticmethod
+    def pontuar(a, b, entidade):
+        """ Pontuação (0-100) e critérios do par, pela média ponderada dos critérios presentes. """
+        contato = entidade == CandidatoDuplicata.Entidade.CONTATO
+        pesos = DeduplicacaoService.PESOS['contato' if contato else 'empresa']
+        criterios = {
+            'nome': max(
+                (SequenceMatcher(None, x, y).ratio() for x in a['nomes'] for y in b['nomes']), default=0.0,
+            ),
+        }
+        if contato:
+            if a['email'] and b['email']:
+                criterios['email'] = float(a['email'] == b['email'])
+            criterios['cliente'] = float(a['cliente'] == b['cliente'])
+        else:
+            if len(a['documento']) >= 11 and len(b['documento']) >= 11:
+                if a['documento'] == b['documento']:
+                    criterios['documento'] = 1.0
+                elif len(a['documento']) == len(b['documento']) == 14 and a['documento'][:8] == b['documento'][:8]:
+                    criterios['documento'] = 0.7
+                else:
+                    criterios['documento'] = 0.0
+            if a['dominio'] and b['dominio']:
+                criterios['dominio'] = float(a['dominio'] == b['dominio'])
+        if a['telefone'] and b['telefone']:
+            criterios['telefone'] = float(a['telefone'] == b['telefone'])
+
+        pontuacao = 100 * sum(pesos[c] * v for c, v in criterios.items()) / sum(pesos[c] for c in criterios)
+        if criterios.get('documento') == 1.0:
+            pontuacao = max(pontuacao, 95)
+        elif criterios.get('documento') == 0.0:
+            # Documentos diferentes: empresas distintas com nome parecido
+            pontuacao = min(pontuacao, 50)
+        return round(pontuacao, 2), {c: round(v, 2) for c, v in criterios.items()}
+
+    @staticmethod
+    def detectar(entidade):
+        """
+        Atualiza a fila de revisão da entidade: inclui pares novos acima da
+        pontuação mínima, atualiza os pendentes e remove os pendentes que
+        deixaram de ser candidatos. Pares já revisados não voltam à fila.
+        """
+        minimo = settings.CRM_DUPLICIDADE_PONTUACAO_MINIMA
+        maximo = settings.CRM_DUPLICIDADE_BLOCO_MAXIMO
+
+        registros = {}
+        blocos = defaultdict(list)
+        for registro in DeduplicacaoService._registros(entidade):
+            registros[registro['pk']] = registro
+            for chave in registro['chaves']:
+                blocos[chave].append(registro['pk'])
+
+        pares = set()
+        for membros in blocos.values():
+            if 1 < len(membros) <= maximo:
+                pares.update(combinations(sorted(membros), 2))
+
+        encontrados = {}
+        for a, b in pares:
+            pontuacao, criterios = DeduplicacaoService.pontuar(registros[a], registros[b], entidade)
+            if pontuacao >= minimo:
+                encontrados[(a, b)] = (Decimal(str(pontuacao)), criterios)
+
+        existentes = {
+            (c.registro_a_id, c.registro_b_id): c
+            for c in CandidatoDuplicata.objects.filter(entidade=entidade).only(
+                'pk', 'registro_a_id', 'registro_b_id', 'status', 'pontuacao', 'criterios',
+            )
+        }
+        novos, atualizados = [], []
+        for (a, b), (pontuacao, criterios) in encontrados.items():
+            existente = existentes.get((a, b))
+            if existente is None:
+                novos.append(CandidatoDuplicata(
+                    entidade=entidade, registro_a_id=a, registro_b_id=b, pontuacao=pontuacao, criterios=criterios,
+                ))
+            elif existente.status == CandidatoDuplicata.Status.PENDENTE and existente.pontuacao != pontuacao:
+                existente.pontuacao, existente.criterios = pontuacao, criterios
+                atualizados.append(existente)
+        obsoletos = [
+            c.pk for par, c in existentes.items()
+            if c.status == CandidatoDuplicata.Status.PENDENTE and par not in encontrados
+        ]
+
+        with transaction.atomic():
+            CandidatoDuplicata.objects.bulk_create(novos, batch_size=1000, ignore_conflicts=True)
+            CandidatoDuplicata.objects.bulk_update(atualizados, ['pontuacao', 'criterios'], batch_size=1000)
+            CandidatoDuplicata.objects.filter(pk__in=obsoletos).delete()
+
+        return {
+            'registros': len(registros), 'comparacoes': len(pares),
+            'novos': len(novos), 'atualizados': len(atualizados), 'removidos': len(obsoletos),
+        }
+
+    @staticmethod
+    def repontar(destino, origem):
+        """
+        Transfere para destino tudo o que aponta para origem, com um UPDATE por
+        relação reversa (FK, 1-1 e M2M), inclusive as ocultas (related_name='+'),
+        que a exclusão do duplicado também alcançaria. Ficam de fora as tabelas
+        intermediárias automáticas (tratadas pelo M2M) e o histórico
+        (simple_history), que preserva o vínculo da época. Retorna
+        {relação: linhas movidas}.
+        """
+        movidos = {}
+        relacoes = [
+            campo for campo in origem._meta.get_fields(include_hidden=True)
+            if campo.auto_created and not campo.concrete
+            and not campo.related_model._meta.auto_created
+            and not issubclass(campo.related_model, HistoricalChanges)
+        ]
+        for relacao in relacoes:
+            campo = relacao.field
+            rotulo = f'{relacao.related_model._meta.label}.{campo.name}'
+            if relacao.many_to_many:
+                through = campo.remote_field.through
+                lado, outro_lado = campo.m2m_reverse_field_name(), campo.m2m_field_name()
+                # Vínculos que o destino já possui ficariam repetidos
+                through.objects.filter(**{
+                    lado: origem, f'{outro_lado}__in': through.objects.filter(**{lado: destino}).values(outro_lado),
+                }).delete()
+                movidos[rotulo] = through.objects.filter(**{lado: origem}).update(**{lado: destino})
+                continue
+
+            queryset = relacao.related_model._base_manager.filter(**{campo.name: origem})
+            if relacao.one_to_one and relacao.related_model._base_manager.filter(**{campo.name: destino}).exists():
+                # 1-1 já ocupado no destino (ex.: ResumoCliente, recalculado após a mescla)
+                queryset.delete()
+                movidos[rotulo] = 0
+                continue
+            movidos[rotulo] = queryset.update(**{campo.name: destino})
+
+        for campo in origem._meta.many_to_many:
+            getattr(destino, campo.name).add(*getattr(origem, campo.name).all())
+        return movidos
+
+    @staticmethod
+    @transaction.atomic
+    def mesclar(candidato, mantido_id, usuario=None):
+        """ Mescla o par mantendo mantido_id; retorna as linhas movidas por relação. """
+        candidato = CandidatoDuplicata.objects.select_for_update().get(pk=candidato.pk)
+        if candidato.status != CandidatoDuplicata.Status.PENDENTE:
+            raise ValueError("Este par já foi revisado.")
+        if mantido_id not in (candidato.registro_a_id, candidato.registro_b_id):
+            raise ValueError("O registro mantido deve ser um dos dois do par.")
+        duplicado_id = candidato.registro_b_id if mantido_id == candidato.registro_a_id else candidato.registro_a_id
+
+        modelo = DeduplicacaoService.modelo(candidato.entidade)
+        registros = modelo._base_manager.select_for_update().in_bulk([mantido_id, duplicado_id])
+        if len(registros) < 2:
+            raise ValueError("Um dos registros do par não existe mais.")
+        mantido, duplicado = registros[mantido_id], registros[duplicado_id]
+
+        produtos_cotados = []
+        if candidato.entidade == CandidatoDuplicata.Entidade.FORNECEDOR:
+            produtos_cotados = list(
+                apps.get_model('tc_produtos', 'PrecoFornecedor').objects.filter(fornecedor_id__in=[mantido_id, duplicado_id])
+                .values_list('produto_id', flat=True).distinct()
+            )
+
+        movidos = DeduplicacaoService.repontar(mantido, duplicado)
+
+        # Campos vazios do mantido herdam os valores do duplicado
+        herdados = []
+        for campo in modelo._meta.concrete_fields:
+            if campo.primary_key or getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False):
+                continue
+            if getattr(mantido, campo.attname) in (None, '') and getattr(duplicado, campo.attname) not in (None, ''):
+                setattr(mantido, campo.attname, getattr(duplicado, campo.attname))
+                herdados.append(campo.name)
+        duplicado.delete()
+        if herdados:
+            mantido.save(update_fields=herdados)
+
+        candidato.status = CandidatoDuplicata.Status.MESCLADO
+        candidato.mantido_id = mantido_id
+        candidato.revisado_por = usuario
+        candidato.revisado_em = timezone.now()
+        candidato.save()
+
+        # Outros pares pendentes do registro excluído voltam na próxima busca, já contra o mantido
+        CandidatoDuplicata.objects.filter(
+            entidade=candidato.entidade, status=CandidatoDuplicata.Status.PENDENTE,
+        ).filter(Q(registro_a_id=duplicado_id) | Q(registro_b_id=duplicado_id)).delete()
+
+        if candidato.entidade == CandidatoDuplicata.Entidade.CLIENTE:
+            ResumoClienteService.atualizar([mantido_id])
+        if produtos_cotados:
+            # Os preços foram movidos por UPDATE (sem signals): refaz o melhor preço dos produtos afetados
+            from tc_produtos.services import PrecoFornecedorService
+            PrecoFornecedorService.atualizar_indice(produtos_cotados)
+        return movidos
+
+    @staticmethod
+    def descartar(candidato, usuario=None):
+        candidato.status = CandidatoDuplicata.Status.DESCARTADO
+        candidato.revisado_por = usuario
+        candidato.revisado_em = timezone.now()
+        candidato.save(update_fields=['status', 'revisado_por', 'revisado_em'])
+
+
+# ############################################################################
+# KANBAN (movimentações em lote com controle de versão e feed de alterações)
+# ############################################################################
+
+# Enviado por KanbanService.mover antes do bulk_update (que não dispara
+# pre_save/post_save), com as oportunidades já alteradas em memória: os
+# receptores ainda leem o estado anterior no banco e agendam seus recálculos.
+oportunidades_movidas = Signal()
+
+
+class ConflitoKanban(ValueError):
+    """
+    Lote rejeitado: algum cartão foi alterado (ou saiu do quadro) desde que o
+    usuário o recebeu. Leva o estado atual de todos os cartões do lote para
+    que o quadro desfaça o que exibia.
+    """
+
+    def __init__(self, cartoes, removidos):
+        self.cartoes = cartoes
+        self.removidos = removidos
+        super().__init__("Outro usuário alterou estes negócios enquanto você os movia. O quadro foi atualizado.")
+
+
+class KanbanService:
+    """
+    Mutações do quadro em lote. Cada coluna alterada chega com os cartões na
+    ordem exibida e a versão que o quadro conhece deles:
+    [{"etapa": 3, "cartoes": [{"id": 10, "versao": 4}, ...]}, ...].
+    Uma versão desatualizada rejeita o lote inteiro (ConflitoKanban). Mudanças
+    de etapa vão num bulk_update com histórico (base do funil de vendas);
+    reordenações gravam só a posição. Cada cartão gravado entra no feed
+    AlteracaoKanban, cujo id é a revisão do quadro.
+
+    Os ids do feed são alocados antes do commit, então uma revisão pode ficar
+    visível depois da seguinte. A revisão entregue aos quadros só avança sobre
+    linhas mais antigas que MARGEM_SEGUNDOS; as recentes são reenviadas até
+    lá, e um id que fizer commit fora de ordem ainda fica acima do "desde".
+    """
+
+    CACHE_REVISAO = 'tc_crm:kanban:revisao'
+    MARGEM_SEGUNDOS = 10
+    CAMPOS_MOVIMENTACAO = ['etapa', 'data_fechamento_real', 'posicao_kanban', 'versao']
+
+    @staticmethod
+    def visiveis(usuario, vendedor_id=None):
+        """ Oportunidades do quadro do usuário: vendedores só veem as suas; gestores podem filtrar. """
+        queryset = Oportunidade.objects.all()
+        if not (usuario.is_superuser or usuario.departamento in ['diretoria', 'financeiro']):
+            return queryset.filter(responsavel=usuario)
+        if vendedor_id:
+            return queryset.filter(responsavel_id=vendedor_id)
+        return queryset
+
+    @staticmethod
+    def _inteiro(valor, campo):
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"{campo} inválido: {valor!r}")
+
+    @staticmethod
+    def _destinos(colunas):
+        """ {oportunidade_id: (etapa_id, posição, versão)} a partir das colunas enviadas. """
+        if not isinstance(colunas, list):
+            raise ValueError("As colunas devem ser uma lista.")
+        destinos = {}
+        for coluna in colunas:
+            if not isinstance(coluna, dict) or not isinstance(coluna.get('cartoes'), list):
+                raise ValueError(f"Coluna inválida: {coluna!r}")
+            etapa_id = KanbanService._inteiro(coluna.get('etapa'), 'Etapa')
+            for posicao, cartao in enumerate(coluna['cartoes']):
+                if not isinstance(cartao, dict):
+                    raise ValueError(f"Cartão inválido: {cartao!r}")
+                pk = KanbanService._inteiro(cartao.get('id'), 'Cartão')
+                if pk in destinos:
+                    raise ValueError(f"Cartão {pk} repetido no lote.")
+                destinos[pk] = (etapa_id, posicao, KanbanService._inteiro(cartao.get('versao'), 'Versão'))
+        return destinos
+
+    @staticmethod
+    @transaction.atomic
+    def mover(colunas, usuario):
+        """
+        Aplica o lote e devolve as oportunidades gravadas. Lote malformado:
+        ValueError; versões desatualizadas ou cartões que o usuário não vê
+        mais: ConflitoKanban, sem gravar nada.
+        """
+        destinos = KanbanService._destinos(colunas)
+        etapas = EtapaVenda.objects.in_bulk({etapa_id for etapa_id, _, _ in destinos.values()})
+        faltando = {etapa_id for etapa_id, _, _ in destinos.values()} - set(etapas)
+        if faltando:
+            raise ValueError(f"Etapa não encontrada: {', '.join(map(str, sorted(faltando)))}")
+
+        oportunidades = KanbanService.visiveis(usuario).select_for_update().in_bulk(destinos)
+        desatualizadas = [o for pk, o in oportunidades.items() if o.versao != destinos[pk][2]]
+        removidos = sorted(set(destinos) - set(oportunidades))
+        if desatualizadas or removidos:
+            raise ConflitoKanban(list(oportunidades.values()), removidos)
+
+        movidas, reordenadas = [], []
+        agora = timezone.now()
+        for pk, oportunidade in oportunidades.items():
+            etapa_id, posicao, _ = destinos[pk]
+            if oportunidade.etapa_id != etapa_id:
+                # Mesma regra de Oportunidade.save(): etapa ganha fixa a data real do fechamento
+                oportunidade.etapa = etapas[etapa_id]
+                if oportunidade.etapa.e_etapa_ganha and not oportunidade.data_fechamento_real:
+                    oportunidade.data_fechamento_real = agora
+                oportunidade.posicao_kanban = posicao
+                oportunidade.versao += 1
+                movidas.append(oportunidade)
+            elif oportunidade.posicao_kanban != posicao:
+                oportunidade.posicao_kanban = posicao
+                reordenadas.append(oportunidade)
+
+        if movidas:
+            oportunidades_movidas.send(sender=Oportunidade, oportunidades=movidas)
+            bulk_update_with_history(
+                movidas, Oportunidade, KanbanService.CAMPOS_MOVIMENTACAO, batch_size=500, default_user=usuario,
+            )
+        if reordenadas:
+            Oportunidade.objects.bulk_update(reordenadas, ['posicao_kanban'], batch_size=500)
+
+        gravadas = movidas + reordenadas
+        KanbanService.registrar([o.pk for o in gravadas])
+        return gravadas
+
+    @staticmethod
+    def registrar(oportunidade_ids):
+        """
+        Publica os cartões no feed após o commit: as linhas ganham ids (revisões)
+        na ordem em que as alterações ficam visíveis, e o histórico vencido é
+        descartado.
+        """
+        oportunidade_ids = sorted({pk for pk in oportunidade_ids if pk})
+        if oportunidade_ids:
+            transaction.on_commit(lambda: KanbanService._publicar(oportunidade_ids))
+
+    @staticmethod
+    def _publicar(oportunidade_ids):
+        AlteracaoKanban.objects.bulk_create([AlteracaoKanban(oportunidade_id=pk) for pk in oportunidade_ids])
+        limite = timezone.now() - timedelta(hours=settings.CRM_KANBAN_RETENCAO_HORAS)
+        AlteracaoKanban.objects.filter(criado_em__lt=limite).delete()
+        cache.delete(KanbanService.CACHE_REVISAO)
+
+    @staticmethod
+    def revisao():
+        """ Última revisão do quadro; os quadros abertos consultam isto a cada intervalo. """
+        revisao = cache.get(KanbanService.CACHE_REVISAO)
+        if revisao is None:
+            revisao = AlteracaoKanban.objects.aggregate(revisao=Max('pk'))['revisao'] or 0
+            cache.set(KanbanService.CACHE_REVISAO, revisao, settings.CRM_KANBAN_INTERVALO_SEGUNDOS)
+        return revisao
+
+    @staticmethod
+    def revisao_assentada():
+        """ Revisão inicial de um quadro: a maior entre as linhas do feed mais antigas que a margem. """
+        limite = timezone.now() - timedelta(seconds=KanbanService.MARGEM_SEGUNDOS)
+        return AlteracaoKanban.objects.filter(criado_em__lte=limite).aggregate(revisao=Max('pk'))['revisao'] or 0
+
+    @staticmethod
+    def alteracoes(desde, oportunidades):
+        """
+        Cartões alterados após a revisão "desde" (um por cartão), dentro do
+        queryset visível do quadro: {'revisao', 'cartoes', 'removidos'}. A
+        revisão devolvida não passa das linhas mais antigas que a margem.
+        Devolve None quando o feed já não cobre essa revisão (o quadro deve ser
+        recarregado inteiro).
+        """
+        linhas = list(AlteracaoKanban.objects.filter(pk__gt=desde).values_list('pk', 'oportunidade_id', 'criado_em'))
+        if not linhas:
+            return {'revisao': desde, 'cartoes': [], 'removidos': []}
+        primeira = AlteracaoKanban.objects.aggregate(primeira=Min('pk'))['primeira']
+        if desde < primeira - 1:
+            return None
+
+        limite = timezone.now() - timedelta(seconds=KanbanService.MARGEM_SEGUNDOS)
+        alteradas = {oportunidade_id for _, oportunidade_id, _ in linhas}
+        cartoes = list(oportunidades.filter(pk__in=alteradas).select_related('cliente'))
+        return {
+            'revisao': max([desde] + [pk for pk, _, criado_em in linhas if criado_em <= limite]),
+            'cartoes': cartoes,
+            'removidos': sorted(alteradas - {o.pk for o in cartoes}),
+        }
@@ -0,0 +1,102 @@
+# tc_crm/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Atividade, MetaMensal, Oportunidade
+from .services import KanbanService, MetasService, ResumoClienteService, oportunidades_movidas
+
+
+# ############################################################################
+# VISÃO 360: recalcula o resumo dos clientes afetados, após o commit
+# ############################################################################
+
+@receiver(pre_save, sender=Oportunidade)
+@receiver(pre_save, sender=Atividade)
+@receiver(pre_save, sender='tc_financeiro.Fatura')
+@receiver(pre_save, sender='tc_operacoes.Chamado')
+@receiver(pre_save, sender='tc_operacoes.Ativo')
+def guardar_cliente_anterior(sender, instance, **kwargs):
+    # Registro movido para outro cliente: o resumo do anterior também muda
+    instance._cliente_anterior = None
+    if instance.pk:
+        instance._cliente_anterior = sender.objects.filter(pk=instance.pk).values_list('cliente_id', flat=True).first()
+
+@receiver(post_save, sender=Oportunidade)
+@receiver(post_delete, sender=Oportunidade)
+@receiver(post_save, sender=Atividade)
+@receiver(post_delete, sender=Atividade)
+@receiver(post_save, sender='tc_financeiro.Fatura')
+@receiver(post_delete, sender='tc_financeiro.Fatura')
+@receiver(post_save, sender='tc_operacoes.Chamado')
+@receiver(post_delete, sender='tc_operacoes.Chamado')
+@receiver(post_save, sender='tc_operacoes.Ativo')
+@receiver(post_delete, sender='tc_operacoes.Ativo')
+def atualizar_resumo_cliente(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    ResumoClienteService.agendar({instance.cliente_id, getattr(instance, '_cliente_anterior', None)})
+
+
+# ############################################################################
+# METAS: mantém MetaConsolidada em dia com as três fontes de metas
+# ############################################################################
+
+@receiver(pre_save, sender=MetaMensal)
+@receiver(pre_save, sender='tc_core.MetaGlobal')
+@receiver(pre_save, sender='tc_financeiro.MetaVenda')
+def guardar_chaves_meta_anteriores(sender, instance, **kwargs):
+    # Meta movida para outro vendedor/mês: a chave antiga também é refeita
+    instance._chaves_meta_anteriores = set()
+    if instance.pk:
+        anterior = sender.objects.filter(pk=instance.pk).first()
+        if anterior is not None:
+            instance._chaves_meta_anteriores = MetasService.chaves(anterior)
+
+@receiver(post_save, sender=MetaMensal)
+@receiver(post_delete, sender=MetaMensal)
+@receiver(post_save, sender='tc_core.MetaGlobal')
+@receiver(post_delete, sender='tc_core.MetaGlobal')
+@receiver(post_save, sender='tc_financeiro.MetaVenda')
+@receiver(post_delete, sender='tc_financeiro.MetaVenda')
+def sincronizar_meta_consolidada(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    MetasService.agendar(MetasService.chaves(instance) | getattr(instance, '_chaves_meta_anteriores', set()))
+
+@receiver(pre_save, sender=Oportunidade)
+def guardar_fechamento_anterior(sender, instance, **kwargs):
+    # Fechamento mudado de mês ou desfeito: o painel do mês antigo também muda
+    instance._fechamento_anterior = None
+    if instance.pk:
+        instance._fechamento_anterior = sender.objects.filter(pk=instance.pk).values_list(
+            'data_fechamento_real', flat=True
+        ).first()
+
+@receiver(post_save, sender=Oportunidade)
+@receiver(post_delete, sender=Oportunidade)
+def invalidar_painel_metas(sender, instance, **kwargs):
+    # O realizado do mês do fechamento (atual e anterior) mudou
+    datas = [instance.data_fechamento_real, getattr(instance, '_fechamento_anterior', None)]
+    if any(datas):
+        transaction.on_commit(lambda: MetasService.invalidar(*datas))
+
+
+# ############################################################################
+# KANBAN: movimentações em lote e feed de alterações dos quadros abertos
+# ############################################################################
+
+@receiver(oportunidades_movidas)
+def recalcular_apos_movimentacao(sender, oportunidades, **kwargs):
+    # O bulk_update do quadro não passa pelos receptores de post_save acima
+    ResumoClienteService.agendar({o.cliente_id for o in oportunidades})
+    datas = [o.data_fechamento_real for o in oportunidades if o.data_fechamento_real]
+    if datas:
+        transaction.on_commit(lambda: MetasService.invalidar(*datas))
+
+@receiver(post_save, sender=Oportunidade)
+@receiver(post_delete, sender=Oportunidade)
+def publicar_alteracao_kanban(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    KanbanService.registrar([instance.pk])
@@ -1,3 +1,499 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tc_produtos.models import Fornecedor, MelhorPrecoProduto, PrecoFornecedor, Produto
+from tc_produtos.services import PrecoFornecedorService
+from .models import (
+    AlteracaoKanban, Atividade, CandidatoDuplicata, Cliente, EtapaVenda, ItemProposta, Oportunidade, Proposta,
+    TransicaoEtapa,
+)
+from .services import (
+    ClonagemService, ConflitoKanban, DeduplicacaoService, EdicaoItensPropostaService, FunilVendasService,
+    KanbanService, MetasService,
+)
+
+User = get_user_model()
+
+
+class MesclagemDuplicatasTest(TestCase):
+    """
+    Mesclagem de um par da fila de duplicidades: tudo o que aponta para o
+    duplicado (inclusive relações ocultas) passa para o registro mantido.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(username='revisor', password='senha')
+        cls.etapa = EtapaVenda.objects.create(nome='Prospecção', ordem=1)
+
+    def candidato(self, entidade, mantido, duplicado):
+        return CandidatoDuplicata.objects.create(
+            entidade=entidade, registro_a_id=mantido.pk, registro_b_id=duplicado.pk, pontuacao=Decimal('95.00'),
+        )
+
+    def test_mescla_de_clientes_reaponta_oportunidades_e_completa_campos(self):
+        mantido = Cliente.objects.create(razao_social='Acme Ltda')
+        duplicado = Cliente.objects.create(razao_social='ACME LTDA', email_corporativo='contato@acme.com.br')
+        oportunidade = Oportunidade.objects.create(nome='Renovação', cliente=duplicado, etapa=self.etapa)
+        candidato = self.candidato(CandidatoDuplicata.Entidade.CLIENTE, mantido, duplicado)
+
+        movidos = DeduplicacaoService.mesclar(candidato, mantido.pk, usuario=self.usuario)
+
+        self.assertEqual(movidos['tc_crm.Oportunidade.cliente'], 1)
+        oportunidade.refresh_from_db()
+        self.assertEqual(oportunidade.cliente, mantido)
+        self.assertFalse(Cliente.objects.filter(pk=duplicado.pk).exists())
+        mantido.refresh_from_db()
+        self.assertEqual(mantido.email_corporativo, 'contato@acme.com.br')
+
+        candidato.refresh_from_db()
+        self.assertEqual(candidato.status, CandidatoDuplicata.Status.MESCLADO)
+        self.assertEqual(candidato.mantido_id, mantido.pk)
+        with self.assertRaises(ValueError):
+            DeduplicacaoService.mesclar(candidato, mantido.pk)
+
+    def test_mescla_de_fornecedores_reaponta_precos_e_melhor_preco(self):
+        mantido = Fornecedor.objects.create(razao_social='Distribuidora Sul', cnpj='11.111.111/0001-11')
+        duplicado = Fornecedor.objects.create(razao_social='Distribuidora Sul SA', cnpj='22.222.222/0001-22')
+        produto = Produto.objects.create(nome='Switch 24p', codigo_interno='SW-24')
+        PrecoFornecedor.objects.create(produto=produto, fornecedor=mantido, preco_custo=Decimal('120.00'))
+        preco_duplicado = PrecoFornecedor.objects.create(produto=produto, fornecedor=duplicado, preco_custo=Decimal('100.00'))
+        PrecoFornecedorService.atualizar_indice([produto.pk])
+        self.assertEqual(MelhorPrecoProduto.objects.get(produto=produto).fornecedor, duplicado)
+        candidato = self.candidato(CandidatoDuplicata.Entidade.FORNECEDOR, mantido, duplicado)
+
+        movidos = DeduplicacaoService.mesclar(candidato, mantido.pk, usuario=self.usuario)
+
+        # MelhorPrecoProduto.fornecedor usa related_name='+' (relação oculta)
+        self.assertEqual(movidos['tc_produtos.MelhorPrecoProduto.fornecedor'], 1)
+        self.assertEqual(movidos['tc_produtos.PrecoFornecedor.fornecedor'], 1)
+        self.assertFalse(Fornecedor.objects.filter(pk=duplicado.pk).exists())
+        self.assertEqual(PrecoFornecedor.objects.filter(fornecedor=mantido).count(), 2)
+
+        melhor = MelhorPrecoProduto.objects.get(produto=produto)
+        self.assertEqual(melhor.fornecedor, mantido)
+        self.assertEqual(melhor.preco_fornecedor, preco_duplicado)
+        self.assertEqual(melhor.preco_brl, Decimal('100.00'))
+        self.assertEqual(melhor.qtd_fornecedores, 2)
+
+
+class MigracaoCatalogoLegadoTest(TransactionTestCase):
+    """
+    Incorporação de tc_crm.Fornecedor/Produto ao catálogo de tc_produtos com
+    linhas legadas: contratos (e histórico) e itens de estoque passam a
+    apontar para o cadastro único antes de as tabelas legadas saírem.
+    """
+    migrar_de = [
+        ('tc_crm', '0014_candidatoduplicata'),
+        ('tc_contratos', '0002_initial'),
+        ('tc_estoque', '0001_initial'),
+        ('tc_produtos', '0004_busca_catalogo'),
+    ]
+    migrar_para = [('tc_crm', '0015_fornecedor_produto_catalogo')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrar_de)
+        antes = executor.loader.project_state(self.migrar_de).apps
+
+        # Cadastro canônico: um registro sem par e um com o mesmo CNPJ/código de um legado
+        Fornecedor = antes.get_model('tc_produtos', 'Fornecedor')
+        Fornecedor.objects.create(razao_social='Sem Par', cnpj='99.999.999/0001-99')
+        self.fornecedor_existente = Fornecedor.objects.create(razao_social='Telecom Norte', cnpj='33444555000166')
+        Produto = antes.get_model('tc_produtos', 'Produto')
+        self.produto_existente = Produto.objects.create(nome='Cabo UTP', codigo_interno='CAB-01')
+
+        FornecedorLegado = antes.get_model('tc_crm', 'Fornecedor')
+        ProdutoLegado = antes.get_model('tc_crm', 'Produto')
+        Contrato = antes.get_model('tc_contratos', 'Contrato')
+        HistoricalContrato = antes.get_model('tc_contratos', 'HistoricalContrato')
+        ItemEstoque = antes.get_model('tc_estoque', 'ItemEstoque')
+
+        com_par = FornecedorLegado.objects.create(razao_social='TELECOM NORTE', cnpj='33.444.555/0001-66')
+        sem_par = FornecedorLegado.objects.create(razao_social='Energia Leste', cnpj='77.888.999/0001-00')
+        self.contratos = {}
+        for numero, fornecedor in (('CT-1', com_par), ('CT-2', sem_par)):
+            contrato = Contrato.objects.create(
+                numero_contrato=numero, objeto_contrato='Link dedicado', valor_mensal=Decimal('500.00'),
+                data_inicio=timezone.localdate(), fornecedor=fornecedor,
+            )
+            self.contratos[numero] = contrato.pk
+        HistoricalContrato.objects.create(
+            id=self.contratos['CT-1'], numero_contrato='CT-1', objeto_contrato='Link dedicado',
+            valor_mensal=Decimal('500.00'), data_inicio=timezone.localdate(), criado_em=timezone.now(),
+            fornecedor=com_par, history_date=timezone.now(), history_type='+',
+        )
+
+        ProdutoLegado.objects.create(nome='Cabo UTP (legado)', codigo='CAB-01', preco_venda=Decimal('2.50'))
+        novo = ProdutoLegado.objects.create(nome='Fonte 12V', codigo='FON-02', preco_venda=Decimal('35.00'))
+        # Códigos em minúsculas: um já está no catálogo (e no legado com outra caixa), o outro é novo
+        minusculo = ProdutoLegado.objects.create(nome='Cabo UTP cat6', codigo=' cab-01', preco_venda=Decimal('2.80'))
+        ProdutoLegado.objects.create(nome='Retentor', codigo='ret-03', preco_venda=Decimal('4.00'))
+        for produto in ProdutoLegado.objects.all():
+            ItemEstoque.objects.create(produto=produto, quantidade_atual=10 if produto == novo else 3)
+        antes.get_model('tc_estoque', 'MovimentacaoEstoque').objects.create(
+            item=ItemEstoque.objects.get(produto=minusculo), tipo='ENT', quantidade=3,
+            usuario_id=User.objects.create_user(username='estoquista').pk,
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrar_para)
+        self.apps = executor.loader.project_state(self.migrar_para).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_contratos_apontam_para_o_fornecedor_do_catalogo(self):
+        Fornecedor = self.apps.get_model('tc_produtos', 'Fornecedor')
+        Contrato = self.apps.get_model('tc_contratos', 'Contrato')
+        HistoricalContrato = self.apps.get_model('tc_contratos', 'HistoricalContrato')
+
+        # Mesmo CNPJ (só dígitos) reaproveita o canônico; o outro é criado
+        self.assertEqual(Fornecedor.objects.count(), 3)
+        criado = Fornecedor.objects.get(cnpj='77.888.999/0001-00')
+        self.assertEqual(criado.razao_social, 'Energia Leste')
+
+        self.assertEqual(Contrato.objects.get(pk=self.contratos['CT-1']).fornecedor_id, self.fornecedor_existente.pk)
+        self.assertEqual(Contrato.objects.get(pk=self.contratos['CT-2']).fornecedor_id, criado.pk)
+        self.assertEqual(HistoricalContrato.objects.get().fornecedor_id, self.fornecedor_existente.pk)
+
+    def test_estoque_aponta_para_o_produto_do_catalogo(self):
+        Produto = self.apps.get_model('tc_produtos', 'Produto')
+        ItemEstoque = self.apps.get_model('tc_estoque', 'ItemEstoque')
+        MovimentacaoEstoque = self.apps.get_model('tc_estoque', 'MovimentacaoEstoque')
+
+        # " cab-01" cai no CAB-01 existente; "ret-03" é criado em maiúsculas
+        self.assertEqual(sorted(Produto.objects.values_list('codigo_interno', flat=True)), ['CAB-01', 'FON-02', 'RET-03'])
+        criado = Produto.objects.get(codigo_interno='FON-02')
+        self.assertEqual(criado.nome, 'Fonte 12V')
+        self.assertEqual(criado.preco_venda_padrao, Decimal('35.00'))
+        retentor = Produto.objects.get(codigo_interno='RET-03')
+
+        # Os dois itens legados do cabo viram um único saldo, com a movimentação
+        saldos = dict(ItemEstoque.objects.values_list('produto_id', 'quantidade_atual'))
+        self.assertEqual(saldos, {self.produto_existente.pk: 6, criado.pk: 10, retentor.pk: 3})
+        self.assertEqual(MovimentacaoEstoque.objects.get().item.produto_id, self.produto_existente.pk)
+
+
+class KanbanMovimentacaoTest(TestCase):
+    """
+    Lotes do quadro com controle de versão: uma versão desatualizada rejeita o
+    lote inteiro (409) e o feed só avança a revisão sobre linhas assentadas.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='gestor', password='senha')
+        cls.cliente = Cliente.objects.create(razao_social='Cliente Kanban')
+        cls.prospeccao = EtapaVenda.objects.create(nome='Prospecção', ordem=1)
+        cls.proposta = EtapaVenda.objects.create(nome='Proposta', ordem=2)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.primeira = Oportunidade.objects.create(nome='Negócio A', cliente=self.cliente, etapa=self.prospeccao)
+        self.segunda = Oportunidade.objects.create(nome='Negócio B', cliente=self.cliente, etapa=self.prospeccao)
+
+    def lote(self, versao_primeira):
+        return [{'etapa': self.proposta.pk, 'cartoes': [
+            {'id': self.primeira.pk, 'versao': versao_primeira},
+            {'id': self.segunda.pk, 'versao': self.segunda.versao},
+        ]}]
+
+    def mover(self, colunas):
+        return self.client.post(reverse('crm:kanban_mover'), {'colunas': json.dumps(colunas)})
+
+    def test_lote_atual_move_os_cartoes_e_publica_no_feed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.mover(self.lote(self.primeira.versao))
+
+        self.assertEqual(response.status_code, 200)
+        for oportunidade in (self.primeira, self.segunda):
+            versao = oportunidade.versao
+            oportunidade.refresh_from_db()
+            self.assertEqual(oportunidade.etapa, self.proposta)
+            self.assertEqual(oportunidade.versao, versao + 1)
+        self.assertEqual(
+            set(AlteracaoKanban.objects.values_list('oportunidade_id', flat=True)), {self.primeira.pk, self.segunda.pk},
+        )
+
+    def test_versao_desatualizada_responde_409_sem_gravar(self):
+        # Outro usuário moveu o cartão depois que o quadro o recebeu
+        Oportunidade.objects.filter(pk=self.primeira.pk).update(versao=self.primeira.versao + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.mover(self.lote(self.primeira.versao))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual({c.pk for c in response.context['cartoes']}, {self.primeira.pk, self.segunda.pk})
+        self.assertFalse(Oportunidade.objects.filter(etapa=self.proposta).exists())
+        self.assertFalse(AlteracaoKanban.objects.exists())
+
+    def test_cartao_fora_do_quadro_gera_conflito(self):
+        lote = self.lote(self.primeira.versao)
+        removida = self.segunda.pk
+        self.segunda.delete()
+
+        with self.assertRaises(ConflitoKanban) as conflito:
+            KanbanService.mover(lote, self.usuario)
+
+        self.assertEqual(conflito.exception.removidos, [removida])
+        self.primeira.refresh_from_db()
+        self.assertEqual(self.primeira.etapa, self.prospeccao)
+
+    def test_feed_reenvia_linhas_recentes_ate_assentarem(self):
+        antiga = AlteracaoKanban.objects.create(oportunidade_id=self.primeira.pk)
+        assentada = timezone.now() - timedelta(seconds=KanbanService.MARGEM_SEGUNDOS + 1)
+        AlteracaoKanban.objects.filter(pk=antiga.pk).update(criado_em=assentada)
+        # A revisão seguinte ficou visível antes de uma anterior (commit fora de ordem)
+        AlteracaoKanban.objects.create(pk=antiga.pk + 2, oportunidade_id=self.segunda.pk)
+        oportunidades = Oportunidade.objects.all()
+
+        alteracoes = KanbanService.alteracoes(antiga.pk, oportunidades)
+        self.assertEqual(alteracoes['revisao'], antiga.pk)
+        self.assertEqual([c.pk for c in alteracoes['cartoes']], [self.segunda.pk])
+
+        AlteracaoKanban.objects.create(pk=antiga.pk + 1, oportunidade_id=self.primeira.pk)
+        alteracoes = KanbanService.alteracoes(alteracoes['revisao'], oportunidades)
+        self.assertEqual({c.pk for c in alteracoes['cartoes']}, {self.primeira.pk, self.segunda.pk})
+
+        AlteracaoKanban.objects.update(criado_em=assentada)
+        self.assertEqual(KanbanService.alteracoes(antiga.pk, oportunidades)['revisao'], antiga.pk + 2)
+
+
+class ClonagemTest(TestCase):
+    """
+    Cópia de propostas (variantes) e de oportunidades com propostas, itens e
+    atividades pendentes; as views exigem login e permissão de inclusão.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_superuser(username='gestor', password='senha')
+        cls.sem_permissao = User.objects.create_user(username='estagiario', password='senha')
+        cls.cliente = Cliente.objects.create(razao_social='Cliente Clonagem')
+        cls.aberta = EtapaVenda.objects.create(nome='Prospecção', ordem=1)
+        cls.ganha = EtapaVenda.objects.create(nome='Ganho', ordem=5, e_etapa_ganha=True)
+
+    def setUp(self):
+        self.oportunidade = Oportunidade.objects.create(
+            nome='Projeto Rede', cliente=self.cliente, etapa=self.ganha, responsavel=self.gestor,
+            valor_estimado=Decimal('5000.00'), data_fechamento_real=timezone.now(),
+        )
+        self.proposta = Proposta.objects.create(oportunidade=self.oportunidade, criado_por=self.gestor)
+        for ordem, preco in enumerate((Decimal('10.00'), Decimal('25.50'))):
+            ItemProposta.objects.create(proposta=self.proposta, resumo_item=f'Item {ordem}', quantidade=2, preco_unitario=preco, ordem=ordem)
+        self.pendente = Atividade.objects.create(
+            assunto='Ligar', data_hora=timezone.now(), responsavel=self.gestor, oportunidade=self.oportunidade,
+        )
+        Atividade.objects.create(
+            assunto='Visita', data_hora=timezone.now(), responsavel=self.gestor, oportunidade=self.oportunidade,
+            concluida=True,
+        )
+
+    def test_variantes_copiam_os_itens_e_respeitam_o_limite(self):
+        novas = ClonagemService.clonar_proposta(self.proposta, variantes=500, usuario=self.gestor)
+
+        self.assertEqual(len(novas), ClonagemService.LIMITE_VARIANTES)
+        self.assertEqual(len({nova.id_proposta for nova in novas} | {self.proposta.id_proposta}), len(novas) + 1)
+        for nova in novas:
+            self.assertEqual(nova.status, 'elaboracao')
+            self.assertEqual(
+                list(nova.itens.values_list('resumo_item', 'quantidade', 'preco_unitario')),
+                list(self.proposta.itens.values_list('resumo_item', 'quantidade', 'preco_unitario')),
+            )
+
+    def test_oportunidade_ganha_vira_negocio_em_aberto(self):
+        nova = ClonagemService.clonar_oportunidade(
+            self.oportunidade, atividades=[self.pendente.pk], usuario=self.gestor,
+        )
+
+        self.assertEqual(nova.etapa, self.aberta)
+        self.assertIsNone(nova.data_fechamento_real)
+        self.assertEqual(nova.nome, 'Projeto Rede (CÓPIA)')
+        proposta = Proposta.objects.get(oportunidade=nova)
+        self.assertEqual(proposta.itens.count(), 2)
+        self.assertEqual(list(nova.atividade_set.values_list('assunto', flat=True)), ['Ligar'])
+
+    def test_duplicar_exige_login_e_permissao(self):
+        urls = [
+            reverse('crm:oportunidade_duplicar', args=[self.oportunidade.pk]),
+            reverse('crm:proposta_duplicar', args=[self.proposta.pk]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.post(url).status_code, 302)
+        self.client.force_login(self.sem_permissao)
+        for url in urls:
+            self.assertEqual(self.client.post(url).status_code, 403)
+        self.assertEqual(Oportunidade.objects.count(), 1)
+        self.assertEqual(Proposta.objects.count(), 1)
+
+    def test_duplicar_recusa_proposta_de_outra_oportunidade(self):
+        outra = Oportunidade.objects.create(nome='Outra', cliente=self.cliente, etapa=self.aberta)
+        alheia = Proposta.objects.create(oportunidade=outra, criado_por=self.gestor)
+        self.client.force_login(self.gestor)
+
+        response = self.client.post(
+            reverse('crm:oportunidade_duplicar', args=[self.oportunidade.pk]), {'propostas': [alheia.pk]},
+        )
+
+        self.assertRedirects(response, reverse('crm:oportunidade_detail', args=[self.oportunidade.pk]), fetch_redirect_response=False)
+        self.assertEqual(Oportunidade.objects.count(), 2)
+
+
+class EdicaoItensPropostaTest(TestCase):
+    """
+    Editor de itens em lote: alterações, exclusões e reordenação numa única
+    transação; lote inválido é desfeito e as views exigem change_proposta.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.gestor = User.objects.create_superuser(username='gestor', password='senha')
+        cls.sem_permissao = User.objects.create_user(username='estagiario', password='senha')
+        cliente = Cliente.objects.create(razao_social='Cliente Itens')
+        etapa = EtapaVenda.objects.create(nome='Proposta', ordem=1)
+        cls.oportunidade = Oportunidade.objects.create(nome='Projeto Itens', cliente=cliente, etapa=etapa)
+
+    def setUp(self):
+        self.proposta = Proposta.objects.create(oportunidade=self.oportunidade, criado_por=self.gestor)
+        self.itens = [
+            ItemProposta.objects.create(
+                proposta=self.proposta, resumo_item=f'Item {ordem}', quantidade=1, preco_unitario=Decimal('10.00'), ordem=ordem,
+            )
+            for ordem in range(3)
+        ]
+
+    def ordem(self):
+        return list(self.proposta.itens.order_by('ordem').values_list('pk', flat=True))
+
+    def test_lote_altera_exclui_e_reordena(self):
+        primeiro, segundo, terceiro = self.itens
+
+        resultado = EdicaoItensPropostaService.aplicar(self.proposta, [
+            {'op': 'update', 'id': primeiro.pk, 'quantidade': '3', 'preco': '12,50'},
+            {'op': 'delete', 'id': segundo.pk},
+            {'op': 'reorder', 'ids': [terceiro.pk, primeiro.pk]},
+        ])
+
+        self.assertEqual(resultado['removidos'], [segundo.pk])
+        self.assertTrue(resultado['reordenado'])
+        self.assertEqual(self.ordem(), [terceiro.pk, primeiro.pk])
+        primeiro.refresh_from_db()
+        self.assertEqual((primeiro.quantidade, primeiro.preco_unitario), (3, Decimal('12.50')))
+        self.assertEqual(EdicaoItensPropostaService.totais(self.proposta)['subtotal'], Decimal('47.50'))
+
+    def test_reordenacao_com_ids_invalidos_desfaz_o_lote(self):
+        primeiro = self.itens[0]
+        for ids in ('1,2,3', {'a': 1}, [str(primeiro.pk)], [True]):
+            with self.subTest(ids=ids), self.assertRaises(ValueError):
+                EdicaoItensPropostaService.aplicar(self.proposta, [
+                    {'op': 'update', 'id': primeiro.pk, 'quantidade': '9'},
+                    {'op': 'reorder', 'ids': ids},
+                ])
+        primeiro.refresh_from_db()
+        self.assertEqual(primeiro.quantidade, 1)
+
+    def test_lote_invalido_responde_400(self):
+        self.client.force_login(self.gestor)
+
+        response = self.client.post(
+            reverse('crm:itens_proposta_lote', args=[self.proposta.pk]),
+            {'operacoes': json.dumps([{'op': 'reorder', 'ids': 'x'}])},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertContains(response, 'Lista de ids inválida', status_code=400)
+
+    def test_views_exigem_permissao_de_alteracao(self):
+        item = self.itens[0]
+        chamadas = [
+            (reverse('crm:itens_proposta_lote', args=[self.proposta.pk]), {'operacoes': json.dumps([{'op': 'delete', 'id': item.pk}])}),
+            (reverse('crm:item_proposta_atualizar', args=[item.pk]), {'qtd': '5'}),
+            (reverse('crm:item_proposta_add', args=[self.proposta.pk]), {'catalogo_id': 'P-1'}),
+            (reverse('crm:item_proposta_excluir', args=[item.pk]), {}),
+        ]
+        for url, dados in chamadas:
+            self.assertEqual(self.client.post(url, dados).status_code, 302)
+        self.client.force_login(self.sem_permissao)
+        for url, dados in chamadas:
+            self.assertEqual(self.client.post(url, dados).status_code, 403)
+        item.refresh_from_db()
+        self.assertEqual(item.quantidade, 1)
+        self.assertEqual(self.proposta.itens.count(), 3)
+
+
+class TempoMedianoEtapaTest(TestCase):
+    """ Mediana do tempo em cada etapa, limitada ao período e ao vendedor filtrados. """
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = User.objects.create_user(username='vendedor', password='senha')
+        cliente = Cliente.objects.create(razao_social='Cliente Funil')
+        cls.prospeccao = EtapaVenda.objects.create(nome='Prospecção', ordem=1)
+        cls.proposta = EtapaVenda.objects.create(nome='Proposta', ordem=2)
+        cls.oportunidade = Oportunidade.objects.create(nome='Funil', cliente=cliente, etapa=cls.prospeccao)
+        cls.agora = timezone.now()
+
+    def transicao(self, segundos, dias_atras=0, responsavel=None):
+        return TransicaoEtapa.objects.create(
+            oportunidade=self.oportunidade, etapa_origem=self.prospeccao, etapa_destino=self.proposta,
+            responsavel=responsavel, data=self.agora - timedelta(days=dias_atras),
+            segundos_na_etapa=segundos, history_id=TransicaoEtapa.objects.count() + 1,
+        )
+
+    def test_mediana_do_periodo_por_etapa(self):
+        for segundos in (100, 300, 200, 1000):
+            self.transicao(segundos)
+        self.transicao(999999, dias_atras=60)
+        self.transicao(50, responsavel=self.vendedor)
+        hoje = timezone.localdate()
+
+        self.assertEqual(
+            FunilVendasService.tempo_mediano_por_etapa(hoje - timedelta(days=7), hoje),
+            {self.prospeccao.pk: 200},
+        )
+        self.assertEqual(
+            FunilVendasService.tempo_mediano_por_etapa(hoje, hoje, responsavel=self.vendedor),
+            {self.prospeccao.pk: 50},
+        )
+
+
+class InvalidacaoPainelMetasTest(TestCase):
+    """ Mudar ou desfazer a data de fechamento descarta o painel do mês novo e do antigo. """
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(razao_social='Cliente Metas')
+        cls.ganha = EtapaVenda.objects.create(nome='Ganho', ordem=1, e_etapa_ganha=True)
+        cls.aberta = EtapaVenda.objects.create(nome='Negociação', ordem=0)
+        cls.janeiro = timezone.make_aware(timezone.datetime(2026, 1, 15, 12))
+        cls.fevereiro = timezone.make_aware(timezone.datetime(2026, 2, 15, 12))
+
+    def setUp(self):
+        self.paineis = [MetasService.CACHE_PAINEL.format(2026, 1), MetasService.CACHE_PAINEL.format(2026, 2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oportunidade = Oportunidade.objects.create(
+                nome='Venda', cliente=self.cliente, etapa=self.ganha, data_fechamento_real=self.janeiro,
+            )
+        cache.set_many({chave: {'em_cache': True} for chave in self.paineis})
+
+    def salvar(self, **campos):
+        for campo, valor in campos.items():
+            setattr(self.oportunidade, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oportunidade.save()
+
+    def test_mudanca_de_mes_invalida_os_dois_meses(self):
+        self.salvar(data_fechamento_real=self.fevereiro)
+
+        self.assertEqual(cache.get_many(self.paineis), {})
+
+    def test_reabertura_invalida_o_mes_do_fechamento_anterior(self):
+        self.salvar(etapa=self.aberta, data_fechamento_real=None)
+
+        self.assertIsNone(cache.get(self.paineis[0]))
+        self.assertIsNotNone(cache.get(self.paineis[1]))
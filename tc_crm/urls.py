@@ -8,6 +8,7 @@ urlpatterns = [
     path('clientes/', views.ClienteListView.as_view(), name='cliente_list'),
     path('clientes/novo/', views.ClienteCreateView.as_view(), name='cliente_create'),
     path('clientes/<int:pk>/', views.ClienteDetailView.as_view(), name='cliente_detail'),
+    path('clientes/<int:pk>/abas/<slug:aba>/', views.ClienteAbaView.as_view(), name='cliente_aba'),
     path('clientes/<int:pk>/editar/', views.ClienteUpdateView.as_view(), name='cliente_update'),
     path('clientes/<int:pk>/excluir/', views.ClienteDeleteView.as_view(), name='cliente_delete'),
 
@@ -18,8 +19,9 @@ urlpatterns = [
     
     # Rotas de Kanban e Oportunidades
     path('kanban/', views.KanbanView.as_view(), name='kanban'),
+    path('kanban/mover/', views.KanbanMoverView.as_view(), name='kanban_mover'),
+    path('kanban/alteracoes/', views.KanbanAlteracoesView.as_view(), name='kanban_alteracoes'),
     path('oportunidades/novo/', views.OportunidadeCreateView.as_view(), name='oportunidade_create'),
-    path('oportunidades/atualizar-etapa/', views.atualizar_etapa_oportunidade, name='atualizar_etapa'),
     path('oportunidades/<int:pk>/', views.OportunidadeDetailView.as_view(), name='oportunidade_detail'),
     path('oportunidades/<int:oportunidade_pk>/atividade/novo/', views.AtividadeCreateView.as_view(), name='atividade_create'),
     path('atividades/<int:pk>/editar/', views.AtividadeUpdateView.as_view(), name='atividade_update'),
@@ -33,6 +35,8 @@ urlpatterns = [
     path('oportunidades/<int:oportunidade_pk>/proposta/novo/', views.PropostaCreateView.as_view(), name='proposta_create'),
     path('proposta/<int:pk>/itens/', views.PropostaItensView.as_view(), name='proposta_itens'),
     path('proposta/<int:pk>/item/add/', views.item_proposta_add, name='item_proposta_add'),
+    path('proposta/<int:pk>/itens/lote/', views.itens_proposta_lote, name='itens_proposta_lote'),
+    path('proposta/<int:pk>/catalogo/', views.CatalogoBuscaView.as_view(), name='proposta_catalogo_busca'),
     path('proposta/<int:pk>/total-fragment/', views.proposta_total_fragment, name='proposta_total_fragment'),
     path('proposta/item/<int:pk>/atualizar/', views.atualizar_item_proposta, name='item_proposta_atualizar'),
     path('proposta/item/<int:pk>/excluir/', views.excluir_item_proposta, name='item_proposta_excluir'),
@@ -50,6 +54,12 @@ urlpatterns = [
     # Rotas de Fornecedores
     path('fornecedor/modal/novo/', views.fornecedor_modal_create, name='fornecedor_modal_create'),
 
+    # Rotas de Duplicidades (fila de revisão e mesclagem)
+    path('duplicidades/', views.DuplicidadeListView.as_view(), name='duplicidade_list'),
+    path('duplicidades/buscar/', views.DuplicidadeBuscarView.as_view(), name='duplicidade_buscar'),
+    path('duplicidades/<int:pk>/mesclar/', views.DuplicidadeMesclarView.as_view(), name='duplicidade_mesclar'),
+    path('duplicidades/<int:pk>/descartar/', views.DuplicidadeDescartarView.as_view(), name='duplicidade_descartar'),
+
     #Rota Dashboard CRM
     path('performance/', views.dashboard_vendas_view, name='dashboard_vendas'),
 ]
\ No newline at end of file
@@ -1,23 +1,28 @@
 import datetime
-from decimal import Decimal
+import json
+from collections import defaultdict
 from django.utils import timezone
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import Count, Sum, Q, prefetch_related_objects
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy, reverse
-from django.http import HttpResponse
-from tc_core.mixins import PermissionRequiredMixin
+from django.http import HttpResponse, Http404
+from tc_core.mixins import PermissionRequiredMixin, KeysetPaginationMixin
 from django.contrib import messages
-from django.apps import apps
 from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
 from django.template.loader import render_to_string
 from weasyprint import HTML
-from datetime import timedelta
-from django.contrib.auth.decorators import login_required
-
-from .models import Cliente, Contato, EtapaVenda, Oportunidade, Atividade, Proposta, ItemProposta, MetaMensal
+from django.contrib.auth.decorators import login_required, permission_required
+
+from .models import (
+    CandidatoDuplicata, Cliente, Contato, EtapaVenda, Oportunidade, Atividade, Proposta, ItemProposta, MetaMensal,
+)
+from .services import (
+    CatalogoService, ClonagemService, ConflitoKanban, DeduplicacaoService, EdicaoItensPropostaService, KanbanService,
+    MetasService, PrevisaoVendasService, ResumoClienteService,
+)
 from .forms import ClienteForm, ContatoForm, OportunidadeForm, AtividadeForm, PropostaForm, FornecedorForm
 
 from tc_produtos.models import Fornecedor # Certifique-se de importar o correto
@@ -28,7 +33,7 @@ from tc_core.models import Usuario  # CORRETO: Usuario vem do core
 # CLIENTES (CRUD COMPLETO)
 # ############################################################################
 
-class ClienteListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ClienteListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     permission_required = 'tc_crm.view_cliente'
     model = Cliente
     # Se a requisição for HTMX, renderiza apenas a tabela, senão a página inteira
@@ -38,8 +43,12 @@ class ClienteListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         return ['crm/cliente_list.html']
         
     context_object_name = 'clientes'
-    ordering = ['razao_social']
     paginate_by = 20
+    keyset_ordenacao_padrao = 'razao_social'
+    keyset_ordenacoes = {
+        'razao_social': ('razao_social',),
+        '-razao_social': ('-razao_social',),
+    }
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -48,9 +57,9 @@ class ClienteListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         q = self.request.GET.get('q')
         if q:
             queryset = queryset.filter(
-                models.Q(razao_social__icontains=q) | 
-                models.Q(nome_fantasia__icontains=q) | 
-                models.Q(cnpj_cpf__icontains=q)
+                Q(razao_social__icontains=q) | 
+                Q(nome_fantasia__icontains=q) | 
+                Q(cnpj_cpf__icontains=q)
             )
 
         # Filtro por Vendedor Responsável
@@ -74,30 +83,48 @@ class ClienteDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        hoje = timezone.now()
-        
-        # Oportunidades Ganhas (Vendas)
-        vendas = Oportunidade.objects.filter(
-            cliente=self.object, 
-            etapa__e_etapa_ganha=True
-        )
-        
-        # Cálculos de Indicadores
-        context['total_vendas_geral'] = vendas.aggregate(Sum('valor_estimado'))['valor_estimado__sum'] or 0
-        context['total_vendas_ano'] = vendas.filter(data_fechamento_real__year=hoje.year).aggregate(Sum('valor_estimado'))['valor_estimado__sum'] or 0
-        
-        tres_meses_atras = hoje - timedelta(days=90)
-        context['total_vendas_trimestre'] = vendas.filter(data_fechamento_real__gte=tres_meses_atras).aggregate(Sum('valor_estimado'))['valor_estimado__sum'] or 0
-        
-        um_mes_atras = hoje - timedelta(days=30)
-        context['total_vendas_mes'] = vendas.filter(data_fechamento_real__gte=um_mes_atras).aggregate(Sum('valor_estimado'))['valor_estimado__sum'] or 0
-
-        # Dados para as Abas
-        context['oportunidades'] = self.object.oportunidade_set.all().order_by('-id')
-        # Busca propostas de todas as oportunidades do cliente
-        context['propostas'] = Proposta.objects.filter(oportunidade__cliente=self.object).order_by('-data_criacao')
-        context['ultimas_vendas_list'] = vendas.order_by('-data_fechamento_real')[:10]
-        
+        # Indicadores vêm do resumo pré-calculado; as abas carregam via HTMX
+        context['resumo'] = ResumoClienteService.obter(self.object)
+        return context
+
+class ClienteAbaView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+    """ Conteúdo de uma aba do Hub do Cliente, carregado sob demanda (HTMX). """
+    permission_required = 'tc_crm.view_cliente'
+    model = Cliente
+    context_object_name = 'cliente'
+    ABAS = {
+        'contatos': 'Contatos',
+        'atividades': 'Timeline (FUP)',
+        'oportunidades': 'Oportunidades',
+        'contratos': 'Contratos',
+        'propostas': 'Propostas',
+    }
+
+    def get(self, request, *args, **kwargs):
+        if kwargs['aba'] not in self.ABAS:
+            raise Http404
+        return super().get(request, *args, **kwargs)
+
+    def get_template_names(self):
+        return [f"crm/partials/cliente_aba_{self.kwargs['aba']}.html"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        aba = self.kwargs['aba']
+        oportunidades = self.object.oportunidade_set.order_by('-id')
+        if aba == 'contatos':
+            context['contatos'] = self.object.contato_set.all()
+        elif aba == 'atividades':
+            context['atividades'] = self.object.atividade_set.select_related('responsavel')
+            context['prim_oport'] = oportunidades.first()
+        elif aba == 'oportunidades':
+            context['oportunidades'] = oportunidades.select_related('etapa')
+        elif aba == 'contratos':
+            context['oportunidades'] = oportunidades.filter(tipo_oportunidade=Oportunidade.TiposOportunidade.CONTRATO)
+        elif aba == 'propostas':
+            context['propostas'] = Proposta.objects.filter(
+                oportunidade__cliente=self.object
+            ).prefetch_related('itens').order_by('-data_criacao')
         return context
 
 class ClienteCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
@@ -194,22 +221,22 @@ class KanbanView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Pega o vendedor da URL, se não houver, assume o próprio usuário
+        # Vendedor comum só vê as DELE; gestor pode filtrar um vendedor pela URL
         vendedor_id = self.request.GET.get('vendedor')
-        
+
+        # Revisão lida antes dos cartões: o que mudar depois (ou ainda não tiver feito commit) chega pelo feed
+        context['revisao'] = KanbanService.revisao_assentada()
+        context['intervalo'] = settings.CRM_KANBAN_INTERVALO_SEGUNDOS
+        context['vendedor_id'] = vendedor_id or ''
+
+        por_etapa = defaultdict(list)
+        oportunidades = KanbanService.visiveis(user, vendedor_id).select_related('cliente').order_by('posicao_kanban', '-pk')
+        for oportunidade in oportunidades:
+            por_etapa[oportunidade.etapa_id].append(oportunidade)
+
         etapas = EtapaVenda.objects.all().order_by('ordem')
         for etapa in etapas:
-            # Filtro base
-            queryset = Oportunidade.objects.filter(etapa=etapa)
-            
-            # Se for vendedor comum, ele só vê as DELE, independente do que estiver na URL
-            if not (user.is_superuser or user.departamento in ['diretoria', 'financeiro']):
-                queryset = queryset.filter(responsavel=user)
-            # Se for gestor e houver um ID na URL, filtra por aquele vendedor específico
-            elif vendedor_id:
-                queryset = queryset.filter(responsavel_id=vendedor_id)
-                
-            etapa.oportunidades_lista = queryset
+            etapa.oportunidades_lista = por_etapa[etapa.pk]
             
         context['etapas'] = etapas
         return context
@@ -285,43 +312,91 @@ class OportunidadeUpdateView(LoginRequiredMixin, PermissionRequiredMixin, Update
             return response
         return super().form_valid(form)
 
+@login_required
+@permission_required('tc_crm.add_oportunidade', raise_exception=True)
 @require_POST
 def oportunidade_duplicar(request, pk):
-    """Cria uma nova oportunidade baseada em uma existente."""
+    """Cria uma nova oportunidade baseada em uma existente, com as propostas e as atividades pendentes."""
     original = get_object_or_404(Oportunidade, pk=pk)
-    
-    # Cria a cópia limpando o ID para o banco gerar um novo
-    nova_op = Oportunidade.objects.get(pk=pk)
-    nova_op.pk = None
-    nova_op.id = None
-    nova_op.nome = f"{original.nome} (CÓPIA)"
-    # Reseta campos de fechamento real se houver
-    nova_op.data_fechamento_real = None
-    nova_op.save()
-    
+
+    # Só aceita ids da própria oportunidade (texto, ids alheios ou fora da faixa do banco são recusados)
+    postadas = set(request.POST.getlist('propostas'))
+    postadas_atividades = set(request.POST.getlist('atividades'))
+    validas = {str(pk) for pk in original.proposta_set.values_list('pk', flat=True)}
+    validas_atividades = {str(pk) for pk in original.atividade_set.values_list('pk', flat=True)}
+    if not postadas <= validas or not postadas_atividades <= validas_atividades:
+        messages.error(request, "Seleção de propostas/atividades inválida.")
+        return redirect('crm:oportunidade_detail', pk=original.pk)
+
+    # Sem seleção explícita: todas as propostas e só as atividades ainda não concluídas
+    propostas = [int(pk) for pk in postadas] or None
+    atividades = [int(pk) for pk in postadas_atividades] or original.atividade_set.filter(concluida=False).values('pk')
+    try:
+        nova_op = ClonagemService.clonar_oportunidade(
+            original, propostas=propostas, atividades=atividades, usuario=request.user
+        )
+    except ValueError as erro:
+        messages.error(request, str(erro))
+        return redirect('crm:oportunidade_detail', pk=original.pk)
+
     messages.success(request, f"Oportunidade duplicada como '{nova_op.nome}'")
     
     # Redireciona para a nova oportunidade criada
     return redirect('crm:oportunidade_detail', pk=nova_op.pk)
 
-@csrf_exempt
-@require_POST
-def atualizar_etapa_oportunidade(request):
-    opportunity_id = request.POST.get('opportunity_id')
-    new_etapa_id = request.POST.get('new_etapa_id')
-    oportunidade = get_object_or_404(Oportunidade, pk=opportunity_id)
-    etapa = get_object_or_404(EtapaVenda, pk=new_etapa_id)
-    
-    oportunidade.etapa = etapa
-    oportunidade.save()
+class KanbanMoverView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Recebe em "colunas" (JSON) as colunas alteradas do quadro, cada uma com os
+    cartões na ordem exibida e a versão conhecida, e devolve os cartões
+    gravados. Em conflito de versão nada é gravado e a resposta (409) traz os
+    cartões atuais para o quadro se corrigir.
+    """
+    permission_required = 'tc_crm.change_oportunidade'
 
-    # Se a etapa for "Ganha", dispara o gatilho para o frontend abrir a modal de fechamento
-    if etapa.e_etapa_ganha:
-        response = HttpResponse(status=204)
-        response['HX-Trigger'] = f'abrirFechamento-{oportunidade.pk}'
+    def post(self, request):
+        try:
+            colunas = json.loads(request.POST.get('colunas') or '[]')
+        except ValueError:
+            return HttpResponse("Lote de movimentações inválido.", status=400)
+        try:
+            cartoes, removidos, status = KanbanService.mover(colunas, request.user), [], 200
+        except ConflitoKanban as conflito:
+            cartoes, removidos, status = conflito.cartoes, conflito.removidos, 409
+        except ValueError as erro:
+            return HttpResponse(str(erro), status=400)
+        prefetch_related_objects(cartoes, 'cliente')
+        return render(request, 'crm/partials/kanban_cartoes.html', {
+            'cartoes': cartoes, 'removidos': removidos,
+        }, status=status)
+
+class KanbanAlteracoesView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """
+    Feed do quadro: cartões alterados após a revisão "desde". Sem novidades
+    responde 204 sem tocar nas oportunidades; a nova revisão vai no cabeçalho
+    X-Kanban-Revisao.
+    """
+    permission_required = 'tc_crm.view_oportunidade'
+
+    def get(self, request):
+        try:
+            desde = int(request.GET.get('desde', ''))
+        except ValueError:
+            return HttpResponse("Revisão inválida.", status=400)
+        if KanbanService.revisao() <= desde:
+            return HttpResponse(status=204)
+
+        oportunidades = KanbanService.visiveis(request.user, request.GET.get('vendedor'))
+        alteracoes = KanbanService.alteracoes(desde, oportunidades)
+        if alteracoes is None:
+            # O feed já descartou parte do que este quadro não viu
+            response = HttpResponse(status=204)
+            response['HX-Refresh'] = 'true'
+            return response
+        if not (alteracoes['cartoes'] or alteracoes['removidos']):
+            return HttpResponse(status=204)
+        response = render(request, 'crm/partials/kanban_cartoes.html', alteracoes)
+        response['X-Kanban-Revisao'] = alteracoes['revisao']
         return response
-        
-    return HttpResponse(status=204)
 
 # Nova View para Renderizar a Modal de Escolha de Proposta
 def oportunidade_fechamento_view(request, pk):
@@ -501,133 +576,122 @@ class PropostaItensView(LoginRequiredMixin, PermissionRequiredMixin, DetailView)
     template_name = 'crm/proposta_itens.html'
     context_object_name = 'proposta'
 
+class CatalogoBuscaView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """ Resultados (fragmento HTMX) da busca no catálogo do editor de itens. """
+    permission_required = 'tc_crm.change_proposta'
+    template_name = 'crm/partials/catalogo_resultados.html'
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produtos_catalogo'] = apps.get_model('tc_produtos', 'Produto').objects.all()
-        context['servicos_catalogo'] = apps.get_model('tc_servicos', 'Servico').objects.all()
+        context['proposta_pk'] = self.kwargs['pk']
+        context['termo'] = self.request.GET.get('q', '').strip()
+        context['resultados'] = CatalogoService.buscar(context['termo'])
+        context['tamanho_minimo'] = CatalogoService.TAMANHO_MINIMO
         return context
 
+@login_required
+@permission_required('tc_crm.add_proposta', raise_exception=True)
 @require_POST
 def proposta_duplicar(request, pk):
-    """Cria uma cópia da proposta e de todos os seus itens associados."""
+    """Cria uma ou mais cópias (variantes) da proposta com todos os seus itens."""
     original = get_object_or_404(Proposta, pk=pk)
-    oportunidade_id = original.oportunidade.id
-    
-    # 1. Clona a Proposta (Capa)
-    nova_proposta = Proposta.objects.get(pk=pk)
-    nova_proposta.pk = None
-    nova_proposta.id = None
-    # Limpa o ID antigo para o save() gerar um novo código (ex: 20251231T005)
-    nova_proposta.id_proposta = "" 
-    nova_proposta.status = 'elaboracao'
-    nova_proposta.data_criacao = timezone.now()
-    nova_proposta.save()
-    
-    # 2. Clona os Itens da Proposta original para a nova
-    # Busca itens usando a relação correta 'itens' ou 'itemproposta_set'
-    itens_originais = original.itens.all() if hasattr(original, 'itens') else original.itemproposta_set.all()
-    
-    for item in itens_originais:
-        item.pk = None
-        item.id = None
-        item.proposta = nova_proposta
-        item.save()
-    
-    messages.success(request, f"Proposta duplicada com sucesso!")
-    return redirect('crm:oportunidade_detail', pk=oportunidade_id)
+    try:
+        variantes = int(request.POST.get('variantes', 1))
+    except ValueError:
+        variantes = 1
 
+    novas = ClonagemService.clonar_proposta(original, variantes=variantes, usuario=request.user)
+
+    if len(novas) == 1:
+        messages.success(request, "Proposta duplicada com sucesso!")
+    else:
+        messages.success(request, f"{len(novas)} variantes da proposta criadas!")
+    return redirect('crm:oportunidade_detail', pk=original.oportunidade_id)
+
+def _resposta_itens_proposta(request, proposta, operacoes):
+    """ Aplica o lote e devolve linhas alteradas + totais como swaps out-of-band. """
+    contexto = {'proposta': proposta, 'todos': None}
+    try:
+        contexto['resultado'] = EdicaoItensPropostaService.aplicar(proposta, operacoes)
+    except ValueError as erro:
+        # Lote desfeito: redesenha todas as linhas para descartar o que a tela já mostrava
+        contexto['erro'] = str(erro)
+        contexto['todos'] = list(proposta.itens.all())
+    contexto['totais'] = EdicaoItensPropostaService.totais(proposta)
+    return render(request, 'crm/partials/proposta_itens_lote.html', contexto, status=400 if 'erro' in contexto else 200)
+
+@login_required
+@permission_required('tc_crm.change_proposta', raise_exception=True)
+@require_POST
+def itens_proposta_lote(request, pk):
+    """
+    Editor de itens: recebe em "operacoes" (JSON) um lote de add/update/delete/reorder
+    e, opcionalmente, "adicionar" com ids do catálogo (P-12, S-3).
+    """
+    proposta = get_object_or_404(Proposta, pk=pk)
+    try:
+        operacoes = json.loads(request.POST.get('operacoes') or '[]')
+    except ValueError:
+        return HttpResponse("Lote de operações inválido.", status=400)
+    if isinstance(operacoes, list):
+        operacoes += [{'op': 'add', 'catalogo_id': catalogo_id} for catalogo_id in request.POST.getlist('adicionar')]
+    return _resposta_itens_proposta(request, proposta, operacoes)
+
+@login_required
+@permission_required('tc_crm.change_proposta', raise_exception=True)
 @require_POST
 def atualizar_item_proposta(request, pk):
-    item = get_object_or_404(ItemProposta, pk=pk)
+    item = get_object_or_404(ItemProposta.objects.select_related('proposta'), pk=pk)
+    operacao = {'op': 'update', 'id': item.pk}
     if 'qtd' in request.POST:
-        item.quantidade = int(request.POST.get('qtd'))
+        operacao['quantidade'] = request.POST.get('qtd')
     if 'preco' in request.POST:
-        item.preco_unitario = Decimal(request.POST.get('preco').replace(',', '.'))
-    item.save()
-
-    # Identificação do Tipo idêntica ao Template Principal
-    badge_html = ""
-    if "SER-" in item.resumo_item or "MÃO DE OBRA" in item.resumo_item.upper():
-        badge_html = '<span class="badge-type badge-servico">Serviço</span>'
-    elif "CON-" in item.resumo_item or "SOFT" in item.resumo_item.upper():
-        badge_html = '<span class="badge-type badge-software">Software</span>'
-    else:
-        badge_html = '<span class="badge-type badge-fisico">Físico</span>'
-
-    # HTML Corrigido com as colunas <td> corretas para manter o alinhamento
-    html = f"""
-    <tr class="item-row" id="item-{item.pk}">
-        <td class="px-4 align-middle">{badge_html}</td>
-        <td class="align-middle"><strong>{item.resumo_item}</strong></td>
-        <td class="align-middle">
-            <input type="number" name="qtd" value="{item.quantidade}" 
-                   class="form-control form-control-sm text-center input-edit"
-                   hx-post="/crm/proposta/item/{item.pk}/atualizar/" 
-                   hx-trigger="change" hx-target="#item-{item.pk}" hx-swap="outerHTML">
-        </td>
-        <td class="align-middle text-right">
-            <input type="text" name="preco" value="{item.preco_unitario}" 
-                   class="form-control form-control-sm text-right input-edit"
-                   hx-post="/crm/proposta/item/{item.pk}/atualizar/" 
-                   hx-trigger="change" hx-target="#item-{item.pk}" hx-swap="outerHTML">
-        </td>
-        <td class="align-middle text-right font-weight-bold text-dark">R$ {item.total}</td>
-        <td class="align-middle text-center">
-            <button class="btn btn-link text-danger p-0" hx-delete="/crm/proposta/item/{item.pk}/excluir/" 
-                    hx-target="#item-{item.pk}" hx-swap="delete" hx-confirm="Remover item?">
-                <i class="fas fa-trash"></i>
-            </button>
-        </td>
-    </tr>
-    """
-    response = HttpResponse(html)
-    response['HX-Trigger'] = 'atualizarTotalGeral'
-    return response
+        operacao['preco'] = request.POST.get('preco')
+    return _resposta_itens_proposta(request, item.proposta, [operacao])
 
+@login_required
+@permission_required('tc_crm.change_proposta', raise_exception=True)
 @require_POST
 def item_proposta_add(request, pk):
     proposta = get_object_or_404(Proposta, pk=pk)
-    catalogo_id = request.POST.get('catalogo_id')
-    tipo, item_id = catalogo_id.split('-')
-    
-    if tipo == 'P':
-        catalogo_item = get_object_or_404(apps.get_model('tc_produtos', 'Produto'), pk=item_id)
-        preco_venda = catalogo_item.preco_venda_padrao
-    else:
-        catalogo_item = get_object_or_404(apps.get_model('tc_servicos', 'Servico'), pk=item_id)
-        preco_venda = getattr(catalogo_item, 'preco_venda_padrao', Decimal('0.00'))
-
-    item = ItemProposta.objects.create(proposta=proposta, quantidade=1, preco_unitario=preco_venda, resumo_item=catalogo_item.nome)
-    return atualizar_item_proposta(request, item.pk)
+    return _resposta_itens_proposta(request, proposta, [{'op': 'add', 'catalogo_id': request.POST.get('catalogo_id')}])
 
+@login_required
+@permission_required('tc_crm.change_proposta', raise_exception=True)
 def excluir_item_proposta(request, pk):
     if request.method in ['DELETE', 'POST']:
-        item = get_object_or_404(ItemProposta, pk=pk)
-        item.delete()
-        response = HttpResponse("")
-        response['HX-Trigger'] = 'atualizarTotalGeral'
-        return response
+        item = get_object_or_404(ItemProposta.objects.select_related('proposta'), pk=pk)
+        return _resposta_itens_proposta(request, item.proposta, [{'op': 'delete', 'id': item.pk}])
     return HttpResponse(status=405)
 
 def proposta_total_fragment(request, pk):
     proposta = get_object_or_404(Proposta, pk=pk)
-    return HttpResponse(f"R$ {proposta.valor_total}")
+    return HttpResponse(f"R$ {EdicaoItensPropostaService.totais(proposta)['total']}")
 
 #Lista de propostas
-class PropostaListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class PropostaListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     permission_required = 'tc_crm.view_proposta'
     model = Proposta
     template_name = 'crm/proposta_list.html'
     context_object_name = 'propostas'
     paginate_by = 20
+    keyset_template_parcial = 'crm/partials/proposta_rows.html'
+    # Apenas estas ordenações são aceitas via ?order_by=
+    keyset_ordenacao_padrao = '-data_criacao'
+    keyset_ordenacoes = {
+        '-data_criacao': ('-data_criacao',),
+        'data_criacao': ('data_criacao',),
+        '-id_proposta': ('-id_proposta',),
+        'id_proposta': ('id_proposta',),
+    }
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        order_by = self.request.GET.get('order_by', '-data_criacao')
-        return queryset.order_by(order_by)
+        return super().get_queryset().select_related('oportunidade__cliente')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        if self.e_pagina_seguinte:
+            return context
         
         # 1. Total Emitido (Soma da receita inicial + mensal de todas as propostas)
         # Ajustamos para usar os campos reais do banco: receita_inicial e receita_mensal
@@ -755,22 +819,101 @@ def fornecedor_modal_create(request):
     # MUDANÇA AQUI: Apontando para a pasta financeiro
     return render(request, 'financeiro/partials/fornecedor_rapido_modal.html', {'form': form})
 
-def atualizar_etapa(request):
-    opportunity_id = request.POST.get('opportunity_id')
-    new_etapa_id = request.POST.get('new_etapa_id')
-    oportunidade = get_object_or_404(Oportunidade, pk=opportunity_id)
-    etapa = get_object_or_404(EtapaVenda, pk=new_etapa_id)
-    
-    oportunidade.etapa = etapa
-    oportunidade.save()
 
-    # Se a etapa for marcada como "Etapa Ganha" no banco de dados
-    if etapa.e_etapa_ganha:
+# ############################################################################
+# DUPLICIDADES DE CADASTRO (Fila de revisão)
+# ############################################################################
+
+class DuplicidadeListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+    permission_required = 'tc_crm.view_candidatoduplicata'
+    template_name = 'crm/duplicidade_list.html'
+    context_object_name = 'candidatos'
+    paginate_by = 25
+
+    def get_entidade(self):
+        entidade = self.request.GET.get('entidade')
+        return entidade if entidade in CandidatoDuplicata.Entidade.values else CandidatoDuplicata.Entidade.CLIENTE
+
+    def get_queryset(self):
+        return CandidatoDuplicata.objects.filter(
+            entidade=self.get_entidade(), status=CandidatoDuplicata.Status.PENDENTE,
+        ).order_by('-pontuacao', 'pk')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        entidade = self.get_entidade()
+        modelo = DeduplicacaoService.modelo(entidade)
+        campos = [modelo._meta.get_field(nome) for nome in DeduplicacaoService.CAMPOS_REVISAO[entidade]]
+
+        # Os dois lados de todos os pares da página em uma query
+        candidatos = context['candidatos']
+        registros = modelo.objects.select_related(*[c.name for c in campos if c.is_relation]).in_bulk(
+            {pk for c in candidatos for pk in (c.registro_a_id, c.registro_b_id)}
+        )
+        for candidato in candidatos:
+            a, b = registros.get(candidato.registro_a_id), registros.get(candidato.registro_b_id)
+            candidato.registro_a, candidato.registro_b = a, b
+            candidato.comparacao = [
+                (campo.verbose_name, getattr(a, campo.name, None), getattr(b, campo.name, None)) for campo in campos
+            ]
+
+        pendentes = dict(
+            CandidatoDuplicata.objects.filter(status=CandidatoDuplicata.Status.PENDENTE)
+            .values_list('entidade').annotate(total=Count('pk'))
+        )
+        context['entidade'] = entidade
+        context['entidades'] = [(valor, rotulo, pendentes.get(valor, 0)) for valor, rotulo in CandidatoDuplicata.Entidade.choices]
+        return context
+
+class DuplicidadeBuscarView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'tc_crm.change_candidatoduplicata'
+
+    def post(self, request):
+        entidade = request.POST.get('entidade')
+        if entidade not in CandidatoDuplicata.Entidade.values:
+            raise Http404
+        resultado = DeduplicacaoService.detectar(entidade)
+        messages.success(
+            request,
+            f"{resultado['registros']} cadastro(s) analisado(s) em {resultado['comparacoes']} comparação(ões): "
+            f"{resultado['novos']} novo(s) par(es) na fila."
+        )
         response = HttpResponse(status=204)
-        response['HX-Trigger'] = f'abrirFechamento-{oportunidade.id}'
+        response['HX-Refresh'] = 'true'
+        return response
+
+class DuplicidadeMesclarView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'tc_crm.change_candidatoduplicata'
+
+    def post(self, request, pk):
+        candidato = get_object_or_404(CandidatoDuplicata, pk=pk)
+        # A mescla exclui o duplicado: exige também a permissão de exclusão do cadastro
+        opts = DeduplicacaoService.modelo(candidato.entidade)._meta
+        permissao_exclusao = f'{opts.app_label}.delete_{opts.model_name}'
+        if not request.user.has_perm(permissao_exclusao):
+            messages.error(request, f"Acesso Negado: Você não tem permissão ('{permissao_exclusao}') para mesclar estes cadastros.")
+            response = HttpResponse(status=204)
+            response['HX-Refresh'] = 'true'
+            return response
+        try:
+            movidos = DeduplicacaoService.mesclar(candidato, int(request.POST.get('mantido', 0)), usuario=request.user)
+        except ValueError as erro:
+            messages.error(request, str(erro))
+        else:
+            messages.success(request, f"Cadastros mesclados: {sum(movidos.values())} vínculo(s) transferido(s).")
+        response = HttpResponse(status=204)
+        response['HX-Refresh'] = 'true'
+        return response
+
+class DuplicidadeDescartarView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    permission_required = 'tc_crm.change_candidatoduplicata'
+
+    def post(self, request, pk):
+        candidato = get_object_or_404(CandidatoDuplicata, pk=pk, status=CandidatoDuplicata.Status.PENDENTE)
+        DeduplicacaoService.descartar(candidato, usuario=request.user)
+        response = HttpResponse(status=204)
+        response['HX-Refresh'] = 'true'
         return response
-    
-    return HttpResponse(status=204)
 
 
         
@@ -783,10 +926,9 @@ def dashboard_vendas_view(request):
     import json
     import locale
     from decimal import Decimal
-    from django.db.models import Sum, Q
+    from django.db.models import Sum
     from django.utils import timezone
-    from tc_core.models import Usuario
-    from .models import Oportunidade, MetaMensal, Cliente
+    from .models import Oportunidade, Cliente
 
     # Configuração de idioma para meses em Português
     try:
@@ -808,53 +950,25 @@ def dashboard_vendas_view(request):
     mes_ant = data_mes_anterior.month
     ano_ant = data_mes_anterior.year
 
-    # --- 1. LÓGICA DO GRÁFICO E PERFORMANCE ---
-    vendedores_performance = Usuario.objects.filter(
-        departamento='comercial', is_active=True
-    ).annotate(
-        realizado_mes=Sum(
-            'oportunidade__valor_estimado',
-            filter=Q(
-                oportunidade__etapa__e_etapa_ganha=True,
-                oportunidade__data_fechamento_real__month=mes_atual,
-                oportunidade__data_fechamento_real__year=ano_atual
-            )
-        )
-    )
+    # --- 1. LÓGICA DO GRÁFICO E PERFORMANCE (metas x realizado da equipe, em cache por mês) ---
+    painel = MetasService.painel(ano_atual, mes_atual)
+    painel_anterior = MetasService.painel(ano_ant, mes_ant)
 
-    labels, dados_meta, dados_realizado = [], [], []
-    for v in vendedores_performance:
-        labels.append(v.get_full_name() or v.username)
-        meta_v = MetaMensal.objects.filter(vendedor=v, mes=mes_atual, ano=ano_atual).first()
-        dados_meta.append(float(meta_v.valor_objetivo) if meta_v else 0.0)
-        dados_realizado.append(float(v.realizado_mes) if v.realizado_mes else 0.0)
+    labels = [linha['nome'] for linha in painel['vendedores']]
+    dados_meta = [float(linha['meta']) for linha in painel['vendedores']]
+    dados_realizado = [float(linha['realizado']) for linha in painel['vendedores']]
 
     # --- 2. TOTAIS E COMPARATIVO ---
-    realizado_anterior = Decimal('0.00')
     if is_gestor:
-        meta_global = MetaMensal.objects.filter(vendedor__isnull=True, mes=mes_atual, ano=ano_atual).first()
-        valor_meta_topo = meta_global.valor_objetivo if meta_global else Decimal('0.00')
-        valor_realizado_topo = sum(dados_realizado)
-        realizado_anterior = Oportunidade.objects.filter(
-            etapa__e_etapa_ganha=True, 
-            data_fechamento_real__month=mes_ant,
-            data_fechamento_real__year=ano_ant
-        ).aggregate(total=Sum('valor_estimado'))['total'] or Decimal('0.00')
+        valor_meta_topo = painel['meta_global']
+        valor_realizado_topo = painel['realizado_equipe']
+        realizado_anterior = painel_anterior['realizado_empresa']
     else:
-        try:
-            idx = labels.index(user.get_full_name() or user.username)
-            valor_meta_topo = Decimal(dados_meta[idx])
-            valor_realizado_topo = Decimal(dados_realizado[idx])
-        except (ValueError, IndexError):
-            valor_meta_topo = Decimal('0.00')
-            valor_realizado_topo = Decimal('0.00')
-        
-        realizado_anterior = Oportunidade.objects.filter(
-            responsavel=user,
-            etapa__e_etapa_ganha=True, 
-            data_fechamento_real__month=mes_ant,
-            data_fechamento_real__year=ano_ant
-        ).aggregate(total=Sum('valor_estimado'))['total'] or Decimal('0.00')
+        minha_linha = MetasService.do_vendedor(painel, user.pk)
+        minha_linha_anterior = MetasService.do_vendedor(painel_anterior, user.pk)
+        valor_meta_topo = minha_linha['meta'] if minha_linha else Decimal('0.00')
+        valor_realizado_topo = minha_linha['realizado'] if minha_linha else Decimal('0.00')
+        realizado_anterior = minha_linha_anterior['realizado'] if minha_linha_anterior else Decimal('0.00')
 
     porcentagem = float(round((Decimal(valor_realizado_topo) / valor_meta_topo) * 100, 1)) if valor_meta_topo > 0 else 0
     crescimento_vs_anterior = 0
@@ -884,6 +998,9 @@ def dashboard_vendas_view(request):
     qtd_clientes_meus = Cliente.objects.filter(oportunidade__responsavel=user).distinct().count()
     qtd_opts_total = Oportunidade.objects.exclude(etapa__e_etapa_ganha=True).exclude(etapa__nome__icontains='Perdida').count()
 
+    # Previsão ponderada pela taxa histórica de ganho (empresa para gestores, senão a do vendedor)
+    previsao = PrevisaoVendasService.obter(PrevisaoVendasService.escopo(user))
+
     # --- 4. MONTAGEM FINAL DO CONTEXTO ---
     context = {
         'is_gestor': is_gestor,
@@ -896,7 +1013,7 @@ def dashboard_vendas_view(request):
         'grafico_labels': json.dumps(labels),
         'grafico_meta': json.dumps(dados_meta),
         'grafico_realizado': json.dumps(dados_realizado),
-        'ranking_vendedores': vendedores_performance.order_by('-realizado_mes')[:5] if is_gestor else [],
+        'ranking_vendedores': sorted(painel['vendedores'], key=lambda linha: -linha['realizado'])[:5] if is_gestor else [],
         
         # Variáveis dos Cards
         'qtd_abertas': qtd_abertas, 'vol_abertas': vol_abertas,
@@ -905,6 +1022,9 @@ def dashboard_vendas_view(request):
         'qtd_clientes_total': qtd_clientes_total,
         'qtd_clientes_meus': qtd_clientes_meus,
         'qtd_opts_total': qtd_opts_total,
+        'previsao_mes': previsao['meses'][0]['ponderado'],
+        'pipeline_ponderado': previsao['ponderado'],
+        'previsao_meses': previsao['meses'],
     }
 
     return render(request, 'crm/dashboard_vendas.html', context)
\ No newline at end of file
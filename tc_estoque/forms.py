@@ -19,11 +19,9 @@ class ItemEstoqueForm(forms.ModelForm):
         
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Filtra 'Produto' para mostrar apenas itens que não são Serviços (TipoProduto.ESTOQUE_PROPRIO)
-        ProdutoModel = apps.get_model('produtos', 'Produto')
-        self.fields['produto'].queryset = ProdutoModel.objects.filter(
-            tipo_produto=ProdutoModel.TipoProduto.ESTOQUE_PROPRIO
-        )
+        # Filtra 'Produto' para mostrar apenas produtos físicos (serviços e licenças não têm estoque)
+        ProdutoModel = apps.get_model('tc_produtos', 'Produto')
+        self.fields['produto'].queryset = ProdutoModel.objects.filter(tipo_produto='PROD')
         # Aplica a classe padrão do Select2
         self.fields['produto'].widget.attrs.update({'class': 'form-control custom-select'})
 
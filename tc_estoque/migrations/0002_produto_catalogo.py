@@ -0,0 +1,91 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def consolidar_produtos(apps, schema_editor):
+    # Incorpora tc_crm.Produto ao catálogo de tc_produtos pelo código (código
+    # legado = codigo_interno); os que não existem são criados em lote e os
+    # itens de estoque passam a apontar para o catálogo único. O catálogo
+    # grava o código em maiúsculas (Produto.save, que o bulk_create não chama),
+    # então a comparação e a gravação usam o código normalizado.
+    Legado = apps.get_model('tc_crm', 'Produto')
+    Produto = apps.get_model('tc_produtos', 'Produto')
+    ItemEstoque = apps.get_model('tc_estoque', 'ItemEstoque')
+
+    def normalizar(codigo):
+        return codigo.strip().upper()
+
+    legados = [
+        (pk, normalizar(codigo), nome, preco_venda)
+        for pk, codigo, nome, preco_venda in Legado.objects.values_list('pk', 'codigo', 'nome', 'preco_venda')
+    ]
+    existentes = {normalizar(codigo) for codigo in Produto.objects.values_list('codigo_interno', flat=True)}
+    novos = {}
+    for _pk, codigo, nome, preco_venda in legados:
+        if codigo not in existentes:
+            # Códigos legados que só diferiam na caixa viram um único produto
+            novos.setdefault(codigo, Produto(codigo_interno=codigo, nome=nome, preco_venda_padrao=preco_venda))
+    Produto.objects.bulk_create(novos.values(), batch_size=1000)
+
+    canonicos = {normalizar(codigo): pk for codigo, pk in Produto.objects.values_list('codigo_interno', 'pk')}
+    mapa = {pk: canonicos[codigo] for pk, codigo, _nome, _preco in legados}
+
+    # Legados que só diferiam na caixa do código caem no mesmo produto: como o
+    # estoque é um por produto, os saldos (e as movimentações) são somados no
+    # primeiro item
+    mantidos, fundidos, alterados = {}, {}, []
+    for item in ItemEstoque.objects.only('pk', 'produto_id', 'quantidade_atual', 'quantidade_minima').order_by('pk').iterator(chunk_size=2000):
+        destino = mapa[item.produto_id]
+        mantido = mantidos.get(destino)
+        if mantido is None:
+            item.produto_catalogo_id = destino
+            mantidos[destino] = item
+            alterados.append(item)
+            continue
+        mantido.quantidade_atual += item.quantidade_atual
+        mantido.quantidade_minima = max(mantido.quantidade_minima, item.quantidade_minima)
+        fundidos.setdefault(mantido.pk, []).append(item.pk)
+    ItemEstoque.objects.bulk_update(alterados, ['produto_catalogo', 'quantidade_atual', 'quantidade_minima'], batch_size=1000)
+
+    if fundidos:
+        MovimentacaoEstoque = apps.get_model('tc_estoque', 'MovimentacaoEstoque')
+        for mantido_id, item_ids in fundidos.items():
+            MovimentacaoEstoque.objects.filter(item_id__in=item_ids).update(item_id=mantido_id)
+        ItemEstoque.objects.filter(pk__in=[pk for item_ids in fundidos.values() for pk in item_ids]).delete()
+
+class Migration(migrations.Migration):
+
+    # Cada operação no seu próprio commit: no PostgreSQL o ALTER TABLE não pode
+    # rodar com as verificações de FK da cópia ainda pendentes na transação
+    atomic = False
+
+    dependencies = [
+        ('tc_estoque', '0001_initial'),
+        ('tc_crm', '0014_candidatoduplicata'),
+        ('tc_produtos', '0004_busca_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemestoque',
+            name='produto_catalogo',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tc_produtos.produto'),
+        ),
+        migrations.RunPython(consolidar_produtos, migrations.RunPython.noop, atomic=True),
+        migrations.RemoveField(
+            model_name='itemestoque',
+            name='produto',
+        ),
+        migrations.RenameField(
+            model_name='itemestoque',
+            old_name='produto_catalogo',
+            new_name='produto',
+        ),
+        migrations.AlterField(
+            model_name='itemestoque',
+            name='produto',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estoque', to='tc_produtos.produto', verbose_name='Produto'),
+        ),
+    ]
@@ -2,9 +2,9 @@ from django.db import models
 from django.conf import settings
 
 class ItemEstoque(models.Model):
-    # Ajustado para tc_crm.Produto (Nome real no seu arquivo)
+    # Catálogo único de produtos (tc_produtos); o cadastro legado do CRM foi incorporado
     produto = models.OneToOneField(
-        'tc_crm.Produto', 
+        'tc_produtos.Produto', 
         on_delete=models.CASCADE, 
         related_name='estoque',
         verbose_name="Produto"
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Fatura, Despesa, MetaVenda
+from .models import Fatura, Despesa, MetaVenda, ExecucaoComissao, LinhaComissao
 from simple_history.admin import SimpleHistoryAdmin
 
 @admin.register(Fatura)
@@ -59,4 +59,28 @@ class DespesaAdmin(SimpleHistoryAdmin):
 
 @admin.register(MetaVenda)
 class MetaVendaAdmin(SimpleHistoryAdmin):
-    list_display = ('usuario', 'ano')
\ No newline at end of file
+    list_display = ('usuario', 'ano')
+
+@admin.register(ExecucaoComissao)
+class ExecucaoComissaoAdmin(admin.ModelAdmin):
+    list_display = ('competencia', 'base', 'completa', 'beneficiarios', 'linhas', 'iniciada_em', 'concluida_em', 'executada_por')
+    list_filter = ('base', 'completa', 'competencia')
+    readonly_fields = [f.name for f in ExecucaoComissao._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(LinhaComissao)
+class LinhaComissaoAdmin(admin.ModelAdmin):
+    # Extrato imutável: apenas consulta; correções entram como ajuste/estorno na próxima rodada
+    list_display = ('competencia', 'tipo_beneficiario', 'beneficiario', 'documento', 'tipo_lancamento', 'valor_base', 'taxa', 'valor_comissao')
+    list_filter = ('competencia', 'base', 'tipo_beneficiario', 'tipo_lancamento')
+    search_fields = ('documento', 'vendedor__username', 'vendedor__first_name', 'distribuidor__razao_social')
+    list_select_related = ('vendedor', 'distribuidor')
+    readonly_fields = [f.name for f in LinhaComissao._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
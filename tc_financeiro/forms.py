@@ -1,7 +1,8 @@
 from django import forms
 from .models import Fatura, Despesa, MetaVenda
-from tc_produtos.models import Fornecedor 
-from tc_crm.models import Cliente
+from tc_core.autocomplete import AutocompleteModelChoiceField
+from tc_crm.autocompletes import ClienteAutocomplete
+from tc_produtos.autocompletes import FornecedorAutocomplete
 from django.utils.translation import gettext_lazy as _
 
 class PremiumFormMixin:
@@ -21,10 +22,8 @@ class PremiumFormMixin:
                     field.widget.attrs['class'] = 'form-control select2 rounded-12'
 
 class FaturaForm(PremiumFormMixin, forms.ModelForm):
-    cliente = forms.ModelChoiceField(
-        queryset=Cliente.objects.all().order_by('razao_social'),
-        widget=forms.Select(attrs={'class': 'select2'})
-    )
+    # Busca remota: o formulário renderiza só o cliente escolhido
+    cliente = AutocompleteModelChoiceField(ClienteAutocomplete)
 
     class Meta:
         model = Fatura
@@ -43,11 +42,7 @@ class FaturaForm(PremiumFormMixin, forms.ModelForm):
         }
 
 class DespesaForm(PremiumFormMixin, forms.ModelForm):
-    fornecedor = forms.ModelChoiceField(
-        queryset=Fornecedor.objects.all().order_by('razao_social'),
-        required=True,
-        widget=forms.Select(attrs={'class': 'select2'})
-    )
+    fornecedor = AutocompleteModelChoiceField(FornecedorAutocomplete, required=True)
     
     class Meta:
         model = Despesa
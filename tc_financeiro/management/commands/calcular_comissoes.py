@@ -0,0 +1,30 @@
+# tc_financeiro/management/commands/calcular_comissoes.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tc_financeiro.models import ExecucaoComissao
+from tc_financeiro.services import ComissaoService
+
+class Command(BaseCommand):
+    help = 'Fecha as comissões de vendedores e distribuidores do mês, lançando as diferenças no extrato'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mês de fechamento no formato AAAA-MM (padrão: mês anterior)')
+        parser.add_argument('--base', choices=ExecucaoComissao.Base.values, help='Base de cálculo (padrão: FINANCEIRO_COMISSAO_BASE)')
+        parser.add_argument('--completa', action='store_true', help='Recalcula todos os beneficiários, não só os alterados')
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                competencia = datetime.strptime(options['mes'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Informe o mês no formato AAAA-MM.')
+        else:
+            competencia = (timezone.localdate().replace(day=1) - timezone.timedelta(days=1)).replace(day=1)
+
+        execucao = ComissaoService.executar(competencia, base=options['base'], completa=options['completa'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{execucao}: {execucao.beneficiarios} beneficiário(s) recalculado(s), {execucao.linhas} lançamento(s).'
+        ))
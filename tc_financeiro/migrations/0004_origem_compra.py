@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_financeiro', '0003_alter_despesa_numero_documento_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='despesa',
+            name='origem',
+            field=models.CharField(choices=[('MANUAL', 'Lançamento Manual'), ('PEDIDO', 'Pedido de Venda'), ('COMPRA', 'Pedido de Compra'), ('CONTRATO', 'Contrato Recorrente'), ('NF', 'Nota Fiscal'), ('IMPORTACAO', 'Importação de Planilha/XML')], default='MANUAL', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='fatura',
+            name='origem',
+            field=models.CharField(choices=[('MANUAL', 'Lançamento Manual'), ('PEDIDO', 'Pedido de Venda'), ('COMPRA', 'Pedido de Compra'), ('CONTRATO', 'Contrato Recorrente'), ('NF', 'Nota Fiscal'), ('IMPORTACAO', 'Importação de Planilha/XML')], default='MANUAL', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='historicaldespesa',
+            name='origem',
+            field=models.CharField(choices=[('MANUAL', 'Lançamento Manual'), ('PEDIDO', 'Pedido de Venda'), ('COMPRA', 'Pedido de Compra'), ('CONTRATO', 'Contrato Recorrente'), ('NF', 'Nota Fiscal'), ('IMPORTACAO', 'Importação de Planilha/XML')], default='MANUAL', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='historicalfatura',
+            name='origem',
+            field=models.CharField(choices=[('MANUAL', 'Lançamento Manual'), ('PEDIDO', 'Pedido de Venda'), ('COMPRA', 'Pedido de Compra'), ('CONTRATO', 'Contrato Recorrente'), ('NF', 'Nota Fiscal'), ('IMPORTACAO', 'Importação de Planilha/XML')], default='MANUAL', max_length=50),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_financeiro', '0004_origem_compra'),
+        ('tc_produtos', '0004_busca_catalogo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoComissao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(verbose_name='Competência (mês)')),
+                ('base', models.CharField(choices=[('oportunidade', 'Oportunidades Ganhas'), ('fatura', 'Faturas Pagas')], max_length=20, verbose_name='Base de Cálculo')),
+                ('completa', models.BooleanField(default=False, verbose_name='Recalculou Todos os Beneficiários?')),
+                ('iniciada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Iniciada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+                ('beneficiarios', models.PositiveIntegerField(default=0, verbose_name='Beneficiários Recalculados')),
+                ('linhas', models.PositiveIntegerField(default=0, verbose_name='Linhas Lançadas')),
+                ('taxas', models.JSONField(blank=True, default=dict, verbose_name='Taxas Aplicadas')),
+                ('executada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Executada por')),
+            ],
+            options={
+                'verbose_name': 'Execução de Comissão',
+                'verbose_name_plural': 'Execuções de Comissão',
+                'ordering': ['-iniciada_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LinhaComissao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(verbose_name='Competência (mês)')),
+                ('base', models.CharField(choices=[('oportunidade', 'Oportunidades Ganhas'), ('fatura', 'Faturas Pagas')], max_length=20, verbose_name='Base de Cálculo')),
+                ('tipo_beneficiario', models.CharField(choices=[('vendedor', 'Vendedor'), ('distribuidor', 'Distribuidor')], max_length=20, verbose_name='Beneficiário')),
+                ('origem_id', models.PositiveIntegerField(verbose_name='ID da Origem')),
+                ('documento', models.CharField(blank=True, max_length=255, verbose_name='Documento')),
+                ('tipo_lancamento', models.CharField(choices=[('comissao', 'Comissão'), ('ajuste', 'Ajuste'), ('estorno', 'Estorno')], max_length=20, verbose_name='Lançamento')),
+                ('valor_base', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Valor Base')),
+                ('taxa', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Taxa (%)')),
+                ('valor_comissao', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Comissão')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('distribuidor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='linhas_comissao', to='tc_produtos.fornecedor', verbose_name='Distribuidor')),
+                ('execucao', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lancamentos', to='tc_financeiro.execucaocomissao')),
+                ('vendedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='linhas_comissao', to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Linha de Comissão',
+                'verbose_name_plural': 'Extrato de Comissões',
+                'ordering': ['competencia', 'tipo_beneficiario', 'criado_em'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='execucaocomissao',
+            index=models.Index(fields=['competencia', 'base', 'iniciada_em'], name='idx_execucao_comissao'),
+        ),
+        migrations.AddIndex(
+            model_name='linhacomissao',
+            index=models.Index(fields=['competencia', 'base', 'tipo_beneficiario'], name='idx_comissao_competencia'),
+        ),
+        migrations.AddIndex(
+            model_name='linhacomissao',
+            index=models.Index(fields=['base', 'origem_id'], name='idx_comissao_origem'),
+        ),
+        migrations.AddIndex(
+            model_name='linhacomissao',
+            index=models.Index(fields=['vendedor', 'competencia'], name='idx_comissao_vendedor'),
+        ),
+        migrations.AddIndex(
+            model_name='linhacomissao',
+            index=models.Index(fields=['distribuidor', 'competencia'], name='idx_comissao_distribuidor'),
+        ),
+    ]
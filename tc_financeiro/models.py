@@ -18,6 +18,7 @@ class FinanceiroBase(models.Model):
     class OrigemTitulo(models.TextChoices):
         MANUAL = 'MANUAL', _('Lançamento Manual')
         PEDIDO = 'PEDIDO', _('Pedido de Venda')
+        COMPRA = 'COMPRA', _('Pedido de Compra')
         CONTRATO = 'CONTRATO', _('Contrato Recorrente')
         NF = 'NF', _('Nota Fiscal')
         IMPORTACAO = 'IMPORTACAO', _('Importação de Planilha/XML')
@@ -139,9 +140,11 @@ class Fatura(FinanceiroBase):
             
             self.numero_documento = f"{prefixo}{novo_num:07d}"
 
-        # Automação de Status original
+        # Automação de Status original (cancelamento/renegociação é manual e prevalece)
         self.recalcular_totais()
-        if self.valor_pago >= self.valor_total and self.valor_total > 0:
+        if self.status in (self.StatusFatura.CANCELADO, self.StatusFatura.RENEGOCIADO):
+            pass
+        elif self.valor_pago >= self.valor_total and self.valor_total > 0:
             self.status = self.StatusFatura.PAGO
         elif self.valor_pago > 0:
             self.status = self.StatusFatura.PARCIAL
@@ -170,6 +173,7 @@ class Despesa(FinanceiroBase):
     history = HistoricalRecords()
 
     def save(self, *args, **kwargs):
+        hoje = timezone.localdate()
         bruto = self.valor_original + self.valor_juros + self.valor_multa + getattr(self, 'valor_acrescimo', 0)
         self.valor_total = bruto - getattr(self, 'valor_desconto', 0)
 
@@ -196,4 +200,99 @@ class MetaVenda(models.Model):
     history = HistoricalRecords()
 
     class Meta:
-        unique_together = ('usuario', 'ano')
\ No newline at end of file
+        unique_together = ('usuario', 'ano')
+
+# ############################################################################
+# COMISSÕES (Execuções mensais e extrato imutável)
+# ############################################################################
+
+class ExecucaoComissao(models.Model):
+    """ Uma rodada de cálculo de comissões para um mês de fechamento e uma base. """
+    class Base(models.TextChoices):
+        OPORTUNIDADE = 'oportunidade', _('Oportunidades Ganhas')
+        FATURA = 'fatura', _('Faturas Pagas')
+
+    competencia = models.DateField(verbose_name="Competência (mês)")
+    base = models.CharField(max_length=20, choices=Base.choices, verbose_name="Base de Cálculo")
+    completa = models.BooleanField(default=False, verbose_name="Recalculou Todos os Beneficiários?")
+    iniciada_em = models.DateTimeField(default=timezone.now, verbose_name="Iniciada em")
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluída em")
+    executada_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Executada por"
+    )
+    beneficiarios = models.PositiveIntegerField(default=0, verbose_name="Beneficiários Recalculados")
+    linhas = models.PositiveIntegerField(default=0, verbose_name="Linhas Lançadas")
+    # Taxas dos vendedores usadas na rodada ({id: "5.00"}); a próxima rodada compara
+    taxas = models.JSONField(default=dict, blank=True, verbose_name="Taxas Aplicadas")
+
+    class Meta:
+        verbose_name = "Execução de Comissão"
+        verbose_name_plural = "Execuções de Comissão"
+        ordering = ['-iniciada_em']
+        indexes = [models.Index(fields=['competencia', 'base', 'iniciada_em'], name='idx_execucao_comissao')]
+
+    def __str__(self):
+        return f"{self.get_base_display()} {self.competencia:%m/%Y} ({self.iniciada_em:%d/%m/%Y %H:%M})"
+
+
+class LinhaComissao(models.Model):
+    """
+    Lançamento do extrato de comissões. As linhas nunca são alteradas nem
+    excluídas: correções (mudança de valor, taxa ou vendedor, fatura cancelada)
+    entram como novos lançamentos de ajuste ou estorno pela diferença.
+    """
+    class Beneficiario(models.TextChoices):
+        VENDEDOR = 'vendedor', _('Vendedor')
+        DISTRIBUIDOR = 'distribuidor', _('Distribuidor')
+
+    class TipoLancamento(models.TextChoices):
+        COMISSAO = 'comissao', _('Comissão')
+        AJUSTE = 'ajuste', _('Ajuste')
+        ESTORNO = 'estorno', _('Estorno')
+
+    execucao = models.ForeignKey(ExecucaoComissao, on_delete=models.PROTECT, related_name='lancamentos')
+    competencia = models.DateField(verbose_name="Competência (mês)")
+    base = models.CharField(max_length=20, choices=ExecucaoComissao.Base.choices, verbose_name="Base de Cálculo")
+    tipo_beneficiario = models.CharField(max_length=20, choices=Beneficiario.choices, verbose_name="Beneficiário")
+    vendedor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='linhas_comissao', verbose_name="Vendedor"
+    )
+    distribuidor = models.ForeignKey(
+        'tc_produtos.Fornecedor', on_delete=models.PROTECT, null=True, blank=True,
+        related_name='linhas_comissao', verbose_name="Distribuidor"
+    )
+    # Oportunidade ou Fatura (conforme a base) que originou o lançamento
+    origem_id = models.PositiveIntegerField(verbose_name="ID da Origem")
+    documento = models.CharField(max_length=255, blank=True, verbose_name="Documento")
+    tipo_lancamento = models.CharField(max_length=20, choices=TipoLancamento.choices, verbose_name="Lançamento")
+    valor_base = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Valor Base")
+    taxa = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Taxa (%)")
+    valor_comissao = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Comissão")
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Linha de Comissão"
+        verbose_name_plural = "Extrato de Comissões"
+        ordering = ['competencia', 'tipo_beneficiario', 'criado_em']
+        indexes = [
+            models.Index(fields=['competencia', 'base', 'tipo_beneficiario'], name='idx_comissao_competencia'),
+            models.Index(fields=['base', 'origem_id'], name='idx_comissao_origem'),
+            models.Index(fields=['vendedor', 'competencia'], name='idx_comissao_vendedor'),
+            models.Index(fields=['distribuidor', 'competencia'], name='idx_comissao_distribuidor'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_lancamento_display()} {self.documento}: R$ {self.valor_comissao}"
+
+    @property
+    def beneficiario(self):
+        return self.vendedor if self.tipo_beneficiario == self.Beneficiario.VENDEDOR else self.distribuidor
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Lançamentos de comissão são imutáveis: registre um ajuste ou estorno.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Lançamentos de comissão são imutáveis: registre um ajuste ou estorno.")
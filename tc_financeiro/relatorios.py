@@ -0,0 +1,92 @@
+# tc_financeiro/relatorios.py
+from django import forms
+
+from tc_relatorios.registro import RelatorioBase, registrar
+
+from .models import Despesa, ExecucaoComissao, Fatura
+from .services import AgingService, ComissaoService
+
+# ############################################################################
+# AGING DE CONTAS A RECEBER / PAGAR
+# ############################################################################
+
+@registrar
+class AgingTitulosRelatorio(RelatorioBase):
+    codigo = 'aging-titulos'
+    titulo = 'Aging de Títulos'
+    descricao = 'Saldo em aberto por faixa de atraso (1–30, 31–60, 61–90, +90 dias), agrupado.'
+    categoria = 'Financeiro'
+    permissao = 'tc_financeiro.view_fatura'
+    parametros = {
+        'tipo': forms.ChoiceField(label='Títulos', choices=[('receber', 'A Receber'), ('pagar', 'A Pagar')]),
+        'agrupamento': forms.ChoiceField(label='Agrupar por', choices=[
+            ('parceiro', 'Cliente / Fornecedor'),
+            ('tipo_titulo', 'Tipo de Título'),
+            ('centro_custo', 'Centro de Custo (apenas a pagar)'),
+        ]),
+    }
+    colunas = [('grupo', 'Grupo')] + [
+        (f'{chave}_valor', f'{rotulo} (R$)') for chave, rotulo in AgingService.FAIXAS if chave in AgingService.FAIXAS_ATRASO
+    ] + [('total_qtd', 'Qtd. Títulos')]
+
+    def get_modelo(self, params):
+        return Fatura if params['tipo'] == 'receber' else Despesa
+
+    def gerar(self, params):
+        for linha in AgingService.por_grupo(self.get_modelo(params), params['agrupamento']):
+            yield {chave: float(linha[chave]) if chave.endswith('_valor') else linha[chave] for chave, _ in self.colunas}
+
+    def resumir(self, params):
+        resumo = AgingService.resumo(self.get_modelo(params))
+        return {'a vencer': resumo['a_vencer_valor'], 'vencido': resumo['vencido_valor'], 'total em aberto': resumo['total_valor']}
+
+# ############################################################################
+# EXTRATO DE COMISSÕES (por vendedor / distribuidor)
+# ############################################################################
+
+@registrar
+class ExtratoComissoesRelatorio(RelatorioBase):
+    codigo = 'extrato-comissoes'
+    titulo = 'Extrato de Comissões'
+    descricao = 'Comissões, ajustes e estornos lançados no mês para cada vendedor e distribuidor.'
+    categoria = 'Financeiro'
+    permissao = 'tc_financeiro.view_linhacomissao'
+    parametros = {
+        'competencia': forms.DateField(label='Mês (qualquer dia)', widget=forms.DateInput(attrs={'type': 'date'})),
+        'base': forms.ChoiceField(label='Base', choices=[('', 'Todas')] + ExecucaoComissao.Base.choices, required=False),
+    }
+    colunas = [
+        ('tipo', 'Beneficiário'),
+        ('nome', 'Nome'),
+        ('valor_base', 'Valor Base (R$)'),
+        ('comissao', 'Comissões (R$)'),
+        ('ajustes', 'Ajustes (R$)'),
+        ('estornos', 'Estornos (R$)'),
+        ('total', 'Total a Pagar (R$)'),
+        ('lancamentos', 'Lançamentos'),
+    ]
+
+    def gerar(self, params):
+        for linha in ComissaoService.extrato(params['competencia'], params.get('base')):
+            if linha['tipo_beneficiario'] == ComissaoService.VENDEDOR:
+                nome = f"{linha['vendedor__first_name'] or ''} {linha['vendedor__last_name'] or ''}".strip() or linha['vendedor__username']
+            else:
+                nome = linha['distribuidor__razao_social']
+            yield {
+                'tipo': 'Vendedor' if linha['tipo_beneficiario'] == ComissaoService.VENDEDOR else 'Distribuidor',
+                'nome': nome,
+                'valor_base': float(linha['valor_base']),
+                'comissao': float(linha['comissao']),
+                'ajustes': float(linha['ajustes']),
+                'estornos': float(linha['estornos']),
+                'total': float(linha['total']),
+                'lancamentos': linha['lancamentos'],
+            }
+
+    def resumir(self, params):
+        linhas = list(self.gerar(params))
+        return {
+            'vendedores': sum(l['total'] for l in linhas if l['tipo'] == 'Vendedor'),
+            'distribuidores': sum(l['total'] for l in linhas if l['tipo'] == 'Distribuidor'),
+            'estornos': sum(l['estornos'] for l in linhas),
+        }
@@ -1,8 +1,16 @@
+import re
 import xmltodict
-from decimal import Decimal
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from .models import Despesa
-from tc_crm.models import Fornecedor
+from .models import Despesa, ExecucaoComissao, Fatura, LinhaComissao
+from tc_crm.models import Cliente, Oportunidade
+from tc_produtos.models import Fornecedor
 
 class XMLInvoiceService:
     @staticmethod
@@ -69,4 +77,375 @@ class XMLInvoiceService:
             status='aguardando'
         )
         
-        return despesa, fornecedor_novo
\ No newline at end of file
+        return despesa, fornecedor_novo
+
+
+# ############################################################################
+# AGING (VENCIMENTOS) DE CONTAS A RECEBER / PAGAR
+# ############################################################################
+
+class AgingService:
+    """
+    Classifica os títulos em aberto por faixa de vencimento com agregação
+    condicional: todas as faixas saem de uma única query (SUM/COUNT ... FILTER,
+    ou CASE WHEN nos bancos sem FILTER), inclusive quando agrupadas.
+    """
+    # (chave, rótulo); as condições dependem de 'hoje' e são montadas em _condicoes()
+    FAIXAS = [
+        ('hoje', 'Vence Hoje'),
+        ('proximos_7', 'Próximos 7 Dias'),
+        ('mes', 'Mês Atual'),
+        ('a_vencer', 'A Vencer'),
+        ('vencido_1_30', '1–30 Dias'),
+        ('vencido_31_60', '31–60 Dias'),
+        ('vencido_61_90', '61–90 Dias'),
+        ('vencido_90_mais', '+90 Dias'),
+        ('vencido', 'Total Vencido'),
+        ('total', 'Total em Aberto'),
+    ]
+
+    # Faixas exibidas nas colunas do relatório de aging
+    FAIXAS_ATRASO = ['a_vencer', 'vencido_1_30', 'vencido_31_60', 'vencido_61_90', 'vencido_90_mais', 'total']
+
+    # agrupamento -> (campo de id, campo de rótulo, parâmetro de drill-down na listagem, título)
+    AGRUPAMENTOS = {
+        Fatura: {
+            'parceiro': ('cliente_id', 'cliente__razao_social', 'cliente', 'Cliente'),
+            'tipo_titulo': ('tipo_titulo', 'tipo_titulo', 'tipo_titulo', 'Tipo de Título'),
+        },
+        Despesa: {
+            'parceiro': ('fornecedor_id', 'fornecedor__razao_social', 'fornecedor', 'Fornecedor'),
+            'tipo_titulo': ('tipo_titulo', 'tipo_titulo', 'tipo_titulo', 'Tipo de Título'),
+            # Centro de custo vem da requisição que originou o PO vinculado à despesa
+            'centro_custo': (
+                'pedidocompra__requisicao_origem__centro_custo_id',
+                'pedidocompra__requisicao_origem__centro_custo__nome',
+                'centro_custo',
+                'Centro de Custo',
+            ),
+        },
+    }
+
+    @staticmethod
+    def em_aberto(modelo):
+        """ Q dos títulos que ainda compõem o saldo a receber/pagar. """
+        if modelo is Despesa:
+            return Q(pago=False) & ~Q(status__in=['pago', 'cancelada'])
+        return ~Q(status__in=['pago', 'cancelado', 'renegociado'])
+
+    @staticmethod
+    def _condicoes(hoje):
+        inicio_mes = hoje.replace(day=1)
+        fim_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return {
+            'hoje': Q(data_vencimento=hoje),
+            'proximos_7': Q(data_vencimento__range=[hoje + timedelta(days=1), hoje + timedelta(days=7)]),
+            'mes': Q(data_vencimento__range=[inicio_mes, fim_mes]),
+            'a_vencer': Q(data_vencimento__gte=hoje),
+            'vencido_1_30': Q(data_vencimento__lt=hoje, data_vencimento__gte=hoje - timedelta(days=30)),
+            'vencido_31_60': Q(data_vencimento__lt=hoje - timedelta(days=30), data_vencimento__gte=hoje - timedelta(days=60)),
+            'vencido_61_90': Q(data_vencimento__lt=hoje - timedelta(days=60), data_vencimento__gte=hoje - timedelta(days=90)),
+            'vencido_90_mais': Q(data_vencimento__lt=hoje - timedelta(days=90)),
+            'vencido': Q(data_vencimento__lt=hoje),
+            'total': Q(),
+        }
+
+    @staticmethod
+    def condicao(modelo, faixa, hoje=None):
+        """ Q de uma faixa (títulos em aberto) para o drill-down nas listagens. """
+        condicoes = AgingService._condicoes(hoje or timezone.localdate())
+        if faixa not in condicoes:
+            return None
+        return AgingService.em_aberto(modelo) & condicoes[faixa]
+
+    @staticmethod
+    def _agregacoes(modelo, hoje, campo_valor, extras=None):
+        aberto = AgingService.em_aberto(modelo)
+        filtros = {chave: (aberto & q, campo_valor) for chave, q in AgingService._condicoes(hoje).items()}
+        for chave, extra in (extras or {}).items():
+            filtros[chave] = extra if isinstance(extra, tuple) else (extra, campo_valor)
+        agregacoes = {}
+        for chave, (q, campo) in filtros.items():
+            agregacoes[f'{chave}_valor'] = Coalesce(
+                Sum(campo, filter=q), Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=15, decimal_places=2),
+            )
+            agregacoes[f'{chave}_qtd'] = Count('pk', filter=q)
+        return agregacoes
+
+    @staticmethod
+    def resumo(modelo, queryset=None, hoje=None, campo_valor='valor_saldo', extras=None):
+        """
+        Totais (valor e quantidade) de todas as faixas em uma única query.
+        'extras' aceita {chave: Q} ou {chave: (Q, campo)} para indicadores
+        adicionais na mesma passada (ex.: recebido no mês, somando valor_pago),
+        devolvidos como <chave>_valor / <chave>_qtd.
+        """
+        hoje = hoje or timezone.localdate()
+        queryset = modelo.objects.all() if queryset is None else queryset
+        return queryset.aggregate(**AgingService._agregacoes(modelo, hoje, campo_valor, extras))
+
+    @staticmethod
+    def por_grupo(modelo, agrupamento, queryset=None, hoje=None, campo_valor='valor_saldo'):
+        """ Uma linha por cliente/fornecedor, centro de custo ou tipo de título (GROUP BY). """
+        try:
+            campo_id, campo_rotulo, _, _ = AgingService.AGRUPAMENTOS[modelo][agrupamento]
+        except KeyError:
+            raise ValueError(f"Agrupamento '{agrupamento}' não suportado para {modelo.__name__}.")
+        hoje = hoje or timezone.localdate()
+        queryset = modelo.objects.all() if queryset is None else queryset
+        campos = [campo_id] if campo_id == campo_rotulo else [campo_id, campo_rotulo]
+        linhas = (
+            queryset.filter(AgingService.em_aberto(modelo))
+            .values(*campos)
+            .annotate(**AgingService._agregacoes(modelo, hoje, campo_valor))
+            .order_by('-vencido_valor', '-total_valor')
+        )
+        rotulos_tipo = dict(modelo.TipoTitulo.choices)
+        for linha in linhas:
+            linha['grupo_id'] = linha[campo_id]
+            rotulo = linha[campo_rotulo]
+            if agrupamento == 'tipo_titulo':
+                rotulo = rotulos_tipo.get(rotulo, rotulo)
+            linha['grupo'] = rotulo or 'Não informado'
+            yield linha
+
+
+# ############################################################################
+# COMISSÕES (Vendedores e distribuidores)
+# ############################################################################
+
+class ComissaoService:
+    """
+    Fecha as comissões de um mês em lote: o devido por (beneficiário, origem)
+    sai de uma única query sobre as oportunidades ganhas ou faturas pagas, o já
+    lançado de outra query agregada, e apenas a diferença vira lançamento no
+    extrato (comissão, ajuste ou estorno). Origens que deixaram de valer
+    (fatura cancelada, oportunidade reaberta) são estornadas mesmo que sejam de
+    meses anteriores. Rodadas seguintes do mesmo mês recalculam só os
+    beneficiários afetados por mudanças desde a rodada anterior.
+    """
+    STATUS_PAGOS = [Fatura.StatusFatura.PAGO, Fatura.StatusFatura.PARCIAL]
+    CENTAVO = Decimal('0.01')
+
+    VENDEDOR = LinhaComissao.Beneficiario.VENDEDOR
+    DISTRIBUIDOR = LinhaComissao.Beneficiario.DISTRIBUIDOR
+
+    @staticmethod
+    def periodo(competencia):
+        inicio = competencia.replace(day=1)
+        return inicio, (inicio + timedelta(days=32)).replace(day=1)
+
+    @staticmethod
+    def taxa_distribuidor(regra):
+        """ Primeiro percentual da regra de comissionamento ('3%', '2,5 % sobre a venda'). """
+        encontrado = re.search(r'(\d+(?:[.,]\d+)?)\s*%', regra or '')
+        return Decimal(encontrado.group(1).replace(',', '.')) if encontrado else Decimal('0')
+
+    @staticmethod
+    def validas(base):
+        """ Origens que ainda dão direito a comissão, de qualquer mês. """
+        if base == ExecucaoComissao.Base.OPORTUNIDADE:
+            return Oportunidade.objects.filter(etapa__e_etapa_ganha=True)
+        return Fatura.objects.filter(status__in=ComissaoService.STATUS_PAGOS)
+
+    @staticmethod
+    def origens(base, competencia):
+        """
+        Origens do mês com vendedor, distribuidor e valor base anotados. Fatura
+        sem contrato ligado a oportunidade fica com o vendedor do último negócio
+        ganho do cliente.
+        """
+        inicio, fim = ComissaoService.periodo(competencia)
+        qs = ComissaoService.validas(base)
+        if base == ExecucaoComissao.Base.OPORTUNIDADE:
+            qs = qs.filter(
+                data_fechamento_real__gte=timezone.make_aware(datetime.combine(inicio, time.min)),
+                data_fechamento_real__lt=timezone.make_aware(datetime.combine(fim, time.min)),
+            ).annotate(com_documento=F('nome'), com_vendedor=F('responsavel_id'), com_valor=F('valor_estimado'))
+        else:
+            ultimo_vendedor = Oportunidade.objects.filter(
+                cliente_id=OuterRef('cliente_id'), etapa__e_etapa_ganha=True, responsavel__isnull=False,
+            ).order_by('-data_fechamento_real', '-pk').values('responsavel_id')[:1]
+            qs = qs.annotate(
+                com_data=Coalesce('data_liquidacao', 'data_competencia', 'data_vencimento'),
+            ).filter(com_data__gte=inicio, com_data__lt=fim).annotate(
+                com_documento=F('numero_documento'),
+                com_vendedor=Coalesce(
+                    'contrato__oportunidade__responsavel_id', Subquery(ultimo_vendedor), output_field=IntegerField(),
+                ),
+                com_valor=F('valor_pago'),
+            )
+        return qs.annotate(
+            com_distribuidor=F('cliente__distribuidora_padrao_id'),
+            com_e_distribuidor=F('cliente__distribuidora_padrao__e_distribuidor'),
+            com_regra=F('cliente__distribuidora_padrao__comissionamento_regra'),
+        )
+
+    @staticmethod
+    def alterados(base, competencia, anterior, taxas):
+        """
+        (vendedores, distribuidores) afetados desde a rodada anterior: origens
+        ou clientes alterados no histórico, regras de distribuidor alteradas e
+        vendedores com taxa diferente da usada na rodada anterior.
+        """
+        modelo = Oportunidade if base == ExecucaoComissao.Base.OPORTUNIDADE else Fatura
+        desde = anterior.iniciada_em
+        origens_alteradas = modelo.history.filter(history_date__gt=desde).values('id')
+        clientes_alterados = Cliente.history.filter(history_date__gt=desde).values('id')
+
+        vendedores = {
+            pk for pk, taxa in taxas.items()
+            if anterior.taxas.get(str(pk), str(taxa)) != str(taxa)
+        }
+        distribuidores = set(Fornecedor.history.filter(history_date__gt=desde).values_list('id', flat=True))
+
+        # Atribuição atual das origens alteradas...
+        atuais = ComissaoService.origens(base, competencia).filter(
+            Q(pk__in=origens_alteradas) | Q(cliente_id__in=clientes_alterados)
+        ).values_list('com_vendedor', 'com_distribuidor')
+        # ...e a que já foi lançada para elas (vendedor/distribuidor anterior)
+        lancados = LinhaComissao.objects.filter(base=base).filter(
+            Q(origem_id__in=origens_alteradas)
+            | Q(competencia=anterior.competencia, origem_id__in=modelo.objects.filter(
+                cliente_id__in=clientes_alterados).values('pk'))
+        ).values_list('vendedor_id', 'distribuidor_id').distinct()
+
+        for vendedor, distribuidor in list(atuais) + list(lancados):
+            if vendedor:
+                vendedores.add(vendedor)
+            if distribuidor:
+                distribuidores.add(distribuidor)
+        return vendedores, distribuidores
+
+    @staticmethod
+    def devido(base, competencia, taxas, vendedores=None, distribuidores=None):
+        """ {(tipo, beneficiário, origem): (documento, valor base, taxa, comissão)} do mês. """
+        qs = ComissaoService.origens(base, competencia)
+        if vendedores is not None:
+            qs = qs.filter(Q(com_vendedor__in=vendedores) | Q(com_distribuidor__in=distribuidores))
+
+        devido = {}
+        for linha in qs.values(
+            'pk', 'com_documento', 'com_vendedor', 'com_distribuidor', 'com_e_distribuidor', 'com_regra', 'com_valor',
+        ):
+            valor = linha['com_valor'] or Decimal('0')
+            beneficiarios = []
+            if linha['com_vendedor'] and (vendedores is None or linha['com_vendedor'] in vendedores):
+                beneficiarios.append((ComissaoService.VENDEDOR, linha['com_vendedor'], taxas.get(linha['com_vendedor'])))
+            if linha['com_distribuidor'] and linha['com_e_distribuidor'] and (
+                distribuidores is None or linha['com_distribuidor'] in distribuidores
+            ):
+                beneficiarios.append((
+                    ComissaoService.DISTRIBUIDOR, linha['com_distribuidor'],
+                    ComissaoService.taxa_distribuidor(linha['com_regra']),
+                ))
+            for tipo, beneficiario, taxa in beneficiarios:
+                taxa = taxa or Decimal('0')
+                comissao = (valor * taxa / 100).quantize(ComissaoService.CENTAVO, rounding=ROUND_HALF_UP)
+                devido[(tipo, beneficiario, linha['pk'])] = (linha['com_documento'] or '', valor, taxa, comissao)
+        return devido
+
+    @staticmethod
+    def lancado(base, competencia, vendedores=None, distribuidores=None):
+        """
+        Saldo já lançado por (tipo, beneficiário, origem), somando todos os
+        meses, para as origens do mês e as que deixaram de valer.
+        """
+        qs = LinhaComissao.objects.filter(base=base).filter(
+            Q(origem_id__in=ComissaoService.origens(base, competencia).values('pk'))
+            | ~Q(origem_id__in=ComissaoService.validas(base).values('pk'))
+        )
+        if vendedores is not None:
+            qs = qs.filter(Q(vendedor_id__in=vendedores) | Q(distribuidor_id__in=distribuidores))
+
+        lancado = {}
+        for linha in qs.values('tipo_beneficiario', 'vendedor_id', 'distribuidor_id', 'origem_id').annotate(
+            total_base=Sum('valor_base'), total_comissao=Sum('valor_comissao'),
+            ultimo_documento=Max('documento'), ultima_taxa=Max('taxa'),
+        ):
+            if not linha['total_comissao'] and not linha['total_base']:
+                continue
+            beneficiario = linha['vendedor_id'] if linha['tipo_beneficiario'] == ComissaoService.VENDEDOR else linha['distribuidor_id']
+            lancado[(linha['tipo_beneficiario'], beneficiario, linha['origem_id'])] = (
+                linha['ultimo_documento'], linha['total_base'], linha['ultima_taxa'], linha['total_comissao'],
+            )
+        return lancado
+
+    @staticmethod
+    @transaction.atomic
+    def executar(competencia, base=None, usuario=None, completa=False):
+        """
+        Lança no extrato a diferença entre o devido e o já lançado. Sem rodada
+        anterior para o mês/base (ou com completa=True) recalcula todos os
+        beneficiários; caso contrário, apenas os alterados.
+        """
+        base = base or settings.FINANCEIRO_COMISSAO_BASE
+        competencia = competencia.replace(day=1)
+        anterior = ExecucaoComissao.objects.select_for_update().filter(
+            competencia=competencia, base=base, concluida_em__isnull=False,
+        ).order_by('-iniciada_em').first()
+
+        completa = completa or anterior is None
+        execucao = ExecucaoComissao.objects.create(
+            competencia=competencia, base=base, completa=completa, executada_por=usuario,
+        )
+        taxas = dict(get_user_model().objects.values_list('pk', 'taxa_comissao'))
+
+        vendedores = distribuidores = None
+        if not completa:
+            vendedores, distribuidores = ComissaoService.alterados(base, competencia, anterior, taxas)
+
+        devido = ComissaoService.devido(base, competencia, taxas, vendedores, distribuidores)
+        lancado = ComissaoService.lancado(base, competencia, vendedores, distribuidores)
+
+        linhas = []
+        for chave in devido.keys() | lancado.keys():
+            tipo, beneficiario, origem_id = chave
+            documento_lancado, base_lancada, taxa_lancada, comissao_lancada = lancado.get(
+                chave, ('', Decimal('0'), Decimal('0'), Decimal('0'))
+            )
+            documento, valor_base, taxa, comissao = devido.get(chave, (documento_lancado, Decimal('0'), taxa_lancada, Decimal('0')))
+            diferenca = comissao - comissao_lancada
+            if not diferenca:
+                continue
+
+            if chave not in lancado:
+                lancamento = LinhaComissao.TipoLancamento.COMISSAO
+            elif not comissao:
+                lancamento = LinhaComissao.TipoLancamento.ESTORNO
+            else:
+                lancamento = LinhaComissao.TipoLancamento.AJUSTE
+            linhas.append(LinhaComissao(
+                execucao=execucao, competencia=competencia, base=base, tipo_beneficiario=tipo,
+                vendedor_id=beneficiario if tipo == ComissaoService.VENDEDOR else None,
+                distribuidor_id=beneficiario if tipo == ComissaoService.DISTRIBUIDOR else None,
+                origem_id=origem_id, documento=documento, tipo_lancamento=lancamento,
+                valor_base=valor_base - base_lancada, taxa=taxa, valor_comissao=diferenca,
+            ))
+        LinhaComissao.objects.bulk_create(linhas)
+
+        execucao.taxas = {str(pk): str(taxa) for pk, taxa in taxas.items()}
+        execucao.beneficiarios = len({chave[:2] for chave in devido.keys() | lancado.keys()})
+        execucao.linhas = len(linhas)
+        execucao.concluida_em = timezone.now()
+        execucao.save()
+        return execucao
+
+    @staticmethod
+    def extrato(competencia, base=None):
+        """ Totais do mês por beneficiário (comissões, ajustes e estornos), em uma query. """
+        qs = LinhaComissao.objects.filter(competencia=competencia.replace(day=1))
+        if base:
+            qs = qs.filter(base=base)
+        return qs.values(
+            'tipo_beneficiario', 'vendedor_id', 'vendedor__first_name', 'vendedor__last_name', 'vendedor__username',
+            'distribuidor_id', 'distribuidor__razao_social',
+        ).annotate(
+            valor_base=Coalesce(Sum('valor_base'), Value(Decimal('0')), output_field=DecimalField()),
+            comissao=Coalesce(Sum('valor_comissao', filter=Q(tipo_lancamento=LinhaComissao.TipoLancamento.COMISSAO)), Value(Decimal('0')), output_field=DecimalField()),
+            ajustes=Coalesce(Sum('valor_comissao', filter=Q(tipo_lancamento=LinhaComissao.TipoLancamento.AJUSTE)), Value(Decimal('0')), output_field=DecimalField()),
+            estornos=Coalesce(Sum('valor_comissao', filter=Q(tipo_lancamento=LinhaComissao.TipoLancamento.ESTORNO)), Value(Decimal('0')), output_field=DecimalField()),
+            total=Coalesce(Sum('valor_comissao'), Value(Decimal('0')), output_field=DecimalField()),
+            lancamentos=Count('id'),
+        ).order_by('tipo_beneficiario', '-total')
@@ -1,3 +1,202 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from tc_compras.models import ItemPedidoCompra, PedidoCompra, RecebimentoItem
+from tc_compras.services import ContasPagarRecebimentoService
+from tc_crm.models import Cliente, EtapaVenda, Oportunidade
+from tc_produtos.models import Fornecedor
+from .models import Despesa, ExecucaoComissao, Fatura, LinhaComissao
+from .services import AgingService, ComissaoService
+
+User = get_user_model()
+
+
+class ComissaoServiceTest(TestCase):
+    """
+    Fechamento mensal de comissões: rodadas repetidas não duplicam o extrato e
+    origens que deixam de valer (ou mudam de valor) geram estorno/ajuste.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendedor = User.objects.create_user(username='vendedor', password='senha', taxa_comissao=Decimal('5.00'))
+        cls.cliente = Cliente.objects.create(razao_social='Cliente Comissão')
+        cls.etapa_aberta = EtapaVenda.objects.create(nome='Negociação', ordem=1)
+        cls.etapa_ganha = EtapaVenda.objects.create(nome='Ganho', ordem=2, e_etapa_ganha=True)
+        cls.competencia = timezone.localdate().replace(day=1)
+        cls.base = ExecucaoComissao.Base.OPORTUNIDADE
+
+    def setUp(self):
+        self.oportunidade = Oportunidade.objects.create(
+            nome='Venda 1', cliente=self.cliente, responsavel=self.vendedor, etapa=self.etapa_ganha,
+            valor_estimado=Decimal('1000.00'), data_fechamento_real=timezone.now(),
+        )
+
+    def executar(self):
+        return ComissaoService.executar(self.competencia, base=self.base)
+
+    def saldo(self):
+        return sum((linha.valor_comissao for linha in LinhaComissao.objects.all()), Decimal('0'))
+
+    def test_primeira_rodada_lanca_comissao(self):
+        execucao = self.executar()
+
+        self.assertTrue(execucao.completa)
+        linha = LinhaComissao.objects.get()
+        self.assertEqual(linha.tipo_lancamento, LinhaComissao.TipoLancamento.COMISSAO)
+        self.assertEqual(linha.vendedor, self.vendedor)
+        self.assertEqual(linha.origem_id, self.oportunidade.pk)
+        self.assertEqual(linha.valor_comissao, Decimal('50.00'))
+
+    def test_rodadas_repetidas_nao_duplicam_o_extrato(self):
+        self.executar()
+        segunda = self.executar()
+        completa = ComissaoService.executar(self.competencia, base=self.base, completa=True)
+
+        self.assertFalse(segunda.completa)
+        self.assertEqual(segunda.linhas, 0)
+        self.assertEqual(completa.linhas, 0)
+        self.assertEqual(LinhaComissao.objects.count(), 1)
+        self.assertEqual(self.saldo(), Decimal('50.00'))
+
+    def test_oportunidade_reaberta_e_estornada(self):
+        self.executar()
+        self.oportunidade.etapa = self.etapa_aberta
+        self.oportunidade.save()
+
+        execucao = self.executar()
+
+        self.assertEqual(execucao.linhas, 1)
+        estorno = LinhaComissao.objects.get(execucao=execucao)
+        self.assertEqual(estorno.tipo_lancamento, LinhaComissao.TipoLancamento.ESTORNO)
+        self.assertEqual(estorno.valor_comissao, Decimal('-50.00'))
+        self.assertEqual(self.saldo(), Decimal('0'))
+
+        # Já estornada: nova rodada não lança nada
+        self.assertEqual(self.executar().linhas, 0)
+
+    def test_mudanca_de_valor_lanca_somente_o_ajuste(self):
+        self.executar()
+        self.oportunidade.valor_estimado = Decimal('1200.00')
+        self.oportunidade.save()
+
+        execucao = self.executar()
+
+        ajuste = LinhaComissao.objects.get(execucao=execucao)
+        self.assertEqual(ajuste.tipo_lancamento, LinhaComissao.TipoLancamento.AJUSTE)
+        self.assertEqual(ajuste.valor_comissao, Decimal('10.00'))
+        self.assertEqual(ajuste.valor_base, Decimal('200.00'))
+        self.assertEqual(self.saldo(), Decimal('60.00'))
+
+
+class AgingServiceTest(TestCase):
+    """
+    Faixas de vencimento dos títulos em aberto e cards da listagem de faturas,
+    todos a partir de uma única agregação.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='financeiro', password='senha')
+        cls.cliente = Cliente.objects.create(razao_social='Cliente Aging')
+        cls.hoje = timezone.localdate()
+
+    def fatura(self, vencimento, valor, pago=Decimal('0.00'), **campos):
+        return Fatura.objects.create(
+            cliente=self.cliente, data_vencimento=vencimento, data_competencia=self.hoje,
+            valor_original=valor, valor_pago=pago, **campos,
+        )
+
+    def test_resumo_separa_as_faixas_de_atraso(self):
+        self.fatura(self.hoje, Decimal('100.00'))
+        self.fatura(self.hoje - timedelta(days=10), Decimal('200.00'))
+        self.fatura(self.hoje - timedelta(days=45), Decimal('300.00'), pago=Decimal('50.00'))
+        self.fatura(self.hoje - timedelta(days=120), Decimal('400.00'))
+        self.fatura(self.hoje - timedelta(days=5), Decimal('999.00'), status=Fatura.StatusFatura.CANCELADO)
+
+        resumo = AgingService.resumo(Fatura, hoje=self.hoje)
+
+        self.assertEqual(resumo['hoje_valor'], Decimal('100.00'))
+        self.assertEqual(resumo['vencido_1_30_valor'], Decimal('200.00'))
+        self.assertEqual(resumo['vencido_31_60_valor'], Decimal('250.00'))
+        self.assertEqual(resumo['vencido_61_90_qtd'], 0)
+        self.assertEqual(resumo['vencido_90_mais_valor'], Decimal('400.00'))
+        self.assertEqual(resumo['vencido_valor'], Decimal('850.00'))
+        self.assertEqual(resumo['total_valor'], Decimal('950.00'))
+        self.assertEqual(resumo['total_qtd'], 4)
+
+    def test_card_recebido_no_mes_soma_o_valor_pago(self):
+        self.fatura(self.hoje, Decimal('100.00'))
+        paga = self.fatura(self.hoje - timedelta(days=3), Decimal('250.00'))
+        paga.valor_pago = Decimal('250.00')
+        paga.data_liquidacao = self.hoje
+        paga.save()
+        self.assertEqual(paga.status, Fatura.StatusFatura.PAGO)
+        self.assertEqual(paga.valor_saldo, Decimal('0.00'))
+
+        self.client.force_login(self.usuario)
+        response = self.client.get(reverse('financeiro:fatura_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_recebido_mes'], Decimal('250.00'))
+        self.assertEqual(response.context['total_receber'], Decimal('100.00'))
+
+
+class DespesaRecebimentoCompraTest(TransactionTestCase):
+    """
+    Recebimentos de compra geram uma Despesa por PO no commit da transação;
+    o que foi marcado numa transação desfeita não vaza para a seguinte.
+    """
+    def setUp(self):
+        fornecedor = Fornecedor.objects.create(razao_social='Fornecedor Compras', cnpj='00.000.000/0001-00')
+        self.pedidos = []
+        for _ in range(2):
+            pedido = PedidoCompra.objects.create(fornecedor=fornecedor)
+            ItemPedidoCompra.objects.create(pedido_compra=pedido, descricao_item='Cabo', quantidade_pedida=10, preco_unitario=Decimal('5.00'))
+            ItemPedidoCompra.objects.create(pedido_compra=pedido, descricao_item='Conector', quantidade_pedida=10, preco_unitario=Decimal('2.00'))
+            self.pedidos.append(pedido)
+
+    def receber(self, pedido, quantidade=2):
+        return [RecebimentoItem(item_pedido=item, quantidade_recebida=quantidade) for item in pedido.itens_pedido.all()]
+
+    def test_commit_gera_uma_despesa_por_pedido(self):
+        primeiro, segundo = self.pedidos
+        ContasPagarRecebimentoService.receber_lote(self.receber(primeiro) + self.receber(segundo, 1))
+
+        self.assertEqual(Despesa.objects.count(), 2)
+        primeiro.refresh_from_db()
+        self.assertEqual(primeiro.fatura_vinculada.valor_original, Decimal('14.00'))
+        segundo.refresh_from_db()
+        self.assertEqual(segundo.fatura_vinculada.valor_original, Decimal('7.00'))
+
+    def test_rollback_descarta_o_lote_da_transacao(self):
+        primeiro, segundo = self.pedidos
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                for recebimento in self.receber(primeiro):
+                    recebimento.save()
+                raise RuntimeError
+
+        ContasPagarRecebimentoService.receber_lote(self.receber(segundo))
+
+        self.assertEqual(RecebimentoItem.objects.filter(item_pedido__pedido_compra=primeiro).count(), 0)
+        self.assertEqual(list(Despesa.objects.values_list('numero_documento', flat=True)), [f'PO-{segundo.pk}'])
+
+    def test_savepoint_desfeito_nao_perde_os_pedidos_seguintes(self):
+        primeiro, segundo = self.pedidos
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    for recebimento in self.receber(primeiro):
+                        recebimento.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            for recebimento in self.receber(segundo) + self.receber(primeiro):
+                recebimento.save()
+
+        self.assertEqual(Despesa.objects.count(), 2)
@@ -6,6 +6,7 @@ app_name = 'financeiro'
 urlpatterns = [
     # Dashboard Principal
     path('dashboard/', views.FinancialDashboardView.as_view(), name='dashboard'),
+    path('aging/', views.AgingView.as_view(), name='aging'),
 
     # --- GESTÃO DE RECEITAS (FATURAS / CONTAS A RECEBER) ---
     path('faturas/', views.FaturaListView.as_view(), name='fatura_list'),
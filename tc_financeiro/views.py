@@ -13,8 +13,9 @@ from decimal import Decimal
 
 from .models import Fatura, Despesa, MetaVenda
 from .forms import FaturaForm, DespesaForm, ContratoForm
-from .services import XMLInvoiceService
+from .services import AgingService, XMLInvoiceService
 from tc_contratos.models import Contrato
+from tc_core.mixins import KeysetPaginationMixin
 
 class FinancialDashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'financeiro/dashboard.html'
@@ -78,6 +79,45 @@ class FinancialDashboardView(LoginRequiredMixin, TemplateView):
         context['hoje'] = hoje
         return context
 
+# --- AGING (VENCIMENTOS) ---
+
+def filtrar_grupo_aging(queryset, params, modelo):
+    """ Aplica o grupo vindo do drill-down do aging (?cliente=, ?fornecedor=, ?tipo_titulo=, ?centro_custo=). """
+    for campo_id, _, parametro, _ in AgingService.AGRUPAMENTOS[modelo].values():
+        valor = params.get(parametro)
+        if valor == 'nenhum':
+            queryset = queryset.filter(**{f'{campo_id}__isnull': True})
+        elif valor:
+            queryset = queryset.filter(**{campo_id: valor})
+    return queryset
+
+
+class AgingView(LoginRequiredMixin, TemplateView):
+    template_name = 'financeiro/aging.html'
+    tipos = {'receber': Fatura, 'pagar': Despesa}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tipo = self.request.GET.get('tipo') if self.request.GET.get('tipo') in self.tipos else 'receber'
+        modelo = self.tipos[tipo]
+        agrupamentos = AgingService.AGRUPAMENTOS[modelo]
+        agrupamento = self.request.GET.get('agrupamento')
+        if agrupamento not in agrupamentos:
+            agrupamento = 'parceiro'
+
+        rotulos = dict(AgingService.FAIXAS)
+        context.update({
+            'tipo': tipo,
+            'agrupamento': agrupamento,
+            'agrupamentos': [(chave, definicao[3]) for chave, definicao in agrupamentos.items()],
+            'parametro_grupo': agrupamentos[agrupamento][2],
+            'lista_url': reverse_lazy('financeiro:fatura_list' if modelo is Fatura else 'financeiro:despesa_list'),
+            'faixas': [(chave, rotulos[chave]) for chave in AgingService.FAIXAS_ATRASO],
+            'resumo': AgingService.resumo(modelo),
+            'linhas': list(AgingService.por_grupo(modelo, agrupamento)),
+        })
+        return context
+
 # --- FATURAS ---
 
 @login_required
@@ -91,13 +131,22 @@ def fatura_receber_agora(request, pk):
     response['HX-Trigger'] = 'faturaAtualizada'
     return response
 
-class FaturaListView(LoginRequiredMixin, ListView):
+class FaturaListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Fatura
     template_name = 'financeiro/fatura_list.html'
     context_object_name = 'faturas'
+    keyset_template_parcial = 'financeiro/partials/fatura_rows.html'
+    keyset_ordenacao_padrao = 'data_vencimento'
+    keyset_ordenacoes = {
+        'data_vencimento': ('data_vencimento',),
+        '-data_vencimento': ('-data_vencimento',),
+        'valor_original': ('valor_original',),
+        '-valor_original': ('-valor_original',),
+        '-data_emissao': ('-data_emissao',),
+    }
 
     def get_queryset(self):
-        queryset = super().get_queryset().order_by('data_vencimento')
+        queryset = super().get_queryset().select_related('cliente')
         hoje = timezone.now().date()
         
         # Filtro de busca textual
@@ -105,39 +154,35 @@ class FaturaListView(LoginRequiredMixin, ListView):
         if q:
             queryset = queryset.filter(Q(numero_documento__icontains=q) | Q(cliente__razao_social__icontains=q) | Q(cliente__nome_fantasia__icontains=q))
         
-        # FILTRO POR CARD (KPI)
+        # FILTRO POR CARD (KPI) / DRILL-DOWN DO AGING
         f = self.request.GET.get('f')
-        if f == 'hoje':
-            queryset = queryset.filter(data_vencimento=hoje).exclude(status='pago')
-        elif f == 'atrasado':
-            queryset = queryset.filter(status='atrasado')
+        if f == 'atrasado':
+            f = 'vencido'
+        faixa = AgingService.condicao(Fatura, f, hoje)
+        if faixa is not None:
+            queryset = queryset.filter(faixa)
         elif f == 'pago':
             queryset = queryset.filter(status='pago', data_liquidacao__month=hoje.month)
-            
-        return queryset
+        return filtrar_grupo_aging(queryset, self.request.GET, Fatura)
 
     def get_context_data(self, **kwargs):
-            context = super().get_context_data(**kwargs)
-            hoje = timezone.now().date()
-            
-            # KPIs usando valor_original como referência de "valor da conta"
-            context['total_receber'] = Fatura.objects.exclude(status='pago').aggregate(
-                total=Sum('valor_original'))['total'] or 0
-                
-            context['total_recebido_mes'] = Fatura.objects.filter(
-                status='pago', 
-                data_liquidacao__month=hoje.month
-            ).aggregate(total=Sum('valor_original'))['total'] or 0
-            
-            context['total_vencido'] = Fatura.objects.filter(
-                status='atrasado'
-            ).aggregate(total=Sum('valor_original'))['total'] or 0
-            
-            context['total_hoje'] = Fatura.objects.filter(
-                data_vencimento=hoje
-            ).exclude(status='pago').aggregate(total=Sum('valor_original'))['total'] or 0
-            
+        context = super().get_context_data(**kwargs)
+        if self.e_pagina_seguinte:
             return context
+        hoje = timezone.now().date()
+
+        # Todos os cards saem de uma única agregação condicional
+        resumo = AgingService.resumo(Fatura, hoje=hoje, extras={
+            # Título pago tem saldo zero: o recebido soma o valor pago
+            'recebido_mes': (
+                Q(status='pago', data_liquidacao__year=hoje.year, data_liquidacao__month=hoje.month), 'valor_pago',
+            ),
+        })
+        context['total_receber'] = resumo['total_valor']
+        context['total_hoje'] = resumo['hoje_valor']
+        context['total_vencido'] = resumo['vencido_valor']
+        context['total_recebido_mes'] = resumo['recebido_mes_valor']
+        return context
 
 class FaturaCreateView(LoginRequiredMixin, CreateView):
     model = Fatura
@@ -196,16 +241,13 @@ class FaturaPlanilhaView(LoginRequiredMixin, ListView):
     template_name = 'financeiro/partials/fatura_planilha.html'
     context_object_name = 'faturas'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        from tc_crm.models import Cliente
-        context['clientes'] = Cliente.objects.all().order_by('razao_social')
-        return context
-
     def post(self, request, *args, **kwargs):
+        from tc_crm.models import Cliente
         clientes, numeros, vencimentos, valores = request.POST.getlist('cliente[]'), request.POST.getlist('numero[]'), request.POST.getlist('vencimento[]'), request.POST.getlist('valor[]')
+        # Os clientes vêm da busca remota: valida só as PKs enviadas, numa consulta
+        existentes = {str(pk) for pk in Cliente.objects.filter(pk__in=[c for c in clientes if c.isdigit()]).values_list('pk', flat=True)}
         for i in range(len(clientes)):
-            if clientes[i] and valores[i] and vencimentos[i]:
+            if clientes[i] in existentes and valores[i] and vencimentos[i]:
                 Fatura.objects.create(
                     cliente_id=clientes[i], numero_documento=numeros[i],
                     data_vencimento=timezone.datetime.strptime(vencimentos[i], '%Y-%m-%d').date(),
@@ -221,44 +263,42 @@ def fatura_confirm_liquidar(request, pk):
     return render(request, 'financeiro/partials/fatura_confirm_liquidar.html', {'fatura': fatura})
 # --- DESPESAS ---
 
-class DespesaListView(LoginRequiredMixin, ListView):
+class DespesaListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Despesa
     template_name = 'financeiro/despesa_list.html'
     context_object_name = 'despesas'
+    keyset_template_parcial = 'financeiro/partials/despesa_rows.html'
+    keyset_ordenacao_padrao = '-data_vencimento'
+    keyset_ordenacoes = {
+        '-data_vencimento': ('-data_vencimento',),
+        'data_vencimento': ('data_vencimento',),
+        '-valor_original': ('-valor_original',),
+        'valor_original': ('valor_original',),
+    }
 
     def get_queryset(self):
-        return Despesa.objects.all().order_by('-data_vencimento')
+        queryset = super().get_queryset().select_related('fornecedor')
+        faixa = AgingService.condicao(Despesa, self.request.GET.get('f'))
+        if faixa is not None:
+            queryset = queryset.filter(faixa)
+        return filtrar_grupo_aging(queryset, self.request.GET, Despesa)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         hoje = timezone.localtime(timezone.now()).date()
         context['hoje'] = hoje
-        amanha = hoje + timedelta(days=1)
-        set7_dias = hoje + timedelta(days=7)
-
-        # Base: Apenas o que NÃO foi pago e NÃO foi cancelado
-        # Usamos o campo 'pago' (Booleano) que é mais confiável que a string 'status'
-        despesas_abertas = Despesa.objects.exclude(pago=True).exclude(status='cancelada')
-
-        # 1. Vencendo Hoje (Filtro exato para hoje)
-        vencendo_hoje = despesas_abertas.filter(data_vencimento=hoje)
-        context['vencendo_hoje_valor'] = vencendo_hoje.aggregate(Sum('valor_original'))['valor_original__sum'] or Decimal('0.00')
-        context['vencendo_hoje_qtd'] = vencendo_hoje.count()
-
-        # 2. Vencidas (Atraso) - Tudo que venceu antes de hoje
-        vencidas = despesas_abertas.filter(data_vencimento__lt=hoje)
-        context['vencidas_valor'] = vencidas.aggregate(Sum('valor_original'))['valor_original__sum'] or Decimal('0.00')
-        context['vencidas_qtd'] = vencidas.count()
-
-        # 3. Próximos 7 Dias (Começa de AMANHÃ até daqui a 7 dias para não repetir o 'Hoje')
-        prox_7 = despesas_abertas.filter(data_vencimento__range=[amanha, set7_dias])
-        context['prox_7_valor'] = prox_7.aggregate(Sum('valor_original'))['valor_original__sum'] or Decimal('0.00')
-        context['prox_7_qtd'] = prox_7.count()
-        
-        # 4. Total do Mês (Baseado no vencimento dentro do mês atual)
-        mes_atual = despesas_abertas.filter(data_vencimento__month=hoje.month, data_vencimento__year=hoje.year)
-        context['total_mes_valor'] = mes_atual.aggregate(Sum('valor_original'))['valor_original__sum'] or Decimal('0.00')
+        if self.e_pagina_seguinte:
+            return context
 
+        # Cards: uma única agregação condicional sobre as despesas em aberto
+        resumo = AgingService.resumo(Despesa, hoje=hoje)
+        context['vencendo_hoje_valor'] = resumo['hoje_valor']
+        context['vencendo_hoje_qtd'] = resumo['hoje_qtd']
+        context['vencidas_valor'] = resumo['vencido_valor']
+        context['vencidas_qtd'] = resumo['vencido_qtd']
+        context['prox_7_valor'] = resumo['proximos_7_valor']
+        context['prox_7_qtd'] = resumo['proximos_7_qtd']
+        context['total_mes_valor'] = resumo['mes_valor']
         return context
 
 class DespesaCreateView(LoginRequiredMixin, CreateView):
@@ -331,10 +371,16 @@ class DespesaDetailView(LoginRequiredMixin, DetailView):
 
 # --- OUTROS (CONTRATOS, XML, METAS) ---
 
-class ContratoListView(LoginRequiredMixin, ListView):
+class ContratoListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Contrato
     template_name = 'financeiro/contrato_list.html'
     context_object_name = 'contratos'
+    keyset_template_parcial = 'contratos/partials/contrato_rows.html'
+    keyset_ordenacao_padrao = '-criado_em'
+    keyset_ordenacoes = {
+        '-criado_em': ('-criado_em',),
+        'data_fim': ('data_fim',),
+    }
 
 class ContratoCreateView(LoginRequiredMixin, CreateView):
     model = Contrato
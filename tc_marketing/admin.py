@@ -1,3 +1,23 @@
 from django.contrib import admin
+from simple_history.admin import SimpleHistoryAdmin
 
-# Register your models here.
+from .models import CanalMarketing, GastoMarketing, IndicadorAquisicaoMensal
+
+
+@admin.register(CanalMarketing)
+class CanalMarketingAdmin(SimpleHistoryAdmin):
+    list_display = ('nome',)
+    search_fields = ('nome',)
+
+
+@admin.register(GastoMarketing)
+class GastoMarketingAdmin(SimpleHistoryAdmin):
+    list_display = ('canal', 'ano', 'mes', 'valor_gasto')
+    list_filter = ('canal', 'ano')
+
+
+@admin.register(IndicadorAquisicaoMensal)
+class IndicadorAquisicaoMensalAdmin(admin.ModelAdmin):
+    list_display = ('ano', 'mes', 'canal', 'valor_gasto', 'novos_clientes', 'cac', 'ltv', 'payback_meses', 'calculado_em')
+    list_filter = ('canal', 'ano')
+    readonly_fields = [f.name for f in IndicadorAquisicaoMensal._meta.fields]
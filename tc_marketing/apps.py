@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TcMarketingConfig(AppConfig):
     name = 'tc_marketing'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,24 @@
+# tc_marketing/management/commands/recalcular_indicadores_aquisicao.py
+
+from django.core.management.base import BaseCommand, CommandError
+from tc_marketing.services import IndicadoresAquisicaoService
+
+class Command(BaseCommand):
+    help = 'Recalcula os indicadores mensais de CAC, LTV e payback (todos os meses ou apenas os informados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mes', action='append', dest='meses',
+            help='Mês no formato AAAA-MM (pode ser repetido).'
+        )
+
+    def handle(self, *args, **options):
+        meses = None
+        if options['meses']:
+            try:
+                meses = [tuple(int(parte) for parte in valor.split('-')) for valor in options['meses']]
+            except ValueError:
+                raise CommandError("Use o formato AAAA-MM em --mes.")
+
+        gravados = IndicadoresAquisicaoService.recalcular(meses)
+        self.stdout.write(self.style.SUCCESS(f'{gravados} indicador(es) de aquisição gravado(s).'))
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_marketing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorAquisicaoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveIntegerField(verbose_name='Ano de Referência')),
+                ('mes', models.PositiveIntegerField(verbose_name='Mês de Referência')),
+                ('valor_gasto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Gasto no Mês (R$)')),
+                ('novos_clientes', models.PositiveIntegerField(default=0, verbose_name='Novos Clientes')),
+                ('cac', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='CAC (R$)')),
+                ('receita_realizada', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Receita Recebida da Coorte (R$)')),
+                ('receita_recorrente', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='MRR Ativo da Coorte (R$)')),
+                ('ltv', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='LTV Médio (R$)')),
+                ('payback_meses', models.DecimalField(blank=True, decimal_places=1, max_digits=8, null=True, verbose_name='Payback (meses)')),
+                ('calculado_em', models.DateTimeField(auto_now=True, verbose_name='Calculado em')),
+                ('canal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='indicadores', to='tc_marketing.canalmarketing', verbose_name='Canal de Marketing')),
+            ],
+            options={
+                'verbose_name': 'Indicador de Aquisição (CAC/LTV)',
+                'verbose_name_plural': 'Indicadores de Aquisição (CAC/LTV)',
+                'ordering': ['-ano', '-mes', 'canal__nome'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('canal__isnull', False)), fields=('canal', 'ano', 'mes'), name='indicador_unico_por_canal_mes'), models.UniqueConstraint(condition=models.Q(('canal__isnull', True)), fields=('ano', 'mes'), name='indicador_consolidado_unico_mes')],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ from simple_history.models import HistoricalRecords
 from decimal import Decimal
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from django.db.models import Q
 
 # ############################################################################
 # 1. ENTIDADES MESTRAS DO MÓDULO MARKETING
@@ -69,4 +70,53 @@ class GastoMarketing(models.Model):
     def clean(self):
         """ Validação extra para garantir que o mês está no intervalo correto. """
         if not 1 <= self.mes <= 12:
-            raise ValidationError({'mes': _('O mês deve estar entre 1 e 12.')})
\ No newline at end of file
+            raise ValidationError({'mes': _('O mês deve estar entre 1 e 12.')})
+
+# ############################################################################
+# 3. INDICADORES DE AQUISIÇÃO (CAC / LTV) - Materializados por Mês e Canal
+# ############################################################################
+
+class IndicadorAquisicaoMensal(models.Model):
+    """
+    Resultado mensal de CAC, LTV e payback por canal (canal vazio = consolidado
+    do mês). Mantido por IndicadoresAquisicaoService; não editar manualmente.
+    """
+    canal = models.ForeignKey(
+        CanalMarketing,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='indicadores',
+        verbose_name="Canal de Marketing"
+    )
+    ano = models.PositiveIntegerField(verbose_name="Ano de Referência")
+    mes = models.PositiveIntegerField(verbose_name="Mês de Referência")
+
+    valor_gasto = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Gasto no Mês (R$)")
+    novos_clientes = models.PositiveIntegerField(default=0, verbose_name="Novos Clientes")
+    cac = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="CAC (R$)")
+
+    # LTV da coorte (clientes adquiridos no mês/canal)
+    receita_realizada = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="Receita Recebida da Coorte (R$)")
+    receita_recorrente = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'), verbose_name="MRR Ativo da Coorte (R$)")
+    ltv = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True, verbose_name="LTV Médio (R$)")
+    payback_meses = models.DecimalField(max_digits=8, decimal_places=1, null=True, blank=True, verbose_name="Payback (meses)")
+
+    calculado_em = models.DateTimeField(auto_now=True, verbose_name="Calculado em")
+
+    class Meta:
+        verbose_name = "Indicador de Aquisição (CAC/LTV)"
+        verbose_name_plural = "Indicadores de Aquisição (CAC/LTV)"
+        ordering = ['-ano', '-mes', 'canal__nome']
+        constraints = [
+            models.UniqueConstraint(fields=['canal', 'ano', 'mes'], condition=Q(canal__isnull=False), name='indicador_unico_por_canal_mes'),
+            models.UniqueConstraint(fields=['ano', 'mes'], condition=Q(canal__isnull=True), name='indicador_consolidado_unico_mes'),
+        ]
+
+    def __str__(self):
+        return f"{self.canal or 'Consolidado'} - {self.mes:02d}/{self.ano}"
+
+    @property
+    def razao_ltv_cac(self):
+        if not self.cac or self.ltv is None:
+            return None
+        return self.ltv / self.cac
@@ -0,0 +1,153 @@
+# tc_marketing/services.py
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import GastoMarketing, IndicadorAquisicaoMensal
+
+# ############################################################################
+# CAC / LTV / PAYBACK (materializados em IndicadorAquisicaoMensal)
+# ############################################################################
+
+class IndicadoresAquisicaoService:
+    """
+    - Novo cliente: primeira Oportunidade ganha do Cliente; o mês e o canal de
+      aquisição são os dessa oportunidade.
+    - CAC: gasto do mês/canal ÷ novos clientes do mês/canal.
+    - LTV (por coorte): (valor já recebido em Faturas + MRR dos contratos ativos
+      × MARKETING_LTV_HORIZONTE_MESES) ÷ novos clientes.
+    - Payback: CAC ÷ receita mensal média por cliente da coorte (MRR; sem
+      contratos ativos, a receita recebida dividida pelos meses desde a aquisição).
+
+    Cada recálculo usa um punhado de queries agrupadas e regrava apenas os meses
+    informados, o que permite atualizar incrementalmente a partir dos signals.
+    """
+
+    @staticmethod
+    def _intervalo(ano, mes):
+        inicio = timezone.make_aware(datetime(ano, mes, 1))
+        fim = timezone.make_aware(datetime(ano + mes // 12, mes % 12 + 1, 1))
+        return inicio, fim
+
+    @staticmethod
+    def _mes_de(data_hora):
+        local = timezone.localtime(data_hora)
+        return local.year, local.month
+
+    @staticmethod
+    def _clientes_com_aquisicao():
+        from tc_crm.models import Cliente, Oportunidade
+
+        ganhas = Oportunidade.objects.filter(
+            cliente=OuterRef('pk'), etapa__e_etapa_ganha=True, data_fechamento_real__isnull=False
+        ).order_by('data_fechamento_real', 'pk')
+        return Cliente.objects.annotate(
+            aquisicao=Subquery(ganhas.values('data_fechamento_real')[:1]),
+            canal_aquisicao=Subquery(ganhas.values('canal_origem_id')[:1]),
+        ).filter(aquisicao__isnull=False)
+
+    @staticmethod
+    def meses_de_aquisicao(cliente_ids):
+        """ {cliente_id: (ano, mes)} do primeiro negócio ganho de cada cliente. """
+        linhas = IndicadoresAquisicaoService._clientes_com_aquisicao().filter(
+            pk__in=cliente_ids
+        ).values_list('pk', 'aquisicao')
+        return {pk: IndicadoresAquisicaoService._mes_de(aquisicao) for pk, aquisicao in linhas}
+
+    @staticmethod
+    def meses_registrados():
+        """ Todos os meses com gasto ou com aquisição de cliente. """
+        meses = set(GastoMarketing.objects.values_list('ano', 'mes').distinct())
+        for aquisicao in IndicadoresAquisicaoService._clientes_com_aquisicao().values_list('aquisicao', flat=True):
+            meses.add(IndicadoresAquisicaoService._mes_de(aquisicao))
+        return meses
+
+    @staticmethod
+    def recalcular(meses=None):
+        """ Recalcula e regrava os indicadores dos meses [(ano, mes), ...] (todos se None). """
+        from tc_contratos.models import Contrato
+        from tc_financeiro.models import Fatura
+
+        meses = set(meses) if meses is not None else IndicadoresAquisicaoService.meses_registrados()
+        if not meses:
+            return 0
+
+        # 1. Aquisições dos meses (1 query)
+        filtro_aquisicao = Q()
+        for ano, mes in meses:
+            inicio, fim = IndicadoresAquisicaoService._intervalo(ano, mes)
+            filtro_aquisicao |= Q(aquisicao__gte=inicio, aquisicao__lt=fim)
+        coortes = defaultdict(list)
+        for cliente_id, aquisicao, canal_id in IndicadoresAquisicaoService._clientes_com_aquisicao().filter(
+            filtro_aquisicao
+        ).values_list('pk', 'aquisicao', 'canal_aquisicao'):
+            ano, mes = IndicadoresAquisicaoService._mes_de(aquisicao)
+            # Sem canal, o cliente entra apenas no consolidado (a mesma chave)
+            if canal_id is not None:
+                coortes[(ano, mes, canal_id)].append(cliente_id)
+            coortes[(ano, mes, None)].append(cliente_id)
+
+        # 2. Gastos por mês e canal (1 query agrupada)
+        filtro_gasto = Q()
+        for ano, mes in meses:
+            filtro_gasto |= Q(ano=ano, mes=mes)
+        gastos = defaultdict(Decimal)
+        for linha in GastoMarketing.objects.filter(filtro_gasto).values('ano', 'mes', 'canal_id').annotate(total=Sum('valor_gasto')):
+            gastos[(linha['ano'], linha['mes'], linha['canal_id'])] += linha['total'] or Decimal('0.00')
+            gastos[(linha['ano'], linha['mes'], None)] += linha['total'] or Decimal('0.00')
+
+        # 3. Receita recebida e MRR ativo dos clientes adquiridos (2 queries agrupadas)
+        cliente_ids = {pk for chave, ids in coortes.items() if chave[2] is None for pk in ids}
+        recebido = dict(
+            Fatura.objects.filter(cliente_id__in=cliente_ids).exclude(status='cancelado')
+            .values('cliente_id').annotate(total=Sum('valor_pago')).values_list('cliente_id', 'total')
+        ) if cliente_ids else {}
+        mrr = dict(
+            Contrato.objects.filter(cliente_id__in=cliente_ids, situacao='ATIVO')
+            .values('cliente_id').annotate(total=Sum('valor_mensal')).values_list('cliente_id', 'total')
+        ) if cliente_ids else {}
+
+        horizonte = Decimal(getattr(settings, 'MARKETING_LTV_HORIZONTE_MESES', 12))
+        hoje = timezone.localdate()
+        indicadores = []
+        for ano, mes, canal_id in set(coortes) | set(gastos):
+            if (ano, mes) not in meses:
+                continue
+            ids = coortes.get((ano, mes, canal_id), [])
+            novos = len(ids)
+            gasto = gastos.get((ano, mes, canal_id), Decimal('0.00'))
+            realizada = sum((recebido.get(pk) or Decimal('0.00') for pk in ids), Decimal('0.00'))
+            recorrente = sum((mrr.get(pk) or Decimal('0.00') for pk in ids), Decimal('0.00'))
+
+            cac = ltv = payback = None
+            if novos:
+                cac = (gasto / novos).quantize(Decimal('0.01'))
+                ltv = ((realizada + recorrente * horizonte) / novos).quantize(Decimal('0.01'))
+                meses_de_vida = max((hoje.year - ano) * 12 + hoje.month - mes, 1)
+                mensal = (recorrente / novos) if recorrente else (realizada / novos / meses_de_vida)
+                if mensal > 0:
+                    payback = (cac / mensal).quantize(Decimal('0.1'))
+
+            indicadores.append(IndicadorAquisicaoMensal(
+                canal_id=canal_id, ano=ano, mes=mes, valor_gasto=gasto, novos_clientes=novos, cac=cac,
+                receita_realizada=realizada, receita_recorrente=recorrente, ltv=ltv, payback_meses=payback,
+            ))
+
+        filtro_meses = Q()
+        for ano, mes in meses:
+            filtro_meses |= Q(ano=ano, mes=mes)
+        with transaction.atomic():
+            IndicadorAquisicaoMensal.objects.filter(filtro_meses).delete()
+            IndicadorAquisicaoMensal.objects.bulk_create(indicadores)
+        return len(indicadores)
+
+    @staticmethod
+    def recalcular_por_clientes(cliente_ids, meses_extras=()):
+        """ Recalcula os meses de aquisição dos clientes (após mudança em negócios, faturas ou contratos). """
+        meses = set(IndicadoresAquisicaoService.meses_de_aquisicao(cliente_ids).values()) | set(meses_extras)
+        return IndicadoresAquisicaoService.recalcular(meses)
@@ -0,0 +1,68 @@
+# tc_marketing/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from tc_contratos.models import Contrato
+from tc_crm.models import Oportunidade
+from tc_crm.services import oportunidades_movidas
+from tc_financeiro.models import Fatura
+
+from .models import GastoMarketing
+from .services import IndicadoresAquisicaoService
+
+
+# ############################################################################
+# CAC / LTV: recalcula somente os meses afetados, após o commit
+# ############################################################################
+
+@receiver(pre_save, sender=GastoMarketing)
+def guardar_mes_gasto_anterior(sender, instance, **kwargs):
+    instance._mes_anterior = None
+    if instance.pk:
+        instance._mes_anterior = GastoMarketing.objects.filter(pk=instance.pk).values_list('ano', 'mes').first()
+
+@receiver(post_save, sender=GastoMarketing)
+@receiver(post_delete, sender=GastoMarketing)
+def recalcular_mes_do_gasto(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    meses = {(instance.ano, instance.mes)}
+    if getattr(instance, '_mes_anterior', None):
+        meses.add(tuple(instance._mes_anterior))
+    transaction.on_commit(lambda: IndicadoresAquisicaoService.recalcular(meses))
+
+
+@receiver(pre_save, sender=Oportunidade)
+def guardar_aquisicao_anterior(sender, instance, **kwargs):
+    # O negócio pode mudar o mês de aquisição do cliente (ou deixar de ser o primeiro ganho)
+    instance._aquisicao_anterior = IndicadoresAquisicaoService.meses_de_aquisicao([instance.cliente_id]).get(instance.cliente_id)
+
+@receiver(post_save, sender=Oportunidade)
+@receiver(post_delete, sender=Oportunidade)
+def recalcular_aquisicao_do_cliente(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    cliente_id = instance.cliente_id
+    anterior = getattr(instance, '_aquisicao_anterior', None)
+    transaction.on_commit(
+        lambda: IndicadoresAquisicaoService.recalcular_por_clientes([cliente_id], [anterior] if anterior else [])
+    )
+
+@receiver(oportunidades_movidas)
+def recalcular_aquisicao_apos_movimentacao(sender, oportunidades, **kwargs):
+    # Movimentação em lote do Kanban: o banco ainda tem as etapas anteriores
+    cliente_ids = {o.cliente_id for o in oportunidades}
+    anteriores = set(IndicadoresAquisicaoService.meses_de_aquisicao(cliente_ids).values())
+    transaction.on_commit(lambda: IndicadoresAquisicaoService.recalcular_por_clientes(cliente_ids, anteriores))
+
+
+@receiver(post_save, sender=Fatura)
+@receiver(post_delete, sender=Fatura)
+@receiver(post_save, sender=Contrato)
+@receiver(post_delete, sender=Contrato)
+def recalcular_ltv_do_cliente(sender, instance, **kwargs):
+    if kwargs.get('raw') or not instance.cliente_id:
+        return
+    cliente_id = instance.cliente_id
+    transaction.on_commit(lambda: IndicadoresAquisicaoService.recalcular_por_clientes([cliente_id]))
@@ -1,3 +1,61 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from tc_crm.models import Cliente, EtapaVenda, Oportunidade
+from .models import CanalMarketing, GastoMarketing, IndicadorAquisicaoMensal
+from .services import IndicadoresAquisicaoService
+
+
+class IndicadoresAquisicaoTest(TestCase):
+    """
+    Coortes de aquisição por mês e canal: cada cliente conta uma vez no seu
+    canal e uma vez no consolidado (canal vazio), inclusive sem canal.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = timezone.localdate()
+        cls.canal = CanalMarketing.objects.create(nome='Google Ads')
+        cls.ganha = EtapaVenda.objects.create(nome='Ganho', ordem=1, e_etapa_ganha=True)
+
+    def adquirir(self, nome, canal=None):
+        cliente = Cliente.objects.create(razao_social=nome)
+        Oportunidade.objects.create(
+            nome=f'Primeira venda {nome}', cliente=cliente, etapa=self.ganha, canal_origem=canal,
+            valor_estimado=Decimal('1000.00'), data_fechamento_real=timezone.now(),
+        )
+        return cliente
+
+    def indicador(self, canal):
+        return IndicadorAquisicaoMensal.objects.get(ano=self.hoje.year, mes=self.hoje.month, canal=canal)
+
+    def test_cliente_sem_canal_conta_uma_vez_no_consolidado(self):
+        GastoMarketing.objects.create(
+            canal=self.canal, ano=self.hoje.year, mes=self.hoje.month, valor_gasto=Decimal('900.00'),
+        )
+        self.adquirir('Cliente do Canal', canal=self.canal)
+        self.adquirir('Cliente Direto')
+        self.adquirir('Outro Direto')
+
+        IndicadoresAquisicaoService.recalcular([(self.hoje.year, self.hoje.month)])
+
+        por_canal = self.indicador(self.canal)
+        self.assertEqual(por_canal.novos_clientes, 1)
+        self.assertEqual(por_canal.cac, Decimal('900.00'))
+
+        consolidado = self.indicador(None)
+        self.assertEqual(consolidado.novos_clientes, 3)
+        self.assertEqual(consolidado.valor_gasto, Decimal('900.00'))
+        self.assertEqual(consolidado.cac, Decimal('300.00'))
+        self.assertEqual(IndicadorAquisicaoMensal.objects.count(), 2)
+
+    def test_recalculo_regrava_o_mes_sem_duplicar(self):
+        self.adquirir('Cliente Direto')
+        mes = [(self.hoje.year, self.hoje.month)]
+
+        IndicadoresAquisicaoService.recalcular(mes)
+        IndicadoresAquisicaoService.recalcular(mes)
 
-# Create your tests here.
+        self.assertEqual(IndicadorAquisicaoMensal.objects.count(), 1)
+        self.assertEqual(self.indicador(None).novos_clientes, 1)
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from simple_history.admin import SimpleHistoryAdmin
 
-# Register your models here.
+from .models import MetaSLA, MetricaSuporteDiaria
+
+
+@admin.register(MetaSLA)
+class MetaSLAAdmin(SimpleHistoryAdmin):
+    list_display = ('prioridade', 'categoria', 'prazo_primeira_resposta_min', 'prazo_resolucao_min')
+    list_filter = ('prioridade',)
+
+
+@admin.register(MetricaSuporteDiaria)
+class MetricaSuporteDiariaAdmin(admin.ModelAdmin):
+    list_display = ('data', 'atendente', 'categoria', 'abertos', 'respondidos', 'resolvidos', 'violacoes_resolucao')
+    list_filter = ('categoria', 'atendente')
+    date_hierarchy = 'data'
+    readonly_fields = [f.name for f in MetricaSuporteDiaria._meta.fields]
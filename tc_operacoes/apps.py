@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TcOperacoesConfig(AppConfig):
     name = 'tc_operacoes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
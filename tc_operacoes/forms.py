@@ -1,6 +1,9 @@
 from django import forms
 from .models import Fabricante, TipoAtivo, Ativo, Chamado, InteracaoChamado, OrdemServico, CategoriaOperacao
+from tc_contratos.autocompletes import ContratoAutocomplete
 from tc_contratos.models import Contrato
+from tc_core.autocomplete import AutocompleteSelect
+from tc_crm.autocompletes import ClienteAutocomplete
 
 class FabricanteForm(forms.ModelForm):
     class Meta:
@@ -31,7 +34,7 @@ class AtivoForm(forms.ModelForm):
         ]
         widgets = {
             'produto_catalogo': forms.Select(attrs={'class': 'form-control select2'}),
-            'cliente': forms.Select(attrs={'class': 'form-control select2'}),
+            'cliente': AutocompleteSelect(ClienteAutocomplete, attrs={'class': 'form-control select2'}),
             'fabricante': forms.Select(attrs={'class': 'form-control select2'}),
             'tipo': forms.Select(attrs={'class': 'form-control select2'}),
             'identificador_unico': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Serial / Service Tag'}),
@@ -50,8 +53,9 @@ class OrdemServicoForm(forms.ModelForm):
         ]
         widgets = {
             'numero_os': forms.TextInput(attrs={'class': 'form-control'}),
-            'cliente': forms.Select(attrs={'class': 'form-control select2'}),
+            'cliente': AutocompleteSelect(ClienteAutocomplete, attrs={'class': 'form-control select2'}),
             'responsavel': forms.Select(attrs={'class': 'form-control select2'}),
+            'contrato_vinculado': AutocompleteSelect(ContratoAutocomplete, attrs={'class': 'form-control select2'}),
             'titulo': forms.TextInput(attrs={'class': 'form-control'}),
             'descricao': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
             'status': forms.Select(attrs={'class': 'form-control'}),
@@ -73,7 +77,7 @@ class ChamadoForm(forms.ModelForm):
             'prioridade', 'status', 'atendente_responsavel'
         ]
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-control select2'}),
+            'cliente': AutocompleteSelect(ClienteAutocomplete, attrs={'class': 'form-control select2'}),
             'solicitante_contato': forms.Select(attrs={'class': 'form-control select2'}),
             'ativo_vinculado': forms.Select(attrs={'class': 'form-control select2'}),
             'categoria': forms.Select(attrs={'class': 'form-control'}),
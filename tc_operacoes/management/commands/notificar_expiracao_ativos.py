@@ -0,0 +1,45 @@
+# tc_operacoes/management/commands/notificar_expiracao_ativos.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tc_operacoes.services import GarantiaAtivosService
+
+class Command(BaseCommand):
+    help = 'Envia o resumo por cliente das garantias/licenças de ativos a vencer e, opcionalmente, cria as oportunidades de renovação'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'OPERACOES_GARANTIA_ANTECEDENCIA_DIAS', 60),
+            help='Janela de vencimento em dias (padrão: OPERACOES_GARANTIA_ANTECEDENCIA_DIAS).'
+        )
+        parser.add_argument(
+            '--criar-oportunidades', action='store_true',
+            help='Cria uma oportunidade de renovação por cliente para os ativos ainda sem oportunidade.'
+        )
+        parser.add_argument(
+            '--recalcular', action='store_true',
+            help='Recalcula antes o vencimento efetivo de todos os ativos.'
+        )
+
+    def handle(self, *args, **options):
+        if options['recalcular']:
+            total = GarantiaAtivosService.recalcular_expiracoes()
+            self.stdout.write(f'{total} ativo(s) com vencimento recalculado.')
+
+        resumos = GarantiaAtivosService.resumos_por_cliente(options['dias'])
+        if not resumos:
+            self.stdout.write("Nenhuma garantia/licença vencendo no período.")
+            return
+
+        if options['criar_oportunidades']:
+            criadas = GarantiaAtivosService.criar_oportunidades_renovacao(resumos)
+            self.stdout.write(self.style.SUCCESS(f'{criadas} oportunidade(s) de renovação criada(s).'))
+
+        enviados = GarantiaAtivosService.enviar_alertas(resumos)
+        if not enviados:
+            self.stdout.write(self.style.WARNING(
+                'OPERACOES_GARANTIA_EMAILS sem destinatários: nenhum alerta enviado; os ativos seguem pendentes.'
+            ))
+            return
+        ativos = sum(len(lista) for _, lista in resumos)
+        self.stdout.write(self.style.SUCCESS(f'{enviados} resumo(s) enviado(s) cobrindo {ativos} ativo(s).'))
@@ -0,0 +1,25 @@
+# tc_operacoes/management/commands/recalcular_metricas_suporte.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from tc_operacoes.services import MetricasSuporteService
+
+class Command(BaseCommand):
+    help = 'Recalcula os tempos de 1ª resposta/resolução dos chamados e os consolidados diários de suporte'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Data inicial no formato AAAA-MM-DD (padrão: todo o histórico).')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = date.fromisoformat(options['desde'])
+            except ValueError:
+                raise CommandError("Use o formato AAAA-MM-DD em --desde.")
+
+        chamados, consolidados = MetricasSuporteService.reconstruir(desde)
+        self.stdout.write(self.style.SUCCESS(
+            f'{chamados} chamado(s) recalculado(s); {consolidados} linha(s) de consolidado gravada(s).'
+        ))
@@ -0,0 +1,107 @@
+# Generated by Django 6.0 on 2026-10-19 12:40
+
+import django.db.models.deletion
+import simple_history.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_operacoes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chamado',
+            name='data_primeira_resposta',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Primeira Resposta'),
+        ),
+        migrations.AddField(
+            model_name='chamado',
+            name='data_resolucao',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Resolução'),
+        ),
+        migrations.AddField(
+            model_name='chamado',
+            name='sla_resolucao_violado',
+            field=models.BooleanField(editable=False, null=True, verbose_name='SLA de Resolução Violado'),
+        ),
+        migrations.AddField(
+            model_name='chamado',
+            name='sla_resposta_violado',
+            field=models.BooleanField(editable=False, null=True, verbose_name='SLA de Resposta Violado'),
+        ),
+        migrations.AddField(
+            model_name='chamado',
+            name='tempo_primeira_resposta_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Tempo até 1ª Resposta (min)'),
+        ),
+        migrations.AddField(
+            model_name='chamado',
+            name='tempo_resolucao_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Tempo de Resolução (min)'),
+        ),
+        migrations.CreateModel(
+            name='HistoricalMetaSLA',
+            fields=[
+                ('id', models.BigIntegerField(auto_created=True, blank=True, db_index=True, verbose_name='ID')),
+                ('prioridade', models.CharField(choices=[('1', 'Crítica / Parada Total'), ('2', 'Alta'), ('3', 'Média / Normal'), ('4', 'Baixa')], max_length=1, verbose_name='Prioridade')),
+                ('prazo_primeira_resposta_min', models.PositiveIntegerField(verbose_name='Prazo p/ 1ª Resposta (min)')),
+                ('prazo_resolucao_min', models.PositiveIntegerField(verbose_name='Prazo p/ Resolução (min)')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('categoria', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tc_operacoes.categoriaoperacao', verbose_name='Categoria (opcional)')),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical Meta de SLA',
+                'verbose_name_plural': 'historical Metas de SLA',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='MetaSLA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prioridade', models.CharField(choices=[('1', 'Crítica / Parada Total'), ('2', 'Alta'), ('3', 'Média / Normal'), ('4', 'Baixa')], max_length=1, verbose_name='Prioridade')),
+                ('prazo_primeira_resposta_min', models.PositiveIntegerField(verbose_name='Prazo p/ 1ª Resposta (min)')),
+                ('prazo_resolucao_min', models.PositiveIntegerField(verbose_name='Prazo p/ Resolução (min)')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metas_sla', to='tc_operacoes.categoriaoperacao', verbose_name='Categoria (opcional)')),
+            ],
+            options={
+                'verbose_name': 'Meta de SLA',
+                'verbose_name_plural': 'Metas de SLA',
+                'ordering': ['prioridade', 'categoria__nome'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('categoria__isnull', False)), fields=('prioridade', 'categoria'), name='meta_sla_unica_por_categoria'), models.UniqueConstraint(condition=models.Q(('categoria__isnull', True)), fields=('prioridade',), name='meta_sla_unica_geral')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MetricaSuporteDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Dia')),
+                ('abertos', models.PositiveIntegerField(default=0, verbose_name='Chamados Abertos')),
+                ('respondidos', models.PositiveIntegerField(default=0, verbose_name='Primeiras Respostas')),
+                ('resolvidos', models.PositiveIntegerField(default=0, verbose_name='Chamados Resolvidos')),
+                ('soma_primeira_resposta_min', models.PositiveBigIntegerField(default=0, verbose_name='Soma 1ª Resposta (min)')),
+                ('soma_resolucao_min', models.PositiveBigIntegerField(default=0, verbose_name='Soma Resolução (min)')),
+                ('violacoes_resposta', models.PositiveIntegerField(default=0, verbose_name='Violações de SLA (Resposta)')),
+                ('violacoes_resolucao', models.PositiveIntegerField(default=0, verbose_name='Violações de SLA (Resolução)')),
+                ('atendente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metricas_suporte', to=settings.AUTH_USER_MODEL, verbose_name='Atendente')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metricas_suporte', to='tc_operacoes.categoriaoperacao', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Métrica Diária de Suporte',
+                'verbose_name_plural': 'Métricas Diárias de Suporte',
+                'ordering': ['-data'],
+                'indexes': [models.Index(fields=['data', 'atendente'], name='idx_metrica_suporte_dia')],
+            },
+        ),
+    ]
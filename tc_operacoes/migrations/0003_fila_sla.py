@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 12:44
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def calcular_prazos_iniciais(apps, schema_editor):
+    # Mesma regra de MetricasSuporteService.prazos: meta da categoria, senão a
+    # geral da prioridade, senão o padrão do sistema
+    Chamado = apps.get_model('tc_operacoes', 'Chamado')
+    MetaSLA = apps.get_model('tc_operacoes', 'MetaSLA')
+    padrao = {'1': 240, '2': 480, '3': 1440, '4': 2880}
+    metas = {(m.prioridade, m.categoria_id): m.prazo_resolucao_min for m in MetaSLA.objects.all()}
+
+    alterados = []
+    for chamado in Chamado.objects.only('pk', 'prioridade', 'categoria_id', 'data_abertura').iterator():
+        minutos = metas.get(
+            (chamado.prioridade, chamado.categoria_id),
+            metas.get((chamado.prioridade, None), padrao.get(chamado.prioridade, 1440)),
+        )
+        chamado.prazo_sla = chamado.data_abertura + timedelta(minutes=minutos)
+        alterados.append(chamado)
+    Chamado.objects.bulk_update(alterados, ['prazo_sla'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0005_oportunidade_canal_origem'),
+        ('tc_operacoes', '0002_metricas_suporte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chamado',
+            name='prazo_sla',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Prazo SLA'),
+        ),
+        migrations.AddIndex(
+            model_name='chamado',
+            index=models.Index(fields=['status', 'prazo_sla'], name='idx_chamado_fila_sla'),
+        ),
+        migrations.AddIndex(
+            model_name='chamado',
+            index=models.Index(fields=['atendente_responsavel', 'status', 'prazo_sla'], name='idx_chamado_fila_atendente'),
+        ),
+        migrations.RunPython(calcular_prazos_iniciais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def calcular_expiracoes_iniciais(apps, schema_editor):
+    # Mesma regra de Ativo.calcular_expiracao_efetiva
+    Ativo = apps.get_model('tc_operacoes', 'Ativo')
+    alterados = []
+    for ativo in Ativo.objects.select_related('produto_catalogo').iterator():
+        if ativo.data_expiracao_garantia:
+            ativo.data_expiracao_efetiva = ativo.data_expiracao_garantia
+        elif ativo.data_aquisicao and ativo.produto_catalogo.dias_garantia > 0:
+            ativo.data_expiracao_efetiva = ativo.data_aquisicao + timedelta(days=ativo.produto_catalogo.dias_garantia)
+        else:
+            continue
+        alterados.append(ativo)
+    Ativo.objects.bulk_update(alterados, ['data_expiracao_efetiva'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_crm', '0006_resumocliente'),
+        ('tc_operacoes', '0003_fila_sla'),
+        ('tc_produtos', '0003_cotacaomoeda_melhorprecoproduto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ativo',
+            name='alerta_expiracao_para',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Alerta Enviado p/ Expiração'),
+        ),
+        migrations.AddField(
+            model_name='ativo',
+            name='data_expiracao_efetiva',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Expiração da Garantia (Efetiva)'),
+        ),
+        migrations.AddField(
+            model_name='ativo',
+            name='oportunidade_renovacao',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ativos_renovacao', to='tc_crm.oportunidade', verbose_name='Oportunidade de Renovação'),
+        ),
+        migrations.AddField(
+            model_name='historicalativo',
+            name='oportunidade_renovacao',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tc_crm.oportunidade', verbose_name='Oportunidade de Renovação'),
+        ),
+        migrations.AddIndex(
+            model_name='ativo',
+            index=models.Index(fields=['data_expiracao_efetiva', 'cliente'], name='idx_ativo_expiracao'),
+        ),
+        migrations.RunPython(calcular_expiracoes_iniciais, migrations.RunPython.noop),
+    ]
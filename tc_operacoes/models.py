@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Q # Necessário para constraints
 import logging
+from datetime import timedelta
 
 # Configuração de logging (opcional, mas boa prática)
 logger = logging.getLogger(__name__)
@@ -77,17 +78,45 @@ class Ativo(models.Model):
     
     data_aquisicao = models.DateField(null=True, blank=True)
     data_expiracao_garantia = models.DateField(null=True, blank=True)
+
+    # Vencimento efetivo: a data informada ou aquisição + garantia do catálogo
+    data_expiracao_efetiva = models.DateField(null=True, blank=True, editable=False, verbose_name="Expiração da Garantia (Efetiva)")
+    # Vencimento já avisado no resumo por cliente (evita alertas repetidos)
+    alerta_expiracao_para = models.DateField(null=True, blank=True, editable=False, verbose_name="Alerta Enviado p/ Expiração")
+    oportunidade_renovacao = models.ForeignKey(
+        'tc_crm.Oportunidade',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        editable=False,
+        related_name='ativos_renovacao',
+        verbose_name="Oportunidade de Renovação"
+    )
     
     observacoes = models.TextField(blank=True, null=True)
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=['data_expiracao_efetiva', 'alerta_expiracao_para'])
 
     class Meta:
         verbose_name = "Ativo (CMDB)"
         verbose_name_plural = "Ativos (CMDB)"
+        indexes = [
+            models.Index(fields=['data_expiracao_efetiva', 'cliente'], name='idx_ativo_expiracao'),
+        ]
 
     def __str__(self):
         return f"{self.identificador_unico} - {self.produto_catalogo.nome}"
 
+    def calcular_expiracao_efetiva(self):
+        if self.data_expiracao_garantia:
+            return self.data_expiracao_garantia
+        dias_garantia = self.produto_catalogo.dias_garantia
+        if self.data_aquisicao and dias_garantia > 0:
+            return self.data_aquisicao + timedelta(days=dias_garantia)
+        return None
+
+    def save(self, *args, **kwargs):
+        self.data_expiracao_efetiva = self.calcular_expiracao_efetiva()
+        super().save(*args, **kwargs)
+
 # ############################################################################
 # 2. GESTÃO DE ORDENS DE SERVIÇO (OS)
 # ############################################################################
@@ -209,16 +238,52 @@ class Chamado(models.Model):
     data_ultima_interacao = models.DateTimeField(auto_now=True)
     data_fechamento = models.DateTimeField(null=True, blank=True)
 
-    history = HistoricalRecords()
+    # Prazo de resolução pela MetaSLA (prioridade/categoria); ordena a fila de atendimento
+    prazo_sla = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Prazo SLA")
+
+    # Métricas derivadas (mantidas por MetricasSuporteService ao registrar interações/soluções)
+    data_primeira_resposta = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Primeira Resposta")
+    data_resolucao = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Resolução")
+    tempo_primeira_resposta_min = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Tempo até 1ª Resposta (min)")
+    tempo_resolucao_min = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Tempo de Resolução (min)")
+    sla_resposta_violado = models.BooleanField(null=True, editable=False, verbose_name="SLA de Resposta Violado")
+    sla_resolucao_violado = models.BooleanField(null=True, editable=False, verbose_name="SLA de Resolução Violado")
+
+    history = HistoricalRecords(excluded_fields=[
+        'data_primeira_resposta', 'data_resolucao', 'tempo_primeira_resposta_min',
+        'tempo_resolucao_min', 'sla_resposta_violado', 'sla_resolucao_violado', 'prazo_sla',
+    ])
 
     class Meta:
         verbose_name = "Chamado / Ticket"
         verbose_name_plural = "Chamados / Tickets"
         ordering = ['prioridade', '-data_abertura']
+        indexes = [
+            models.Index(fields=['status', 'prazo_sla'], name='idx_chamado_fila_sla'),
+            models.Index(fields=['atendente_responsavel', 'status', 'prazo_sla'], name='idx_chamado_fila_atendente'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Numeração automática do ticket (Ano-000000)
+        if not self.ticket_id:
+            from django.utils import timezone
+            prefixo = f"{timezone.now().year}-"
+            ultimo = Chamado.objects.filter(ticket_id__startswith=prefixo).order_by('-ticket_id').values_list('ticket_id', flat=True).first()
+            try:
+                numero = int(ultimo.split('-')[1]) + 1 if ultimo else 1
+            except (IndexError, ValueError):
+                numero = 1
+            self.ticket_id = f"{prefixo}{numero:06d}"
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"#{self.ticket_id} - {self.assunto}"
 
+    @property
+    def sla_vencido(self):
+        from django.utils import timezone
+        return bool(self.prazo_sla and self.status in ('NEW', 'ASS', 'PEN') and self.prazo_sla < timezone.now())
+
 class InteracaoChamado(models.Model):
     chamado = models.ForeignKey(Chamado, on_delete=models.CASCADE, related_name='interacoes')
     autor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
@@ -238,4 +303,80 @@ class SolucaoChamado(models.Model):
 
     class Meta:
         verbose_name = "Solução de Chamado"
-        verbose_name_plural = "Soluções de Chamados"
\ No newline at end of file
+        verbose_name_plural = "Soluções de Chamados"
+
+# ############################################################################
+# 4. SLA E MÉTRICAS DE SUPORTE
+# ############################################################################
+
+class MetaSLA(models.Model):
+    """
+    Prazos de atendimento por prioridade. Uma meta com categoria tem precedência
+    sobre a meta geral (sem categoria) da mesma prioridade.
+    """
+    prioridade = models.CharField(max_length=1, choices=Chamado.PRIORIDADE_CHOICES, verbose_name="Prioridade")
+    categoria = models.ForeignKey(
+        CategoriaOperacao,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='metas_sla',
+        verbose_name="Categoria (opcional)"
+    )
+    prazo_primeira_resposta_min = models.PositiveIntegerField(verbose_name="Prazo p/ 1ª Resposta (min)")
+    prazo_resolucao_min = models.PositiveIntegerField(verbose_name="Prazo p/ Resolução (min)")
+
+    history = HistoricalRecords()
+
+    class Meta:
+        verbose_name = "Meta de SLA"
+        verbose_name_plural = "Metas de SLA"
+        ordering = ['prioridade', 'categoria__nome']
+        constraints = [
+            models.UniqueConstraint(fields=['prioridade', 'categoria'], condition=Q(categoria__isnull=False), name='meta_sla_unica_por_categoria'),
+            models.UniqueConstraint(fields=['prioridade'], condition=Q(categoria__isnull=True), name='meta_sla_unica_geral'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_prioridade_display()} - {self.categoria or 'Geral'}"
+
+
+class MetricaSuporteDiaria(models.Model):
+    """
+    Consolidado diário por atendente e categoria. Guarda somas e contagens
+    (não médias) para que qualquer período/agrupamento seja uma simples soma.
+    Mantido por MetricasSuporteService; não editar manualmente.
+    """
+    data = models.DateField(verbose_name="Dia")
+    atendente = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='metricas_suporte',
+        verbose_name="Atendente"
+    )
+    categoria = models.ForeignKey(
+        CategoriaOperacao,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='metricas_suporte',
+        verbose_name="Categoria"
+    )
+
+    abertos = models.PositiveIntegerField(default=0, verbose_name="Chamados Abertos")
+    respondidos = models.PositiveIntegerField(default=0, verbose_name="Primeiras Respostas")
+    resolvidos = models.PositiveIntegerField(default=0, verbose_name="Chamados Resolvidos")
+    soma_primeira_resposta_min = models.PositiveBigIntegerField(default=0, verbose_name="Soma 1ª Resposta (min)")
+    soma_resolucao_min = models.PositiveBigIntegerField(default=0, verbose_name="Soma Resolução (min)")
+    violacoes_resposta = models.PositiveIntegerField(default=0, verbose_name="Violações de SLA (Resposta)")
+    violacoes_resolucao = models.PositiveIntegerField(default=0, verbose_name="Violações de SLA (Resolução)")
+
+    class Meta:
+        verbose_name = "Métrica Diária de Suporte"
+        verbose_name_plural = "Métricas Diárias de Suporte"
+        ordering = ['-data']
+        indexes = [
+            models.Index(fields=['data', 'atendente'], name='idx_metrica_suporte_dia'),
+        ]
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.atendente or 'Sem atendente'} / {self.categoria or 'Sem categoria'}"
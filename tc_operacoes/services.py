@@ -0,0 +1,515 @@
+# tc_operacoes/services.py
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from .models import Ativo, Chamado, InteracaoChamado, MetaSLA, MetricaSuporteDiaria
+
+# ############################################################################
+# MÉTRICAS DE SUPORTE (1ª resposta, resolução, SLA e consolidados diários)
+# ############################################################################
+
+class MetricasSuporteService:
+    """
+    Os tempos são gravados no próprio Chamado quando a interação/solução é
+    registrada; dashboards leem MetricaSuporteDiaria em vez de varrer o
+    histórico de interações. Tempos em minutos corridos.
+    """
+    CACHE_METAS = 'tc_operacoes:metas_sla'
+
+    # Usado quando não há MetaSLA cadastrada: (1ª resposta, resolução) em minutos
+    SLA_PADRAO = {
+        '1': (30, 4 * 60),
+        '2': (60, 8 * 60),
+        '3': (4 * 60, 24 * 60),
+        '4': (8 * 60, 48 * 60),
+    }
+
+    @staticmethod
+    def metas_sla():
+        """ {(prioridade, categoria_id|None): (prazo_resposta, prazo_resolucao)}, em cache. """
+        metas = cache.get(MetricasSuporteService.CACHE_METAS)
+        if metas is None:
+            metas = {
+                (m['prioridade'], m['categoria_id']): (m['prazo_primeira_resposta_min'], m['prazo_resolucao_min'])
+                for m in MetaSLA.objects.values('prioridade', 'categoria_id', 'prazo_primeira_resposta_min', 'prazo_resolucao_min')
+            }
+            cache.set(MetricasSuporteService.CACHE_METAS, metas, None)
+        return metas
+
+    @staticmethod
+    def invalidar_metas():
+        cache.delete(MetricasSuporteService.CACHE_METAS)
+
+    @staticmethod
+    def prazos(prioridade, categoria_id):
+        metas = MetricasSuporteService.metas_sla()
+        return (
+            metas.get((prioridade, categoria_id))
+            or metas.get((prioridade, None))
+            or MetricasSuporteService.SLA_PADRAO.get(prioridade, MetricasSuporteService.SLA_PADRAO['3'])
+        )
+
+    @staticmethod
+    def _minutos(inicio, fim):
+        return max(int((fim - inicio).total_seconds() // 60), 0)
+
+    @staticmethod
+    def _dias(*datas):
+        return {timezone.localtime(d).date() for d in datas if d}
+
+    # ------------------------------------------------------------------
+    # Timestamps derivados por chamado
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def registrar_interacao(interacao):
+        """ Grava a 1ª resposta (interação visível ao cliente) se ainda não houver. """
+        if interacao.e_nota_interna:
+            return False
+        chamado = Chamado.objects.only('pk', 'prioridade', 'categoria_id', 'data_abertura').get(pk=interacao.chamado_id)
+        minutos = MetricasSuporteService._minutos(chamado.data_abertura, interacao.data_registro)
+        prazo_resposta, _ = MetricasSuporteService.prazos(chamado.prioridade, chamado.categoria_id)
+        atualizados = Chamado.objects.filter(pk=chamado.pk, data_primeira_resposta__isnull=True).update(
+            data_primeira_resposta=interacao.data_registro,
+            tempo_primeira_resposta_min=minutos,
+            sla_resposta_violado=minutos > prazo_resposta,
+        )
+        if atualizados:
+            MetricasSuporteService.agendar_rollup(MetricasSuporteService._dias(interacao.data_registro))
+        return bool(atualizados)
+
+    @staticmethod
+    def registrar_solucao(solucao):
+        """ Grava a resolução e marca o chamado como Resolvido. """
+        chamado = Chamado.objects.only(
+            'pk', 'prioridade', 'categoria_id', 'data_abertura', 'data_resolucao', 'status', 'atendente_responsavel_id'
+        ).get(pk=solucao.chamado_id)
+        minutos = MetricasSuporteService._minutos(chamado.data_abertura, solucao.data_resolucao)
+        _, prazo_resolucao = MetricasSuporteService.prazos(chamado.prioridade, chamado.categoria_id)
+        Chamado.objects.filter(pk=chamado.pk).update(
+            status='RES',
+            data_resolucao=solucao.data_resolucao,
+            tempo_resolucao_min=minutos,
+            sla_resolucao_violado=minutos > prazo_resolucao,
+        )
+        if chamado.status in FilaChamadosService.STATUS_ABERTOS:
+            FilaChamadosService.ajustar_carga(chamado.atendente_responsavel_id, -1)
+        MetricasSuporteService.agendar_rollup(
+            MetricasSuporteService._dias(solucao.data_resolucao, chamado.data_resolucao)
+        )
+
+    @staticmethod
+    def recalcular_chamados(queryset=None):
+        """
+        Reconstrói os campos derivados a partir de interações e soluções (carga
+        inicial ou correção após exclusões). Uma query de leitura + bulk_update.
+        """
+        queryset = Chamado.objects.all() if queryset is None else queryset
+        primeira = InteracaoChamado.objects.filter(
+            chamado=OuterRef('pk'), e_nota_interna=False
+        ).order_by('data_registro').values('data_registro')[:1]
+        chamados = list(queryset.annotate(
+            _primeira=Subquery(primeira),
+            _resolucao=F('solucao__data_resolucao'),
+        ).only('pk', 'prioridade', 'categoria_id', 'data_abertura'))
+
+        for chamado in chamados:
+            prazo_resposta, prazo_resolucao = MetricasSuporteService.prazos(chamado.prioridade, chamado.categoria_id)
+            chamado.data_primeira_resposta = chamado._primeira
+            chamado.data_resolucao = chamado._resolucao
+            chamado.tempo_primeira_resposta_min = chamado.sla_resposta_violado = None
+            chamado.tempo_resolucao_min = chamado.sla_resolucao_violado = None
+            if chamado._primeira:
+                chamado.tempo_primeira_resposta_min = MetricasSuporteService._minutos(chamado.data_abertura, chamado._primeira)
+                chamado.sla_resposta_violado = chamado.tempo_primeira_resposta_min > prazo_resposta
+            if chamado._resolucao:
+                chamado.tempo_resolucao_min = MetricasSuporteService._minutos(chamado.data_abertura, chamado._resolucao)
+                chamado.sla_resolucao_violado = chamado.tempo_resolucao_min > prazo_resolucao
+
+        Chamado.objects.bulk_update(chamados, [
+            'data_primeira_resposta', 'data_resolucao', 'tempo_primeira_resposta_min',
+            'tempo_resolucao_min', 'sla_resposta_violado', 'sla_resolucao_violado',
+        ], batch_size=1000)
+        return len(chamados)
+
+    # ------------------------------------------------------------------
+    # Consolidados diários (dia x atendente x categoria)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def agendar_rollup(dias):
+        dias = set(dias)
+        if dias:
+            transaction.on_commit(lambda: MetricasSuporteService.atualizar_rollups(dias))
+
+    @staticmethod
+    def atualizar_rollups(dias):
+        """ Regrava MetricaSuporteDiaria dos dias informados com 3 queries agrupadas. """
+        dias = sorted(set(dias))
+        if not dias:
+            return 0
+
+        # Faixa no campo bruto (usa índice) + refinamento pelo dia local
+        inicio = timezone.make_aware(datetime.combine(dias[0], time.min))
+        fim = timezone.make_aware(datetime.combine(dias[-1] + timedelta(days=1), time.min))
+
+        def agrupado(campo_data, **agregacoes):
+            return (
+                Chamado.objects.filter(**{f'{campo_data}__gte': inicio, f'{campo_data}__lt': fim})
+                .annotate(dia=TruncDate(campo_data))
+                .filter(dia__in=dias)
+                .values('dia', 'atendente_responsavel_id', 'categoria_id')
+                .annotate(**agregacoes)
+            )
+
+        linhas = defaultdict(dict)
+        consultas = [
+            agrupado('data_abertura', abertos=Count('pk')),
+            agrupado(
+                'data_primeira_resposta', respondidos=Count('pk'),
+                soma_primeira_resposta_min=Sum('tempo_primeira_resposta_min'),
+                violacoes_resposta=Count('pk', filter=Q(sla_resposta_violado=True)),
+            ),
+            agrupado(
+                'data_resolucao', resolvidos=Count('pk'),
+                soma_resolucao_min=Sum('tempo_resolucao_min'),
+                violacoes_resolucao=Count('pk', filter=Q(sla_resolucao_violado=True)),
+            ),
+        ]
+        for consulta in consultas:
+            for linha in consulta:
+                chave = (linha.pop('dia'), linha.pop('atendente_responsavel_id'), linha.pop('categoria_id'))
+                linhas[chave].update({campo: valor or 0 for campo, valor in linha.items()})
+
+        metricas = [
+            MetricaSuporteDiaria(data=dia, atendente_id=atendente_id, categoria_id=categoria_id, **valores)
+            for (dia, atendente_id, categoria_id), valores in linhas.items()
+        ]
+        with transaction.atomic():
+            MetricaSuporteDiaria.objects.filter(data__in=dias).delete()
+            MetricaSuporteDiaria.objects.bulk_create(metricas)
+        return len(metricas)
+
+    @staticmethod
+    def dias_do_chamado(chamado):
+        return MetricasSuporteService._dias(chamado.data_abertura, chamado.data_primeira_resposta, chamado.data_resolucao)
+
+    @staticmethod
+    def reconstruir(desde=None):
+        """ Recalcula chamados e consolidados a partir de 'desde' (date) ou de todo o histórico. """
+        chamados = Chamado.objects.all()
+        if desde:
+            inicio = timezone.make_aware(datetime.combine(desde, time.min))
+            chamados = chamados.filter(
+                Q(data_abertura__gte=inicio) | Q(solucao__data_resolucao__gte=inicio) | Q(interacoes__data_registro__gte=inicio)
+            ).distinct()
+        total = MetricasSuporteService.recalcular_chamados(chamados)
+
+        primeiro = desde or Chamado.objects.aggregate(inicio=Min('data_abertura'))['inicio']
+        if not primeiro:
+            return total, 0
+        if not desde:
+            primeiro = timezone.localtime(primeiro).date()
+        hoje = timezone.localdate()
+        dias = [primeiro + timedelta(days=i) for i in range((hoje - primeiro).days + 1)]
+        consolidados = 0
+        for i in range(0, len(dias), 31):
+            consolidados += MetricasSuporteService.atualizar_rollups(dias[i:i + 31])
+        return total, consolidados
+
+    # ------------------------------------------------------------------
+    # Leitura para dashboards
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def resumo(inicio, fim, agrupar_por=None):
+        """
+        Totais do período [inicio, fim] a partir dos consolidados. agrupar_por:
+        None, 'data', 'atendente' ou 'categoria'. Devolve médias já calculadas.
+        """
+        campos = {
+            None: [],
+            'data': ['data'],
+            'atendente': ['atendente_id', 'atendente__username', 'atendente__first_name', 'atendente__last_name'],
+            'categoria': ['categoria_id', 'categoria__nome'],
+        }[agrupar_por]
+        qs = MetricaSuporteDiaria.objects.filter(data__range=[inicio, fim])
+        agregacoes = {
+            campo: Sum(campo) for campo in (
+                'abertos', 'respondidos', 'resolvidos', 'soma_primeira_resposta_min',
+                'soma_resolucao_min', 'violacoes_resposta', 'violacoes_resolucao',
+            )
+        }
+        linhas = [qs.aggregate(**agregacoes)] if not campos else list(qs.values(*campos).annotate(**agregacoes).order_by(*campos))
+        for linha in linhas:
+            for campo in agregacoes:
+                linha[campo] = linha[campo] or 0
+            linha['media_primeira_resposta_min'] = (
+                linha['soma_primeira_resposta_min'] / linha['respondidos'] if linha['respondidos'] else None
+            )
+            linha['mttr_min'] = linha['soma_resolucao_min'] / linha['resolvidos'] if linha['resolvidos'] else None
+            linha['pct_sla_resolucao'] = (
+                100 * (linha['resolvidos'] - linha['violacoes_resolucao']) / linha['resolvidos'] if linha['resolvidos'] else None
+            )
+        return linhas[0] if agrupar_por is None else linhas
+
+
+# ############################################################################
+# FILA DE ATENDIMENTO (prazo SLA + atribuição pela menor carga)
+# ############################################################################
+
+class FilaChamadosService:
+    """
+    A fila é ordenada por prazo_sla e servida pelos índices (status, prazo_sla)
+    e (atendente, status, prazo_sla). A carga de cada atendente (chamados em
+    aberto) fica em cache, é ajustada com incr/decr a cada mudança e
+    reconstruída com uma única query agrupada quando expira.
+    """
+    STATUS_ABERTOS = ('NEW', 'ASS', 'PEN')
+    STATUS_A_PEGAR = ('NEW', 'ASS')
+    CACHE_ATENDENTES = 'tc_operacoes:atendentes'
+    CACHE_CARGA = 'tc_operacoes:carga:{}'
+
+    @staticmethod
+    def calcular_prazo(chamado):
+        _, prazo_resolucao = MetricasSuporteService.prazos(chamado.prioridade, chamado.categoria_id)
+        return (chamado.data_abertura or timezone.now()) + timedelta(minutes=prazo_resolucao)
+
+    @staticmethod
+    def fila(atendente=None, sem_atendente=False, apenas_abertos=True):
+        qs = Chamado.objects.all()
+        if apenas_abertos:
+            qs = qs.filter(status__in=FilaChamadosService.STATUS_ABERTOS)
+        if atendente is not None:
+            qs = qs.filter(atendente_responsavel=atendente)
+        elif sem_atendente:
+            qs = qs.filter(atendente_responsavel__isnull=True)
+        return qs.order_by('prazo_sla', 'pk')
+
+    @staticmethod
+    def proximo_chamado(atendente):
+        """
+        Próximo chamado a atender: o de prazo mais curto entre os do próprio
+        atendente e os sem dono, numa única query indexada. Chamados sem dono
+        são assumidos na hora (linhas travadas por outro atendente são puladas).
+        """
+        with transaction.atomic():
+            chamado = (
+                Chamado.objects.select_for_update(skip_locked=True)
+                .filter(status__in=FilaChamadosService.STATUS_A_PEGAR)
+                .filter(Q(atendente_responsavel=atendente) | Q(atendente_responsavel__isnull=True))
+                .order_by('prazo_sla', 'pk')
+                .first()
+            )
+            if chamado and chamado.atendente_responsavel_id is None:
+                chamado.atendente_responsavel = atendente
+                chamado.status = 'ASS'
+                chamado.save(update_fields=['atendente_responsavel', 'status', 'data_ultima_interacao'])
+        return chamado
+
+    # ------------------------------------------------------------------
+    # Carga por atendente (cache)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _timeout():
+        return getattr(settings, 'OPERACOES_CARGA_CACHE_TIMEOUT', 10 * 60)
+
+    @staticmethod
+    def atendentes():
+        """ IDs dos usuários ativos do departamento operacional (em cache). """
+        ids = cache.get(FilaChamadosService.CACHE_ATENDENTES)
+        if ids is None:
+            ids = list(get_user_model().objects.filter(
+                is_active=True, departamento='operacional'
+            ).order_by('pk').values_list('pk', flat=True))
+            cache.set(FilaChamadosService.CACHE_ATENDENTES, ids, FilaChamadosService._timeout())
+        return ids
+
+    @staticmethod
+    def cargas():
+        """ {atendente_id: chamados em aberto}; reconstrói tudo se faltar alguma chave. """
+        ids = FilaChamadosService.atendentes()
+        chaves = {FilaChamadosService.CACHE_CARGA.format(pk): pk for pk in ids}
+        em_cache = cache.get_many(chaves.keys())
+        if len(em_cache) == len(chaves):
+            return {chaves[chave]: valor for chave, valor in em_cache.items()}
+
+        contagem = dict(
+            Chamado.objects.filter(status__in=FilaChamadosService.STATUS_ABERTOS, atendente_responsavel_id__in=ids)
+            .values('atendente_responsavel_id').annotate(total=Count('pk'))
+            .values_list('atendente_responsavel_id', 'total')
+        )
+        cargas = {pk: contagem.get(pk, 0) for pk in ids}
+        cache.set_many({FilaChamadosService.CACHE_CARGA.format(pk): total for pk, total in cargas.items()}, FilaChamadosService._timeout())
+        return cargas
+
+    @staticmethod
+    def ajustar_carga(atendente_id, delta):
+        """ Ajusta o contador em cache só após o commit, para não divergir do banco em caso de rollback. """
+        if not atendente_id or not delta:
+            return
+
+        def ajustar():
+            try:
+                cache.incr(FilaChamadosService.CACHE_CARGA.format(atendente_id), delta)
+            except ValueError:
+                pass  # Sem chave em cache: será reconstruída na próxima leitura
+        transaction.on_commit(ajustar)
+
+    @staticmethod
+    def invalidar_atendentes():
+        cache.delete(FilaChamadosService.CACHE_ATENDENTES)
+
+    @staticmethod
+    def atendente_menos_carregado():
+        cargas = FilaChamadosService.cargas()
+        if not cargas:
+            return None
+        return min(cargas, key=lambda pk: (cargas[pk], pk))
+
+
+# ############################################################################
+# GARANTIAS / LICENÇAS DOS ATIVOS (CMDB): vencimentos, alertas e renovação
+# ############################################################################
+
+class GarantiaAtivosService:
+    """
+    Ativo.data_expiracao_efetiva (indexada com o cliente) concentra o
+    vencimento: a data informada no ativo ou, na falta dela, aquisição +
+    Produto.dias_garantia. Os alertas saem em um resumo por cliente e as
+    oportunidades de renovação são criadas em lote (uma por cliente).
+    """
+
+    @staticmethod
+    def recalcular_expiracoes(ativos=None):
+        """ Recalcula o vencimento efetivo em UPDATEs por prazo de garantia (sem loop por ativo). """
+        from tc_produtos.models import Produto
+
+        ativos = Ativo.objects.all() if ativos is None else ativos
+        total = ativos.filter(data_expiracao_garantia__isnull=False).update(
+            data_expiracao_efetiva=F('data_expiracao_garantia')
+        )
+        derivados = ativos.filter(data_expiracao_garantia__isnull=True)
+        total += derivados.filter(
+            Q(data_aquisicao__isnull=True) | Q(produto_catalogo__dias_garantia__lte=0)
+        ).update(data_expiracao_efetiva=None)
+
+        prazos = Produto.objects.filter(
+            pk__in=derivados.values('produto_catalogo_id'), dias_garantia__gt=0
+        ).values_list('dias_garantia', flat=True).distinct()
+        for dias in prazos:
+            total += derivados.filter(data_aquisicao__isnull=False, produto_catalogo__dias_garantia=dias).update(
+                data_expiracao_efetiva=F('data_aquisicao') + timedelta(days=dias)
+            )
+        return total
+
+    @staticmethod
+    def vencendo(dias, hoje=None):
+        """ Ativos com garantia/licença vencendo nos próximos `dias` (usa idx_ativo_expiracao). """
+        hoje = hoje or timezone.localdate()
+        return Ativo.objects.filter(data_expiracao_efetiva__range=(hoje, hoje + timedelta(days=dias)))
+
+    @staticmethod
+    def resumos_por_cliente(dias, hoje=None, apenas_pendentes=True):
+        """
+        [(cliente, [ativos])] dos vencimentos do período numa única query
+        ordenada por cliente. Com apenas_pendentes, ignora os já avisados.
+        """
+        ativos = GarantiaAtivosService.vencendo(dias, hoje)
+        if apenas_pendentes:
+            ativos = ativos.filter(
+                Q(alerta_expiracao_para__isnull=True) | ~Q(alerta_expiracao_para=F('data_expiracao_efetiva'))
+            )
+        ativos = ativos.select_related('cliente', 'produto_catalogo').order_by('cliente_id', 'data_expiracao_efetiva', 'pk')
+
+        resumos = []
+        for ativo in ativos:
+            if not resumos or resumos[-1][0].pk != ativo.cliente_id:
+                resumos.append((ativo.cliente, []))
+            resumos[-1][1].append(ativo)
+        return resumos
+
+    @staticmethod
+    def enviar_alertas(resumos):
+        """
+        Um e-mail por cliente (uma conexão SMTP) e marca os ativos como avisados.
+        Sem destinatários nada é enviado nem marcado: os ativos seguem pendentes.
+        """
+        destinatarios = getattr(settings, 'OPERACOES_GARANTIA_EMAILS', [])
+        mensagens = []
+        for cliente, ativos in resumos:
+            linhas = [
+                f"- {a.identificador_unico} ({a.produto_catalogo.nome}): vence em {a.data_expiracao_efetiva.strftime('%d/%m/%Y')}"
+                for a in ativos
+            ]
+            mensagens.append((
+                f"ALERTA: {len(ativos)} garantia(s)/licença(s) vencendo - {cliente.razao_social}",
+                "Olá,\n\nOs ativos abaixo estão com garantia ou licença próxima do vencimento:\n\n"
+                + "\n".join(linhas)
+                + "\n\nAvalie a renovação com o cliente.",
+                None,  # Usa o DEFAULT_FROM_EMAIL
+                destinatarios,
+            ))
+        if not mensagens or not destinatarios:
+            return 0
+        send_mass_mail(mensagens, fail_silently=False)
+
+        ativos = [a for _, lista in resumos for a in lista]
+        for ativo in ativos:
+            ativo.alerta_expiracao_para = ativo.data_expiracao_efetiva
+        Ativo.objects.bulk_update(ativos, ['alerta_expiracao_para'], batch_size=500)
+        return len(mensagens)
+
+    @staticmethod
+    def criar_oportunidades_renovacao(resumos):
+        """
+        Uma Oportunidade de renovação por cliente para os ativos ainda sem
+        oportunidade vinculada (bulk_create com histórico + bulk_update).
+        """
+        from tc_crm.models import EtapaVenda, Oportunidade
+        from tc_crm.services import ResumoClienteService
+
+        etapa = EtapaVenda.objects.filter(e_etapa_ganha=False).order_by('ordem', 'pk').first()
+        if etapa is None:
+            return 0
+
+        pendentes = []
+        oportunidades = []
+        for cliente, ativos in resumos:
+            ativos = [a for a in ativos if a.oportunidade_renovacao_id is None]
+            if not ativos:
+                continue
+            pendentes.append(ativos)
+            oportunidades.append(Oportunidade(
+                nome=f"Renovação de garantia/licença - {len(ativos)} ativo(s)",
+                cliente=cliente,
+                etapa=etapa,
+                valor_estimado=sum((a.produto_catalogo.preco_venda_padrao or 0 for a in ativos), Decimal('0.00')),
+                data_fechamento_prevista=min(a.data_expiracao_efetiva for a in ativos),
+            ))
+        if not oportunidades:
+            return 0
+
+        with transaction.atomic():
+            oportunidades = bulk_create_with_history(oportunidades, Oportunidade)
+            vinculados = []
+            for oportunidade, ativos in zip(oportunidades, pendentes):
+                for ativo in ativos:
+                    ativo.oportunidade_renovacao = oportunidade
+                    vinculados.append(ativo)
+            bulk_update_with_history(vinculados, Ativo, ['oportunidade_renovacao'], batch_size=500)
+        # bulk_create não dispara signals: atualiza a visão 360 dos clientes
+        ResumoClienteService.agendar({o.cliente_id for o in oportunidades})
+        return len(oportunidades)
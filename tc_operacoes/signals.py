@@ -0,0 +1,129 @@
+# tc_operacoes/signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Ativo, Chamado, InteracaoChamado, SolucaoChamado, MetaSLA
+from .services import FilaChamadosService, GarantiaAtivosService, MetricasSuporteService
+
+
+# ############################################################################
+# MÉTRICAS DE SUPORTE: timestamps derivados e consolidados diários
+# ############################################################################
+
+@receiver(post_save, sender=InteracaoChamado)
+def registrar_primeira_resposta(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        MetricasSuporteService.registrar_interacao(instance)
+
+@receiver(post_save, sender=SolucaoChamado)
+def registrar_resolucao(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        MetricasSuporteService.registrar_solucao(instance)
+
+@receiver(post_delete, sender=InteracaoChamado)
+@receiver(post_delete, sender=SolucaoChamado)
+def recalcular_chamado_apos_exclusao(sender, instance, **kwargs):
+    chamado_id = instance.chamado_id
+
+    def recalcular():
+        chamados = Chamado.objects.filter(pk=chamado_id)
+        dias = {d for c in chamados for d in MetricasSuporteService.dias_do_chamado(c)}
+        MetricasSuporteService.recalcular_chamados(chamados)
+        dias |= {d for c in chamados.all() for d in MetricasSuporteService.dias_do_chamado(c)}
+        MetricasSuporteService.atualizar_rollups(dias)
+    transaction.on_commit(recalcular)
+
+
+@receiver(pre_save, sender=Chamado)
+def preparar_chamado(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    instance._dimensoes_anteriores = None
+    if instance.pk:
+        instance._dimensoes_anteriores = Chamado.objects.filter(pk=instance.pk).values(
+            'atendente_responsavel_id', 'categoria_id', 'prioridade', 'status'
+        ).first()
+    anteriores = instance._dimensoes_anteriores
+
+    # Atribuição automática ao atendente com menor carga
+    if anteriores is None and instance.atendente_responsavel_id is None and getattr(settings, 'OPERACOES_AUTO_ATRIBUIR', True):
+        instance.atendente_responsavel_id = FilaChamadosService.atendente_menos_carregado()
+        if instance.atendente_responsavel_id and instance.status == 'NEW':
+            instance.status = 'ASS'
+
+    # Prazo SLA: recalculado na abertura ou quando a meta aplicável muda
+    if (
+        anteriores is None or instance.prazo_sla is None
+        or anteriores['prioridade'] != instance.prioridade or anteriores['categoria_id'] != instance.categoria_id
+    ):
+        instance.prazo_sla = FilaChamadosService.calcular_prazo(instance)
+
+@receiver(post_save, sender=Chamado)
+def atualizar_fila_e_consolidados(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    anteriores = getattr(instance, '_dimensoes_anteriores', None)
+
+    # Carga em cache: sai do atendente anterior e entra no atual
+    abertos = FilaChamadosService.STATUS_ABERTOS
+    antes = (anteriores['atendente_responsavel_id'], anteriores['status'] in abertos) if anteriores else (None, False)
+    depois = (instance.atendente_responsavel_id, instance.status in abertos)
+    if antes != depois:
+        if antes[1]:
+            FilaChamadosService.ajustar_carga(antes[0], -1)
+        if depois[1]:
+            FilaChamadosService.ajustar_carga(depois[0], 1)
+
+    if created:
+        MetricasSuporteService.agendar_rollup(MetricasSuporteService.dias_do_chamado(instance))
+        return
+    if not anteriores:
+        return
+    if anteriores['prioridade'] != instance.prioridade or anteriores['categoria_id'] != instance.categoria_id:
+        # Mudou a meta de SLA aplicável: reavalia as violações
+        MetricasSuporteService.recalcular_chamados(Chamado.objects.filter(pk=instance.pk))
+    if any(anteriores[campo] != getattr(instance, campo) for campo in ('atendente_responsavel_id', 'categoria_id', 'prioridade')):
+        MetricasSuporteService.agendar_rollup(MetricasSuporteService.dias_do_chamado(
+            Chamado.objects.get(pk=instance.pk)
+        ))
+
+@receiver(post_delete, sender=Chamado)
+def liberar_carga(sender, instance, **kwargs):
+    if instance.status in FilaChamadosService.STATUS_ABERTOS:
+        FilaChamadosService.ajustar_carga(instance.atendente_responsavel_id, -1)
+
+@receiver(post_delete, sender=Chamado)
+def atualizar_consolidados_apos_exclusao(sender, instance, **kwargs):
+    # O chamado some dos consolidados dos dias em que foi aberto/respondido/resolvido
+    MetricasSuporteService.agendar_rollup(MetricasSuporteService.dias_do_chamado(instance))
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidar_cache_atendentes(sender, **kwargs):
+    FilaChamadosService.invalidar_atendentes()
+
+
+@receiver(post_save, sender=MetaSLA)
+@receiver(post_delete, sender=MetaSLA)
+def invalidar_cache_metas(sender, **kwargs):
+    MetricasSuporteService.invalidar_metas()
+
+
+# ############################################################################
+# GARANTIAS: mudança no prazo do catálogo recalcula os ativos derivados
+# ############################################################################
+
+@receiver(pre_save, sender='tc_produtos.Produto')
+def guardar_garantia_anterior(sender, instance, **kwargs):
+    instance._dias_garantia_anterior = None
+    if instance.pk:
+        instance._dias_garantia_anterior = sender.objects.filter(pk=instance.pk).values_list('dias_garantia', flat=True).first()
+
+@receiver(post_save, sender='tc_produtos.Produto')
+def recalcular_expiracao_ativos(sender, instance, created, **kwargs):
+    if created or kwargs.get('raw') or getattr(instance, '_dias_garantia_anterior', None) == instance.dias_garantia:
+        return
+    GarantiaAtivosService.recalcular_expiracoes(
+        Ativo.objects.filter(produto_catalogo=instance, data_expiracao_garantia__isnull=True)
+    )
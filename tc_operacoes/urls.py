@@ -9,6 +9,7 @@ urlpatterns = [
     # ---------------------------
     path('chamados/', views.ChamadoListView.as_view(), name='chamado_list'),
     path('chamados/novo/', views.ChamadoCreateView.as_view(), name='chamado_create'),
+    path('chamados/proximo/', views.ProximoChamadoView.as_view(), name='chamado_proximo'),
     path('chamados/<int:pk>/', views.ChamadoDetailView.as_view(), name='chamado_detail'),
     path('chamados/<int:pk>/editar/', views.ChamadoUpdateView.as_view(), name='chamado_update'),
     
@@ -1,39 +1,80 @@
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy, reverse
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import get_object_or_404, redirect, render
 from django.http import HttpResponseRedirect, HttpResponse
-from tc_core.mixins import PermissionRequiredMixin
+from tc_core.mixins import PermissionRequiredMixin, KeysetPaginationMixin
 
 from .models import Fabricante, TipoAtivo, Ativo, Chamado, CategoriaOperacao, OrdemServico, InteracaoChamado, SolucaoChamado
 from .forms import FabricanteForm, TipoAtivoForm, AtivoForm, ChamadoForm, InteracaoChamadoForm, OrdemServicoForm
+from .services import FilaChamadosService, GarantiaAtivosService
 
 # ############################################################################
 # CHAMADOS (ITSM) - CRUD
 # ############################################################################
 
-class ChamadoListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ChamadoListView(LoginRequiredMixin, PermissionRequiredMixin, KeysetPaginationMixin, ListView):
     permission_required = 'operacoes.view_chamado'
     model = Chamado
     template_name = 'operacoes/chamado_list.html'
     context_object_name = 'chamados'
-    ordering = ['-prioridade', '-data_criacao'] # Exemplo
+    keyset_template_parcial = 'operacoes/partials/chamado_rows.html'
+    # Fila de atendimento: prazo SLA mais curto primeiro
+    keyset_ordenacao_padrao = 'prazo_sla'
+    keyset_ordenacoes = {
+        'prazo_sla': ('prazo_sla',),
+        # Prioridade '1' é a mais crítica, então a ordem crescente vem primeiro
+        'prioridade': ('prioridade', '-data_abertura'),
+        '-data_abertura': ('-data_abertura',),
+        'data_abertura': ('data_abertura',),
+    }
+    # ?fila=minha | sem_atendente (padrão: todos os chamados em aberto)
+    FILAS = {
+        'todos': 'Todos em aberto',
+        'minha': 'Minha fila',
+        'sem_atendente': 'Sem atendente',
+    }
+
+    def get_queryset(self):
+        fila = self.request.GET.get('fila')
+        queryset = FilaChamadosService.fila(
+            atendente=self.request.user if fila == 'minha' else None,
+            sem_atendente=fila == 'sem_atendente',
+            apenas_abertos=self.request.GET.get('status') != 'todos',
+        )
+        return queryset.select_related('cliente', 'atendente_responsavel')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_heading'] = 'Chamados de Suporte (ITSM)'
+        context['filas'] = self.FILAS
+        context['fila_atual'] = self.request.GET.get('fila') if self.request.GET.get('fila') in self.FILAS else 'todos'
         return context
 
+class ProximoChamadoView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """ Assume o próximo chamado da fila (menor prazo SLA) e abre o detalhe. """
+    permission_required = 'tc_operacoes.change_chamado'
+
+    def post(self, request, *args, **kwargs):
+        chamado = FilaChamadosService.proximo_chamado(request.user)
+        if chamado is None:
+            messages.info(request, 'Não há chamados aguardando atendimento.')
+            url = reverse('operacoes:chamado_list')
+        else:
+            url = reverse('operacoes:chamado_detail', kwargs={'pk': chamado.pk})
+        if request.htmx:
+            return HttpResponse(status=204, headers={'HX-Redirect': url})
+        return redirect(url)
+
 class ChamadoCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     permission_required = 'operacoes.add_chamado'
     model = Chamado
     form_class = ChamadoForm
     
-    def form_valid(self, form):
-        # Define o usuário logado como responsável inicial, se não for definido no form
-        if not form.instance.responsavel:
-            form.instance.responsavel = self.request.user
-        return super().form_valid(form)
+    # Sem atendente informado, o chamado é distribuído ao atendente com menor
+    # carga (OPERACOES_AUTO_ATRIBUIR) no pre_save de Chamado
         
     def get_template_names(self):
         if self.request.htmx:
@@ -53,7 +94,7 @@ class ChamadoDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView)
         context = super().get_context_data(**kwargs)
         context['page_heading'] = f'Chamado # {self.object.pk}'
         context['interacao_form'] = InteracaoChamadoForm()
-        context['interacoes'] = self.object.interacoes.all().order_by('data_criacao')
+        context['interacoes'] = self.object.interacoes.all().order_by('data_registro')
         # Adiciona a solução se existir
         try:
             context['solucao'] = self.object.solucao
@@ -89,7 +130,7 @@ class InteracaoChamadoCreateView(LoginRequiredMixin, PermissionRequiredMixin, Cr
         # O HTMX espera um fragmento para substituir a lista de interações
         if self.request.htmx:
              # Retorna o template que renderiza a lista completa de interações atualizada
-             return render(self.request, 'operacoes/partials/interacao_list_fragment.html', {'chamado': chamado, 'interacoes': chamado.interacoes.all().order_by('data_criacao')})
+             return render(self.request, 'operacoes/partials/interacao_list_fragment.html', {'chamado': chamado, 'interacoes': chamado.interacoes.all().order_by('data_registro')})
         
         return response
 
@@ -119,11 +160,28 @@ class AtivoListView(LoginRequiredMixin, ListView):
     model = Ativo
     template_name = 'operacoes/ativo_list.html'
     context_object_name = 'ativos'
-    ordering = ['nome']
+    ordering = ['identificador_unico']
+    paginate_by = 50
+    # ?vencendo=<dias>: garantias/licenças a vencer (índice de expiração); só as janelas abaixo
+    JANELAS_VENCIMENTO = (30, 60, 90)
+
+    def get_vencendo(self):
+        valor = self.request.GET.get('vencendo', '')
+        return next((dias for dias in self.JANELAS_VENCIMENTO if str(dias) == valor), None)
+
+    def get_queryset(self):
+        dias = self.get_vencendo()
+        if dias is not None:
+            queryset = GarantiaAtivosService.vencendo(dias).order_by('data_expiracao_efetiva', 'pk')
+        else:
+            queryset = super().get_queryset()
+        return queryset.select_related('cliente', 'produto_catalogo', 'tipo', 'oportunidade_renovacao')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_heading'] = 'Inventário de Ativos (CMDB)'
+        context['janelas_vencimento'] = self.JANELAS_VENCIMENTO
+        context['vencendo'] = self.get_vencendo()
         return context
 
 class AtivoCreateView(LoginRequiredMixin, CreateView):
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Fornecedor, CategoriaProduto, Produto, PrecoFornecedor, KitMaterial, ItemKit, FornecedorContato
+from .models import (
+    Fornecedor, CategoriaProduto, Produto, PrecoFornecedor, KitMaterial, ItemKit, FornecedorContato,
+    CotacaoMoeda, MelhorPrecoProduto
+)
 
 class FornecedorContatoInline(admin.TabularInline):
     model = FornecedorContato
@@ -33,9 +36,20 @@ class ProdutoAdmin(admin.ModelAdmin):
 
 class ItemKitInline(admin.TabularInline):
     model = ItemKit
+    fk_name = 'kit'
     extra = 1
 
 @admin.register(KitMaterial)
 class KitMaterialAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'custo_total_estimado')
-    inlines = [ItemKitInline]
\ No newline at end of file
+    list_display = ('nome', 'custo_total', 'custo_atualizado_em')
+    inlines = [ItemKitInline]
+
+@admin.register(CotacaoMoeda)
+class CotacaoMoedaAdmin(admin.ModelAdmin):
+    list_display = ('moeda', 'taxa_brl', 'fonte', 'atualizado_em')
+
+@admin.register(MelhorPrecoProduto)
+class MelhorPrecoProdutoAdmin(admin.ModelAdmin):
+    list_display = ('produto', 'fornecedor', 'preco_brl', 'moeda_original', 'qtd_fornecedores', 'atualizado_em')
+    search_fields = ('produto__nome', 'produto__codigo_interno', 'fornecedor__razao_social')
+    list_select_related = ('produto', 'fornecedor')
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TcProdutosConfig(AppConfig):
     name = 'tc_produtos'
+
+    def ready(self):
+        from . import signals  # noqa: F401
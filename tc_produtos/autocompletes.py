@@ -0,0 +1,27 @@
+# tc_produtos/autocompletes.py
+from tc_core.autocomplete import AutocompleteBase, registrar_autocomplete
+
+from .models import Fornecedor, Produto
+
+# ############################################################################
+# BUSCAS REMOTAS DOS SELECTS
+# ############################################################################
+
+@registrar_autocomplete
+class FornecedorAutocomplete(AutocompleteBase):
+    codigo = 'fornecedores'
+    modelo = Fornecedor
+    campos_busca = ('razao_social__icontains', 'nome_fantasia__icontains', 'cnpj__icontains')
+    ordenacao = ('razao_social', 'pk')
+    permissao = 'tc_produtos.view_fornecedor'
+    placeholder = 'Busque o fornecedor por nome ou CNPJ...'
+
+
+@registrar_autocomplete
+class ProdutoAutocomplete(AutocompleteBase):
+    codigo = 'produtos'
+    modelo = Produto
+    campos_busca = ('nome__icontains', 'codigo_interno__icontains')
+    ordenacao = ('nome', 'pk')
+    permissao = 'tc_produtos.view_produto'
+    placeholder = 'Busque o produto por nome ou código...'
@@ -0,0 +1,107 @@
+# tc_produtos/cambio.py
+import csv
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MOEDA_BASE = 'BRL'
+CACHE_KEY_TAXAS = 'tc_produtos:taxas_cambio'
+
+
+# ############################################################################
+# PROVEDORES DE COTAÇÃO
+# ############################################################################
+
+class ProvedorCambioBase:
+    """
+    Interface dos provedores de câmbio. Uma implementação só precisa devolver
+    {moeda: valor de 1 unidade em BRL}; configure a classe em CAMBIO_PROVEDOR.
+    """
+    nome = 'base'
+
+    def obter_taxas(self):
+        raise NotImplementedError
+
+
+class ProvedorCambioArquivo(ProvedorCambioBase):
+    """ Lê as cotações de um CSV local com as colunas "moeda;taxa". """
+    nome = 'arquivo'
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or getattr(settings, 'CAMBIO_ARQUIVO', None)
+
+    def obter_taxas(self):
+        taxas = {}
+        with open(self.caminho, newline='', encoding='utf-8') as arquivo:
+            amostra = arquivo.read(1024)
+            arquivo.seek(0)
+            delimitador = ';' if ';' in amostra else ','
+            for linha in csv.reader(arquivo, delimiter=delimitador):
+                if len(linha) < 2 or not linha[0].strip():
+                    continue
+                moeda = linha[0].strip().upper()
+                try:
+                    taxas[moeda] = Decimal(linha[1].strip().replace(',', '.'))
+                except InvalidOperation:
+                    # Cabeçalho ou linha inválida
+                    continue
+        return taxas
+
+
+def get_provedor():
+    caminho = getattr(settings, 'CAMBIO_PROVEDOR', 'tc_produtos.cambio.ProvedorCambioArquivo')
+    return import_string(caminho)()
+
+
+# ############################################################################
+# TABELA DE COTAÇÕES (CACHE)
+# ############################################################################
+
+def taxas_cambio():
+    """ Tabela {moeda: taxa_brl}, lida do banco uma vez e mantida em cache. """
+    from .models import CotacaoMoeda
+
+    def carregar():
+        taxas = dict(CotacaoMoeda.objects.values_list('moeda', 'taxa_brl'))
+        taxas[MOEDA_BASE] = Decimal('1')
+        return taxas
+
+    return cache.get_or_set(CACHE_KEY_TAXAS, carregar, getattr(settings, 'CAMBIO_CACHE_TIMEOUT', 3600))
+
+
+def converter_para_brl(valor, moeda, taxas=None):
+    """ Converte para BRL; retorna None se a moeda não tiver cotação cadastrada. """
+    if valor is None:
+        return None
+    moeda = (moeda or MOEDA_BASE).upper()
+    taxa = (taxas if taxas is not None else taxas_cambio()).get(moeda)
+    if taxa is None:
+        return None
+    return (Decimal(valor) * taxa).quantize(Decimal('0.01'))
+
+
+def atualizar_cotacoes(provedor=None):
+    """
+    Busca as cotações no provedor, grava na tabela CotacaoMoeda e invalida o
+    cache. Retorna o conjunto de moedas cuja taxa mudou.
+    """
+    from .models import CotacaoMoeda
+
+    provedor = provedor or get_provedor()
+    novas = {m.upper(): t for m, t in provedor.obter_taxas().items() if m.upper() != MOEDA_BASE}
+    atuais = dict(CotacaoMoeda.objects.values_list('moeda', 'taxa_brl'))
+
+    alteradas = {m for m, t in novas.items() if atuais.get(m) != t}
+    if alteradas:
+        CotacaoMoeda.objects.bulk_create(
+            [CotacaoMoeda(moeda=m, taxa_brl=novas[m], fonte=provedor.nome) for m in alteradas],
+            update_conflicts=True, unique_fields=['moeda'], update_fields=['taxa_brl', 'fonte', 'atualizado_em'],
+        )
+    cache.delete(CACHE_KEY_TAXAS)
+    logger.info("Cotações atualizadas via %s: %s", provedor.nome, sorted(alteradas))
+    return alteradas
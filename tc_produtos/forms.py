@@ -7,11 +7,13 @@ from .models import Produto, CategoriaProduto, Fornecedor, FornecedorContato, Fo
 ItemKitFormSet = inlineformset_factory(
     KitMaterial, 
     ItemKit,
-    fields=['produto', 'quantidade'],
+    fk_name='kit',
+    fields=['produto', 'subkit', 'quantidade'],
     extra=1,
     can_delete=True,
     widgets={
         'produto': forms.Select(attrs={'class': 'form-control'}),
+        'subkit': forms.Select(attrs={'class': 'form-control'}),
         'quantidade': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.001'}),
     }
 )
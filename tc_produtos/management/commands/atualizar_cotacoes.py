@@ -0,0 +1,32 @@
+# tc_produtos/management/commands/atualizar_cotacoes.py
+
+from django.core.management.base import BaseCommand, CommandError
+from tc_produtos.cambio import atualizar_cotacoes, get_provedor, ProvedorCambioArquivo
+from tc_produtos.services import PrecoFornecedorService
+
+class Command(BaseCommand):
+    help = 'Atualiza a tabela de câmbio e o índice de melhor preço por produto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--arquivo', help='CSV "moeda;taxa" a usar no lugar do provedor configurado.')
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Reconstrói o índice de todos os produtos, não só dos afetados pelas moedas alteradas.'
+        )
+
+    def handle(self, *args, **options):
+        provedor = ProvedorCambioArquivo(options['arquivo']) if options['arquivo'] else get_provedor()
+        try:
+            alteradas = atualizar_cotacoes(provedor)
+        except (OSError, NotImplementedError) as e:
+            raise CommandError(f'Falha ao obter cotações ({provedor.nome}): {e}')
+
+        if options['reconstruir']:
+            total = PrecoFornecedorService.atualizar_indice()
+        else:
+            total = PrecoFornecedorService.atualizar_por_moedas(alteradas)
+
+        moedas = ', '.join(sorted(alteradas)) or 'nenhuma'
+        self.stdout.write(self.style.SUCCESS(
+            f'Cotações alteradas: {moedas}. {total} produto(s) com melhor preço atualizado.'
+        ))
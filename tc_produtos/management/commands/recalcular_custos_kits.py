@@ -0,0 +1,27 @@
+# tc_produtos/management/commands/recalcular_custos_kits.py
+
+from django.core.management.base import BaseCommand
+from tc_produtos.services import CusteioKitService
+
+class Command(BaseCommand):
+    help = 'Recalcula o custo materializado dos Kits de Materiais (todos ou apenas os informados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kit', type=int, action='append', dest='kits',
+            help='ID do kit a recalcular (pode ser repetido). Os kits que o contêm também são recalculados.'
+        )
+        parser.add_argument(
+            '--produto', type=int, action='append', dest='produtos',
+            help='ID do produto cujo custo mudou (pode ser repetido).'
+        )
+
+    def handle(self, *args, **options):
+        if options['produtos']:
+            alterados = CusteioKitService.recalcular_por_produtos(options['produtos'])
+        elif options['kits']:
+            alterados = CusteioKitService.recalcular_por_kits(options['kits'])
+        else:
+            alterados = CusteioKitService.recalcular()
+
+        self.stdout.write(self.style.SUCCESS(f'{alterados} kit(s) com custo atualizado.'))
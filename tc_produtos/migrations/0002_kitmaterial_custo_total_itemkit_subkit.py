@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Sum, DecimalField
+
+
+def calcular_custos_iniciais(apps, schema_editor):
+    # Até aqui os kits só continham produtos: um nível basta
+    KitMaterial = apps.get_model('tc_produtos', 'KitMaterial')
+    kits = KitMaterial.objects.annotate(
+        custo=Sum(F('itens_kit__produto__custo_padrao') * F('itens_kit__quantidade'), output_field=DecimalField())
+    )
+    alterados = []
+    for kit in kits:
+        kit.custo_total = (kit.custo or Decimal('0.00')).quantize(Decimal('0.01'))
+        alterados.append(kit)
+    KitMaterial.objects.bulk_update(alterados, ['custo_total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_produtos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemkit',
+            name='subkit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='usado_em_kits', to='tc_produtos.kitmaterial', verbose_name='Sub-Kit'),
+        ),
+        migrations.AddField(
+            model_name='kitmaterial',
+            name='custo_atualizado_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Custo Recalculado em'),
+        ),
+        migrations.AddField(
+            model_name='kitmaterial',
+            name='custo_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=14, verbose_name='Custo Total Calculado'),
+        ),
+        migrations.AlterField(
+            model_name='itemkit',
+            name='produto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tc_produtos.produto'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemkit',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('produto__isnull', False), ('subkit__isnull', True)), models.Q(('produto__isnull', True), ('subkit__isnull', False)), _connector='OR'), name='apenas_um_tipo_de_item_kit'),
+        ),
+        migrations.RunPython(calcular_custos_iniciais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_produtos', '0002_kitmaterial_custo_total_itemkit_subkit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CotacaoMoeda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moeda', models.CharField(max_length=3, unique=True, verbose_name='Moeda (ISO)')),
+                ('taxa_brl', models.DecimalField(decimal_places=6, max_digits=14, verbose_name='Valor de 1 unidade em BRL')),
+                ('fonte', models.CharField(blank=True, max_length=100, verbose_name='Fonte')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Cotação de Moeda',
+                'verbose_name_plural': 'Cotações de Moedas',
+                'ordering': ['moeda'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MelhorPrecoProduto',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='melhor_preco', serialize=False, to='tc_produtos.produto')),
+                ('preco_brl', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Melhor Preço (BRL)')),
+                ('moeda_original', models.CharField(default='BRL', max_length=3)),
+                ('qtd_fornecedores', models.PositiveIntegerField(default=1, verbose_name='Fornecedores Cotados')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('fornecedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tc_produtos.fornecedor')),
+                ('preco_fornecedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tc_produtos.precofornecedor')),
+            ],
+            options={
+                'verbose_name': 'Melhor Preço por Produto',
+                'verbose_name_plural': 'Melhores Preços por Produto',
+            },
+        ),
+    ]
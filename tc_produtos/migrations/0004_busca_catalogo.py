@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 14:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Busca por "contém" no catálogo (UPPER(col) LIKE '%termo%'): só o PostgreSQL
+# tem índice para isso (pg_trgm); nos demais bancos a migração não faz nada.
+CAMPOS_TRIGRAM = ('nome', 'codigo_interno')
+
+
+def criar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for campo in CAMPOS_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_produto_{campo}_trgm ON tc_produtos_produto '
+            f'USING gin (UPPER({campo}::text) gin_trgm_ops)'
+        )
+
+
+def remover_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in CAMPOS_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX IF EXISTS idx_produto_{campo}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_produtos', '0003_cotacaomoeda_melhorprecoproduto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['ean_gtin'], name='idx_produto_ean'),
+        ),
+        migrations.RunPython(criar_indices_trigram, remover_indices_trigram),
+    ]
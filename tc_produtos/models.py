@@ -1,7 +1,8 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from simple_history.models import HistoricalRecords
-from django.db.models import F, Sum, DecimalField
+from django.db.models import Q
+from django.core.exceptions import ValidationError
 from decimal import Decimal
 from django.conf import settings
 from django.utils.text import slugify
@@ -152,6 +153,10 @@ class Produto(models.Model):
     class Meta:
         verbose_name = "Produto/Serviço"
         verbose_name_plural = "Produtos e Serviços"
+        indexes = [
+            # Leitores de código de barras buscam o EAN exato/prefixo
+            models.Index(fields=['ean_gtin'], name='idx_produto_ean'),
+        ]
 
     def __str__(self):
         return f"{self.codigo_interno} - {self.nome}"
@@ -211,6 +216,43 @@ class PrecoFornecedor(models.Model):
     def __str__(self):
         return f"{self.produto.nome} - {self.fornecedor.razao_social}"
 
+
+class CotacaoMoeda(models.Model):
+    """ Tabela de câmbio usada para normalizar os preços de fornecedores em BRL. """
+    moeda = models.CharField(max_length=3, unique=True, verbose_name="Moeda (ISO)")
+    taxa_brl = models.DecimalField(max_digits=14, decimal_places=6, verbose_name="Valor de 1 unidade em BRL")
+    fonte = models.CharField(max_length=100, blank=True, verbose_name="Fonte")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Cotação de Moeda"
+        verbose_name_plural = "Cotações de Moedas"
+        ordering = ['moeda']
+
+    def __str__(self):
+        return f"{self.moeda} = R$ {self.taxa_brl}"
+
+
+class MelhorPrecoProduto(models.Model):
+    """
+    Índice desnormalizado com o menor preço atual de cada produto entre os
+    fornecedores, já convertido para BRL. Mantido pelo PrecoFornecedorService.
+    """
+    produto = models.OneToOneField(Produto, on_delete=models.CASCADE, primary_key=True, related_name='melhor_preco')
+    fornecedor = models.ForeignKey(Fornecedor, on_delete=models.CASCADE, related_name='+')
+    preco_fornecedor = models.ForeignKey(PrecoFornecedor, on_delete=models.CASCADE, related_name='+')
+    preco_brl = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Melhor Preço (BRL)")
+    moeda_original = models.CharField(max_length=3, default='BRL')
+    qtd_fornecedores = models.PositiveIntegerField(default=1, verbose_name="Fornecedores Cotados")
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Melhor Preço por Produto"
+        verbose_name_plural = "Melhores Preços por Produto"
+
+    def __str__(self):
+        return f"{self.produto.nome}: R$ {self.preco_brl} ({self.fornecedor.razao_social})"
+
 # ############################################################################
 # GRUPO 3: Kit de Materiais
 # ############################################################################
@@ -218,8 +260,15 @@ class PrecoFornecedor(models.Model):
 class KitMaterial(models.Model):
     nome = models.CharField(max_length=150, unique=True, verbose_name="Nome do Kit")
     descricao = models.TextField(blank=True, null=True)
-    
-    history = HistoricalRecords()
+
+    # Custo materializado: mantido pelo CusteioKitService (tc_produtos/services.py)
+    custo_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal('0.00'), editable=False,
+        verbose_name="Custo Total Calculado"
+    )
+    custo_atualizado_em = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Custo Recalculado em")
+
+    history = HistoricalRecords(excluded_fields=['custo_total', 'custo_atualizado_em'])
 
     class Meta:
         verbose_name = "Kit de Material"
@@ -227,28 +276,55 @@ class KitMaterial(models.Model):
 
     @property
     def custo_total_estimado(self):
-        total = self.itens_kit.aggregate(
-            total_custo=Sum(F('produto__custo_padrao') * F('quantidade'), output_field=DecimalField())
-        )['total_custo']
-        return total.quantize(Decimal("0.01")) if total else Decimal('0.00')
+        # Mantido por compatibilidade com templates/admin: lê o custo já calculado
+        return self.custo_total
 
     def __str__(self):
         return self.nome
 
 class ItemKit(models.Model):
     kit = models.ForeignKey(KitMaterial, on_delete=models.CASCADE, related_name='itens_kit')
-    produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
+    # Um item é um produto OU outro kit (composição em vários níveis)
+    produto = models.ForeignKey(Produto, on_delete=models.CASCADE, null=True, blank=True)
+    subkit = models.ForeignKey(
+        KitMaterial, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='usado_em_kits', verbose_name="Sub-Kit"
+    )
     quantidade = models.DecimalField(max_digits=10, decimal_places=3)
 
-    # ADICIONE ESTE BLOCO:
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(produto__isnull=False, subkit__isnull=True) | Q(produto__isnull=True, subkit__isnull=False),
+                name='apenas_um_tipo_de_item_kit'
+            ),
+        ]
+
+    def clean(self):
+        if bool(self.produto_id) == bool(self.subkit_id):
+            raise ValidationError("Informe um produto ou um sub-kit (apenas um deles).")
+        if self.subkit_id and self.kit_id:
+            from .services import CusteioKitService
+            if CusteioKitService.cria_ciclo(self.kit_id, self.subkit_id):
+                raise ValidationError({'subkit': "Este sub-kit já contém o kit atual (composição circular)."})
+
+    @property
+    def custo_unitario(self):
+        if self.subkit_id:
+            return self.subkit.custo_total
+        if self.produto_id:
+            return self.produto.custo_padrao
+        return Decimal("0.00")
+
     @property
     def subtotal_custo(self):
-        if self.produto and self.quantidade:
-            return (self.produto.custo_padrao * self.quantidade).quantize(Decimal("0.01"))
+        if self.quantidade:
+            return (self.custo_unitario * self.quantidade).quantize(Decimal("0.01"))
         return Decimal("0.00")
 
     def __str__(self):
-        return f"{self.quantidade} x {self.produto.nome}"
+        item = self.subkit if self.subkit_id else self.produto
+        return f"{self.quantidade} x {item.nome}"
 
 
 
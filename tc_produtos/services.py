@@ -0,0 +1,270 @@
+# tc_produtos/services.py
+import logging
+from collections import defaultdict, deque
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cambio import taxas_cambio, converter_para_brl
+from .models import KitMaterial, ItemKit, PrecoFornecedor, MelhorPrecoProduto
+
+logger = logging.getLogger(__name__)
+
+
+class CusteioKitService:
+    """
+    Motor de custeio dos Kits de Materiais (BOM em vários níveis).
+
+    O custo de cada kit fica gravado em KitMaterial.custo_total. Quando o
+    custo de um produto muda, apenas os kits que o contêm (direta ou
+    indiretamente, via sub-kits) são recalculados, dos níveis mais internos
+    para os mais externos (ordem topológica).
+    """
+
+    @staticmethod
+    def kits_afetados(produto_ids=(), kit_ids=()):
+        """
+        Retorna os IDs dos kits que contêm os produtos/kits informados,
+        subindo pela árvore de composição (uma consulta por nível).
+        """
+        afetados = set(kit_ids)
+        fronteira = set(
+            ItemKit.objects.filter(produto_id__in=produto_ids).values_list('kit_id', flat=True)
+        ) if produto_ids else set()
+        fronteira |= set(kit_ids)
+
+        while fronteira:
+            afetados |= fronteira
+            pais = set(
+                ItemKit.objects.filter(subkit_id__in=fronteira).values_list('kit_id', flat=True)
+            )
+            fronteira = pais - afetados
+        return afetados
+
+    @staticmethod
+    def cria_ciclo(kit_id, subkit_id):
+        """ True se incluir `subkit_id` dentro de `kit_id` gerar composição circular. """
+        if kit_id == subkit_id:
+            return True
+        return kit_id in CusteioKitService._descendentes(subkit_id)
+
+    @staticmethod
+    def _descendentes(*kit_ids):
+        vistos = set()
+        fronteira = set(kit_ids)
+        while fronteira:
+            filhos = set(
+                ItemKit.objects.filter(kit_id__in=fronteira, subkit__isnull=False)
+                .values_list('subkit_id', flat=True)
+            )
+            fronteira = filhos - vistos
+            vistos |= filhos
+        return vistos
+
+    @staticmethod
+    def _custear(kit_ids, custo_produto):
+        """
+        Calcula o custo dos kits informados em ordem topológica (sub-kits antes
+        dos kits que os contêm), com todas as linhas lidas em uma consulta.
+        Sub-kits fora do conjunto entram com o custo já gravado.
+        `custo_produto(produto_id, custo_padrao)` define o custo de cada produto.
+        Retorna {kit_id: custo}.
+        """
+        linhas = defaultdict(list)
+        dependencias = defaultdict(set)
+        subkits_externos = set()
+        itens = ItemKit.objects.filter(kit_id__in=kit_ids).values_list(
+            'kit_id', 'quantidade', 'produto_id', 'produto__custo_padrao', 'subkit_id'
+        )
+        for kit_id, quantidade, produto_id, custo_padrao, subkit_id in itens:
+            linhas[kit_id].append((quantidade, produto_id, custo_padrao, subkit_id))
+            if subkit_id:
+                if subkit_id in kit_ids:
+                    dependencias[kit_id].add(subkit_id)
+                else:
+                    subkits_externos.add(subkit_id)
+
+        custos = dict(
+            KitMaterial.objects.filter(pk__in=subkits_externos).values_list('pk', 'custo_total')
+        ) if subkits_externos else {}
+
+        # Ordenação topológica (Kahn)
+        pendentes = {k: len(dependencias[k]) for k in kit_ids}
+        dependentes = defaultdict(list)
+        for kit_id, subs in dependencias.items():
+            for sub in subs:
+                dependentes[sub].append(kit_id)
+        fila = deque(k for k, n in pendentes.items() if n == 0)
+        ordem = []
+        while fila:
+            kit_id = fila.popleft()
+            ordem.append(kit_id)
+            for pai in dependentes[kit_id]:
+                pendentes[pai] -= 1
+                if pendentes[pai] == 0:
+                    fila.append(pai)
+
+        if len(ordem) < len(kit_ids):
+            ciclo = sorted(set(kit_ids) - set(ordem))
+            logger.error("Composição circular entre os kits %s; custo não recalculado.", ciclo)
+
+        resultado = {}
+        for kit_id in ordem:
+            total = Decimal('0.00')
+            for quantidade, produto_id, custo_padrao, subkit_id in linhas[kit_id]:
+                if subkit_id:
+                    custo = custos.get(subkit_id, Decimal('0.00'))
+                else:
+                    custo = custo_produto(produto_id, custo_padrao) or Decimal('0.00')
+                total += custo * quantidade
+            custos[kit_id] = resultado[kit_id] = total.quantize(Decimal('0.01'))
+        return resultado
+
+    @staticmethod
+    def recalcular(kit_ids=None):
+        """
+        Recalcula e grava o custo (custo_padrao dos produtos) dos kits
+        informados, ou de todos se None. Retorna quantos kits mudaram de custo.
+        """
+        kits = KitMaterial.objects.only('id', 'custo_total')
+        if kit_ids is not None:
+            kits = kits.filter(pk__in=kit_ids)
+        kits = {k.pk: k for k in kits}
+        if not kits:
+            return 0
+
+        custos = CusteioKitService._custear(set(kits), lambda produto_id, custo_padrao: custo_padrao)
+
+        agora = timezone.now()
+        alterados = []
+        for kit_id, total in custos.items():
+            kit = kits[kit_id]
+            if kit.custo_total != total:
+                kit.custo_total = total
+                kit.custo_atualizado_em = agora
+                alterados.append(kit)
+
+        if alterados:
+            with transaction.atomic():
+                KitMaterial.objects.bulk_update(alterados, ['custo_total', 'custo_atualizado_em'], batch_size=500)
+        return len(alterados)
+
+    @staticmethod
+    def custo_reposicao(kit_ids):
+        """
+        Custo dos kits usando o melhor preço atual de fornecedor (BRL) de cada
+        produto, com fallback para o custo_padrao. Não grava nada.
+        Retorna {kit_id: custo}.
+        """
+        kit_ids = set(kit_ids)
+        todos = kit_ids | CusteioKitService._descendentes(*kit_ids)
+        produto_ids = set(
+            ItemKit.objects.filter(kit_id__in=todos, produto__isnull=False).values_list('produto_id', flat=True)
+        )
+        melhores = PrecoFornecedorService.melhores_precos(produto_ids)
+
+        def custo_produto(produto_id, custo_padrao):
+            melhor = melhores.get(produto_id)
+            return melhor.preco_brl if melhor else custo_padrao
+
+        custos = CusteioKitService._custear(todos, custo_produto)
+        return {k: custos.get(k, Decimal('0.00')) for k in kit_ids}
+
+    @staticmethod
+    def recalcular_por_produtos(produto_ids):
+        """ Recalcula apenas os kits afetados pela mudança de custo dos produtos. """
+        afetados = CusteioKitService.kits_afetados(produto_ids=produto_ids)
+        return CusteioKitService.recalcular(afetados) if afetados else 0
+
+    @staticmethod
+    def recalcular_por_kits(kit_ids):
+        """ Recalcula os kits informados e todos os kits que os contêm. """
+        afetados = CusteioKitService.kits_afetados(kit_ids=kit_ids)
+        return CusteioKitService.recalcular(afetados) if afetados else 0
+
+
+class PrecoFornecedorService:
+    """
+    Índice de melhor preço por produto (MelhorPrecoProduto), com os preços de
+    PrecoFornecedor normalizados em BRL pela tabela de câmbio em cache.
+    """
+
+    @staticmethod
+    def atualizar_indice(produto_ids=None):
+        """
+        Reconstrói o melhor preço dos produtos informados (ou de todos).
+        Preços em moedas sem cotação são ignorados. Retorna a quantidade de
+        produtos com melhor preço gravado.
+        """
+        taxas = taxas_cambio()
+        precos = PrecoFornecedor.objects.all()
+        if produto_ids is not None:
+            precos = precos.filter(produto_id__in=produto_ids)
+
+        melhores = {}
+        cotados = defaultdict(int)
+        for pk, produto_id, fornecedor_id, preco, moeda in precos.values_list(
+            'pk', 'produto_id', 'fornecedor_id', 'preco_custo', 'moeda'
+        ).iterator(chunk_size=2000):
+            preco_brl = converter_para_brl(preco, moeda, taxas)
+            if preco_brl is None:
+                logger.warning("Sem cotação para a moeda %s (PrecoFornecedor %s).", moeda, pk)
+                continue
+            cotados[produto_id] += 1
+            atual = melhores.get(produto_id)
+            if atual is None or preco_brl < atual.preco_brl:
+                melhores[produto_id] = MelhorPrecoProduto(
+                    produto_id=produto_id, fornecedor_id=fornecedor_id, preco_fornecedor_id=pk,
+                    preco_brl=preco_brl, moeda_original=(moeda or 'BRL').upper(),
+                )
+        for produto_id, melhor in melhores.items():
+            melhor.qtd_fornecedores = cotados[produto_id]
+
+        with transaction.atomic():
+            # Produtos que ficaram sem nenhum preço válido saem do índice
+            obsoletos = MelhorPrecoProduto.objects.exclude(produto_id__in=melhores)
+            if produto_ids is not None:
+                obsoletos = obsoletos.filter(produto_id__in=produto_ids)
+            obsoletos.delete()
+
+            MelhorPrecoProduto.objects.bulk_create(
+                melhores.values(), batch_size=500,
+                update_conflicts=True, unique_fields=['produto'],
+                update_fields=['fornecedor', 'preco_fornecedor', 'preco_brl', 'moeda_original', 'qtd_fornecedores', 'atualizado_em'],
+            )
+        return len(melhores)
+
+    @staticmethod
+    def atualizar_por_moedas(moedas):
+        """ Recalcula apenas os produtos que têm preço em alguma das moedas informadas. """
+        if not moedas:
+            return 0
+        produto_ids = set(
+            PrecoFornecedor.objects.filter(moeda__in=moedas).values_list('produto_id', flat=True)
+        )
+        return PrecoFornecedorService.atualizar_indice(produto_ids) if produto_ids else 0
+
+    @staticmethod
+    def melhores_precos(produto_ids):
+        """
+        Fornecedor mais barato para N produtos em uma única consulta.
+        Retorna {produto_id: MelhorPrecoProduto}; produtos sem cotação ficam de fora.
+        """
+        return {
+            m.produto_id: m
+            for m in MelhorPrecoProduto.objects.filter(produto_id__in=produto_ids).select_related('fornecedor')
+        }
+
+    @staticmethod
+    def precos_do_fornecedor(fornecedor_id, produto_ids):
+        """ Preço (em BRL) de um fornecedor específico para N produtos: {produto_id: preço}. """
+        taxas = taxas_cambio()
+        precos = {}
+        for produto_id, preco, moeda in PrecoFornecedor.objects.filter(
+            fornecedor_id=fornecedor_id, produto_id__in=produto_ids
+        ).values_list('produto_id', 'preco_custo', 'moeda'):
+            preco_brl = converter_para_brl(preco, moeda, taxas)
+            if preco_brl is not None and (produto_id not in precos or preco_brl < precos[produto_id]):
+                precos[produto_id] = preco_brl
+        return precos
@@ -0,0 +1,49 @@
+# tc_produtos/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Produto, ItemKit, PrecoFornecedor
+from .services import CusteioKitService, PrecoFornecedorService
+
+
+# ############################################################################
+# CUSTEIO DE KITS: recalcula apenas os kits afetados, após o commit
+# ############################################################################
+
+@receiver(pre_save, sender=Produto)
+def guardar_custo_anterior(sender, instance, **kwargs):
+    instance._custo_padrao_anterior = None
+    if instance.pk:
+        instance._custo_padrao_anterior = (
+            Produto.objects.filter(pk=instance.pk).values_list('custo_padrao', flat=True).first()
+        )
+
+@receiver(post_save, sender=Produto)
+def recalcular_kits_do_produto(sender, instance, created, **kwargs):
+    if created or kwargs.get('raw'):
+        return
+    anterior = getattr(instance, '_custo_padrao_anterior', None)
+    if anterior is not None and anterior != instance.custo_padrao:
+        transaction.on_commit(lambda: CusteioKitService.recalcular_por_produtos([instance.pk]))
+
+@receiver(post_save, sender=ItemKit)
+@receiver(post_delete, sender=ItemKit)
+def recalcular_kit_do_item(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    kit_id = instance.kit_id
+    transaction.on_commit(lambda: CusteioKitService.recalcular_por_kits([kit_id]))
+
+
+# ############################################################################
+# ÍNDICE DE MELHOR PREÇO POR FORNECEDOR
+# ############################################################################
+
+@receiver(post_save, sender=PrecoFornecedor)
+@receiver(post_delete, sender=PrecoFornecedor)
+def atualizar_melhor_preco(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    produto_id = instance.produto_id
+    transaction.on_commit(lambda: PrecoFornecedorService.atualizar_indice([produto_id]))
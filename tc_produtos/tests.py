@@ -1,3 +1,66 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from .models import Produto
+
+User = get_user_model()
+
+
+class PlanilhaEdicaoLoteTest(TestCase):
+    """
+    Fila de edições das planilhas num único POST: cada célula é validada contra
+    a whitelist e o field do model, e as válidas são gravadas num bulk_update
+    com histórico.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(username='comprador', password='senha')
+        cls.cabo = Produto.objects.create(nome='Cabo', codigo_interno='CAB-01', preco_venda_padrao=Decimal('10.00'))
+        cls.fonte = Produto.objects.create(nome='Fonte', codigo_interno='FON-01', preco_venda_padrao=Decimal('50.00'))
+        cls.url = reverse('produtos:update_cells')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def enviar(self, edicoes):
+        return self.client.post(self.url, json.dumps({'edicoes': edicoes}), content_type='application/json')
+
+    def test_lote_grava_as_celulas_validas_e_devolve_cada_resultado(self):
+        historico_antes = Produto.history.count()
+
+        response = self.enviar([
+            {'id': self.cabo.pk, 'campo': 'preco_venda_padrao', 'valor': 'R$ 1.234,50'},
+            {'id': self.fonte.pk, 'campo': 'nome', 'valor': 'fonte 12v'},
+            {'id': self.fonte.pk, 'campo': 'slug', 'valor': 'invasao'},
+            {'id': 999999, 'campo': 'nome', 'valor': 'X'},
+            {'id': self.cabo.pk, 'campo': 'custo_padrao', 'valor': 'abc'},
+        ])
+
+        dados = response.json()
+        self.assertEqual(dados['status'], 'partial')
+        self.assertEqual([r['status'] for r in dados['resultados']], ['success', 'success', 'error', 'error', 'error'])
+        self.cabo.refresh_from_db()
+        self.fonte.refresh_from_db()
+        self.assertEqual(self.cabo.preco_venda_padrao, Decimal('1234.50'))
+        self.assertEqual(self.fonte.nome, 'FONTE 12V')
+        self.assertEqual(self.fonte.modificado_por, self.usuario)
+        self.assertEqual(Produto.history.count(), historico_antes + 2)
+
+    def test_sku_duplicado_e_recusado(self):
+        response = self.enviar([
+            {'id': self.cabo.pk, 'campo': 'codigo_interno', 'valor': 'fon-01'},
+        ])
+
+        self.assertEqual(response.json()['status'], 'error')
+        self.cabo.refresh_from_db()
+        self.assertEqual(self.cabo.codigo_interno, 'CAB-01')
 
-# Create your tests here.
+    def test_formato_invalido_responde_400(self):
+        for corpo in ('nao-e-json', json.dumps({'edicoes': 'x'}), json.dumps({'edicoes': [1, 2]})):
+            with self.subTest(corpo=corpo):
+                response = self.client.post(self.url, corpo, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
@@ -59,6 +59,7 @@ urlpatterns = [
     path('produtos/importar/', views.ProdutoImportView.as_view(), name='produto_import'),
     path('servicos/importar/', views.ServicoImportView.as_view(), name='servico_import'),
     path('item/update-cell/', views.update_produto_cell, name='update_cell'),
+    path('item/update-cells/', views.update_produto_cells, name='update_cells'),
     # Rota geral que o utils pode usar se necessário
     path('baixar-template/', views.baixar_template_importacao, name='baixar_template'),
     # Rota para importação de documentos para fornecedores
@@ -1,7 +1,11 @@
 # tc_produtos/utils.py
 import pandas as pd
+from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
 from .models import Produto, CategoriaProduto
+from .services import CusteioKitService
 from decimal import Decimal
 import logging
 from django.utils.text import slugify
@@ -116,4 +120,140 @@ def processar_importacao_produtos(arquivo, user, is_servico_context=False):
             logs['erros'] += 1
             continue # Garante a ida para a próxima linha
 
-    return True, logs
\ No newline at end of file
+    return True, logs
+
+# ############################################################################
+# EDIÇÃO EM LOTE DAS PLANILHAS (PRODUTOS / SERVIÇOS)
+# ############################################################################
+
+# Campos que podem ser alterados pelas planilhas e o tratamento de cada um
+CAMPOS_EDITAVEIS_PLANILHA = {
+    'nome': 'texto',
+    'codigo_interno': 'texto',
+    'descricao_curta': 'texto',
+    'ean_gtin': 'livre',
+    'custo_padrao': 'decimal',
+    'preco_venda_padrao': 'decimal',
+    'markup_padrao': 'decimal',
+    'dias_garantia': 'livre',
+    'lead_time_dias': 'livre',
+}
+
+LIMITE_EDICOES_LOTE = 1000
+
+
+def _normalizar_valor_planilha(campo, valor):
+    tipo = CAMPOS_EDITAVEIS_PLANILHA[campo]
+    valor = '' if valor is None else str(valor).strip()
+    if tipo == 'texto':
+        # Mesmo tratamento do Produto.save(), que não é chamado no lote
+        return valor.upper()
+    if tipo == 'decimal':
+        v = valor.replace('R$', '').replace(' ', '')
+        if ',' in v and '.' in v:
+            v = v.replace('.', '').replace(',', '.')
+        elif ',' in v:
+            v = v.replace(',', '.')
+        return v
+    return valor
+
+
+def aplicar_edicoes_planilha(edicoes, user):
+    """
+    Aplica uma fila de edições de células [{id, campo, valor}, ...] vindas das
+    planilhas de produtos/serviços. Cada célula é validada individualmente
+    contra a whitelist e o field do model; as válidas são gravadas com um único
+    bulk_update (e histórico em lote) dentro de uma transação.
+
+    Retorna a lista de resultados por célula, na ordem recebida.
+    """
+    resultados = []
+    validas = []
+
+    ids = set()
+    for edicao in edicoes:
+        try:
+            ids.add(int(edicao.get('id')))
+        except (TypeError, ValueError):
+            pass
+    produtos = Produto.objects.in_bulk(ids)
+
+    for edicao in edicoes:
+        resultado = {'id': edicao.get('id'), 'campo': edicao.get('campo'), 'status': 'error'}
+        resultados.append(resultado)
+
+        campo = edicao.get('campo')
+        if campo not in CAMPOS_EDITAVEIS_PLANILHA:
+            resultado['message'] = "Campo não editável pela planilha."
+            continue
+        try:
+            produto = produtos.get(int(edicao.get('id')))
+        except (TypeError, ValueError):
+            produto = None
+        if produto is None:
+            resultado['message'] = "Item não encontrado."
+            continue
+
+        field = Produto._meta.get_field(campo)
+        valor = _normalizar_valor_planilha(campo, edicao.get('valor'))
+        if valor == '' and field.null:
+            valor = None
+        try:
+            valor = field.clean(valor, produto)
+        except ValidationError as e:
+            resultado['message'] = "; ".join(e.messages)
+            continue
+
+        validas.append((resultado, produto, campo, valor))
+
+    # Unicidade do SKU: uma consulta para o lote inteiro
+    novos_codigos = {}
+    for resultado, produto, campo, valor in validas:
+        if campo == 'codigo_interno':
+            novos_codigos.setdefault(valor, set()).add(produto.pk)
+    if novos_codigos:
+        pks_alterando_codigo = set().union(*novos_codigos.values())
+        em_uso = set(
+            Produto.objects.filter(codigo_interno__in=novos_codigos)
+            .exclude(pk__in=pks_alterando_codigo).values_list('codigo_interno', flat=True)
+        )
+        duplicados = {c for c, pks in novos_codigos.items() if len(pks) > 1 or c in em_uso}
+        for resultado, produto, campo, valor in validas:
+            if campo == 'codigo_interno' and valor in duplicados:
+                resultado['message'] = "Código Interno/SKU já utilizado por outro item."
+        validas = [v for v in validas if 'message' not in v[0]]
+
+    if not validas:
+        return resultados
+
+    agora = timezone.now()
+    alterados = {}
+    campos = {'modificado_por', 'atualizado_em'}
+    for resultado, produto, campo, valor in validas:
+        setattr(produto, campo, valor)
+        produto.modificado_por = user
+        produto.atualizado_em = agora
+        alterados[produto.pk] = produto
+        campos.add(campo)
+
+    try:
+        with transaction.atomic():
+            bulk_update_with_history(
+                list(alterados.values()), Produto, list(campos),
+                batch_size=500, default_user=user,
+                default_change_reason="Edição em lote pela planilha",
+            )
+    except IntegrityError as e:
+        logger.warning("Falha na edição em lote da planilha: %s", e)
+        for resultado, produto, campo, valor in validas:
+            resultado['message'] = "Conflito ao gravar o lote. Nenhuma alteração foi salva."
+        return resultados
+
+    # bulk_update não dispara signals: recalcula os kits afetados aqui
+    if 'custo_padrao' in campos:
+        CusteioKitService.recalcular_por_produtos(list(alterados))
+
+    for resultado, produto, campo, valor in validas:
+        resultado['status'] = 'success'
+        resultado['valor'] = '' if valor is None else str(valor)
+    return resultados
@@ -1,3 +1,4 @@
+import json
 import pandas as pd
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
@@ -10,7 +11,8 @@ from django.db.models import Q
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .utils import processar_importacao_produtos
+from .utils import processar_importacao_produtos, aplicar_edicoes_planilha, LIMITE_EDICOES_LOTE
+from .services import CusteioKitService
 
 
 from .models import (
@@ -134,11 +136,8 @@ class ProdutoDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView)
         tem_vinculo_kit = self.object.itemkit_set.exists()
         tem_vinculo_preco = self.object.precos_fornecedores.exists()
         
-        # Verifica se há movimentação no estoque (ajuste conforme seu app tc_estoque)
-        # Nota: Se o modelo tc_estoque.ItemEstoque existe, verificamos aqui
-        tem_estoque = False
-        if hasattr(self.object, 'itemestoque'): 
-            tem_estoque = True
+        # Verifica se o produto tem saldo/movimentação no estoque (tc_estoque.ItemEstoque)
+        tem_estoque = hasattr(self.object, 'estoque')
 
         if tem_vinculo_kit or tem_vinculo_preco or tem_estoque:
             if self.request.htmx:
@@ -222,28 +221,43 @@ class ServicoSheetView(ProdutoSheetView): # Herda a lógica de exportação
 @login_required
 @require_POST
 def update_produto_cell(request):
+    """ Edição de uma única célula (mantida para compatibilidade). """
+    edicao = {
+        'id': request.POST.get('id'),
+        'campo': request.POST.get('campo'),
+        'valor': request.POST.get('valor'),
+    }
+    resultado = aplicar_edicoes_planilha([edicao], request.user)[0]
+    if resultado['status'] == 'success':
+        return JsonResponse({'status': 'success', 'valor': resultado['valor']})
+    return JsonResponse({'status': 'error', 'message': resultado['message']}, status=400)
+
+@login_required
+@require_POST
+def update_produto_cells(request):
+    """
+    Recebe a fila de edições das planilhas em um único POST JSON:
+    {"edicoes": [{"id": 1, "campo": "preco_venda_padrao", "valor": "10,50"}, ...]}
+    e devolve o resultado de cada célula.
+    """
     try:
-        obj_id = request.POST.get('id')
-        campo = request.POST.get('campo')
-        valor = request.POST.get('valor')
-        
-        produto = get_object_or_404(Produto, id=obj_id)
-        
-        # Se for campo de texto, converte para maiúsculo antes de salvar
-        campos_texto = ['nome', 'codigo_interno', 'descricao_curta']
-        if campo in campos_texto:
-            valor = str(valor).upper()
-        
-        if campo == 'preco_venda_padrao':
-            valor = valor.replace('R$', '').replace(' ', '').replace(',', '.')
-        
-        setattr(produto, campo, valor)
-        produto.modificado_por = request.user
-        produto.save() # O save() do model também reforçará o upper()
-        
-        return JsonResponse({'status': 'success'})
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        edicoes = json.loads(request.body).get('edicoes')
+    except (ValueError, AttributeError):
+        edicoes = None
+
+    if not isinstance(edicoes, list) or not all(isinstance(e, dict) for e in edicoes):
+        return JsonResponse({'status': 'error', 'message': "Formato de lote inválido."}, status=400)
+    if len(edicoes) > LIMITE_EDICOES_LOTE:
+        return JsonResponse(
+            {'status': 'error', 'message': f"Máximo de {LIMITE_EDICOES_LOTE} células por lote."}, status=400
+        )
+
+    resultados = aplicar_edicoes_planilha(edicoes, request.user)
+    erros = sum(1 for r in resultados if r['status'] != 'success')
+    return JsonResponse({
+        'status': 'success' if not erros else ('error' if erros == len(resultados) else 'partial'),
+        'resultados': resultados,
+    })
 
 @login_required
 @require_POST
@@ -492,11 +506,17 @@ class KitMaterialListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         # Usamos 'itens_kit' que é o related_name definido no seu models.py
         # O prefetch_related carrega kit + itens + produto em uma única leva
-        return KitMaterial.objects.all().prefetch_related('itens_kit__produto')
+        return KitMaterial.objects.all().prefetch_related('itens_kit__produto', 'itens_kit__subkit')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_heading'] = 'Kits de Materiais / Combos'
+
+        # Custo de reposição (melhor preço atual dos fornecedores) para todos os kits da página
+        kits = context['kits']
+        custos = CusteioKitService.custo_reposicao([k.pk for k in kits])
+        for kit in kits:
+            kit.custo_reposicao = custos.get(kit.pk)
         return context
 
 class KitMaterialCreateView(LoginRequiredMixin, CreateView):
@@ -508,6 +528,7 @@ class KitMaterialCreateView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
         data['produtos_com_preco'] = Produto.objects.filter(ativo=True).only('id', 'custo_padrao', 'preco_venda_padrao')
+        data['kits_com_custo'] = KitMaterial.objects.only('id', 'custo_total')
         if self.request.POST:
             data['itens'] = ItemKitFormSet(self.request.POST)
         else:
@@ -547,6 +568,7 @@ class KitMaterialUpdateView(LoginRequiredMixin, UpdateView):
         data = super().get_context_data(**kwargs)
         # Injetamos custo e venda para o novo painel de lucro
         data['produtos_com_preco'] = Produto.objects.filter(ativo=True).only('id', 'custo_padrao', 'preco_venda_padrao')
+        data['kits_com_custo'] = KitMaterial.objects.exclude(pk=self.object.pk).only('id', 'custo_total')
         
         # CORREÇÃO DA INDENTAÇÃO ABAIXO:
         if self.request.POST:
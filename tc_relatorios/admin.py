@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import ExecucaoRelatorio
 
-# Register your models here.
+@admin.register(ExecucaoRelatorio)
+class ExecucaoRelatorioAdmin(admin.ModelAdmin):
+    list_display = ('relatorio', 'status', 'solicitado_por', 'criado_em', 'concluido_em', 'total_linhas', 'formato')
+    list_filter = ('relatorio', 'status')
+    readonly_fields = ('hash_parametros', 'arquivo', 'formato', 'colunas', 'total_linhas', 'resumo', 'mensagem_erro')
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class TcRelatoriosConfig(AppConfig):
     name = 'tc_relatorios'
+
+    def ready(self):
+        # Carrega o módulo "relatorios.py" de cada app, onde os relatórios se registram
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('relatorios')
@@ -0,0 +1,207 @@
+# tc_relatorios/auditoria.py
+import base64
+import heapq
+import json
+from datetime import datetime
+from functools import cached_property, lru_cache
+
+from django.apps import apps
+from django.db.models import OuterRef, Q, Subquery
+
+# ############################################################################
+# FONTES: todos os modelos com HistoricalRecords
+# ############################################################################
+
+# Caminho até o cliente para modelos sem FK direta "cliente"
+CAMPOS_CLIENTE_EXTRA = {
+    'tc_crm.proposta': 'oportunidade__cliente_id',
+}
+
+# Campos usados (nesta ordem) para descrever o registro sem consultar FKs
+CAMPOS_DESCRICAO = (
+    'ticket_id', 'numero_documento', 'id_proposta', 'razao_social', 'nome',
+    'assunto', 'descricao', 'identificador_unico', 'username',
+)
+
+
+class FonteHistorico:
+    def __init__(self, ordem, modelo):
+        self.ordem = ordem
+        self.modelo = modelo
+        self.historico = getattr(modelo, modelo._meta.simple_history_manager_attribute).model
+        self.chave = modelo._meta.label_lower
+        self.rotulo = str(modelo._meta.verbose_name)
+        self.campo_pk = modelo._meta.pk.attname
+        self.campo_cliente = self._descobrir_campo_cliente()
+
+    def _descobrir_campo_cliente(self):
+        if self.chave == 'tc_crm.cliente':
+            return self.campo_pk
+        for campo in self.modelo._meta.concrete_fields:
+            if campo.name == 'cliente' and campo.is_relation and campo.related_model._meta.label_lower == 'tc_crm.cliente':
+                return campo.attname
+        return CAMPOS_CLIENTE_EXTRA.get(self.chave)
+
+
+@lru_cache(maxsize=None)
+def fontes():
+    """ Fontes ordenadas por chave; a posição entra no desempate do cursor. """
+    modelos = sorted(
+        (m for m in apps.get_models() if getattr(m._meta, 'simple_history_manager_attribute', None)),
+        key=lambda m: m._meta.label_lower,
+    )
+    return tuple(FonteHistorico(ordem, modelo) for ordem, modelo in enumerate(modelos))
+
+
+def fontes_por_chave():
+    return {fonte.chave: fonte for fonte in fontes()}
+
+
+# ############################################################################
+# ENTRADAS DA TIMELINE
+# ############################################################################
+
+class EntradaAuditoria:
+    TIPOS = {'+': 'Criação', '~': 'Alteração', '-': 'Exclusão'}
+
+    def __init__(self, fonte, registro):
+        self.fonte = fonte
+        self.registro = registro
+        self.anterior = None
+
+    @property
+    def chave_ordem(self):
+        return (self.registro.history_date, self.fonte.ordem, self.registro.history_id)
+
+    @property
+    def data(self):
+        return self.registro.history_date
+
+    @property
+    def usuario(self):
+        return self.registro.history_user
+
+    @property
+    def tipo(self):
+        return self.registro.history_type
+
+    @property
+    def tipo_display(self):
+        return self.TIPOS.get(self.tipo, self.tipo)
+
+    @property
+    def objeto_id(self):
+        return getattr(self.registro, self.fonte.campo_pk)
+
+    @property
+    def descricao(self):
+        for campo in CAMPOS_DESCRICAO:
+            valor = getattr(self.registro, campo, None)
+            if valor:
+                return str(valor)[:80]
+        return f"#{self.objeto_id}"
+
+    @cached_property
+    def alteracoes(self):
+        """ [(campo, antes, depois)] em relação à versão anterior (só alterações). """
+        if self.tipo != '~' or self.anterior is None:
+            return []
+        campos = {c.attname: c for c in self.fonte.historico._meta.concrete_fields}
+        resultado = []
+        for mudanca in self.registro.diff_against(self.anterior).changes:
+            campo = campos.get(mudanca.field) or campos.get(f'{mudanca.field}_id')
+            rotulo = str(campo.verbose_name) if campo is not None else mudanca.field
+            resultado.append((rotulo, mudanca.old, mudanca.new))
+        return resultado
+
+
+# ############################################################################
+# PAGINAÇÃO POR CURSOR COM MERGE K-WAY
+# ############################################################################
+
+def codificar_cursor(entrada):
+    bruto = json.dumps([entrada.data.isoformat(), entrada.fonte.chave, entrada.registro.history_id])
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """ (data, ordem_fonte, history_id) ou ValueError. """
+    try:
+        data, chave, history_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return datetime.fromisoformat(data), fontes_por_chave()[chave].ordem, int(history_id)
+    except (KeyError, TypeError, UnicodeError, ValueError):
+        raise ValueError("Cursor de auditoria inválido.")
+
+
+def _consulta(fonte, cliente_id, usuario_id, cursor, limite):
+    qs = fonte.historico.objects.all()
+    if cliente_id is not None:
+        qs = qs.filter(**{fonte.campo_cliente: cliente_id})
+    if usuario_id is not None:
+        qs = qs.filter(history_user_id=usuario_id)
+    if cursor is not None:
+        # Ordem global: (history_date, ordem da fonte, history_id) decrescente
+        data, ordem, history_id = cursor
+        if fonte.ordem > ordem:
+            qs = qs.filter(history_date__lt=data)
+        elif fonte.ordem < ordem:
+            qs = qs.filter(history_date__lte=data)
+        else:
+            qs = qs.filter(Q(history_date__lt=data) | Q(history_date=data, history_id__lt=history_id))
+    qs = qs.select_related('history_user').order_by('-history_date', '-history_id')[:limite]
+    return (EntradaAuditoria(fonte, registro) for registro in qs)
+
+
+def pagina(cliente_id=None, usuario_id=None, modelos=None, cursor=None, tamanho=50):
+    """
+    Uma página da timeline de auditoria, do mais recente para o mais antigo.
+
+    Cada fonte contribui com no máximo tamanho+1 linhas de uma query indexada
+    por history_date; as listas já ordenadas são intercaladas (heapq.merge),
+    então o custo não depende de quantas páginas já foram percorridas.
+    Devolve (entradas, cursor_da_proxima_pagina ou None).
+    """
+    selecionadas = [
+        fonte for fonte in fontes()
+        if (not modelos or fonte.chave in modelos) and (cliente_id is None or fonte.campo_cliente)
+    ]
+    posicao = decodificar_cursor(cursor) if cursor else None
+    fluxos = [_consulta(fonte, cliente_id, usuario_id, posicao, tamanho + 1) for fonte in selecionadas]
+
+    entradas = []
+    for entrada in heapq.merge(*fluxos, key=lambda e: e.chave_ordem, reverse=True):
+        entradas.append(entrada)
+        if len(entradas) > tamanho:
+            break
+
+    proximo = None
+    if len(entradas) > tamanho:
+        entradas = entradas[:tamanho]
+        proximo = codificar_cursor(entradas[-1])
+    return entradas, proximo
+
+
+def carregar_anteriores(entradas):
+    """
+    Busca a versão anterior das alterações da página (2 queries por modelo
+    presente) para que os diffs sejam calculados só nas linhas exibidas.
+    """
+    por_fonte = {}
+    for entrada in entradas:
+        if entrada.tipo == '~':
+            por_fonte.setdefault(entrada.fonte, []).append(entrada)
+
+    for fonte, lista in por_fonte.items():
+        historico = fonte.historico
+        anterior = historico.objects.filter(
+            Q(history_date__lt=OuterRef('history_date'))
+            | Q(history_date=OuterRef('history_date'), history_id__lt=OuterRef('history_id')),
+            **{fonte.campo_pk: OuterRef(fonte.campo_pk)},
+        ).order_by('-history_date', '-history_id').values('history_id')[:1]
+        mapa = dict(
+            historico.objects.filter(history_id__in=[e.registro.history_id for e in lista])
+            .annotate(anterior_id=Subquery(anterior)).values_list('history_id', 'anterior_id')
+        )
+        registros = historico.objects.in_bulk([pk for pk in mapa.values() if pk])
+        for entrada in lista:
+            entrada.anterior = registros.get(mapa.get(entrada.registro.history_id))
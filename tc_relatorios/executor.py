@@ -0,0 +1,232 @@
+# tc_relatorios/executor.py
+import csv
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ExecucaoRelatorio
+from .registro import obter_relatorio
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'RELATORIOS_WORKERS', 2),
+            thread_name_prefix='relatorios',
+        )
+    return _pool
+
+
+def _diretorio():
+    caminho = getattr(settings, 'RELATORIOS_DIR', os.path.join(settings.MEDIA_ROOT, 'relatorios'))
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+
+# ############################################################################
+# SOLICITAÇÃO (com cache por hash de parâmetros)
+# ############################################################################
+
+def solicitar(relatorio, cleaned_data, user=None, forcar=False):
+    """
+    Devolve uma ExecucaoRelatorio para os parâmetros informados:
+    - resultado concluído e dentro da validade -> reaproveitado (cache);
+    - execução idêntica já na fila/executando -> reaproveitada;
+    - caso contrário cria uma nova e envia ao pool de workers após o commit.
+    O reaproveitamento é restrito às execuções do próprio usuário: relatórios
+    com filtro por usuário geram resultados diferentes para os mesmos parâmetros.
+    """
+    params = relatorio.serializar_parametros(cleaned_data)
+    hash_params = relatorio.hash_parametros(params)
+    agora = timezone.now()
+    solicitante = user if user and user.is_authenticated else None
+    execucoes = ExecucaoRelatorio.objects.filter(
+        relatorio=relatorio.codigo, hash_parametros=hash_params, solicitado_por=solicitante
+    )
+
+    if not forcar:
+        validade = agora - timedelta(seconds=getattr(settings, 'RELATORIOS_CACHE_TTL', 6 * 3600))
+        pronta = execucoes.filter(status='concluido', concluido_em__gte=validade).order_by('-concluido_em').first()
+        if pronta:
+            if resultado_disponivel(pronta):
+                return pronta
+            marcar_expirada(pronta)
+
+    limite = agora - timedelta(seconds=getattr(settings, 'RELATORIOS_TIMEOUT', 30 * 60))
+    # Execuções "presas" (processo reiniciado no meio) são marcadas como erro
+    execucoes.filter(status__in=['pendente', 'executando'], criado_em__lt=limite).update(
+        status='erro', mensagem_erro='Tempo limite excedido.', concluido_em=agora
+    )
+    andamento = execucoes.filter(status__in=['pendente', 'executando']).first()
+    if andamento:
+        return andamento
+
+    execucao = ExecucaoRelatorio.objects.create(
+        relatorio=relatorio.codigo, parametros=params, hash_parametros=hash_params,
+        solicitado_por=solicitante,
+    )
+    transaction.on_commit(lambda: _get_pool().submit(executar, execucao.pk))
+    return execucao
+
+
+# ############################################################################
+# EXECUÇÃO (thread do pool)
+# ############################################################################
+
+def executar(execucao_id):
+    close_old_connections()
+    try:
+        atualizadas = ExecucaoRelatorio.objects.filter(pk=execucao_id, status='pendente').update(
+            status='executando', iniciado_em=timezone.now()
+        )
+        if not atualizadas:
+            return
+        execucao = ExecucaoRelatorio.objects.get(pk=execucao_id)
+        relatorio = obter_relatorio(execucao.relatorio)
+        try:
+            if relatorio is None:
+                raise LookupError(f"Relatório '{execucao.relatorio}' não registrado.")
+            params = relatorio.carregar_parametros(execucao.parametros)
+            chaves = [c for c, _ in relatorio.colunas]
+            df = pd.DataFrame.from_records(list(relatorio.gerar(params)), columns=chaves)
+
+            execucao.formato = 'parquet' if PARQUET_DISPONIVEL else 'csv.gz'
+            execucao.arquivo = f"{relatorio.codigo}-{execucao.hash_parametros[:16]}-{execucao.pk}.{execucao.formato}"
+            _gravar(df, caminho_resultado(execucao), execucao.formato)
+
+            execucao.colunas = [list(c) for c in relatorio.colunas]
+            execucao.total_linhas = len(df)
+            execucao.resumo = relatorio.serializar_parametros(relatorio.resumir(params) or {})
+            execucao.status = 'concluido'
+        except Exception as e:
+            logger.exception("Falha ao executar o relatório %s (#%s)", execucao.relatorio, execucao.pk)
+            execucao.status = 'erro'
+            execucao.mensagem_erro = str(e)
+        execucao.concluido_em = timezone.now()
+        execucao.save()
+    finally:
+        close_old_connections()
+
+
+def reenfileirar(execucao, user=None):
+    """
+    Execução concluída cujo arquivo não existe mais (limpeza, outro volume de
+    MEDIA): marca como expirada e solicita de novo com os mesmos parâmetros.
+    """
+    marcar_expirada(execucao)
+    relatorio = obter_relatorio(execucao.relatorio)
+    if relatorio is None:
+        return None
+    return solicitar(relatorio, relatorio.carregar_parametros(execucao.parametros), user)
+
+
+def executar_agora(relatorio, cleaned_data, user=None):
+    """ Executa de forma síncrona (comandos/cron), respeitando o cache. """
+    with transaction.atomic():
+        execucao = solicitar(relatorio, cleaned_data, user)
+    if execucao.status == 'pendente':
+        executar(execucao.pk)
+        execucao.refresh_from_db()
+    return execucao
+
+
+# ############################################################################
+# ARMAZENAMENTO E LEITURA DOS RESULTADOS
+# ############################################################################
+
+def caminho_resultado(execucao):
+    return os.path.join(_diretorio(), execucao.arquivo)
+
+
+def resultado_disponivel(execucao):
+    return execucao.status == 'concluido' and bool(execucao.arquivo) and os.path.exists(caminho_resultado(execucao))
+
+
+def marcar_expirada(execucao):
+    ExecucaoRelatorio.objects.filter(pk=execucao.pk, status='concluido').update(
+        status='erro', mensagem_erro='Resultado expirado: arquivo não encontrado.'
+    )
+    execucao.status = 'erro'
+
+
+def _gravar(df, caminho, formato):
+    temporario = caminho + '.tmp'
+    if formato == 'parquet':
+        df.to_parquet(temporario, index=False, compression='zstd')
+    else:
+        df.to_csv(temporario, index=False, compression='gzip', quoting=csv.QUOTE_MINIMAL)
+    os.replace(temporario, caminho)
+
+
+def ler_linhas(execucao, inicio, quantidade):
+    """ Linhas (lista de listas) de um trecho do resultado; no CSV lê apenas o trecho pedido. """
+    caminho = caminho_resultado(execucao)
+    if execucao.formato == 'parquet':
+        df = pd.read_parquet(caminho).iloc[inicio:inicio + quantidade]
+    else:
+        df = pd.read_csv(caminho, compression='gzip', skiprows=range(1, inicio + 1), nrows=quantidade)
+    return df.astype(object).where(pd.notnull(df), None).values.tolist()
+
+
+class ResultadoPaginavel:
+    """ Adapta o arquivo de resultado à interface esperada pelo django.core.paginator.Paginator. """
+
+    def __init__(self, execucao):
+        self.execucao = execucao
+
+    def count(self):
+        return self.execucao.total_linhas
+
+    def __len__(self):
+        return self.execucao.total_linhas
+
+    def __getitem__(self, fatia):
+        if not isinstance(fatia, slice):
+            raise TypeError("ResultadoPaginavel aceita apenas fatias.")
+        inicio = fatia.start or 0
+        fim = min(fatia.stop if fatia.stop is not None else self.count(), self.count())
+        return ler_linhas(self.execucao, inicio, max(fim - inicio, 0))
+
+
+def iterar_blocos(execucao, tamanho=5000):
+    """ Percorre o resultado em blocos (DataFrames) para exportação em streaming. """
+    caminho = caminho_resultado(execucao)
+    if execucao.formato == 'parquet':
+        import pyarrow.parquet as pq
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, compression='gzip', chunksize=tamanho)
+
+
+def remover_expirados(dias):
+    """ Apaga arquivos e registros de execuções mais antigas que `dias`. """
+    limite = timezone.now() - timedelta(days=dias)
+    antigas = ExecucaoRelatorio.objects.filter(criado_em__lt=limite).exclude(status__in=['pendente', 'executando'])
+    removidas = 0
+    for execucao in antigas.iterator():
+        if execucao.arquivo:
+            try:
+                os.remove(caminho_resultado(execucao))
+            except FileNotFoundError:
+                pass
+        removidas += 1
+    antigas.delete()
+    return removidas
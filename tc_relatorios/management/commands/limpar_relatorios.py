@@ -0,0 +1,14 @@
+# tc_relatorios/management/commands/limpar_relatorios.py
+
+from django.core.management.base import BaseCommand
+from tc_relatorios.executor import remover_expirados
+
+class Command(BaseCommand):
+    help = 'Remove execuções de relatórios (e seus arquivos de resultado) mais antigas que N dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help='Idade mínima, em dias, das execuções removidas.')
+
+    def handle(self, *args, **options):
+        removidas = remover_expirados(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f"{removidas} execução(ões) de relatório removida(s)."))
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecucaoRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('relatorio', models.CharField(max_length=100, verbose_name='Relatório')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('hash_parametros', models.CharField(max_length=64, verbose_name='Hash dos Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Na Fila'), ('executando', 'Executando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('arquivo', models.CharField(blank=True, max_length=255, verbose_name='Arquivo do Resultado')),
+                ('formato', models.CharField(blank=True, max_length=10, verbose_name='Formato do Arquivo')),
+                ('colunas', models.JSONField(blank=True, default=list)),
+                ('total_linhas', models.PositiveIntegerField(default=0)),
+                ('resumo', models.JSONField(blank=True, default=dict, verbose_name='Totalizadores')),
+                ('mensagem_erro', models.TextField(blank=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='execucoes_relatorio', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Execução de Relatório',
+                'verbose_name_plural': 'Execuções de Relatórios',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['relatorio', 'hash_parametros', 'status'], name='idx_execucao_cache')],
+            },
+        ),
+    ]
@@ -1,3 +1,62 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+# ############################################################################
+# EXECUÇÕES DE RELATÓRIOS (processadas em segundo plano)
+# ############################################################################
+
+class ExecucaoRelatorio(models.Model):
+    """
+    Uma execução de relatório registrado (ver tc_relatorios/registro.py).
+    O resultado fica gravado em arquivo (Parquet/CSV) e é reaproveitado por
+    novas solicitações do mesmo usuário com os mesmos parâmetros (mesmo
+    hash_parametros).
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Na Fila'),
+        ('executando', 'Executando'),
+        ('concluido', 'Concluído'),
+        ('erro', 'Erro'),
+    ]
+
+    relatorio = models.CharField(max_length=100, verbose_name="Relatório")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parâmetros")
+    hash_parametros = models.CharField(max_length=64, verbose_name="Hash dos Parâmetros")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pendente')
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='execucoes_relatorio', verbose_name="Solicitado por"
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    # Resultado
+    arquivo = models.CharField(max_length=255, blank=True, verbose_name="Arquivo do Resultado")
+    formato = models.CharField(max_length=10, blank=True, verbose_name="Formato do Arquivo")
+    colunas = models.JSONField(default=list, blank=True)
+    total_linhas = models.PositiveIntegerField(default=0)
+    resumo = models.JSONField(default=dict, blank=True, verbose_name="Totalizadores")
+    mensagem_erro = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Execução de Relatório"
+        verbose_name_plural = "Execuções de Relatórios"
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['relatorio', 'hash_parametros', 'status'], name='idx_execucao_cache'),
+        ]
+
+    def __str__(self):
+        return f"{self.relatorio} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def em_andamento(self):
+        return self.status in ('pendente', 'executando')
+
+    @property
+    def duracao(self):
+        if self.iniciado_em and self.concluido_em:
+            return self.concluido_em - self.iniciado_em
+        return None
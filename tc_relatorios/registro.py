@@ -0,0 +1,100 @@
+# tc_relatorios/registro.py
+import hashlib
+import json
+
+from django import forms
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+# ############################################################################
+# REGISTRO DE RELATÓRIOS
+# ############################################################################
+
+_relatorios = {}
+
+
+class ParametrosJSONEncoder(DjangoJSONEncoder):
+    """ Serializa os parâmetros validados; instâncias de model viram a PK. """
+
+    def default(self, o):
+        if isinstance(o, models.Model):
+            return o.pk
+        if isinstance(o, models.QuerySet):
+            return sorted(o.values_list('pk', flat=True))
+        return super().default(o)
+
+
+class RelatorioBase:
+    """
+    Classe base dos relatórios executados em segundo plano.
+
+    - codigo: identificador único usado nas URLs e no cache.
+    - parametros: {nome: django.forms.Field}; os campos tipam e validam a entrada.
+    - colunas: [(chave, título), ...] na ordem de exibição/exportação.
+    - gerar(params): devolve um iterável de dicts (ou tuplas na ordem das colunas).
+    - resumir(params): opcional, totalizadores gravados junto com a execução.
+    - versao: incremente ao mudar a lógica para invalidar resultados em cache.
+    """
+    codigo = None
+    titulo = ''
+    descricao = ''
+    categoria = 'Geral'
+    permissao = None
+    parametros = {}
+    colunas = []
+    versao = 1
+
+    def get_form_class(self):
+        return type(f'{self.__class__.__name__}Form', (forms.Form,), dict(self.parametros))
+
+    def get_form(self, data=None):
+        form = self.get_form_class()(data)
+        for field in form.fields.values():
+            field.widget.attrs.setdefault('class', 'form-control')
+        return form
+
+    def hash_parametros(self, params):
+        bruto = json.dumps(
+            {'relatorio': self.codigo, 'versao': self.versao, 'params': params},
+            sort_keys=True, cls=ParametrosJSONEncoder,
+        )
+        return hashlib.sha256(bruto.encode()).hexdigest()
+
+    def serializar_parametros(self, cleaned_data):
+        """ Parâmetros validados -> JSON (datas em ISO, decimais em texto). """
+        return json.loads(json.dumps(cleaned_data, cls=ParametrosJSONEncoder, sort_keys=True))
+
+    def carregar_parametros(self, dados):
+        """ JSON gravado na execução -> valores tipados, usando os próprios fields. """
+        form = self.get_form_class()(dados)
+        if not form.is_valid():
+            raise ValueError(f"Parâmetros inválidos: {form.errors.as_text()}")
+        return form.cleaned_data
+
+    def tem_permissao(self, user):
+        return not self.permissao or user.has_perm(self.permissao)
+
+    def gerar(self, params):
+        raise NotImplementedError
+
+    def resumir(self, params):
+        return {}
+
+
+def registrar(classe):
+    """ Decorator: @registrar em uma subclasse de RelatorioBase. """
+    if not classe.codigo:
+        raise ValueError(f"{classe.__name__} precisa definir 'codigo'.")
+    if classe.codigo in _relatorios and _relatorios[classe.codigo] is not classe:
+        raise ValueError(f"Relatório '{classe.codigo}' já registrado.")
+    _relatorios[classe.codigo] = classe
+    return classe
+
+
+def obter_relatorio(codigo):
+    classe = _relatorios.get(codigo)
+    return classe() if classe else None
+
+
+def listar_relatorios():
+    return [classe() for classe in sorted(_relatorios.values(), key=lambda c: (c.categoria, c.titulo))]
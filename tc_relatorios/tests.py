@@ -1,3 +1,86 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 from django.test import TestCase
+from django.urls import reverse
+
+from tc_compras.models import ConciliacaoPedido, ExcecaoConciliacao, PedidoCompra
+from tc_produtos.models import Fornecedor
+
+User = get_user_model()
+
+
+class PermissaoRelatoriosTest(TestCase):
+    """
+    Relatórios gerenciais: sem a permissão do modelo que alimenta o relatório,
+    o usuário logado volta ao dashboard com mensagem de acesso negado.
+    """
+    relatorios = {
+        'relatorios:funil_vendas': 'view_transicaoetapa',
+        'relatorios:cac_ltv': 'view_indicadoraquisicaomensal',
+        'relatorios:desempenho_suporte': 'view_metricasuportediaria',
+        'relatorios:auditoria_compras': 'view_conciliacaopedido',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(username='vendedor', password='senha')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def conceder(self, codename):
+        self.usuario.user_permissions.add(Permission.objects.get(codename=codename))
+
+    def test_sem_permissao_redireciona_para_o_dashboard(self):
+        for rota in self.relatorios:
+            with self.subTest(rota=rota):
+                response = self.client.get(reverse(rota))
+                self.assertRedirects(response, reverse('tc_core:dashboard'), fetch_redirect_response=False)
+
+    def test_com_permissao_abre_o_relatorio(self):
+        for rota, codename in self.relatorios.items():
+            with self.subTest(rota=rota):
+                self.conceder(codename)
+                self.assertEqual(self.client.get(reverse(rota)).status_code, 200)
+
+
+class AuditoriaComprasViewTest(TestCase):
+    """ Auditoria de compras lê ConciliacaoPedido/ExcecaoConciliacao gravados pela conciliação. """
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='compras', password='senha')
+        fornecedor = Fornecedor.objects.create(razao_social='Fornecedor Auditoria', cnpj='00.000.000/0001-00')
+        Status = ConciliacaoPedido.Status
+        cls.conciliado = ConciliacaoPedido.objects.create(
+            pedido=PedidoCompra.objects.create(fornecedor=fornecedor), fornecedor=fornecedor, status=Status.CONCILIADO,
+        )
+        cls.divergente = ConciliacaoPedido.objects.create(
+            pedido=PedidoCompra.objects.create(fornecedor=fornecedor), fornecedor=fornecedor, status=Status.DIVERGENTE,
+            valor_recebido=Decimal('100.00'), valor_despesa=Decimal('130.00'), diferenca=Decimal('30.00'),
+        )
+        ExcecaoConciliacao.objects.create(
+            conciliacao=cls.divergente, tipo=ExcecaoConciliacao.Tipo.VALOR_DIVERGENTE, mensagem='Despesa acima do recebido',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_resumo_e_filtro_por_tipo_de_excecao(self):
+        response = self.client.get(reverse('relatorios:auditoria_compras'))
+
+        self.assertEqual(response.status_code, 200)
+        resumo = response.context['resumo']
+        self.assertEqual((resumo['total'], resumo['conciliados'], resumo['divergentes']), (2, 1, 1))
+        self.assertEqual(resumo['valor_divergente'], Decimal('30.00'))
+        self.assertEqual(response.context['excecoes_por_tipo'][0]['total'], 1)
+
+        response = self.client.get(reverse('relatorios:auditoria_compras'), {'tipo': ExcecaoConciliacao.Tipo.VALOR_DIVERGENTE})
+        self.assertEqual(list(response.context['page_obj']), [self.divergente])
+        self.assertContains(response, 'Despesa acima do recebido')
+
+    def test_filtro_invalido_e_ignorado(self):
+        response = self.client.get(reverse('relatorios:auditoria_compras'), {'status': 'x', 'tipo': 'y'})
 
-# Create your tests here.
+        self.assertEqual(len(response.context['page_obj']), 2)
@@ -4,6 +4,14 @@ from . import views
 app_name = 'relatorios'
 
 urlpatterns = [
+    # ---------------------------
+    # MOTOR DE RELATÓRIOS (execução em segundo plano)
+    # ---------------------------
+    path('catalogo/', views.RelatorioCatalogoView.as_view(), name='catalogo'),
+    path('executar/<slug:codigo>/', views.RelatorioExecutarView.as_view(), name='relatorio_executar'),
+    path('execucoes/<int:pk>/', views.ExecucaoRelatorioDetailView.as_view(), name='execucao_detail'),
+    path('execucoes/<int:pk>/exportar/<str:formato>/', views.exportar_execucao, name='execucao_exportar'),
+
     # Dashboard de Indicadores e KPIs
     #path('', views.RelatorioDashboardView.as_view(), name='dashboard'),
     
@@ -16,19 +24,27 @@ urlpatterns = [
     # ---------------------------
     # RELATÓRIOS DE COMPRAS / AUDITORIA
     # ---------------------------
-    # Compara Preço Estimado da Requisição vs. Preço Real do PO
-    #path('auditoria-compras/', views.AuditoriaComprasView.as_view(), name='auditoria_compras'),
+    # Three-way match: Pedido de Compra x Recebimento x Despesa
+    path('auditoria-compras/', views.AuditoriaComprasView.as_view(), name='auditoria_compras'),
     #path('performance-fornecedores/', views.PerformanceFornecedoresView.as_view(), name='performance_fornecedores'),
     
     # ---------------------------
     # RELATÓRIOS DE MARKETING / VENDAS
     # ---------------------------
     # Calcula CAC e LTV (Life Time Value)
-    #path('cac-ltv/', views.CAC_LTV_View.as_view(), name='cac_ltv'),
+    path('cac-ltv/', views.CacLtvView.as_view(), name='cac_ltv'),
+    # Funil de vendas (conversão, tempo por etapa e velocidade por vendedor)
+    path('funil-vendas/', views.FunilVendasView.as_view(), name='funil_vendas'),
     
     # ---------------------------
     # RELATÓRIOS OPERACIONAIS
     # ---------------------------
     # Desempenho do Suporte (Tempo médio de resposta, Chamados por Cliente)
-    #path('desempenho-suporte/', views.DesempenhoSuporteView.as_view(), name='desempenho_suporte'),
-]
\ No newline at end of file
+    path('desempenho-suporte/', views.DesempenhoSuporteView.as_view(), name='desempenho_suporte'),
+
+    # ---------------------------
+    # AUDITORIA
+    # ---------------------------
+    # Timeline unificada do histórico de alterações (todos os modelos)
+    path('auditoria/', views.AuditoriaTimelineView.as_view(), name='auditoria_timeline'),
+]
@@ -1,3 +1,461 @@
-from django.shortcuts import render
+import csv
+import json
+import tempfile
 
-# Crie suas views aqui.
\ No newline at end of file
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Avg, Count, Q, Sum
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+from django.views.generic import DetailView, TemplateView
+from openpyxl import Workbook
+
+from tc_compras.models import ConciliacaoPedido, ExcecaoConciliacao, ExecucaoConciliacao
+from tc_core.mixins import PermissionRequiredMixin
+from tc_crm.models import Cliente
+from tc_crm.services import FunilVendasService
+from tc_marketing.models import CanalMarketing, IndicadorAquisicaoMensal
+from tc_operacoes.models import Chamado
+from tc_operacoes.services import MetricasSuporteService
+
+from . import auditoria
+from .executor import ResultadoPaginavel, iterar_blocos, reenfileirar, resultado_disponivel, solicitar
+from .models import ExecucaoRelatorio
+from .registro import listar_relatorios, obter_relatorio
+
+# ############################################################################
+# CATÁLOGO E SOLICITAÇÃO DE RELATÓRIOS
+# ############################################################################
+
+class RelatorioAcessoMixin:
+    """ Resolve o relatório da URL e checa a permissão declarada na classe. """
+
+    def get_relatorio(self, codigo):
+        relatorio = obter_relatorio(codigo)
+        if relatorio is None:
+            raise Http404("Relatório não encontrado.")
+        return relatorio
+
+    def negar_acesso(self, relatorio):
+        messages.error(
+            self.request,
+            f"Acesso Negado: Você não tem permissão ('{relatorio.permissao}') para acessar este relatório."
+        )
+        return redirect('relatorios:catalogo')
+
+
+def execucoes_visiveis(user):
+    """ Cada usuário vê as próprias execuções; o superusuário vê todas. """
+    execucoes = ExecucaoRelatorio.objects.all()
+    if not user.is_superuser:
+        execucoes = execucoes.filter(solicitado_por=user)
+    return execucoes
+
+
+def reenfileirar_expirada(request, execucao):
+    """ Resultado concluído sem arquivo: trata como expirado e redireciona para a nova execução. """
+    nova = reenfileirar(execucao, request.user)
+    if nova is None:
+        raise Http404("Relatório não encontrado.")
+    messages.info(request, "O resultado anterior expirou; o relatório foi enviado para nova execução.")
+    return redirect('relatorios:execucao_detail', pk=nova.pk)
+
+
+class RelatorioCatalogoView(LoginRequiredMixin, TemplateView):
+    template_name = 'relatorios/catalogo.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['relatorios'] = [r for r in listar_relatorios() if r.tem_permissao(self.request.user)]
+        context['execucoes'] = ExecucaoRelatorio.objects.filter(
+            solicitado_por=self.request.user
+        ).only('id', 'relatorio', 'status', 'criado_em', 'total_linhas')[:15]
+        titulos = {r.codigo: r.titulo for r in context['relatorios']}
+        for execucao in context['execucoes']:
+            execucao.titulo = titulos.get(execucao.relatorio, execucao.relatorio)
+        return context
+
+
+class RelatorioExecutarView(LoginRequiredMixin, RelatorioAcessoMixin, View):
+    template_name = 'relatorios/relatorio_form.html'
+
+    def get(self, request, codigo):
+        relatorio = self.get_relatorio(codigo)
+        if not relatorio.tem_permissao(request.user):
+            return self.negar_acesso(relatorio)
+        return render(request, self.template_name, {'relatorio': relatorio, 'form': relatorio.get_form()})
+
+    def post(self, request, codigo):
+        relatorio = self.get_relatorio(codigo)
+        if not relatorio.tem_permissao(request.user):
+            return self.negar_acesso(relatorio)
+
+        form = relatorio.get_form(request.POST)
+        if not form.is_valid():
+            return render(request, self.template_name, {'relatorio': relatorio, 'form': form})
+
+        execucao = solicitar(relatorio, form.cleaned_data, request.user, forcar=bool(request.POST.get('forcar')))
+        url = reverse('relatorios:execucao_detail', kwargs={'pk': execucao.pk})
+        if request.htmx:
+            response = HttpResponse(status=204)
+            response['HX-Redirect'] = url
+            return response
+        return redirect(url)
+
+
+# ############################################################################
+# RESULTADO (HTML PAGINADO) E EXPORTAÇÃO
+# ############################################################################
+
+class ExecucaoRelatorioDetailView(LoginRequiredMixin, RelatorioAcessoMixin, DetailView):
+    model = ExecucaoRelatorio
+    template_name = 'relatorios/execucao_detail.html'
+    context_object_name = 'execucao'
+    paginate_by = 50
+
+    def get_queryset(self):
+        return execucoes_visiveis(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        self.relatorio = self.get_relatorio(self.object.relatorio)
+        if not self.relatorio.tem_permissao(request.user):
+            return self.negar_acesso(self.relatorio)
+        if self.object.status == 'concluido' and not resultado_disponivel(self.object):
+            return reenfileirar_expirada(request, self.object)
+
+        # Polling HTMX enquanto a execução está na fila
+        if request.htmx and request.GET.get('parcial') == 'status':
+            if not self.object.em_andamento:
+                response = HttpResponse(status=204)
+                response['HX-Refresh'] = 'true'
+                return response
+            return render(request, 'relatorios/partials/execucao_status.html', {'execucao': self.object})
+
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['relatorio'] = self.relatorio
+        context['form_parametros'] = self.relatorio.get_form(self.object.parametros)
+        if self.object.status == 'concluido':
+            paginator = Paginator(ResultadoPaginavel(self.object), self.paginate_by)
+            context['page_obj'] = paginator.get_page(self.request.GET.get('page'))
+            context['paginator'] = paginator
+        return context
+
+
+@login_required
+def exportar_execucao(request, pk, formato):
+    execucao = get_object_or_404(execucoes_visiveis(request.user), pk=pk, status='concluido')
+    relatorio = obter_relatorio(execucao.relatorio)
+    if relatorio is None:
+        raise Http404("Relatório não encontrado.")
+    if not relatorio.tem_permissao(request.user):
+        messages.error(request, "Acesso Negado: Você não tem permissão para exportar este relatório.")
+        return redirect('relatorios:catalogo')
+    if not resultado_disponivel(execucao):
+        return reenfileirar_expirada(request, execucao)
+
+    nome = f"{execucao.relatorio}_{timezone.localtime(execucao.concluido_em):%Y%m%d_%H%M}"
+    titulos = [titulo for _, titulo in execucao.colunas]
+
+    if formato == 'csv':
+        class Eco:
+            def write(self, valor):
+                return valor
+
+        def linhas():
+            escritor = csv.writer(Eco(), delimiter=';')
+            yield '\ufeff' + escritor.writerow(titulos)
+            for bloco in iterar_blocos(execucao):
+                for linha in bloco.itertuples(index=False, name=None):
+                    yield escritor.writerow(['' if v != v else v for v in linha])
+
+        response = StreamingHttpResponse(linhas(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{nome}.csv"'
+        return response
+
+    if formato == 'xlsx':
+        # write_only mantém a memória constante; o arquivo é enviado em blocos pelo FileResponse
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=relatorio.titulo[:31] or 'Relatório')
+        ws.append(titulos)
+        for bloco in iterar_blocos(execucao):
+            for linha in bloco.itertuples(index=False, name=None):
+                ws.append([None if v != v else v for v in linha])
+        arquivo = tempfile.TemporaryFile()
+        wb.save(arquivo)
+        arquivo.seek(0)
+        return FileResponse(arquivo, as_attachment=True, filename=f"{nome}.xlsx")
+
+    raise Http404("Formato de exportação não suportado.")
+
+
+# ############################################################################
+# COMPRAS: AUDITORIA (lê o resultado da conciliação PO x Recebimento x Despesa)
+# ############################################################################
+
+class AuditoriaComprasView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    """
+    Resultado gravado por ConciliacaoComprasService (comando conciliar_compras):
+    totais por status, exceções por tipo e os pedidos conciliados, filtráveis
+    por status (?status=) e tipo de exceção (?tipo=).
+    """
+    permission_required = 'tc_compras.view_conciliacaopedido'
+    template_name = 'relatorios/auditoria_compras.html'
+    paginate_by = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        status = self.request.GET.get('status', '')
+        status = status if status in ConciliacaoPedido.Status.values else ''
+        tipo = self.request.GET.get('tipo', '')
+        tipo = tipo if tipo in ExcecaoConciliacao.Tipo.values else ''
+
+        # Cards: uma agregação sobre todas as conciliações
+        Status = ConciliacaoPedido.Status
+        resumo = ConciliacaoPedido.objects.aggregate(
+            total=Count('pk'),
+            conciliados=Count('pk', filter=Q(status=Status.CONCILIADO)),
+            parciais=Count('pk', filter=Q(status=Status.PARCIAL)),
+            pendentes=Count('pk', filter=Q(status=Status.PENDENTE)),
+            divergentes=Count('pk', filter=Q(status=Status.DIVERGENTE)),
+            valor_divergente=Sum('diferenca', filter=Q(status=Status.DIVERGENTE)),
+        )
+        tipos = dict(ExcecaoConciliacao.Tipo.choices)
+        excecoes_por_tipo = [
+            {'tipo': valor, 'rotulo': tipos.get(valor, valor), 'total': total}
+            for valor, total in ExcecaoConciliacao.objects.values('tipo').annotate(total=Count('pk'))
+            .order_by('-total').values_list('tipo', 'total')
+        ]
+
+        conciliacoes = ConciliacaoPedido.objects.select_related('fornecedor').prefetch_related('excecoes')
+        if status:
+            conciliacoes = conciliacoes.filter(status=status)
+        if tipo:
+            conciliacoes = conciliacoes.filter(excecoes__tipo=tipo).distinct()
+        paginator = Paginator(conciliacoes.order_by('-pedido_id'), self.paginate_by)
+
+        context.update({
+            'resumo': resumo,
+            'excecoes_por_tipo': excecoes_por_tipo,
+            'ultima_execucao': ExecucaoConciliacao.objects.filter(concluida_em__isnull=False).first(),
+            'page_obj': paginator.get_page(self.request.GET.get('page')),
+            'paginator': paginator,
+            'status': status,
+            'tipo': tipo,
+            'status_choices': ConciliacaoPedido.Status.choices,
+            'tipo_choices': ExcecaoConciliacao.Tipo.choices,
+        })
+        return context
+
+
+# ############################################################################
+# MARKETING: CAC / LTV (lê os indicadores materializados)
+# ############################################################################
+
+class CacLtvView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    permission_required = 'tc_marketing.view_indicadoraquisicaomensal'
+    template_name = 'relatorios/cac_ltv.html'
+    meses_exibidos = 12
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Só aceita canais existentes; qualquer outro valor cai no consolidado geral
+        canais = list(CanalMarketing.objects.all())
+        canal_id = next((c.pk for c in canais if str(c.pk) == self.request.GET.get('canal')), None)
+        indicadores = IndicadorAquisicaoMensal.objects.select_related('canal')
+        indicadores = indicadores.filter(canal_id=canal_id) if canal_id else indicadores.filter(canal__isnull=True)
+        serie = list(indicadores.order_by('-ano', '-mes')[:self.meses_exibidos])
+
+        context['canais'] = canais
+        context['canal_id'] = canal_id
+        context['indicadores'] = serie
+        context['ultimo'] = serie[0] if serie else None
+        context['ltv_medio'] = indicadores.filter(ltv__isnull=False).aggregate(media=Avg('ltv'))['media'] or 0
+        # Comparativo do último mês com indicador, por canal
+        if serie:
+            context['por_canal'] = IndicadorAquisicaoMensal.objects.filter(
+                ano=serie[0].ano, mes=serie[0].mes, canal__isnull=False
+            ).select_related('canal').order_by('cac')
+
+        cronologico = list(reversed(serie))
+        context['chart_labels'] = json.dumps([f"{i.mes:02d}/{i.ano}" for i in cronologico])
+        context['chart_cac'] = json.dumps([float(i.cac or 0) for i in cronologico])
+        context['chart_ltv'] = json.dumps([float(i.ltv or 0) for i in cronologico])
+        return context
+
+
+# ############################################################################
+# OPERAÇÕES: DESEMPENHO DO SUPORTE (lê os consolidados diários)
+# ############################################################################
+
+def formatar_minutos(minutos):
+    if minutos is None:
+        return '---'
+    horas, resto = divmod(int(round(minutos)), 60)
+    return f"{horas}h {resto:02d}m" if horas else f"{resto}m"
+
+
+class PeriodoMixin:
+    """ Período do filtro (?data_inicio=&data_fim=); padrão: mês corrente. O fim é limitado a hoje. """
+
+    def get_periodo(self):
+        hoje = timezone.localdate()
+        try:
+            inicio = timezone.datetime.strptime(self.request.GET.get('data_inicio', ''), '%Y-%m-%d').date()
+            fim = timezone.datetime.strptime(self.request.GET.get('data_fim', ''), '%Y-%m-%d').date()
+        except ValueError:
+            inicio, fim = hoje.replace(day=1), hoje
+        # Datas futuras não têm dados e, no limite (9999-12-31), estouram o cálculo de fim + 1 dia
+        fim = min(fim, hoje)
+        return min(inicio, fim), fim
+
+
+class DesempenhoSuporteView(LoginRequiredMixin, PermissionRequiredMixin, PeriodoMixin, TemplateView):
+    permission_required = 'tc_operacoes.view_metricasuportediaria'
+    template_name = 'relatorios/desempenho_suporte.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        inicio, fim = self.get_periodo()
+
+        resumo = MetricasSuporteService.resumo(inicio, fim)
+        por_atendente = MetricasSuporteService.resumo(inicio, fim, agrupar_por='atendente')
+        por_categoria = MetricasSuporteService.resumo(inicio, fim, agrupar_por='categoria')
+        serie = MetricasSuporteService.resumo(inicio, fim, agrupar_por='data')
+        for linha in [resumo, *por_atendente, *por_categoria]:
+            linha['primeira_resposta_fmt'] = formatar_minutos(linha['media_primeira_resposta_min'])
+            linha['mttr_fmt'] = formatar_minutos(linha['mttr_min'])
+
+        context.update({
+            'data_inicio': inicio.strftime('%Y-%m-%d'),
+            'data_fim': fim.strftime('%Y-%m-%d'),
+            'chamados_abertos': Chamado.objects.filter(status__in=['NEW', 'ASS', 'PEN']).count(),
+            'resolvidos_mes': resumo['resolvidos'],
+            'resumo': resumo,
+            'por_atendente': por_atendente,
+            'por_categoria': por_categoria,
+            'chart_labels': json.dumps([linha['data'].strftime('%d/%m') for linha in serie]),
+            'chart_abertos': json.dumps([linha['abertos'] for linha in serie]),
+            'chart_resolvidos': json.dumps([linha['resolvidos'] for linha in serie]),
+            'clientes_top_suporte': Chamado.objects.filter(
+                data_abertura__date__range=[inicio, fim]
+            ).values('cliente__razao_social').annotate(total_chamados=Count('pk')).order_by('-total_chamados')[:10],
+        })
+        return context
+
+
+# ############################################################################
+# VENDAS: FUNIL (lê a tabela fato TransicaoEtapa)
+# ############################################################################
+
+def formatar_segundos(segundos):
+    if segundos is None:
+        return '---'
+    dias, resto = divmod(int(round(segundos)), 86400)
+    if dias:
+        return f"{dias}d {resto // 3600}h"
+    return formatar_minutos(resto / 60)
+
+
+class FunilVendasView(LoginRequiredMixin, PermissionRequiredMixin, PeriodoMixin, TemplateView):
+    """
+    Conversão entre etapas, tempo mediano em cada etapa e velocidade por
+    vendedor. Os dados vêm da extração incremental do histórico das
+    oportunidades (comando extrair_transicoes_etapa).
+    """
+    permission_required = 'tc_crm.view_transicaoetapa'
+    template_name = 'relatorios/funil_vendas.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        inicio, fim = self.get_periodo()
+
+        funil = FunilVendasService.conversao(inicio, fim)
+        medianas = FunilVendasService.tempo_mediano_por_etapa(inicio, fim)
+        for linha in funil:
+            linha['mediana_fmt'] = formatar_segundos(medianas.get(linha['etapa'].pk))
+        por_vendedor = list(FunilVendasService.velocidade_por_vendedor(inicio, fim))
+        for linha in por_vendedor:
+            linha['media_fmt'] = formatar_segundos(linha['media_segundos'])
+
+        context.update({
+            'data_inicio': inicio.strftime('%Y-%m-%d'),
+            'data_fim': fim.strftime('%Y-%m-%d'),
+            'funil': funil,
+            'por_vendedor': por_vendedor,
+            'processado_em': FunilVendasService.ultimo_processamento(),
+            'chart_labels': json.dumps([linha['etapa'].nome for linha in funil]),
+            'chart_entradas': json.dumps([linha['entradas'] for linha in funil]),
+        })
+        return context
+
+
+# ############################################################################
+# AUDITORIA: timeline unificada do histórico (simple_history)
+# ############################################################################
+
+class AuditoriaTimelineView(LoginRequiredMixin, TemplateView):
+    """
+    Quem mudou o quê, em todos os modelos com histórico: global, por cliente
+    (?cliente=) ou por usuário (?usuario=), filtrável por modelo (?modelo=).
+    A rolagem busca a próxima página por cursor (HTMX).
+    """
+    template_name = 'relatorios/auditoria_timeline.html'
+    template_parcial = 'relatorios/partials/auditoria_linhas.html'
+    paginate_by = 50
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not (request.user.is_superuser or request.user.departamento == 'diretoria'):
+            messages.error(request, "Acesso Negado: a trilha de auditoria é restrita à diretoria.")
+            return redirect('tc_core:dashboard')
+        return super().dispatch(request, *args, **kwargs)
+
+    def _inteiro(self, parametro):
+        valor = self.request.GET.get(parametro, '')
+        return int(valor) if valor.isdigit() else None
+
+    def get_template_names(self):
+        if self.request.htmx and self.request.GET.get('cursor'):
+            return [self.template_parcial]
+        return [self.template_name]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cliente_id = self._inteiro('cliente')
+        usuario_id = self._inteiro('usuario')
+        modelos = [m for m in self.request.GET.getlist('modelo') if m in auditoria.fontes_por_chave()]
+
+        try:
+            entradas, cursor = auditoria.pagina(
+                cliente_id=cliente_id, usuario_id=usuario_id, modelos=modelos,
+                cursor=self.request.GET.get('cursor'), tamanho=self.paginate_by,
+            )
+        except ValueError:
+            raise Http404("Cursor de paginação inválido.")
+        auditoria.carregar_anteriores(entradas)
+
+        proxima_url = None
+        if cursor:
+            params = self.request.GET.copy()
+            params['cursor'] = cursor
+            proxima_url = f"{self.request.path}?{params.urlencode()}"
+
+        context.update({
+            'entradas': entradas,
+            'proxima_url': proxima_url,
+            'fontes': [f for f in auditoria.fontes() if cliente_id is None or f.campo_cliente],
+            'modelos_selecionados': modelos,
+            'usuarios': get_user_model().objects.filter(is_active=True).order_by('first_name', 'username'),
+            'usuario_id': usuario_id,
+            'cliente': Cliente.objects.filter(pk=cliente_id).only('pk', 'razao_social').first() if cliente_id else None,
+        })
+        return context
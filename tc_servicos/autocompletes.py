@@ -0,0 +1,17 @@
+# tc_servicos/autocompletes.py
+from tc_core.autocomplete import AutocompleteBase, registrar_autocomplete
+
+from .models import Servico
+
+# ############################################################################
+# BUSCAS REMOTAS DOS SELECTS
+# ############################################################################
+
+@registrar_autocomplete
+class ServicoAutocomplete(AutocompleteBase):
+    codigo = 'servicos'
+    modelo = Servico
+    campos_busca = ('nome__icontains', 'codigo_servico__icontains')
+    ordenacao = ('nome', 'pk')
+    permissao = 'tc_servicos.view_servico'
+    placeholder = 'Busque o serviço por nome ou código...'
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 14:10
+
+from django.db import migrations
+
+# Ver tc_produtos 0004: índices trigram para a busca do catálogo (só PostgreSQL)
+CAMPOS_TRIGRAM = ('nome', 'codigo_servico')
+
+
+def criar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for campo in CAMPOS_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_servico_{campo}_trgm ON tc_servicos_servico '
+            f'USING gin (UPPER({campo}::text) gin_trgm_ops)'
+        )
+
+
+def remover_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in CAMPOS_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX IF EXISTS idx_servico_{campo}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tc_servicos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices_trigram, remover_indices_trigram),
+    ]